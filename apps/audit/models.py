@@ -58,9 +58,12 @@ class AuditLog(models.Model):
         related_name="audit_logs_created",
         verbose_name=_("Acteur")
     )
+    # Posé à la création de l'événement (et non à l'INSERT) : les écritures
+    # différées de ``apps.audit.sink`` gardent l'heure réelle de l'action.
     timestamp = models.DateTimeField(
         _("Horodatage"),
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         db_index=True
     )
     
@@ -137,6 +140,33 @@ class AuditLog(models.Model):
             metadata=metadata,
         )
 
+    @classmethod
+    def enqueue(
+        cls,
+        action_type: str,
+        actor: User = None,
+        content_type: str = None,
+        object_id: int = None,
+        description: str = "",
+        metadata: dict = None,
+    ) -> bool:
+        """Comme ``log_action`` mais écrit en différé, par lots (``apps.audit.sink``).
+
+        Pour les événements best-effort (sécurité, actions admin) : la requête
+        n'attend pas l'INSERT. Renvoie False si l'enregistrement a été abandonné
+        (file pleine).
+        """
+        from .sink import sink
+
+        return sink.emit(
+            action_type,
+            actor=actor,
+            content_type=content_type,
+            object_id=object_id,
+            description=description,
+            metadata=metadata,
+        )
+
 
 class StripeEventLog(models.Model):
     """🛡️ BANK-GRADE: Idempotency guard for Stripe webhooks.
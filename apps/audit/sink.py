@@ -0,0 +1,333 @@
+"""
+Écriture différée et groupée du journal d'audit.
+
+``AuditLog.log_action`` fait un INSERT synchrone dans la requête : pendant
+une rafale de sondes d'un scanner, chaque chemin suspect ajoutait une
+écriture en base à une réponse censée coûter presque rien. Les événements
+« best-effort » (sécurité, actions admin) passent désormais par ce puits :
+
+- ``emit(...)`` met l'enregistrement en file et rend la main aussitôt ;
+- un thread d'arrière-plan vide la file par ``bulk_create`` dès que
+  ``BATCH_SIZE`` enregistrements attendent, ou au plus tard toutes les
+  ``FLUSH_INTERVAL_MS`` millisecondes ;
+- la file est bornée (``MAX_BUFFER``) : pleine, le nouvel enregistrement
+  est abandonné et compté (``stats()['dropped']``), la requête n'attend
+  jamais la base ;
+- la file restante est écrite à l'arrêt du processus (``atexit``).
+
+Modes (``settings.AUDIT_SINK['MODE']``) :
+
+- ``memory`` (défaut) : file en mémoire du processus ;
+- ``redis`` : liste Redis partagée (cache ``default``), vidée par le thread
+  de chaque worker ; repli en mémoire si Redis est injoignable ;
+- ``sync`` : INSERT immédiat, sans thread (tests, défaut si ``TESTING``).
+
+Les enregistrements métier (validation de devis, jalons…) restent écrits
+par ``AuditLog.log_action``, dans la transaction de l'action.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BUFFER = 10_000
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL_MS = 500
+REDIS_KEY = 'audit:queue'
+REDIS_RETRY_SECONDS = 60
+
+# KEYS[1] = liste ; ARGV = taille max, enregistrement JSON. Renvoie 1 si accepté.
+_LUA_BOUNDED_PUSH = """
+if redis.call('LLEN', KEYS[1]) >= tonumber(ARGV[1]) then
+  return 0
+end
+redis.call('RPUSH', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, 'AUDIT_SINK', {}) or {}).get(key, default)
+
+
+def _mode() -> str:
+    return _cfg('MODE', 'sync' if getattr(settings, 'TESTING', False) else 'memory')
+
+
+def _record(action_type, actor, content_type, object_id, description, metadata) -> dict:
+    """Champs d'un ``AuditLog`` ; l'horodatage est celui de l'événement."""
+    return {
+        'action_type': action_type,
+        'actor_id': getattr(actor, 'pk', actor),
+        'content_type': content_type or '',
+        'object_id': object_id or 0,
+        'description': description,
+        'metadata': metadata or {},
+        'timestamp': timezone.now(),
+    }
+
+
+class AuditSink:
+    """File bornée d'enregistrements d'audit, vidée par un thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._buffer: deque[dict] = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+        self._stopping = False
+        self._redis = None
+        self._redis_disabled_until = 0.0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+    # ------------------------------------------------------------------
+    # Production
+    # ------------------------------------------------------------------
+
+    def emit(
+        self,
+        action_type: str,
+        actor=None,
+        content_type: str = None,
+        object_id: int = None,
+        description: str = "",
+        metadata: dict = None,
+    ) -> bool:
+        """Enfile un enregistrement ; False s'il a été abandonné (file pleine)."""
+        record = _record(action_type, actor, content_type, object_id, description, metadata)
+        mode = _mode()
+        if mode == 'sync':
+            self._write([record])
+            return True
+
+        self._ensure_flusher()
+        if mode == 'redis':
+            accepted = self._push_redis(record)
+            if accepted is not None:
+                if not accepted:
+                    self._count_drop()
+                return accepted
+
+        with self._lock:
+            if len(self._buffer) >= int(_cfg('MAX_BUFFER', DEFAULT_MAX_BUFFER)):
+                self.dropped += 1
+                accepted = False
+            else:
+                self._buffer.append(record)
+                accepted = True
+            pending = len(self._buffer)
+        if not accepted:
+            self._log_drop()
+        elif pending >= self._batch_size():
+            self._wake.set()
+        return accepted
+
+    def _count_drop(self) -> None:
+        with self._lock:
+            self.dropped += 1
+        self._log_drop()
+
+    def _log_drop(self) -> None:
+        # Avertit au 1er, 2e, 4e, 8e… abandon puis tous les 1000 : pas de tempête de logs
+        dropped = self.dropped
+        if dropped & (dropped - 1) == 0 or dropped % 1000 == 0:
+            logger.warning("Audit : file pleine, %d enregistrement(s) abandonné(s)", dropped)
+
+    @staticmethod
+    def _batch_size() -> int:
+        return max(1, int(_cfg('BATCH_SIZE', DEFAULT_BATCH_SIZE)))
+
+    # ------------------------------------------------------------------
+    # Redis
+    # ------------------------------------------------------------------
+
+    def _redis_client(self):
+        if self._redis is None:
+            from django.core.cache.backends.redis import RedisCache
+
+            backend = caches['default']
+            if not isinstance(backend, RedisCache):
+                return None
+            client = backend._cache.get_client(write=True)
+            self._redis = (client, client.register_script(_LUA_BOUNDED_PUSH), backend.make_key(REDIS_KEY))
+        return self._redis
+
+    def _disable_redis(self, error: Exception) -> None:
+        logger.warning("Audit : Redis indisponible (%s), file mémoire %d s", error, REDIS_RETRY_SECONDS)
+        self._redis = None
+        self._redis_disabled_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _push_redis(self, record: dict) -> Optional[bool]:
+        """Pousse dans la liste Redis ; None si Redis est indisponible."""
+        if time.monotonic() < self._redis_disabled_until:
+            return None
+        try:
+            redis = self._redis_client()
+            if redis is None:
+                return None
+            _client, push, key = redis
+            payload = json.dumps({**record, 'timestamp': record['timestamp'].isoformat()}, default=str)
+            return bool(push(keys=[key], args=[int(_cfg('MAX_BUFFER', DEFAULT_MAX_BUFFER)), payload]))
+        except Exception as e:  # noqa: BLE001 — repli mémoire
+            self._disable_redis(e)
+            return None
+
+    def _pop_redis(self, count: int) -> list[dict]:
+        if time.monotonic() < self._redis_disabled_until:
+            return []
+        try:
+            redis = self._redis_client()
+            if redis is None:
+                return []
+            client, _push, key = redis
+            raw = client.lpop(key, count) or []
+        except Exception as e:  # noqa: BLE001
+            self._disable_redis(e)
+            return []
+        records = []
+        for item in raw:
+            try:
+                record = json.loads(item)
+                record['timestamp'] = parse_datetime(record['timestamp']) or timezone.now()
+                records.append(record)
+            except (TypeError, ValueError, KeyError):
+                self.failed += 1
+        return records
+
+    # ------------------------------------------------------------------
+    # Vidage
+    # ------------------------------------------------------------------
+
+    def _ensure_flusher(self) -> None:
+        pid = os.getpid()
+        if self._owner_pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._owner_pid != pid:
+                # Processus fils (fork) : la file et le thread du parent ne sont pas à nous
+                self._buffer.clear()
+                self._redis = None
+                self._owner_pid = pid
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='audit-sink', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        from django.db import close_old_connections, connection
+
+        interval = max(1, int(_cfg('FLUSH_INTERVAL_MS', DEFAULT_FLUSH_INTERVAL_MS))) / 1000
+        try:
+            while not self._stopping:
+                self._wake.wait(interval)
+                self._wake.clear()
+                close_old_connections()
+                try:
+                    self.flush()
+                except Exception:  # noqa: BLE001 — le thread ne doit jamais mourir
+                    logger.exception("Audit : échec du vidage de la file")
+        finally:
+            connection.close()
+
+    def _take(self, count: int) -> list[dict]:
+        with self._lock:
+            return [self._buffer.popleft() for _ in range(min(count, len(self._buffer)))]
+
+    def flush(self) -> int:
+        """Écrit tout ce qui attend (file mémoire puis liste Redis) ; renvoie le nombre écrit."""
+        batch_size = self._batch_size()
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take(batch_size)
+                if len(batch) < batch_size and _mode() == 'redis':
+                    batch += self._pop_redis(batch_size - len(batch))
+                if not batch:
+                    return written
+                written += self._write(batch)
+
+    def _write(self, records: list[dict]) -> int:
+        from .models import AuditLog
+
+        objs = [AuditLog(**record) for record in records]
+        try:
+            AuditLog.objects.bulk_create(objs)
+        except Exception:  # noqa: BLE001 — un enregistrement fautif ne perd pas le lot
+            logger.warning("Audit : échec du bulk_create (%d), écriture unitaire", len(objs), exc_info=True)
+            ok = 0
+            for obj in objs:
+                obj.pk = None
+                try:
+                    obj.save()
+                    ok += 1
+                except Exception:  # noqa: BLE001
+                    self.failed += 1
+            self.written += ok
+            return ok
+        self.written += len(objs)
+        return len(objs)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Arrête le thread et écrit la file restante (appelé à la sortie)."""
+        self._stopping = True
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        try:
+            self.flush()
+        except Exception:  # noqa: BLE001
+            logger.exception("Audit : échec du vidage à l'arrêt (%d en attente)", len(self._buffer))
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._buffer)
+        return {
+            'mode': _mode(),
+            'pending': pending,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+    def reset(self) -> None:
+        """Vide la file et remet les compteurs à zéro (tests)."""
+        with self._lock:
+            self._buffer.clear()
+            self.dropped = self.written = self.failed = 0
+        self._redis = None
+        self._redis_disabled_until = 0.0
+
+
+# Singleton processus
+sink = AuditSink()
+atexit.register(sink.shutdown)
+
+
+def emit(*args, **kwargs) -> bool:
+    return sink.emit(*args, **kwargs)
+
+
+__all__ = [
+    'AuditSink',
+    'emit',
+    'sink',
+]
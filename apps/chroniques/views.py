@@ -4,6 +4,10 @@ from django.db.models import Q, Count
 from django.shortcuts import get_object_or_404, render
 from django.core.paginator import Paginator
 from django.db import ProgrammingError, OperationalError
+
+from core.page_cache import anonymous_page_cache
+from core.query_budget import query_budget
+
 from .models import Article, Category
 
 # ── Valid sort options ──────────────────────────────────────────────
@@ -31,6 +35,9 @@ def _build_query_string(params: dict, exclude: str = "") -> str:
     return "&".join(parts)
 
 
+# article_detail n'est pas mis en cache : il compte les vues (increment_views).
+@anonymous_page_cache('chroniques')
+@query_budget(4)  # +1 : filtre par catégorie
 def article_list(request):
     try:
         qs = Article.objects.select_related('author', 'category').filter(is_published=True)
@@ -118,7 +118,7 @@ class ClientProfileAdmin(admin.ModelAdmin):
                 'fields': (
                     'is_business', 'country_code',
                     'siren', 'siret', 'tva_number',
-                    'legal_form', 'peppol_id',
+                    'legal_form', 'peppol_id', 'iban',
                 ),
                 'description': (
                     '<strong>SIREN obligatoire</strong> sur les factures B2B émises '
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:20
+
+import apps.einvoicing.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0016_einvoicing_phase1_stripe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientprofile',
+            name='iban',
+            field=models.CharField(blank=True, help_text='Compte émetteur des virements du client (rapprochement bancaire).', max_length=34, validators=[apps.einvoicing.validators.validate_iban], verbose_name='IBAN'),
+        ),
+    ]
@@ -25,6 +25,7 @@ from apps.einvoicing.validators import (
     validate_siret,
     validate_vat_intracom,
     validate_peppol_id,
+    validate_iban,
 )
 
 
@@ -104,6 +105,13 @@ class ClientProfile(models.Model):
         validators=[validate_peppol_id],
         help_text="Format `<scheme>:<value>`, ex. `0009:90826411200016` (SIRET).",
     )
+    iban = models.CharField(
+        "IBAN",
+        max_length=34,
+        blank=True,
+        validators=[validate_iban],
+        help_text="Compte émetteur des virements du client (rapprochement bancaire).",
+    )
 
     # Adresse de livraison (mention obligatoire si différente de l'adresse de facturation)
     delivery_address_line = models.CharField(
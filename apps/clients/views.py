@@ -2,6 +2,7 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView, ListView, DetailView, UpdateView, CreateView
 from django.contrib import messages
 from django.urls import reverse_lazy
@@ -10,6 +11,8 @@ from django.core.files.storage import default_storage
 from django.views.decorators.clickjacking import xframe_options_sameorigin
 from django.views.decorators.http import require_POST
 
+from core.query_budget import query_budget
+
 from .models import ClientProfile, Project, ProjectMilestone, ClientDocument, ClientNotification
 from .forms import ClientProfileForm, DocumentUploadForm, ClientRequestForm
 
@@ -59,6 +62,7 @@ class ClientRequiredMixin(LoginRequiredMixin):
         return context
 
 
+@method_decorator(query_budget(7), name='dispatch')
 class DashboardView(ClientRequiredMixin, TemplateView):
     """Client dashboard with overview of projects and documents."""
     template_name = 'clients/dashboard.html'
@@ -117,6 +121,7 @@ class ProfileView(ClientRequiredMixin, UpdateView):
         return super().form_valid(form)
 
 
+@method_decorator(query_budget(5), name='dispatch')
 class ProjectListView(ClientRequiredMixin, ListView):
     """List all client projects."""
     model = Project
@@ -290,6 +295,7 @@ def upload_document(request, project_id=None):
     })
 
 
+@method_decorator(query_budget(5), name='dispatch')
 class QuoteListView(ClientRequiredMixin, ListView):
     """List all quotes for the client."""
     template_name = 'clients/quote_list.html'
@@ -301,6 +307,9 @@ class QuoteListView(ClientRequiredMixin, ListView):
         return Quote.objects.filter(
             client=profile
         ).select_related('client').order_by('-created_at')
+
+
+@method_decorator(query_budget(5), name='dispatch')
 class InvoiceListView(ClientRequiredMixin, ListView):
     """List all invoices for the client."""
     template_name = 'clients/invoice_list.html'
@@ -543,6 +552,7 @@ def quick_request(request):
 
 
 @login_required
+@query_budget(3)
 def quote_detail(request, pk):
     """Display quote detail for client."""
     from apps.devis.models import Quote
@@ -560,6 +570,7 @@ def quote_detail(request, pk):
 
 
 @login_required
+@query_budget(6)
 def quote_pdf_download(request, pk):
     """Download quote PDF."""
     from apps.devis.models import Quote
@@ -614,6 +625,7 @@ def quote_pdf_view(request, pk):
 
 
 @login_required
+@query_budget(5)
 def invoice_detail(request, pk):
     """Display invoice detail for client."""
     from apps.factures.models import Invoice
@@ -631,6 +643,7 @@ def invoice_detail(request, pk):
 
 
 @login_required
+@query_budget(12)
 def invoice_pdf_download(request, pk):
     """Download invoice PDF."""
     from apps.factures.models import Invoice
@@ -649,11 +662,11 @@ def invoice_pdf_download(request, pk):
             filename=f"facture_{invoice.number}.pdf"
         )
     
-    # Generate PDF if not exists
-    from apps.factures.services.pdf_generator import InvoicePdfService
+    # Generate PDF if not exists (cache chaud d'abord)
+    from apps.factures.services.pdf_cache import get_or_render
     
     try:
-        pdf_bytes = InvoicePdfService.generate_invoice_pdf(invoice, attach=True)
+        pdf_bytes = get_or_render(invoice)
         return FileResponse(
             iter([pdf_bytes]),
             as_attachment=True,
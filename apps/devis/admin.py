@@ -1,11 +1,11 @@
 from django.contrib import admin, messages
 from django.urls import path, reverse
 from django.shortcuts import get_object_or_404, redirect
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
 from django import forms
 from django.contrib.auth.models import User
 from apps.clients.models import ClientProfile, ClientDocument, ClientNotification
-from .models import Quote, QuoteItem
+from .models import Quote, QuoteItem, QuoteRequest
 
 
 class QuoteAdminForm(forms.ModelForm):
@@ -182,11 +182,16 @@ class QuoteAdmin(admin.ModelAdmin):
 
     @admin.action(description="🧾 Convertir en facture")
     def action_convert_to_invoice(self, request, queryset):
-        for quote in queryset:
-            if hasattr(quote, "convert_to_invoice"):
-                invoice = quote.convert_to_invoice()
-                self.message_user(request, f"{quote.number} → {invoice.number}", level=messages.SUCCESS)
-        self.message_user(request, "Devis converti en facture.", level=messages.SUCCESS)
+        """Conversion en lot : numéros en bloc, lignes en bulk, PDF en tâche de fond."""
+        from .services import create_invoices_from_quotes
+        result = create_invoices_from_quotes(queryset.values_list("pk", flat=True))
+        for created in result.created:
+            self.message_user(request, f"{created.quote.number} → {created.invoice.number}", level=messages.SUCCESS)
+        for reason in result.errors.values():
+            self.message_user(request, reason, level=messages.WARNING)
+        self.message_user(
+            request, f"{len(result.created)} devis converti(s) en facture.", level=messages.SUCCESS,
+        )
 
     @admin.action(description="🧾 Convertir en facture et publier sur portail")
     def action_convert_to_invoice_and_publish(self, request, queryset):
@@ -276,4 +281,47 @@ class QuoteAdmin(admin.ModelAdmin):
         except Exception:
             return False
 
-# NOTE : on ne register pas QuoteItem pour éviter un menu séparé en admin.
\ No newline at end of file
+# NOTE : on ne register pas QuoteItem pour éviter un menu séparé en admin.
+
+
+@admin.register(QuoteRequest)
+class QuoteRequestAdmin(admin.ModelAdmin):
+    """Demandes du formulaire public (lien de l'email de notification staff).
+
+    Les photos s'affichent en miniatures WebP et s'ouvrent sur la variante
+    optimisée (EXIF retiré) produite par ``photo_pipeline`` ; l'original
+    n'est servi que tant que le traitement n'est pas passé.
+    """
+
+    list_display = ("client_name", "email", "phone", "status", "photo_count", "created_at")
+    list_filter = ("status",)
+    search_fields = ("client_name", "email", "phone")
+    readonly_fields = ("photo_gallery", "created_at")
+    exclude = ("photos",)
+
+    def get_queryset(self, request):
+        from django.db.models import Count
+
+        return super().get_queryset(request).annotate(_photo_count=Count("photos"))
+
+    @admin.display(description="Photos", ordering="_photo_count")
+    def photo_count(self, obj):
+        return obj._photo_count
+
+    @admin.display(description="Photos")
+    def photo_gallery(self, obj):
+        links = []
+        for photo in obj.photos.order_by("pk"):
+            if not photo.display_image:
+                continue
+            if photo.thumbnail:
+                label = format_html(
+                    '<img src="{}" alt="" style="max-height:120px;border-radius:4px">', photo.thumbnail.url,
+                )
+            else:  # PDF, photo illisible ou pas encore traitée
+                label = photo.display_image.name.rsplit("/", 1)[-1]
+            links.append(format_html(
+                '<a href="{}" target="_blank" rel="noopener" style="margin-right:8px">{}</a>',
+                photo.display_image.url, label,
+            ))
+        return format_html_join("", "{}", ((link,) for link in links)) if links else "–"
@@ -8,6 +8,7 @@ from django.core.cache import cache
 from django.db import transaction
 from django.utils import timezone
 
+from apps.devis.application import validation_cache
 from apps.devis.email_service import send_quote_validation_code
 from apps.devis.models import Quote, QuoteValidation
 from core.utils import get_client_ip as _get_client_ip
@@ -15,6 +16,9 @@ from core.utils import get_client_ip as _get_client_ip
 logger = logging.getLogger(__name__)
 
 
+MAX_ATTEMPTS = 5
+
+
 class QuoteNotValidatableError(Exception):
     """Le devis n'est pas dans un état permettant la validation."""
 
@@ -52,17 +56,22 @@ def start_quote_validation(
     if quote.status != Quote.QuoteStatus.SENT:
         raise QuoteNotValidatableError(f"Devis non validable (status={quote.status!r}).")
 
-    # Rate-limit : 1 code OTP par minute par devis
+    # Rate-limit : 1 code OTP par minute par devis. ``cache.add`` est atomique :
+    # deux clics simultanés ne peuvent pas envoyer deux codes.
     rate_key = f"otp_ratelimit:quote:{quote.pk}"
-    if cache.get(rate_key):
+    if not cache.add(rate_key, 1, 60):  # 60 secondes de cooldown
         raise QuoteValidationRateLimitError(
             "Un code vient d'être envoyé. Veuillez patienter 1 minute."
         )
 
-    validation = QuoteValidation.create_for_quote(quote, ttl_minutes=ttl_minutes)
-    send_quote_validation_code(quote, validation, request=request, to_email=to_email)
+    try:
+        validation = QuoteValidation.create_for_quote(quote, ttl_minutes=ttl_minutes)
+        send_quote_validation_code(quote, validation, request=request, to_email=to_email)
+    except Exception:
+        cache.delete(rate_key)
+        raise
 
-    cache.set(rate_key, 1, 60)  # 60 secondes de cooldown
+    validation_cache.store_snapshot(validation.token, validation_cache.snapshot_of(validation))
     return QuoteValidationStartResult(quote=quote, validation=validation)
 
 
@@ -76,12 +85,16 @@ def get_pending_validation_for_quote(quote: Quote) -> QuoteValidation:
 
 def confirm_quote_validation_code(
     *,
-    validation: QuoteValidation,
+    validation: Optional[QuoteValidation] = None,
+    token: Optional[str] = None,
     submitted_code: str,
     request=None,
 ) -> bool:
     """Confirme un code de validation et applique les effets métier.
 
+    Accepte la validation ou seulement son ``token`` : la vérification passe
+    par `validation_cache` (instantané en cache, tentative comptée en base).
+
     Conçu comme signature électronique fiable :
     - devis.status = ACCEPTED
     - devis.validated_at = horodatage de la confirmation
@@ -90,15 +103,20 @@ def confirm_quote_validation_code(
     - notification admin par email (best-effort)
     - le signal post_save déclenche l'onboarding client automatique
     """
-    quote = validation.quote
-
-    if validation.is_expired:
+    if validation is not None:
+        token = validation.token
+    snapshot = validation_cache.get_snapshot(token or "")
+    if snapshot is None or snapshot.is_expired:
         raise QuoteValidationExpiredError("Validation expirée.")
 
-    ok = validation.verify(submitted_code)
+    ok = validation_cache.verify_code(token, snapshot, submitted_code, max_attempts=MAX_ATTEMPTS)
     if not ok:
         return False
 
+    # Changement d'état : relecture de la validation confirmée et de son devis.
+    validation = QuoteValidation.objects.select_related("quote").get(pk=snapshot.pk)
+    quote = validation.quote
+
     # ── Audit trail e-signature ──────────────────────────────────
     now = timezone.now()
     audit_trail = {
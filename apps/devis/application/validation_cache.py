@@ -0,0 +1,184 @@
+"""Couche cache des endpoints publics de validation de devis.
+
+Objectif : un jeton inconnu ou déjà verrouillé ne coûte **aucune lecture**
+en base ; la base ne reçoit que les écritures qui comptent (tentative,
+confirmation).
+
+- **Jeton public → devis** (`resolve_quote_id`) : ``Quote.public_token`` est
+  stable, la correspondance est mise en cache ; un jeton inconnu est mis en
+  cache négatif (``NEGATIVE_TTL``) pour que les sondages répétés ne
+  touchent plus la base.
+- **Jeton de validation → instantané** (`get_snapshot`) : pk, devis,
+  expiration, état confirmé, empreinte HMAC du code — suffisant pour
+  vérifier un code sans lire ``QuoteValidation``.
+- **Compteur de tentatives** (`register_attempt`) : chaque essai est écrit
+  en base (``F("attempts") + 1``, atomique) et la valeur relue fait foi.
+  Le cache n'en garde qu'une copie en lecture (instantané mis à jour) : un
+  cache par processus (LocMem sans Redis), évincé ou vidé ne rend aucun
+  essai.
+
+Les clés contiennent une empreinte SHA-256 du jeton, jamais le jeton lui-même.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.devis.models import Quote, QuoteValidation
+
+QUOTE_TOKEN_TTL = 60 * 60 * 24
+NEGATIVE_TTL = 60
+_MISSING = 0  # valeur du cache négatif
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:40]
+
+
+def code_digest(code: str) -> str:
+    """Empreinte HMAC (SECRET_KEY) d'un code OTP — le code n'est pas mis en cache en clair."""
+    return hmac.new(
+        settings.SECRET_KEY.encode("utf-8"), (code or "").strip().encode("utf-8"), hashlib.sha256,
+    ).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Jeton public du devis
+# ---------------------------------------------------------------------------
+def _quote_token_key(token: str) -> str:
+    return f"devis:public_token:{_digest(token)}"
+
+
+def resolve_quote_id(token: str) -> Optional[int]:
+    """pk du devis portant ce ``public_token`` (None si inconnu)."""
+    key = _quote_token_key(token)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached or None
+    pk = Quote.objects.filter(public_token=token).values_list("pk", flat=True).first()
+    cache.set(key, pk or _MISSING, QUOTE_TOKEN_TTL if pk else NEGATIVE_TTL)
+    return pk
+
+
+# ---------------------------------------------------------------------------
+# Jeton de validation OTP
+# ---------------------------------------------------------------------------
+@dataclass(frozen=True)
+class ValidationSnapshot:
+    pk: int
+    quote_id: int
+    expires_at: datetime
+    confirmed: bool
+    code_digest: str
+    attempts: int
+
+    @property
+    def is_expired(self) -> bool:
+        return self.expires_at <= timezone.now()
+
+    @property
+    def ttl(self) -> int:
+        # Conservé un peu après expiration pour répondre « expiré » sans lire la base.
+        return max(int((self.expires_at - timezone.now()).total_seconds()), 0) + 300
+
+
+def _snapshot_key(token: str) -> str:
+    return f"devis:validation:{_digest(token)}"
+
+
+def snapshot_of(validation: QuoteValidation) -> ValidationSnapshot:
+    return ValidationSnapshot(
+        pk=validation.pk,
+        quote_id=validation.quote_id,
+        expires_at=validation.expires_at,
+        confirmed=validation.confirmed_at is not None,
+        code_digest=code_digest(validation.code),
+        attempts=validation.attempts,
+    )
+
+
+def store_snapshot(token: str, snapshot: ValidationSnapshot) -> None:
+    cache.set(_snapshot_key(token), snapshot, snapshot.ttl)
+
+
+def get_snapshot(token: str) -> Optional[ValidationSnapshot]:
+    """Instantané de la validation (None si jeton inconnu, mis en cache négatif)."""
+    key = _snapshot_key(token)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached or None
+    validation = QuoteValidation.objects.filter(token=token).first()
+    if validation is None:
+        cache.set(key, _MISSING, NEGATIVE_TTL)
+        return None
+    snapshot = snapshot_of(validation)
+    store_snapshot(token, snapshot)
+    return snapshot
+
+
+def forget_validations(tokens) -> None:
+    """Retire les instantanés de validations supprimées ou remplacées."""
+    keys = [_snapshot_key(token) for token in tokens]
+    if keys:
+        cache.delete_many(keys)
+
+
+def register_attempt(snapshot: ValidationSnapshot) -> int:
+    """Compte une tentative en base et renvoie le total (toutes requêtes et workers confondus)."""
+    with transaction.atomic():
+        QuoteValidation.objects.filter(pk=snapshot.pk).update(attempts=F("attempts") + 1)
+        # Ligne verrouillée par l'UPDATE jusqu'au commit : la relecture est exacte.
+        return QuoteValidation.objects.filter(pk=snapshot.pk).values_list("attempts", flat=True).first() or 0
+
+
+def verify_code(
+    token: str,
+    snapshot: ValidationSnapshot,
+    submitted_code: str,
+    *,
+    max_attempts: int,
+) -> bool:
+    """Vérifie un code ; chaque tentative est comptée en base avant comparaison."""
+    if snapshot.confirmed:
+        return True
+    if snapshot.is_expired:
+        return False
+    if snapshot.attempts >= max_attempts:
+        return False
+    if not submitted_code or not submitted_code.strip():
+        return False
+
+    attempts = register_attempt(snapshot)
+    if attempts > max_attempts:
+        store_snapshot(token, replace(snapshot, attempts=attempts))
+        return False
+    ok = hmac.compare_digest(code_digest(submitted_code), snapshot.code_digest)
+    if ok:
+        QuoteValidation.objects.filter(pk=snapshot.pk, confirmed_at__isnull=True).update(
+            confirmed_at=timezone.now(),
+        )
+    store_snapshot(token, replace(snapshot, confirmed=ok, attempts=attempts))
+    return ok
+
+
+__all__ = [
+    "ValidationSnapshot",
+    "code_digest",
+    "forget_validations",
+    "get_snapshot",
+    "register_attempt",
+    "resolve_quote_id",
+    "snapshot_of",
+    "store_snapshot",
+    "verify_code",
+]
@@ -22,6 +22,15 @@ class MultiFileInput(forms.ClearableFileInput):
     allow_multiple_selected = True
 
 
+class MultiFileField(forms.FileField):
+    """FileField acceptant la liste de fichiers renvoyée par `MultiFileInput`."""
+
+    def clean(self, data, initial=None):
+        if isinstance(data, (list, tuple)):
+            return [super(MultiFileField, self).clean(item, initial) for item in data]
+        return super().clean(data, initial)
+
+
 class DevisForm(forms.Form):
     """Formulaire simple pour demander un devis."""
 
@@ -205,7 +214,7 @@ class DevisForm(forms.Form):
 class QuoteRequestForm(forms.ModelForm):
     """Formulaire public pour déposer une demande de devis."""
 
-    photos = forms.FileField(
+    photos = MultiFileField(
         label=_("Photos (optionnel)"),
         required=False,
         widget=MultiFileInput(attrs={"multiple": True}),
@@ -0,0 +1,35 @@
+"""Optimise les photos de demandes de devis restées en attente.
+
+Usage :
+    python manage.py process_quote_photos              # toutes les photos en attente
+    python manage.py process_quote_photos --limit 200
+
+Utile pour rattraper l'historique (photos déposées avant le traitement en
+tâche de fond) ou les photos d'un worker interrompu.
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Produit les variantes WebP des photos de demandes de devis en attente et retire les doublons."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Nombre maximum de photos à traiter.")
+
+    def handle(self, *args, **options):
+        from apps.devis.models import QuoteRequestPhoto
+        from apps.devis.photo_pipeline import process_photos
+
+        pending = QuoteRequestPhoto.objects.filter(
+            status=QuoteRequestPhoto.ProcessingStatus.PENDING,
+        ).order_by("pk").values_list("pk", flat=True)
+        if options["limit"]:
+            pending = pending[: options["limit"]]
+        stats = process_photos(list(pending))
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['processed']} photo(s) optimisée(s), {stats['failed']} en échec, "
+            f"{stats['duplicates']} doublon(s) retiré(s)."
+        ))
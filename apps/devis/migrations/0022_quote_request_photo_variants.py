@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devis', '0021_alter_quote_pdf_alter_quote_signature_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quoterequestphoto',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Hauteur'),
+        ),
+        migrations.AddField(
+            model_name='quoterequestphoto',
+            name='optimized',
+            field=models.ImageField(blank=True, upload_to='devis/requests/photos/optimized', verbose_name='Version optimisée (WebP)'),
+        ),
+        migrations.AddField(
+            model_name='quoterequestphoto',
+            name='phash',
+            field=models.CharField(blank=True, db_index=True, help_text='dHash 64 bits (hexadécimal) — détection des doublons.', max_length=16, verbose_name='Empreinte perceptuelle'),
+        ),
+        migrations.AddField(
+            model_name='quoterequestphoto',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Traitée le'),
+        ),
+        migrations.AddField(
+            model_name='quoterequestphoto',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('ready', 'Optimisée'), ('failed', 'Échec')], default='pending', max_length=10, verbose_name='Traitement'),
+        ),
+        migrations.AddField(
+            model_name='quoterequestphoto',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='devis/requests/photos/thumbs', verbose_name='Miniature (WebP)'),
+        ),
+        migrations.AddField(
+            model_name='quoterequestphoto',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Largeur'),
+        ),
+    ]
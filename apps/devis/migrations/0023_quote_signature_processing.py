@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:44
+
+import core.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devis', '0022_quote_request_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quote',
+            name='signature_display',
+            field=models.FileField(blank=True, help_text='Signature rognée et optimisée (affichage/PDF)', null=True, storage=core.utils.raw_media_storage, upload_to='devis/signatures'),
+        ),
+        migrations.AddField(
+            model_name='quote',
+            name='signature_processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='quote',
+            name='signature_status',
+            field=models.CharField(blank=True, choices=[('pending', 'En cours de traitement'), ('ready', 'PDF signé prêt'), ('failed', 'Échec du traitement')], default='', max_length=10),
+        ),
+    ]
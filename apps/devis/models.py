@@ -39,9 +39,35 @@ def _num2words_fr(v: Decimal) -> str:
 
 
 class QuoteRequestPhoto(models.Model):
-    """Fichier (photo ou document) joint à une demande de devis."""
+    """Fichier (photo ou document) joint à une demande de devis.
+
+    L'original est écrit tel quel pendant la requête ; les variantes WebP
+    (``optimized``, ``thumbnail``) et l'empreinte perceptuelle ``phash`` sont
+    produites en tâche de fond (`apps.devis.photo_pipeline`).
+    """
+
+    class ProcessingStatus(models.TextChoices):
+        PENDING = "pending", _("En attente")
+        READY = "ready", _("Optimisée")
+        FAILED = "failed", _("Échec")
 
     image = models.ImageField(_("Fichier"), upload_to="devis/requests/photos")
+    optimized = models.ImageField(
+        _("Version optimisée (WebP)"), upload_to="devis/requests/photos/optimized", blank=True,
+    )
+    thumbnail = models.ImageField(
+        _("Miniature (WebP)"), upload_to="devis/requests/photos/thumbs", blank=True,
+    )
+    width = models.PositiveIntegerField(_("Largeur"), null=True, blank=True)
+    height = models.PositiveIntegerField(_("Hauteur"), null=True, blank=True)
+    phash = models.CharField(
+        _("Empreinte perceptuelle"), max_length=16, blank=True, db_index=True,
+        help_text=_("dHash 64 bits (hexadécimal) — détection des doublons."),
+    )
+    status = models.CharField(
+        _("Traitement"), max_length=10, choices=ProcessingStatus.choices, default=ProcessingStatus.PENDING,
+    )
+    processed_at = models.DateTimeField(_("Traitée le"), null=True, blank=True)
 
     class Meta:
         verbose_name = _("photo de demande de devis")
@@ -50,6 +76,11 @@ class QuoteRequestPhoto(models.Model):
     def __str__(self) -> str:
         return self.image.name if self.image else "Pièce jointe"
 
+    @property
+    def display_image(self):
+        """Variante optimisée si prête, sinon l'original."""
+        return self.optimized if self.optimized else self.image
+
 
 class QuoteRequest(models.Model):
     """Demande initiale envoyée par un client depuis le site ou l'interface publique."""
@@ -179,6 +210,25 @@ class Quote(models.Model):
         null=True,
         help_text="Informations d'audit de la signature"
     )
+    # Traitement différé de la signature (cf. apps.devis.signature_pipeline) :
+    # variante rognée/optimisée pour le PDF, puis régénération du PDF signé.
+    signature_display = models.FileField(
+        upload_to="devis/signatures",
+        blank=True,
+        null=True,
+        storage=raw_media_storage,
+        help_text="Signature rognée et optimisée (affichage/PDF)"
+    )
+
+    class SignatureStatus(models.TextChoices):
+        PENDING = "pending", _("En cours de traitement")
+        READY = "ready", _("PDF signé prêt")
+        FAILED = "failed", _("Échec du traitement")
+
+    signature_status = models.CharField(
+        max_length=10, choices=SignatureStatus.choices, blank=True, default="",
+    )
+    signature_processed_at = models.DateTimeField(null=True, blank=True)
     
     # ===========================================
     # Validation du devis (audit trail)
@@ -546,8 +596,12 @@ class QuoteValidation(models.Model):
         from django.utils import timezone
         from datetime import timedelta
 
+        from apps.devis.application.validation_cache import forget_validations
+
         # Invalidate previous pending validations
-        cls.objects.filter(quote=quote, confirmed_at__isnull=True).delete()
+        pending = cls.objects.filter(quote=quote, confirmed_at__isnull=True)
+        forget_validations(pending.values_list("token", flat=True))
+        pending.delete()
 
         token = secrets.token_urlsafe(32)
         # 6 digits (000000-999999)
@@ -560,32 +614,16 @@ class QuoteValidation(models.Model):
         )
 
     def verify(self, submitted_code: str, *, max_attempts: int = 5) -> bool:
-        """Valide le code : True si OK (et marque confirmed_at)."""
-        import hmac
-        from django.utils import timezone
+        """Valide le code : True si OK (et marque confirmed_at).
 
-        if self.is_confirmed:
-            return True
-        if self.is_expired:
-            return False
-        if self.attempts >= max_attempts:
-            return False
-        
-        # Validate that submitted code is not empty
-        if not submitted_code or not submitted_code.strip():
-            return False
-
-        self.attempts += 1
-        # Timing-safe comparison to prevent side-channel attacks
-        ok = hmac.compare_digest(
-            submitted_code.strip().encode('utf-8'),
-            (self.code or "").strip().encode('utf-8'),
-        )
-        if ok:
-            self.confirmed_at = timezone.now()
-            self.save(update_fields=["attempts", "confirmed_at"])
-            return True
-        self.save(update_fields=["attempts"])
-        return False
+        Chaque tentative est comptée en base par `validation_cache` ; l'instance
+        est rafraîchie (tentatives, confirmation) après vérification.
+        """
+        from apps.devis.application import validation_cache
+
+        snapshot = validation_cache.snapshot_of(self)
+        ok = validation_cache.verify_code(self.token, snapshot, submitted_code, max_attempts=max_attempts)
+        self.refresh_from_db(fields=["attempts", "confirmed_at"])
+        return ok
 
 # === Hexagonal-friendly : code legacy désactivé (nettoyé) ===
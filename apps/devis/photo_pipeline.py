@@ -0,0 +1,183 @@
+"""
+Traitement en tâche de fond des photos jointes aux demandes de devis.
+
+Pendant la requête, `store_uploads` se contente d'écrire les originaux dans
+le stockage (les gros envois sont déjà sur disque, cf.
+``FILE_UPLOAD_MAX_MEMORY_SIZE``, et copiés par morceaux) et de les relier à la
+demande. Le travail coûteux part ensuite en tâche de fond
+(`core.tasks.async_process_quote_request_photos`) :
+
+- orientation EXIF appliquée puis métadonnées retirées (GPS, appareil…) ;
+- redimensionnement et variantes WebP (``optimized`` + ``thumbnail``) ;
+- empreinte perceptuelle (dHash 64 bits) : une photo quasi identique à une
+  autre de la même demande est retirée de la demande et supprimée.
+
+Réglages optionnels (``settings.QUOTE_PHOTOS``) : ``MAX_SIZE``,
+``THUMB_SIZE``, ``WEBP_QUALITY``, ``DUPLICATE_DISTANCE``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from io import BytesIO
+from typing import Iterable
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import QuoteRequest, QuoteRequestPhoto
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 1600
+DEFAULT_THUMB_SIZE = 400
+DEFAULT_WEBP_QUALITY = 80
+# Distance de Hamming max entre deux dHash pour considérer un doublon.
+DEFAULT_DUPLICATE_DISTANCE = 6
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, "QUOTE_PHOTOS", {}) or {}).get(key, default)
+
+
+# ---------------------------------------------------------------------------
+# Requête : stockage des originaux
+# ---------------------------------------------------------------------------
+def store_uploads(quote_request: QuoteRequest, files: Iterable) -> list[QuoteRequestPhoto]:
+    """Enregistre les originaux et les rattache à la demande (sans traitement image)."""
+    photos = []
+    for upload in files:
+        photo = QuoteRequestPhoto()
+        photo.image.save(os.path.basename(upload.name), upload, save=False)
+        photos.append(photo)
+    if not photos:
+        return []
+    QuoteRequestPhoto.objects.bulk_create(photos)
+    quote_request.photos.add(*photos)
+    return photos
+
+
+# ---------------------------------------------------------------------------
+# Traitement image
+# ---------------------------------------------------------------------------
+def dhash(image: Image.Image, size: int = 8) -> str:
+    """Empreinte « difference hash » : 64 bits en hexadécimal."""
+    gray = image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+    pixels = gray.tobytes()
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{size * size // 4}x}"
+
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def _webp(image: Image.Image, max_size: int) -> tuple[bytes, tuple[int, int]]:
+    variant = image.copy()
+    variant.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    # Pas d'argument exif= : les métadonnées de l'original ne sont pas reprises.
+    variant.save(buffer, "WEBP", quality=int(_cfg("WEBP_QUALITY", DEFAULT_WEBP_QUALITY)), method=4)
+    return buffer.getvalue(), variant.size
+
+
+def _load(photo: QuoteRequestPhoto) -> Image.Image:
+    with photo.image.open("rb") as fh:
+        image = Image.open(fh)
+        image.seek(0)  # GIF animé : première image
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or image.mode == "P" else "RGB")
+    return image
+
+
+def process_photo(photo: QuoteRequestPhoto) -> QuoteRequestPhoto:
+    """Produit les variantes WebP et l'empreinte d'une photo (sans dédoublonnage)."""
+    try:
+        image = _load(photo)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        # Bombe de décompression comprise : la photo est écartée, pas le lot.
+        logger.warning("Photo %s illisible — conservée telle quelle.", photo.pk)
+        photo.status = QuoteRequestPhoto.ProcessingStatus.FAILED
+        photo.processed_at = timezone.now()
+        photo.save(update_fields=["status", "processed_at"])
+        return photo
+
+    stem = os.path.splitext(os.path.basename(photo.image.name))[0]
+    optimized, (width, height) = _webp(image, int(_cfg("MAX_SIZE", DEFAULT_MAX_SIZE)))
+    thumbnail, _size = _webp(image, int(_cfg("THUMB_SIZE", DEFAULT_THUMB_SIZE)))
+    photo.optimized.save(f"{stem}.webp", ContentFile(optimized), save=False)
+    photo.thumbnail.save(f"{stem}_thumb.webp", ContentFile(thumbnail), save=False)
+    photo.width, photo.height = width, height
+    photo.phash = dhash(image)
+    photo.status = QuoteRequestPhoto.ProcessingStatus.READY
+    photo.processed_at = timezone.now()
+    photo.save(update_fields=[
+        "optimized", "thumbnail", "width", "height", "phash", "status", "processed_at",
+    ])
+    return photo
+
+
+def _delete_duplicate(photo: QuoteRequestPhoto) -> None:
+    for field_file in (photo.image, photo.optimized, photo.thumbnail):
+        if field_file:
+            field_file.delete(save=False)
+    photo.delete()
+
+
+def process_photos(photo_ids: Iterable[int]) -> dict:
+    """Traite un lot de photos puis retire les doublons au sein de chaque demande.
+
+    Renvoie ``{"processed": n, "failed": n, "duplicates": n}``.
+    """
+    stats = {"processed": 0, "failed": 0, "duplicates": 0}
+    photos = list(
+        QuoteRequestPhoto.objects
+        .filter(pk__in=list(photo_ids), status=QuoteRequestPhoto.ProcessingStatus.PENDING)
+        .order_by("pk")
+    )
+    for photo in photos:
+        process_photo(photo)
+        key = "processed" if photo.status == QuoteRequestPhoto.ProcessingStatus.READY else "failed"
+        stats[key] += 1
+
+    max_distance = int(_cfg("DUPLICATE_DISTANCE", DEFAULT_DUPLICATE_DISTANCE))
+    ready_ids = [p.pk for p in photos if p.phash]
+    requests = QuoteRequest.objects.filter(photos__in=ready_ids).distinct().prefetch_related("photos")
+    for quote_request in requests:
+        kept: list[QuoteRequestPhoto] = []
+        for photo in sorted(quote_request.photos.all(), key=lambda p: p.pk):
+            if not photo.phash:
+                continue
+            if any(hamming(photo.phash, other.phash) <= max_distance for other in kept):
+                with transaction.atomic():
+                    quote_request.photos.remove(photo)
+                    if not photo.quote_requests.exists():
+                        _delete_duplicate(photo)
+                stats["duplicates"] += 1
+                continue
+            kept.append(photo)
+    logger.info(
+        "Photos de demandes de devis : %(processed)s optimisées, %(failed)s en échec, "
+        "%(duplicates)s doublons retirés.", stats,
+    )
+    return stats
+
+
+__all__ = [
+    "dhash",
+    "hamming",
+    "process_photo",
+    "process_photos",
+    "store_uploads",
+]
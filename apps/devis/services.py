@@ -6,19 +6,24 @@ vivre directement dans les vues ou les modèles Django.
 
 Principales responsabilités :
 - Générer une facture à partir d'un devis accepté.
+- Convertir un lot de devis acceptés en factures (numéros réservés en bloc,
+  lignes copiées en un ``bulk_create``, PDF rendus en arrière-plan).
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import secrets
+from dataclasses import dataclass, field
 from datetime import date
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 from typing import Iterable, Optional, Union
 
 from django.db import transaction
 
 from .models import Quote, QuoteItem
-from apps.factures.models import Invoice, InvoiceItem
+from apps.factures.models import Invoice, InvoiceItem, InvoiceNumberSequence
+
+DEFAULT_BULK_BATCH_SIZE = 50
 
 
 @dataclass
@@ -37,6 +42,34 @@ class QuoteStatusError(Exception):
     """Le devis n'est pas dans un état compatible avec la facturation."""
 
 
+@dataclass
+class BulkInvoiceCreationResult:
+    """Résultat d'une conversion en lot : factures créées et devis refusés."""
+
+    created: list[InvoiceCreationResult] = field(default_factory=list)
+    errors: dict[int, str] = field(default_factory=dict)  # pk du devis → motif
+
+    @property
+    def invoices(self) -> list[Invoice]:
+        return [result.invoice for result in self.created]
+
+
+def _invoice_items(quote: Quote, invoice: Invoice) -> list[InvoiceItem]:
+    """Lignes de facture (non enregistrées) figées depuis les lignes du devis."""
+    items: Iterable[QuoteItem] = quote.quote_items.all()
+    return [
+        InvoiceItem(
+            invoice=invoice,
+            description=item.description or (item.service.title if item.service else ""),
+            quantity=item.quantity,
+            unit_price=item.unit_price,
+            tax_rate=item.tax_rate,
+            line_discount=item.line_discount,
+        )
+        for item in items
+    ]
+
+
 @transaction.atomic
 def create_invoice_from_quote(quote: Union[int, Quote]) -> InvoiceCreationResult:
     """
@@ -95,22 +128,109 @@ def create_invoice_from_quote(quote: Union[int, Quote]) -> InvoiceCreationResult
     )
 
     # Copier les lignes
-    items: Iterable[QuoteItem] = q.quote_items.all()
-    for item in items:
-        description = item.description or (
-            item.service.title if item.service else ""
-        )
-        InvoiceItem.objects.create(
-            invoice=invoice,
-            description=description,
-            quantity=item.quantity,
-            unit_price=item.unit_price,
-            tax_rate=item.tax_rate,
-            line_discount=item.line_discount,
-        )
+    InvoiceItem.objects.bulk_create(_invoice_items(q, invoice))
 
     # Mettre à jour le statut du devis
     q.status = Quote.QuoteStatus.INVOICED
     q.save(update_fields=["status"])
 
     return InvoiceCreationResult(invoice=invoice, quote=q)
+
+
+def _quote_totals(quote: Quote) -> tuple[Decimal, Decimal]:
+    """HT / TVA depuis les lignes préchargées (formule de `Quote.compute_totals`)."""
+    ht = tva = Decimal("0")
+    for item in quote.quote_items.all():
+        net = item.quantity * item.unit_price * (1 - (item.line_discount or 0) / Decimal("100"))
+        ht += net
+        tva += net * item.tax_rate / Decimal("100")
+    cent = Decimal("0.01")
+    return ht.quantize(cent, rounding=ROUND_HALF_UP), tva.quantize(cent, rounding=ROUND_HALF_UP)
+
+
+def _create_batch(quote_ids: list[int], result: BulkInvoiceCreationResult) -> list[Invoice]:
+    with transaction.atomic():
+        quotes = list(
+            Quote.objects
+            .select_for_update(of=("self",))
+            .filter(pk__in=quote_ids)
+            .select_related("client")
+            .prefetch_related("quote_items__service")
+            .order_by("pk")
+        )
+        invoiced = set(
+            Invoice.objects.filter(quote_id__in=[q.pk for q in quotes]).values_list("quote_id", flat=True)
+        )
+        todo = []
+        for q in quotes:
+            if q.status != Quote.QuoteStatus.ACCEPTED:
+                result.errors[q.pk] = f"Le devis {q.pk} n'est pas accepté (statut actuel : {q.status!r})."
+            elif q.pk in invoiced:
+                result.errors[q.pk] = f"Une facture existe déjà pour le devis {q.pk}."
+            else:
+                todo.append(q)
+        if not todo:
+            return []
+
+        today = date.today()
+        numbers = InvoiceNumberSequence.allocate(InvoiceNumberSequence.Series.INVOICE, today.year, len(todo))
+        invoices = []
+        for q, number in zip(todo, numbers):
+            q.total_ht, q.tva = _quote_totals(q)
+            q.total_ttc = q.total_ht + q.tva
+            q.status = Quote.QuoteStatus.INVOICED
+            invoices.append(Invoice(
+                quote=q,
+                client=q.client,
+                number=number,
+                issue_date=today,
+                total_ht=q.total_ht,
+                tva=q.tva,
+                total_ttc=q.total_ttc,
+                discount=Decimal("0.00"),
+                amount=q.total_ttc,
+                notes=q.message or "",
+                public_token=secrets.token_urlsafe(32),
+            ))
+        Invoice.objects.bulk_create(invoices)
+        InvoiceItem.objects.bulk_create(
+            [item for q, invoice in zip(todo, invoices) for item in _invoice_items(q, invoice)]
+        )
+        Quote.objects.bulk_update(todo, ["total_ht", "tva", "total_ttc", "status"])
+
+        # bulk_create n'émet pas post_save : événement DRAFT initial de la chaîne d'audit.
+        from apps.einvoicing.models import InvoiceLifecycleEvent
+        InvoiceLifecycleEvent.record_created_many(invoices, source="quote.bulk_invoiced")
+
+        invoice_ids = [invoice.pk for invoice in invoices]
+        from core.tasks import async_prerender_invoice_pdfs
+        transaction.on_commit(lambda: async_prerender_invoice_pdfs(invoice_ids))
+
+    result.created.extend(InvoiceCreationResult(invoice=inv, quote=q) for q, inv in zip(todo, invoices))
+    return invoices
+
+
+def create_invoices_from_quotes(
+    quotes: Iterable[Union[int, Quote]],
+    *,
+    batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+) -> BulkInvoiceCreationResult:
+    """
+    Convertit un lot de devis acceptés en factures.
+
+    Mêmes règles métier que :func:`create_invoice_from_quote`, appliquées par
+    lots de ``batch_size`` devis, chacun dans sa transaction :
+
+    - les devis du lot sont verrouillés (``select_for_update``) puis
+      contrôlés en une requête (statut, facture existante) ; un devis refusé
+      est reporté dans ``errors`` sans bloquer les autres ;
+    - les numéros sont réservés en bloc, les factures puis toutes les lignes
+      insérées par ``bulk_create``, les devis passés à ``INVOICED`` par un
+      seul ``bulk_update`` ;
+    - la génération des PDF / Factur-X part en tâche de fond après commit.
+    """
+    quote_ids = sorted({q if isinstance(q, int) else q.pk for q in quotes})
+    result = BulkInvoiceCreationResult()
+    for start in range(0, len(quote_ids), batch_size):
+        _create_batch(quote_ids[start:start + batch_size], result)
+    return result
@@ -0,0 +1,67 @@
+"""
+Traitement en tâche de fond des signatures électroniques de devis.
+
+Pendant la requête de signature (`views.quote_submit_signature`), seul le
+strict nécessaire à la preuve est enregistré : image originale, empreinte
+SHA-256, audit trail et ``signed_at``. Le devis passe en
+``signature_status = pending`` et le travail coûteux part en tâche de fond
+(`core.tasks.async_process_quote_signature`) :
+
+- variante d'affichage rognée, réduite et optimisée (``signature_display``) —
+  l'original haché n'est jamais modifié ;
+- régénération du PDF signé (``Quote.pdf``), qui incruste cette variante
+  (`DocumentGenerator._signature_data_uri`, repli sur l'original).
+
+La page client interroge `views.quote_signature_status` jusqu'à
+``signature_status = ready``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from core.services.signature_service import SignatureService
+
+from .models import Quote
+
+logger = logging.getLogger(__name__)
+
+
+def _store_display_variant(quote: Quote) -> None:
+    with quote.signature_image.open("rb") as fh:
+        original = fh.read()
+    optimized = SignatureService.normalize_signature_image(original)
+    stem = os.path.splitext(os.path.basename(quote.signature_image.name))[0]
+    quote.signature_display.save(f"{stem}_display.png", ContentFile(optimized), save=False)
+
+
+def process_signature(quote_id: int) -> Quote | None:
+    """Produit la variante d'affichage puis régénère le PDF signé."""
+    quote = Quote.objects.select_related("client").filter(pk=quote_id).first()
+    if quote is None or quote.signature_status != Quote.SignatureStatus.PENDING:
+        return quote
+
+    update_fields = ["signature_status", "signature_processed_at"]
+    if quote.signature_image:
+        try:
+            _store_display_variant(quote)
+            update_fields.append("signature_display")
+        except Exception:  # noqa: BLE001 — l'original reste utilisable
+            logger.warning("Signature du devis %s non optimisée — original conservé.", quote.number, exc_info=True)
+
+    try:
+        quote.generate_pdf(attach=True)
+        quote.signature_status = Quote.SignatureStatus.READY
+    except Exception:  # noqa: BLE001 — la signature reste valide sans PDF
+        logger.exception("Régénération du PDF signé impossible pour le devis %s", quote.number)
+        quote.signature_status = Quote.SignatureStatus.FAILED
+    quote.signature_processed_at = timezone.now()
+    quote.save(update_fields=update_fields)
+    return quote
+
+
+__all__ = ["process_signature"]
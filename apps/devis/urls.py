@@ -39,6 +39,7 @@ urlpatterns = [
     # ===========================================
     path("valider/<str:token>/signer/", views.quote_sign_and_pay, name="quote_sign_and_pay"),
     path("valider/<str:token>/signature/", views.quote_submit_signature, name="quote_submit_signature"),
+    path("valider/<str:token>/signature/statut/", views.quote_signature_status, name="quote_signature_status"),
     path("paiement/succes/", views.quote_payment_success, name="payment_success"),
     path("webhook/stripe/", views.stripe_webhook, name="stripe_webhook"),
 ]
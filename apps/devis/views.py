@@ -6,6 +6,7 @@ import logging
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.core.files.base import ContentFile
+from django.db import transaction
 from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
@@ -13,9 +14,10 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods, require_POST
 from django.utils import timezone
 
+from core.query_budget import query_budget
 from services.models import Service
 from .forms import QuoteRequestForm, QuoteAdminForm
-from .models import QuoteRequest, Quote, QuoteRequestPhoto, QuoteValidation
+from .models import QuoteRequest, Quote
 from .services import create_invoice_from_quote
 from .forms import QuoteValidationCodeForm
 from apps.devis.application.quote_validation import (
@@ -25,10 +27,19 @@ from apps.devis.application.quote_validation import (
     confirm_quote_validation_code,
     start_quote_validation,
 )
+from apps.devis.application import validation_cache
 
 logger = logging.getLogger(__name__)
 
 
+def _quote_for_public_token(token: str) -> Quote:
+    """Devis d'un ``public_token`` : résolution du jeton en cache (négatif compris)."""
+    quote_id = validation_cache.resolve_quote_id(token)
+    if quote_id is None:
+        raise Http404()
+    return get_object_or_404(Quote, pk=quote_id)
+
+
 @require_http_methods(["GET", "POST"])
 def public_devis(request):
     """Formulaire public : création d'une QuoteRequest.
@@ -68,10 +79,13 @@ def public_devis(request):
                 })
 
             qr: QuoteRequest = form.save()
-            files = form.cleaned_data.get("photos_list") or []
-            for f in files:
-                photo = QuoteRequestPhoto.objects.create(image=f)
-                qr.photos.add(photo)
+            # Originaux stockés tels quels ; WebP / EXIF / doublons en tâche de fond
+            from .photo_pipeline import store_uploads
+            from core.tasks import async_process_quote_request_photos
+            photos = store_uploads(qr, form.cleaned_data.get("photos_list") or [])
+            if photos:
+                photo_ids = [p.pk for p in photos]
+                transaction.on_commit(lambda: async_process_quote_request_photos(photo_ids))
             # Notification async (client + admin)
             from core.tasks import async_notify_quote_request
             async_notify_quote_request(qr.pk)
@@ -181,7 +195,7 @@ def quote_validate_start(request, token: str):
 
     Le paramètre ``token`` est le ``Quote.public_token`` (stable).
     """
-    quote = get_object_or_404(Quote, public_token=token)
+    quote = _quote_for_public_token(token)
     
     # Si le devis est déjà accepté, rediriger vers la page appropriée
     if quote.status == Quote.QuoteStatus.ACCEPTED:
@@ -223,8 +237,11 @@ def quote_validate_start(request, token: str):
 @require_http_methods(["GET", "POST"])
 def quote_validate_code(request, token: str):
     """Étape 2 : saisie du code -> validation finale."""
-    validation = get_object_or_404(QuoteValidation, token=token)
-    quote = validation.quote
+    # Instantané en cache : un sondage de code ne lit pas QuoteValidation.
+    validation = validation_cache.get_snapshot(token)
+    if validation is None:
+        raise Http404()
+    quote = get_object_or_404(Quote, pk=validation.quote_id)
 
     if validation.is_expired:
         messages.error(request, "Ce code a expiré. Merci de relancer une validation.")
@@ -235,7 +252,7 @@ def quote_validate_code(request, token: str):
         if form.is_valid():
             try:
                 ok = confirm_quote_validation_code(
-                    validation=validation,
+                    token=token,
                     submitted_code=form.cleaned_data["code"],
                     request=request,
                 )
@@ -266,6 +283,7 @@ def quote_validate_code(request, token: str):
 
 
 @require_http_methods(["GET"])
+@query_budget(8)
 def quote_public_pdf(request, token: str):
     """Téléchargement public du PDF via un jeton *stable*.
 
@@ -274,19 +292,16 @@ def quote_public_pdf(request, token: str):
     - v2+: le lien public pointe vers Quote.public_token (stable)
     Pour compatibilité, on accepte encore un token de QuoteValidation si nécessaire.
     """
-    quote = None
     # 1) Token public stable du devis
-    try:
-        quote = Quote.objects.get(public_token=token)
-    except Exception:
-        quote = None
+    quote_id = validation_cache.resolve_quote_id(token)
 
     # 2) Compatibilité: ancien token de validation 2FA
-    if quote is None:
-        validation = get_object_or_404(QuoteValidation, token=token)
-        if validation.is_expired:
+    if quote_id is None:
+        validation = validation_cache.get_snapshot(token)
+        if validation is None or validation.is_expired:
             raise Http404()
-        quote = validation.quote
+        quote_id = validation.quote_id
+    quote = get_object_or_404(Quote, pk=quote_id)
 
     try:
         # Always generate fresh PDF (ephemeral filesystem on Render)
@@ -317,7 +332,7 @@ def quote_sign_and_pay(request, token: str):
     2. Il signe électroniquement (signature_pad.js)
     3. Il paie l'acompte via Stripe Checkout
     """
-    quote = get_object_or_404(Quote, public_token=token)
+    quote = _quote_for_public_token(token)
     
     # 🛡️ SECURITY: Seuls les devis SENT peuvent être signés (jamais DRAFT)
     if quote.status != Quote.QuoteStatus.SENT:
@@ -355,19 +370,12 @@ def quote_submit_signature(request, token: str):
     Retourne: JSON avec success et éventuellement checkout_url
     """
     # 🛡️ SECURITY: Rate-limit signature submissions (anti-abuse)
-    from django.core.cache import cache as _cache
-    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
-    client_ip = forwarded.split(',')[0].strip() if forwarded else request.META.get('REMOTE_ADDR', '')
-    sig_key = f"ratelimit:signature:{client_ip}"
-    sig_count = _cache.get(sig_key, 0)
-    if sig_count >= 10:  # max 10 signature attempts per hour per IP
+    from core.ratelimit import hit
+    from core.utils import get_client_ip
+    if not hit('signature', get_client_ip(request), limit=10, period=3600).allowed:
         return JsonResponse({"success": False, "error": "Trop de tentatives. Réessayez plus tard."}, status=429)
-    try:
-        _cache.incr(sig_key)
-    except ValueError:
-        _cache.set(sig_key, 1, 3600)
 
-    quote = get_object_or_404(Quote, public_token=token)
+    quote = _quote_for_public_token(token)
     
     # 🛡️ SECURITY: Seuls les devis SENT sont signables
     if quote.status != Quote.QuoteStatus.SENT:
@@ -399,8 +407,9 @@ def quote_submit_signature(request, token: str):
     # Valider la signature
     from core.services.signature_service import SignatureService
     
-    is_valid, message = SignatureService.validate_signature_data(signature_data)
-    if not is_valid:
+    # Décodée une seule fois : les mêmes octets sont validés puis écrits.
+    image_data, message = SignatureService.decode_signature_data(signature_data)
+    if image_data is None:
         return JsonResponse({
             "success": False,
             "error": message
@@ -408,8 +417,8 @@ def quote_submit_signature(request, token: str):
     
     # Sauvegarder la signature
     signature_hash = SignatureService.compute_signature_hash(signature_data)
-    signature_path = SignatureService.save_signature_image(
-        signature_data,
+    signature_path = SignatureService.store_signature_image(
+        image_data,
         filename=f"signature_{quote.number}_{timezone.now().strftime('%Y%m%d_%H%M%S')}",
         subdir="devis/signatures"
     )
@@ -426,12 +435,14 @@ def quote_submit_signature(request, token: str):
         signature_hash=signature_hash,
     )
     
-    # Mettre à jour le devis
+    # Mettre à jour le devis : seul le nécessaire à la preuve est écrit ici,
+    # optimisation de l'image et PDF signé partent en tâche de fond.
     if signature_path:
         quote.signature_image = signature_path
     quote.signed_at = timezone.now()
     quote.signature_audit_trail = audit_trail
-    quote.save(update_fields=['signature_image', 'signed_at', 'signature_audit_trail'])
+    quote.signature_status = Quote.SignatureStatus.PENDING
+    quote.save(update_fields=['signature_image', 'signed_at', 'signature_audit_trail', 'signature_status'])
     
     # Créer la session Stripe si configuré
     from core.services.stripe_service import is_stripe_configured, StripePaymentService
@@ -439,6 +450,7 @@ def quote_submit_signature(request, token: str):
     response_data = {
         "success": True,
         "message": "Signature enregistrée avec succès.",
+        "status_url": reverse("devis:quote_signature_status", kwargs={"token": quote.public_token}),
     }
     
     if is_stripe_configured():
@@ -464,10 +476,32 @@ def quote_submit_signature(request, token: str):
         # Marquer comme accepté directement si pas de paiement
         quote.status = Quote.QuoteStatus.ACCEPTED
         quote.save(update_fields=['status'])
-    
+
+    from core.tasks import async_process_quote_signature
+    transaction.on_commit(lambda: async_process_quote_signature(quote.pk))
+
     return JsonResponse(response_data)
 
 
+@require_http_methods(["GET"])
+def quote_signature_status(request, token: str):
+    """
+    Endpoint AJAX interrogé par la page de signature : le PDF signé est-il prêt ?
+
+    Retourne: JSON ``{status, ready, pdf_url}``
+    """
+    quote = _quote_for_public_token(token)
+    if not quote.signed_at:
+        raise Http404()
+    status = quote.signature_status or Quote.SignatureStatus.READY
+    return JsonResponse({
+        "status": status,
+        # FAILED : la signature est valide, seul le PDF n'a pas pu être régénéré.
+        "ready": status != Quote.SignatureStatus.PENDING,
+        "pdf_url": reverse("devis:quote_public_pdf", kwargs={"token": quote.public_token}),
+    })
+
+
 @require_http_methods(["GET"])
 def quote_payment_success(request):
     """
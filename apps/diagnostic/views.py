@@ -92,7 +92,7 @@ def diagnostic_new(request):
         # Lance l'analyse en arrière-plan ; répond immédiatement.
         _run_diagnostic_async(diag)
 
-        AuditLog.log_action(
+        AuditLog.enqueue(
             action_type="admin_action",
             actor=request.user,
             content_type="diagnostic.SiteDiagnostic",
@@ -231,7 +231,7 @@ def field_form(request, pk):
         diag.overall_score = results["global_score"]
         diag.save()
 
-        AuditLog.log_action(
+        AuditLog.enqueue(
             action_type="admin_action",
             actor=request.user,
             content_type="diagnostic.FieldDiagnostic",
@@ -355,7 +355,7 @@ def send_field_report(diag, actor=None):
     except Exception as exc:  # noqa: BLE001
         return False, f"{diag.company_name} : échec de l'envoi ({exc})."
 
-    AuditLog.log_action(
+    AuditLog.enqueue(
         action_type="admin_action",
         actor=actor,
         content_type="diagnostic.FieldDiagnostic",
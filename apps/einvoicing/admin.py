@@ -1,11 +1,11 @@
-"""Admin (lecture seule) pour le journal de cycle de vie des factures."""
+"""Admin (lecture seule) : journal de cycle de vie, inbox webhooks et cache annuaire PDP."""
 
 from __future__ import annotations
 
 from django.contrib import admin
 from django.utils.html import format_html
 
-from .models import InvoiceLifecycleEvent
+from .models import InvoiceLifecycleEvent, PDPWebhookDelivery, PeppolDirectoryEntry
 
 
 @admin.register(InvoiceLifecycleEvent)
@@ -65,3 +65,68 @@ class InvoiceLifecycleEventAdmin(admin.ModelAdmin):
     @admin.display(description="Hash")
     def short_hash(self, obj: InvoiceLifecycleEvent) -> str:
         return format_html("<code title='{}'>{}…</code>", obj.event_hash, (obj.event_hash or "")[:10])
+
+
+@admin.register(PDPWebhookDelivery)
+class PDPWebhookDeliveryAdmin(admin.ModelAdmin):
+    """Inbox des webhooks PDP — consultation seule (l'ingestion est faite par le worker)."""
+
+    list_display = (
+        "id",
+        "provider",
+        "event_type",
+        "invoice_ref",
+        "status",
+        "attempts",
+        "received_at",
+        "processed_at",
+    )
+    list_filter = ("status", "provider")
+    search_fields = ("delivery_id", "invoice_ref", "event_type")
+    date_hierarchy = "received_at"
+    readonly_fields = (
+        "provider",
+        "delivery_id",
+        "event_type",
+        "invoice_ref",
+        "payload",
+        "status",
+        "attempts",
+        "last_error",
+        "received_at",
+        "processed_at",
+    )
+    ordering = ("-received_at", "-id")
+
+    def has_add_permission(self, request):  # pragma: no cover
+        return False
+
+    def has_change_permission(self, request, obj=None):  # pragma: no cover
+        return False
+
+
+@admin.register(PeppolDirectoryEntry)
+class PeppolDirectoryEntryAdmin(admin.ModelAdmin):
+    """Cache annuaire PDP — rafraîchi par `prefetch_pdp_directory`, suppression = invalidation."""
+
+    list_display = ("identifier", "provider", "found", "name", "peppol_id", "fetched_at", "expires_at")
+    list_filter = ("provider", "found")
+    search_fields = ("identifier", "siret", "name", "peppol_id")
+    readonly_fields = (
+        "provider",
+        "identifier",
+        "found",
+        "name",
+        "siret",
+        "peppol_id",
+        "country_code",
+        "raw",
+        "fetched_at",
+        "expires_at",
+    )
+
+    def has_add_permission(self, request):  # pragma: no cover
+        return False
+
+    def has_change_permission(self, request, obj=None):  # pragma: no cover
+        return False
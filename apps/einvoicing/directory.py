@@ -0,0 +1,259 @@
+"""Cache persistant de l'annuaire PDP/PPF (SIREN/SIRET → routage).
+
+`PDPClient.lookup_directory` est un appel HTTP live ; on l'utilise pour router
+les e-factures et contrôler les fiches clients. Ce module intercale la table
+`PeppolDirectoryEntry` :
+
+- lecture DB d'abord, appel PDP seulement si l'entrée est absente ou périmée ;
+- cache négatif (identifiant absent de l'annuaire) avec un TTL plus court ;
+- préchargement en masse (`prefetch_directory`) avec requêtes concurrentes
+  bornées par le rate limit du provider, écriture en un seul `bulk_create`.
+
+Les erreurs transport / auth ne sont jamais mises en cache.
+
+Réglages (``settings.INVOICING['PDP']``) :
+- ``DIRECTORY_TTL_HOURS``          : durée de vie d'une entrée trouvée (168 h)
+- ``DIRECTORY_NEGATIVE_TTL_HOURS`` : durée de vie d'un cache négatif (24 h)
+- ``DIRECTORY_RATE_PER_SECOND``    : débit max vers l'annuaire PDP (5 req/s)
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PeppolDirectoryEntry
+from .pdp import PDPClient, PDPError, PDPNotFoundError, PDPRateLimitError, get_pdp_client
+from .validators import _normalize_digits
+
+if TYPE_CHECKING:  # pragma: no cover
+    from apps.factures.models import Invoice
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TTL_HOURS = 24 * 7
+DEFAULT_NEGATIVE_TTL_HOURS = 24
+DEFAULT_RATE_PER_SECOND = 5.0
+RATE_LIMIT_MAX_RETRIES = 3
+
+
+def _pdp_cfg() -> dict:
+    return ((getattr(settings, "INVOICING", {}) or {}).get("PDP") or {})
+
+
+def _ttl(found: bool) -> timedelta:
+    cfg = _pdp_cfg()
+    if found:
+        return timedelta(hours=float(cfg.get("DIRECTORY_TTL_HOURS", DEFAULT_TTL_HOURS)))
+    return timedelta(hours=float(cfg.get("DIRECTORY_NEGATIVE_TTL_HOURS", DEFAULT_NEGATIVE_TTL_HOURS)))
+
+
+def normalize_identifier(value: Optional[str]) -> str:
+    """SIREN (9) ou SIRET (14) réduit à ses chiffres ; '' si longueur invalide."""
+    digits = _normalize_digits(value)
+    return digits if len(digits) in (9, 14) else ""
+
+
+def _build_entry(provider: str, identifier: str, result: Optional[dict[str, Any]]) -> PeppolDirectoryEntry:
+    now = timezone.now()
+    found = result is not None
+    result = result or {}
+    return PeppolDirectoryEntry(
+        provider=provider,
+        identifier=identifier,
+        found=found,
+        name=str(result.get("name") or "")[:255],
+        siret=_normalize_digits(result.get("siret"))[:14],
+        peppol_id=str(result.get("peppol_id") or "")[:70],
+        country_code=str(result.get("country_code") or "")[:2],
+        raw=result.get("raw") or {},
+        fetched_at=now,
+        expires_at=now + _ttl(found),
+    )
+
+
+def _store(provider: str, results: dict[str, Optional[dict[str, Any]]]) -> None:
+    """Upsert des résultats en une seule requête."""
+    if not results:
+        return
+    PeppolDirectoryEntry.objects.bulk_create(
+        [_build_entry(provider, ident, result) for ident, result in results.items()],
+        update_conflicts=True,
+        unique_fields=["provider", "identifier"],
+        update_fields=[
+            "found", "name", "siret", "peppol_id", "country_code",
+            "raw", "fetched_at", "expires_at",
+        ],
+    )
+
+
+def lookup_directory_cached(
+    siren_or_siret: str,
+    *,
+    client: PDPClient | None = None,
+    refresh: bool = False,
+) -> Optional[dict[str, Any]]:
+    """`lookup_directory` avec cache DB (même contrat de retour).
+
+    Lève `PDPError` si l'appel PDP échoue (rien n'est alors mis en cache).
+    """
+    identifier = normalize_identifier(siren_or_siret)
+    if not identifier:
+        return None
+    pdp = client or get_pdp_client()
+    if not refresh:
+        entry = (
+            PeppolDirectoryEntry.objects
+            .filter(provider=pdp.provider, identifier=identifier)
+            .first()
+        )
+        if entry is not None and entry.is_fresh:
+            return entry.as_routing()
+    try:
+        result = pdp.lookup_directory(identifier)
+    except PDPNotFoundError:
+        result = None
+    _store(pdp.provider, {identifier: result})
+    return result
+
+
+def resolve_invoice_routing(
+    invoice: "Invoice",
+    *,
+    client: PDPClient | None = None,
+    live: bool = True,
+) -> Optional[dict[str, Any]]:
+    """Routage du destinataire d'une facture (cache d'abord, jamais bloquant).
+
+    Renvoie None si le client n'a ni SIRET ni SIREN, s'il est absent de
+    l'annuaire, ou si la PDP est injoignable. Avec ``live=False``, seule la
+    table `PeppolDirectoryEntry` est lue (même périmée) : aucun appel PDP,
+    le cache étant réchauffé par ``prefetch_pdp_directory``.
+    """
+    profile = getattr(invoice, "client", None)
+    if profile is None:
+        return None
+    identifier = normalize_identifier(profile.siret) or normalize_identifier(profile.siren)
+    if not identifier:
+        return None
+    if not live:
+        pdp = client or get_pdp_client()
+        entry = (
+            PeppolDirectoryEntry.objects
+            .filter(provider=pdp.provider, identifier=identifier)
+            .first()
+        )
+        return entry.as_routing() if entry is not None else None
+    try:
+        return lookup_directory_cached(identifier, client=client)
+    except PDPError:
+        logger.warning("Annuaire PDP indisponible pour Invoice #%s — routage ignoré.", invoice.pk)
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Préchargement en masse
+# ---------------------------------------------------------------------------
+class _RateLimiter:
+    """Espacement minimal entre deux appels, partagé entre threads."""
+
+    def __init__(self, rate_per_second: float) -> None:
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_at)
+            self._next_at = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Décale tous les appels suivants (réponse 429 du provider)."""
+        with self._lock:
+            self._next_at = max(self._next_at, time.monotonic() + seconds)
+
+
+def _fetch(pdp: PDPClient, identifier: str, limiter: _RateLimiter) -> Optional[dict[str, Any]]:
+    for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+        limiter.wait()
+        try:
+            return pdp.lookup_directory(identifier)
+        except PDPNotFoundError:
+            return None
+        except PDPRateLimitError as exc:
+            if attempt >= RATE_LIMIT_MAX_RETRIES:
+                raise
+            limiter.pause(float(exc.retry_after or 2 ** attempt))
+    return None  # pragma: no cover
+
+
+def prefetch_directory(
+    identifiers: Iterable[str],
+    *,
+    client: PDPClient | None = None,
+    max_workers: int = 4,
+    rate_per_second: float | None = None,
+    refresh: bool = False,
+) -> dict[str, int]:
+    """Réchauffe le cache pour une liste de SIREN/SIRET.
+
+    Les identifiants déjà en cache et non périmés sont sautés (une requête),
+    les autres sont interrogés en parallèle sous le rate limit configuré puis
+    enregistrés en un seul upsert. Renvoie des compteurs.
+    """
+    pdp = client or get_pdp_client()
+    wanted = {normalize_identifier(i) for i in identifiers}
+    wanted.discard("")
+    stats = {"requested": len(wanted), "cached": 0, "found": 0, "not_found": 0, "errors": 0}
+    if not wanted:
+        return stats
+
+    if not refresh:
+        fresh = set(
+            PeppolDirectoryEntry.objects
+            .filter(provider=pdp.provider, identifier__in=wanted, expires_at__gt=timezone.now())
+            .values_list("identifier", flat=True)
+        )
+        stats["cached"] = len(fresh)
+        wanted -= fresh
+
+    if rate_per_second is None:
+        rate_per_second = float(_pdp_cfg().get("DIRECTORY_RATE_PER_SECOND", DEFAULT_RATE_PER_SECOND))
+    limiter = _RateLimiter(rate_per_second)
+
+    results: dict[str, Optional[dict[str, Any]]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {ident: pool.submit(_fetch, pdp, ident, limiter) for ident in sorted(wanted)}
+        for ident, future in futures.items():
+            try:
+                results[ident] = future.result()
+            except PDPError as exc:
+                stats["errors"] += 1
+                logger.warning("Annuaire PDP : échec lookup %s (%s).", ident, type(exc).__name__)
+                continue
+            stats["found" if results[ident] is not None else "not_found"] += 1
+
+    _store(pdp.provider, results)
+    return stats
+
+
+__all__ = [
+    "normalize_identifier",
+    "lookup_directory_cached",
+    "resolve_invoice_routing",
+    "prefetch_directory",
+]
@@ -0,0 +1,36 @@
+"""Draine l'inbox des webhooks PDP et affiche le débit d'ingestion.
+
+À planifier (cron Render / django-q Schedule) en complément du drain
+déclenché à chaque livraison, pour rattraper les échecs retryables.
+
+Usage :
+    python manage.py drain_pdp_webhooks
+    python manage.py drain_pdp_webhooks --limit 2000
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Ingère les webhooks PDP en attente (inbox) et affiche le débit."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit", type=int, default=500,
+            help="Nombre max de livraisons traitées (défaut : 500).",
+        )
+
+    def handle(self, *args, **options):
+        from apps.einvoicing.services import drain_webhook_inbox
+
+        stats = drain_webhook_inbox(limit=options["limit"])
+        if stats["locked"]:
+            self.stdout.write(self.style.WARNING("Un drain est déjà en cours — rien à faire."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['processed']} ingérée(s), {stats['ignored']} ignorée(s), "
+            f"{stats['failed']} en échec, {stats['deferred']} différée(s) "
+            f"— {stats['elapsed_ms']} ms ({stats['per_second']}/s)."
+        ))
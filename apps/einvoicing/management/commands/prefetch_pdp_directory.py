@@ -0,0 +1,55 @@
+"""Préchauffe le cache annuaire PDP pour tous les clients ayant un SIREN/SIRET.
+
+Les lookups sont faits en parallèle sous le rate limit du provider
+(``INVOICING['PDP']['DIRECTORY_RATE_PER_SECOND']``) ; les entrées encore
+valides sont sautées sauf `--refresh`.
+
+Usage :
+    python manage.py prefetch_pdp_directory
+    python manage.py prefetch_pdp_directory --workers 8 --refresh
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+
+class Command(BaseCommand):
+    help = "Précharge le cache annuaire PDP pour les ClientProfile avec SIREN/SIRET."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=4,
+            help="Lookups concurrents (défaut : 4).",
+        )
+        parser.add_argument(
+            "--refresh", action="store_true",
+            help="Ré-interroge aussi les entrées encore valides.",
+        )
+
+    def handle(self, *args, **options):
+        from apps.clients.models import ClientProfile
+        from apps.einvoicing.directory import normalize_identifier, prefetch_directory
+
+        identifiers = set()
+        rows = (
+            ClientProfile.objects
+            .exclude(Q(siren="") & Q(siret=""))
+            .values_list("siret", "siren")
+        )
+        for siret, siren in rows.iterator():
+            identifier = normalize_identifier(siret) or normalize_identifier(siren)
+            if identifier:
+                identifiers.add(identifier)
+
+        self.stdout.write(f"{len(identifiers)} identifiant(s) à vérifier…")
+        stats = prefetch_directory(
+            identifiers,
+            max_workers=options["workers"],
+            refresh=options["refresh"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['cached']} déjà en cache, {stats['found']} trouvé(s), "
+            f"{stats['not_found']} absent(s) de l'annuaire, {stats['errors']} erreur(s)."
+        ))
@@ -0,0 +1,45 @@
+"""Resynchronise tous les ClientProfile vers leurs Customers Stripe (diff).
+
+Seuls les clients dont l'empreinte a changé depuis le dernier succès sont
+poussés ; un run interrompu peut être relancé tel quel.
+
+Usage :
+    python manage.py sync_stripe_customers
+    python manage.py sync_stripe_customers --workers 8 --force
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Synchronise en masse les ClientProfile vers Stripe (clients modifiés uniquement)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=4,
+            help="Appels Stripe concurrents (défaut : 4).",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=50,
+            help="Clients par lot avant enregistrement de l'état (défaut : 50).",
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Pousse tous les clients, même inchangés.",
+        )
+
+    def handle(self, *args, **options):
+        from apps.einvoicing.stripe_sync import bulk_sync_stripe_customers
+
+        stats = bulk_sync_stripe_customers(
+            force=options["force"],
+            max_workers=options["workers"],
+            chunk_size=options["chunk_size"],
+        )
+        style = self.style.SUCCESS if not stats["failed"] else self.style.WARNING
+        self.stdout.write(style(
+            f"{stats['total']} client(s) : {stats['skipped']} inchangé(s), "
+            f"{stats['synced']} synchronisé(s), {stats['failed']} en échec."
+        ))
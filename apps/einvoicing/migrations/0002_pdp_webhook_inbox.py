@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('einvoicing', '0001_einvoicing_phase1'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PDPWebhookDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20, verbose_name='PDP')),
+                ('delivery_id', models.CharField(help_text='Identifiant fourni par la PDP, ou SHA-256 du corps à défaut.', max_length=128, verbose_name='ID de livraison')),
+                ('event_type', models.CharField(blank=True, default='', max_length=80, verbose_name="Type d'événement")),
+                ('invoice_ref', models.CharField(blank=True, default='', help_text="ID PDP externe ou numéro, extrait du payload (clé d'ordonnancement).", max_length=100, verbose_name='Référence facture')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Payload brut')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('processed', 'Ingérée'), ('ignored', 'Ignorée (facture ou état inconnu)'), ('failed', 'En échec')], default='pending', max_length=10, verbose_name='Statut')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Dernière erreur')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Reçu le')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Traité le')),
+            ],
+            options={
+                'verbose_name': 'Webhook PDP reçu',
+                'verbose_name_plural': 'Webhooks PDP reçus',
+                'ordering': ('received_at', 'id'),
+                'indexes': [models.Index(fields=['status', 'received_at'], name='idx_pdp_wh_status_time')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'delivery_id'), name='uniq_pdp_webhook_delivery')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('einvoicing', '0002_pdp_webhook_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeppolDirectoryEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20, verbose_name='PDP')),
+                ('identifier', models.CharField(help_text='Identifiant normalisé (chiffres uniquement).', max_length=14, verbose_name='SIREN/SIRET')),
+                ('found', models.BooleanField(default=True, verbose_name="Présent dans l'annuaire")),
+                ('name', models.CharField(blank=True, default='', max_length=255, verbose_name='Raison sociale')),
+                ('siret', models.CharField(blank=True, default='', max_length=14, verbose_name='SIRET')),
+                ('peppol_id', models.CharField(blank=True, default='', max_length=70, verbose_name='Identifiant Peppol')),
+                ('country_code', models.CharField(blank=True, default='', max_length=2, verbose_name='Pays')),
+                ('raw', models.JSONField(blank=True, default=dict, verbose_name='Réponse brute')),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Interrogé le')),
+                ('expires_at', models.DateTimeField(verbose_name='Expire le')),
+            ],
+            options={
+                'verbose_name': 'Entrée annuaire PDP',
+                'verbose_name_plural': 'Annuaire PDP (cache)',
+                'ordering': ('identifier',),
+                'constraints': [models.UniqueConstraint(fields=('provider', 'identifier'), name='uniq_pdp_directory_identifier')],
+            },
+        ),
+    ]
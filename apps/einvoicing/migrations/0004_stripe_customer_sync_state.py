@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0016_einvoicing_phase1_stripe'),
+        ('einvoicing', '0003_pdp_directory_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeCustomerSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('ok', 'Synchronisé'), ('failed', 'En échec')], default='ok', max_length=10, verbose_name='Statut')),
+                ('profile_fingerprint', models.CharField(blank=True, default='', max_length=64, verbose_name='Empreinte profil')),
+                ('tax_fingerprint', models.CharField(blank=True, default='', max_length=64, verbose_name='Empreinte identifiants fiscaux')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Dernière erreur')),
+                ('synced_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernier succès')),
+                ('attempted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Dernière tentative')),
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stripe_sync_state', to='clients.clientprofile', verbose_name='Client')),
+            ],
+            options={
+                'verbose_name': 'État sync Stripe client',
+                'verbose_name_plural': 'États sync Stripe clients',
+            },
+        ),
+    ]
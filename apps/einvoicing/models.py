@@ -6,7 +6,15 @@ Phase 1 — un seul modèle critique :
   d'une facture côté PDP. Rendu immuable au niveau Python (raise sur UPDATE) et
   signé par hash chaîné SHA-256 pour détecter toute altération.
 
-Phases ultérieures : `PDPSubmission`, `PeppolDirectoryEntry`, `EReportingBatch`.
+- `PDPWebhookDelivery` : boîte de réception des webhooks PDP vérifiés, drainée
+  hors requête HTTP par un worker (accusé de réception immédiat, dédoublonnage
+  par identifiant de livraison).
+- `PeppolDirectoryEntry` : cache persistant de l'annuaire PDP/PPF
+  (SIREN/SIRET normalisé → routage), avec TTL et cache négatif.
+- `StripeCustomerSyncState` : empreinte du dernier état `ClientProfile` poussé
+  vers Stripe (sync en masse différentielle et reprenable).
+
+Phases ultérieures : `PDPSubmission`, `EReportingBatch`.
 """
 
 from __future__ import annotations
@@ -216,6 +224,40 @@ class InvoiceLifecycleEvent(models.Model):
             occurred_at=occurred_at or timezone.now(),
         )
 
+    @classmethod
+    def record_created_many(
+        cls,
+        invoices: list,
+        *,
+        source: str = "invoice.created",
+    ) -> list["InvoiceLifecycleEvent"]:
+        """Événement DRAFT initial de factures insérées par ``bulk_create``.
+
+        ``bulk_create`` n'émet pas ``post_save`` : cette méthode remplace le
+        signal pour les créations en masse. Ce sont les premiers événements
+        de chaque facture, chaînés sur GENESIS_HASH, insérés en une requête.
+        """
+        now = timezone.now()
+        events = []
+        for invoice in invoices:
+            payload = {"number": invoice.number, "status": invoice.status}
+            events.append(cls(
+                invoice=invoice,
+                state=LifecycleState.DRAFT,
+                source=source,
+                payload=payload,
+                occurred_at=now,
+                previous_hash=GENESIS_HASH,
+                event_hash=compute_event_hash(
+                    invoice_id=invoice.pk,
+                    state=LifecycleState.DRAFT,
+                    occurred_at=now,
+                    payload=payload,
+                    previous_hash=GENESIS_HASH,
+                ),
+            ))
+        return cls.objects.bulk_create(events)
+
     @classmethod
     def verify_chain(cls, invoice_id: int) -> tuple[bool, Optional[int]]:
         """Vérifie l'intégrité de la chaîne d'événements d'une facture.
@@ -249,4 +291,169 @@ class InvoiceLifecycleEvent(models.Model):
         return True, None
 
 
-__all__ = ["InvoiceLifecycleEvent", "compute_event_hash", "GENESIS_HASH"]
+# ---------------------------------------------------------------------------
+# PDPWebhookDelivery — inbox des webhooks PDP (fast-ACK)
+# ---------------------------------------------------------------------------
+class PDPWebhookDelivery(models.Model):
+    """Livraison webhook PDP vérifiée, en attente d'ingestion.
+
+    La vue HTTP ne fait que vérifier la signature et insérer le payload brut
+    ici ; l'ingestion (lookup facture + `ingest_lifecycle_event`) est faite par
+    `apps.einvoicing.services.drain_webhook_inbox`, dans l'ordre de réception
+    par facture.
+
+    Le couple (provider, delivery_id) est unique : un retry PDP de la même
+    livraison est un no-op.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("En attente")
+        PROCESSED = "processed", _("Ingérée")
+        IGNORED = "ignored", _("Ignorée (facture ou état inconnu)")
+        FAILED = "failed", _("En échec")
+
+    provider = models.CharField(_("PDP"), max_length=20)
+    delivery_id = models.CharField(
+        _("ID de livraison"),
+        max_length=128,
+        help_text=_("Identifiant fourni par la PDP, ou SHA-256 du corps à défaut."),
+    )
+    event_type = models.CharField(_("Type d'événement"), max_length=80, blank=True, default="")
+    invoice_ref = models.CharField(
+        _("Référence facture"),
+        max_length=100,
+        blank=True,
+        default="",
+        help_text=_("ID PDP externe ou numéro, extrait du payload (clé d'ordonnancement)."),
+    )
+    payload = models.JSONField(_("Payload brut"), default=dict, blank=True)
+    status = models.CharField(
+        _("Statut"),
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(_("Tentatives"), default=0)
+    last_error = models.TextField(_("Dernière erreur"), blank=True, default="")
+    received_at = models.DateTimeField(_("Reçu le"), default=timezone.now, editable=False)
+    processed_at = models.DateTimeField(_("Traité le"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Webhook PDP reçu")
+        verbose_name_plural = _("Webhooks PDP reçus")
+        ordering = ("received_at", "id")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "delivery_id"],
+                name="uniq_pdp_webhook_delivery",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "received_at"], name="idx_pdp_wh_status_time"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.provider} · {self.delivery_id} · {self.status}"
+
+
+# ---------------------------------------------------------------------------
+# PeppolDirectoryEntry — cache de l'annuaire PDP/PPF
+# ---------------------------------------------------------------------------
+class PeppolDirectoryEntry(models.Model):
+    """Résultat (positif ou négatif) d'un `PDPClient.lookup_directory`.
+
+    Lu par `apps.einvoicing.directory.lookup_directory_cached` avant tout
+    appel réseau ; `found=False` mémorise un identifiant absent de l'annuaire
+    (cache négatif, TTL plus court).
+    """
+
+    provider = models.CharField(_("PDP"), max_length=20)
+    identifier = models.CharField(
+        _("SIREN/SIRET"),
+        max_length=14,
+        help_text=_("Identifiant normalisé (chiffres uniquement)."),
+    )
+    found = models.BooleanField(_("Présent dans l'annuaire"), default=True)
+    name = models.CharField(_("Raison sociale"), max_length=255, blank=True, default="")
+    siret = models.CharField(_("SIRET"), max_length=14, blank=True, default="")
+    peppol_id = models.CharField(_("Identifiant Peppol"), max_length=70, blank=True, default="")
+    country_code = models.CharField(_("Pays"), max_length=2, blank=True, default="")
+    raw = models.JSONField(_("Réponse brute"), default=dict, blank=True)
+    fetched_at = models.DateTimeField(_("Interrogé le"), default=timezone.now)
+    expires_at = models.DateTimeField(_("Expire le"))
+
+    class Meta:
+        verbose_name = _("Entrée annuaire PDP")
+        verbose_name_plural = _("Annuaire PDP (cache)")
+        ordering = ("identifier",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "identifier"],
+                name="uniq_pdp_directory_identifier",
+            ),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.provider} · {self.identifier} · {'ok' if self.found else 'absent'}"
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.expires_at > timezone.now()
+
+    def as_routing(self) -> Optional[dict[str, Any]]:
+        """Même forme que `PDPClient.lookup_directory` (None si cache négatif)."""
+        if not self.found:
+            return None
+        return {
+            "name": self.name,
+            "siret": self.siret,
+            "peppol_id": self.peppol_id,
+            "country_code": self.country_code,
+            "raw": self.raw,
+        }
+
+
+# ---------------------------------------------------------------------------
+# StripeCustomerSyncState — état de synchronisation Stripe par client
+# ---------------------------------------------------------------------------
+class StripeCustomerSyncState(models.Model):
+    """Dernière synchronisation `ClientProfile` → Customer Stripe.
+
+    Les empreintes SHA-256 portent sur les champs effectivement poussés
+    (profil d'un côté, tax_ids de l'autre) : `bulk_sync_stripe_customers`
+    saute les clients inchangés et ne renvoie que la partie modifiée.
+    """
+
+    class Status(models.TextChoices):
+        OK = "ok", _("Synchronisé")
+        FAILED = "failed", _("En échec")
+
+    client = models.OneToOneField(
+        "clients.ClientProfile",
+        on_delete=models.CASCADE,
+        related_name="stripe_sync_state",
+        verbose_name=_("Client"),
+    )
+    status = models.CharField(_("Statut"), max_length=10, choices=Status.choices, default=Status.OK)
+    profile_fingerprint = models.CharField(_("Empreinte profil"), max_length=64, blank=True, default="")
+    tax_fingerprint = models.CharField(_("Empreinte identifiants fiscaux"), max_length=64, blank=True, default="")
+    last_error = models.TextField(_("Dernière erreur"), blank=True, default="")
+    synced_at = models.DateTimeField(_("Dernier succès"), null=True, blank=True)
+    attempted_at = models.DateTimeField(_("Dernière tentative"), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("État sync Stripe client")
+        verbose_name_plural = _("États sync Stripe clients")
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"client #{self.client_id} · {self.status}"
+
+
+__all__ = [
+    "InvoiceLifecycleEvent",
+    "PDPWebhookDelivery",
+    "PeppolDirectoryEntry",
+    "StripeCustomerSyncState",
+    "compute_event_hash",
+    "GENESIS_HASH",
+]
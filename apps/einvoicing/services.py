@@ -12,11 +12,18 @@ async sont définis dans `apps.einvoicing.tasks`.
 
 from __future__ import annotations
 
+import hashlib
 import logging
+import time
 from typing import TYPE_CHECKING
 
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
 from .codelists import LifecycleState
-from .models import InvoiceLifecycleEvent
+from .directory import resolve_invoice_routing
+from .models import InvoiceLifecycleEvent, PDPWebhookDelivery
 from .pdp import PDPClient, PDPError, get_pdp_client
 
 if TYPE_CHECKING:  # pragma: no cover
@@ -35,8 +42,13 @@ def submit_invoice_to_pdp(
 
     Renvoie l'événement enregistré (succès ou échec). En cas d'erreur PDP,
     un événement REJECTED est tracé avec le motif et l'erreur est relancée.
+
+    La PDP route elle-même la facture (SIREN/SIRET de l'acheteur) : le
+    routage annuaire n'est que tracé dans l'événement, lu dans le cache
+    (`apps.einvoicing.directory`) sans appel live ni attente de retry.
     """
     pdp = client or get_pdp_client()
+    routing = resolve_invoice_routing(invoice, client=pdp, live=False)
     try:
         submission = pdp.submit_invoice(invoice)
     except PDPError as exc:
@@ -59,15 +71,18 @@ def submit_invoice_to_pdp(
     invoice.lifecycle_state = submission.state
     invoice.save(update_fields=["external_pdp_id", "lifecycle_state"])
 
+    payload = {
+        "external_id": submission.external_id,
+        "accepted_at": submission.accepted_at.isoformat(),
+    }
+    if routing and routing.get("peppol_id"):
+        payload["recipient_peppol_id"] = routing["peppol_id"]
     return InvoiceLifecycleEvent.record(
         invoice=invoice,
         state=submission.state,
         actor=actor,
         source=f"pdp.{pdp.provider}.submit",
-        payload={
-            "external_id": submission.external_id,
-            "accepted_at": submission.accepted_at.isoformat(),
-        },
+        payload=payload,
     )
 
 
@@ -93,4 +108,213 @@ def ingest_lifecycle_event(
     return event
 
 
-__all__ = ["submit_invoice_to_pdp", "ingest_lifecycle_event"]
+# ---------------------------------------------------------------------------
+# Inbox webhooks PDP (fast-ACK + drain asynchrone)
+# ---------------------------------------------------------------------------
+WEBHOOK_DRAIN_LOCK_KEY = "einvoicing:webhook_drain_lock"
+WEBHOOK_DRAIN_LOCK_TTL = 300  # secondes — borne haute d'un drain
+WEBHOOK_MAX_ATTEMPTS = 5
+
+# Mapping des états PDP / DGFiP CDAR vers `LifecycleState`.
+_WEBHOOK_STATE_MAP = {
+    "DEPOSEE": LifecycleState.SUBMITTED,
+    "DEPOSITED": LifecycleState.SUBMITTED,
+    "RECUE": LifecycleState.DELIVERED,
+    "RECEIVED": LifecycleState.DELIVERED,
+    "DELIVERED": LifecycleState.DELIVERED,
+    "APPROUVEE": LifecycleState.APPROVED,
+    "APPROVED": LifecycleState.APPROVED,
+    "REFUSEE": LifecycleState.REJECTED,
+    "REJECTED": LifecycleState.REJECTED,
+    "DISPUTED": LifecycleState.DISPUTED,
+    "ENCAISSEE": LifecycleState.PAID,
+    "PAID": LifecycleState.PAID,
+    "SENT": LifecycleState.SENT,
+    "SUBMITTED": LifecycleState.SUBMITTED,
+    "CANCELLED": LifecycleState.CANCELLED,
+}
+
+
+def normalize_webhook_state(state: str) -> str:
+    """Mappe un état PDP / DGFiP CDAR vers `LifecycleState` ('' si inconnu)."""
+    if not state:
+        return ""
+    return _WEBHOOK_STATE_MAP.get(state.upper(), "")
+
+
+def _webhook_data(payload: dict) -> dict:
+    return payload.get("data") or payload
+
+
+def _webhook_invoice_ref(data: dict) -> str:
+    """Référence facture portée par le payload (sans requête DB)."""
+    return str(
+        data.get("invoice_id") or data.get("id")
+        or data.get("external_reference") or data.get("number") or ""
+    )[:100]
+
+
+def resolve_webhook_invoice(data: dict):
+    """Retrouve la facture liée au webhook (par external_pdp_id puis par numéro)."""
+    from apps.factures.models import Invoice
+
+    external_id = str(data.get("invoice_id") or data.get("id") or "")
+    if external_id:
+        inv = Invoice.objects.filter(external_pdp_id=external_id).first()
+        if inv is not None:
+            return inv
+    number = str(data.get("external_reference") or data.get("number") or "")
+    if number:
+        return Invoice.objects.filter(number=number).first()
+    return None
+
+
+def webhook_delivery_id(payload: dict, body: bytes, header_value: str = "") -> str:
+    """Identifiant de livraison : header PDP, puis ID d'événement, puis SHA-256 du corps.
+
+    Le repli sur le hash du corps garantit qu'un retry à l'identique (même
+    corps, signature re-horodatée) reste dédoublonné.
+    """
+    candidate = header_value or payload.get("event_id") or payload.get("delivery_id")
+    if not candidate and "data" in payload:
+        # Enveloppe `{event, id, data}` : `id` identifie l'événement, pas la facture.
+        candidate = payload.get("id")
+    if candidate:
+        return str(candidate)[:128]
+    return hashlib.sha256(body).hexdigest()
+
+
+def record_webhook_delivery(
+    *,
+    provider: str,
+    payload: dict,
+    body: bytes,
+    delivery_header: str = "",
+) -> tuple[PDPWebhookDelivery | None, bool]:
+    """Stocke une livraison vérifiée dans l'inbox.
+
+    Renvoie `(delivery, created)` ; `created=False` pour un doublon (no-op).
+    Une seule requête INSERT, aucune lecture de `Invoice`.
+    """
+    data = _webhook_data(payload)
+    delivery_id = webhook_delivery_id(payload, body, delivery_header)
+    try:
+        with transaction.atomic():
+            delivery = PDPWebhookDelivery.objects.create(
+                provider=provider,
+                delivery_id=delivery_id,
+                event_type=str(payload.get("event") or payload.get("type") or "").lower()[:80],
+                invoice_ref=_webhook_invoice_ref(data),
+                payload=payload,
+            )
+    except IntegrityError:
+        logger.info("Webhook %s : livraison %s déjà reçue (doublon ignoré).", provider, delivery_id)
+        return None, False
+    return delivery, True
+
+
+def _ingest_webhook_delivery(delivery: PDPWebhookDelivery) -> str:
+    """Ingestion d'une livraison ; renvoie le statut final."""
+    data = _webhook_data(delivery.payload or {})
+    invoice = resolve_webhook_invoice(data)
+    if invoice is None:
+        logger.info(
+            "Webhook %s : facture introuvable (event=%s).", delivery.provider, delivery.event_type
+        )
+        return PDPWebhookDelivery.Status.IGNORED
+    state = normalize_webhook_state(data.get("state") or data.get("status") or "")
+    if not state:
+        return PDPWebhookDelivery.Status.IGNORED
+    ingest_lifecycle_event(
+        invoice,
+        state=state,
+        source=f"pdp.{delivery.provider}.webhook",
+        payload={
+            "event": delivery.event_type,
+            "external_id": invoice.external_pdp_id,
+            "reason": data.get("reason") or data.get("rejection_reason") or "",
+            "delivery_id": delivery.delivery_id,
+        },
+    )
+    return PDPWebhookDelivery.Status.PROCESSED
+
+
+def drain_webhook_inbox(
+    *,
+    limit: int = 500,
+    max_attempts: int = WEBHOOK_MAX_ATTEMPTS,
+) -> dict:
+    """Ingère les livraisons en attente, dans l'ordre de réception par facture.
+
+    Un seul drain à la fois (verrou cache) pour garantir l'ordre. Si une
+    livraison échoue, les suivantes de la même facture restent en attente
+    jusqu'au prochain drain ; au-delà de `max_attempts`, la livraison est
+    abandonnée (statut FAILED définitif) et ne bloque plus la file.
+
+    Renvoie des compteurs de débit : processed / ignored / failed / deferred,
+    `elapsed_ms` et `per_second`.
+    """
+    stats = {"processed": 0, "ignored": 0, "failed": 0, "deferred": 0, "locked": False}
+    if not cache.add(WEBHOOK_DRAIN_LOCK_KEY, 1, WEBHOOK_DRAIN_LOCK_TTL):
+        stats["locked"] = True
+        return stats
+
+    started = time.monotonic()
+    try:
+        queue = list(
+            PDPWebhookDelivery.objects
+            .filter(
+                status__in=[PDPWebhookDelivery.Status.PENDING, PDPWebhookDelivery.Status.FAILED],
+                attempts__lt=max_attempts,
+            )
+            .order_by("received_at", "id")[:limit]
+        )
+        blocked_refs: set[str] = set()
+        for delivery in queue:
+            if delivery.invoice_ref and delivery.invoice_ref in blocked_refs:
+                stats["deferred"] += 1
+                continue
+            delivery.attempts += 1
+            try:
+                with transaction.atomic():
+                    delivery.status = _ingest_webhook_delivery(delivery)
+                    delivery.processed_at = timezone.now()
+                    delivery.last_error = ""
+                    delivery.save(update_fields=["status", "attempts", "processed_at", "last_error"])
+            except Exception as exc:  # noqa: BLE001 — une livraison ne bloque pas les autres factures
+                logger.exception(
+                    "Webhook %s : échec ingestion livraison %s", delivery.provider, delivery.delivery_id
+                )
+                delivery.status = PDPWebhookDelivery.Status.FAILED
+                delivery.last_error = str(exc)[:1000]
+                delivery.save(update_fields=["status", "attempts", "last_error"])
+                if delivery.invoice_ref:
+                    blocked_refs.add(delivery.invoice_ref)
+                stats["failed"] += 1
+                continue
+            stats[delivery.status] += 1
+    finally:
+        cache.delete(WEBHOOK_DRAIN_LOCK_KEY)
+
+    elapsed = time.monotonic() - started
+    handled = stats["processed"] + stats["ignored"] + stats["failed"]
+    stats["elapsed_ms"] = round(elapsed * 1000, 1)
+    stats["per_second"] = round(handled / elapsed, 1) if elapsed > 0 else float(handled)
+    if handled:
+        logger.info(
+            "Inbox webhooks PDP drainée : %s ingérées, %s ignorées, %s en échec, %s différées "
+            "(%.1f ms, %.1f/s).",
+            stats["processed"], stats["ignored"], stats["failed"], stats["deferred"],
+            stats["elapsed_ms"], stats["per_second"],
+        )
+    return stats
+
+
+__all__ = [
+    "submit_invoice_to_pdp",
+    "ingest_lifecycle_event",
+    "normalize_webhook_state",
+    "resolve_webhook_invoice",
+    "record_webhook_delivery",
+    "drain_webhook_inbox",
+]
@@ -19,6 +19,10 @@ Usage :
     from apps.einvoicing.stripe_sync import sync_client_to_stripe_customer
     sync_client_to_stripe_customer(client_profile)
 
+    # Resynchronisation de tous les clients (diff par empreinte, reprise) :
+    from apps.einvoicing.stripe_sync import bulk_sync_stripe_customers
+    bulk_sync_stripe_customers()
+
 Robustesse :
 - Idempotent : ne crée pas de doublons (`stripe_customer_id` sert de clé).
 - Tolérant aux pannes : log + raise StripeSyncError (jamais d'exception silencieuse
@@ -28,11 +32,17 @@ Robustesse :
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Optional
 
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -84,6 +94,90 @@ def _detect_tax_id_type(value: str, country_code: str) -> Optional[str]:
     return None
 
 
+def _customer_payload(client: "ClientProfile") -> dict:
+    """Champs Customer Stripe dérivés du `ClientProfile` (hors tax_ids)."""
+    addr = client.effective_delivery_address if hasattr(client, "effective_delivery_address") else {}
+    common = {
+        "name": client.full_name or client.company_name or client.email,
+        "email": client.email or None,
+        "metadata": {
+            "client_profile_id": str(client.pk),
+            "is_business": "true" if client.is_business else "false",
+        },
+    }
+    if addr:
+        common["address"] = {
+            "line1": addr.get("line", "") or client.address_line or "",
+            "city": addr.get("city", "") or client.city or "",
+            "postal_code": addr.get("zip", "") or client.zip_code or "",
+            "country": (addr.get("country") or client.country_code or "FR")[:2],
+        }
+    return common
+
+
+def _tax_id_candidates(client: "ClientProfile") -> list[tuple[str, Optional[str]]]:
+    """Couples (valeur normalisée, type Stripe) à pousser comme tax_ids."""
+    candidates = []
+    if client.tva_number:
+        candidates.append((client.tva_number, _detect_tax_id_type(client.tva_number, client.country_code)))
+    if client.siret:
+        candidates.append((client.siret, "fr_vat"))
+    elif client.siren:
+        candidates.append((client.siren, "fr_vat"))
+    return [
+        ((raw or "").strip().upper().replace(" ", ""), tax_type)
+        for raw, tax_type in candidates
+    ]
+
+
+def _push_customer(
+    sk,
+    client: "ClientProfile",
+    *,
+    customer_id: str = "",
+    push_profile: bool = True,
+    push_tax_ids: bool = True,
+) -> str:
+    """Appels Stripe uniquement (aucune écriture DB) ; renvoie le Customer id.
+
+    La création utilise une clé d'idempotence par client et par contenu : un
+    run interrompu entre la création Stripe et l'enregistrement local ne
+    duplique pas le Customer lors de la reprise, et une fiche modifiée entre
+    deux runs n'est ni rejetée ni rejouée avec l'ancienne réponse (Stripe
+    conserve les clés ~24 h et exige des paramètres identiques).
+    """
+    if not customer_id:
+        payload = _customer_payload(client)
+        customer = sk.Customer.create(
+            **payload,
+            idempotency_key=f"tus-client-{client.pk}-customer-{_fingerprint(payload)[:16]}",
+        )
+        customer_id = customer["id"]
+    elif push_profile:
+        sk.Customer.modify(customer_id, **_customer_payload(client))
+
+    if not push_tax_ids:
+        return customer_id
+
+    # Synchroniser les tax_ids (créés à la demande, jamais supprimés ici).
+    existing = sk.Customer.list_tax_ids(customer_id, limit=20)
+    existing_values = {row["value"] for row in existing.get("data", [])}
+    for value, tax_type in _tax_id_candidates(client):
+        if not value or not tax_type or value in existing_values:
+            continue
+        try:
+            sk.Customer.create_tax_id(customer_id, type=tax_type, value=value)
+        except Exception as exc:  # noqa: BLE001
+            if _is_rate_limit_error(exc):
+                raise
+            # On ne bloque pas la synchro pour un tax_id rejeté par Stripe.
+            logger.warning(
+                "Stripe a refusé le tax_id (%s) pour client #%s : %s",
+                tax_type, client.pk, str(exc)[:120],
+            )
+    return customer_id
+
+
 def sync_client_to_stripe_customer(client: "ClientProfile") -> Optional[str]:
     """Pousse les identifiants fiscaux du `ClientProfile` vers Stripe.
 
@@ -91,6 +185,9 @@ def sync_client_to_stripe_customer(client: "ClientProfile") -> Optional[str]:
     - Met à jour `name`, `email`, `address` côté Stripe.
     - Ajoute les `tax_ids` (un par valeur connue).
 
+    Pour une resynchronisation de tous les clients, préférer
+    `bulk_sync_stripe_customers` (diff par empreinte, reprise sur interruption).
+
     Returns
     -------
     Stripe Customer id ou None si Stripe n'est pas configuré.
@@ -101,60 +198,163 @@ def sync_client_to_stripe_customer(client: "ClientProfile") -> Optional[str]:
         return None
 
     try:
-        customer_id = getattr(client, "stripe_customer_id", "") or ""
-        addr = client.effective_delivery_address if hasattr(client, "effective_delivery_address") else {}
-        common = {
-            "name": client.full_name or client.company_name or client.email,
-            "email": client.email or None,
-            "metadata": {
-                "client_profile_id": str(client.pk),
-                "is_business": "true" if client.is_business else "false",
-            },
-        }
-        if addr:
-            common["address"] = {
-                "line1": addr.get("line", "") or client.address_line or "",
-                "city": addr.get("city", "") or client.city or "",
-                "postal_code": addr.get("zip", "") or client.zip_code or "",
-                "country": (addr.get("country") or client.country_code or "FR")[:2],
-            }
-
-        if customer_id:
-            sk.Customer.modify(customer_id, **common)
-        else:
-            customer = sk.Customer.create(**common)
-            customer_id = customer["id"]
+        existing_id = getattr(client, "stripe_customer_id", "") or ""
+        customer_id = _push_customer(sk, client, customer_id=existing_id)
+        if customer_id != existing_id:
             client.stripe_customer_id = customer_id
             client.save(update_fields=["stripe_customer_id"])
-
-        # Synchroniser les tax_ids (créés à la demande, jamais supprimés ici).
-        existing = sk.Customer.list_tax_ids(customer_id, limit=20)
-        existing_values = {row["value"] for row in existing.get("data", [])}
-        candidates = []
-        if client.tva_number:
-            candidates.append((client.tva_number, _detect_tax_id_type(client.tva_number, client.country_code)))
-        if client.siret:
-            candidates.append((client.siret, "fr_vat"))
-        elif client.siren:
-            candidates.append((client.siren, "fr_vat"))
-        for raw_value, tax_type in candidates:
-            value = (raw_value or "").strip().upper().replace(" ", "")
-            if not value or not tax_type or value in existing_values:
-                continue
-            try:
-                sk.Customer.create_tax_id(customer_id, type=tax_type, value=value)
-            except Exception as exc:  # noqa: BLE001
-                # On ne bloque pas la synchro pour un tax_id rejeté par Stripe.
-                logger.warning(
-                    "Stripe a refusé le tax_id (%s) pour client #%s : %s",
-                    tax_type, client.pk, str(exc)[:120],
-                )
         return customer_id
     except Exception as exc:  # noqa: BLE001
         logger.exception("Échec sync Stripe pour client #%s", client.pk)
         raise StripeSyncError(str(exc)) from exc
 
 
+# ---------------------------------------------------------------------------
+# Synchronisation en masse (diff par empreinte)
+# ---------------------------------------------------------------------------
+BULK_SYNC_MAX_RETRIES = 4
+
+
+def _fingerprint(data) -> str:
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def client_fingerprints(client: "ClientProfile") -> tuple[str, str]:
+    """Empreintes (profil, tax_ids) des champs poussés vers Stripe."""
+    return _fingerprint(_customer_payload(client)), _fingerprint(_tax_id_candidates(client))
+
+
+def _is_rate_limit_error(exc: BaseException) -> bool:
+    return type(exc).__name__ == "RateLimitError" or getattr(exc, "http_status", None) == 429
+
+
+def _push_with_backoff(sk, client, *, customer_id, push_profile, push_tax_ids, backoff_seconds):
+    for attempt in range(BULK_SYNC_MAX_RETRIES + 1):
+        try:
+            return _push_customer(
+                sk, client,
+                customer_id=customer_id,
+                push_profile=push_profile,
+                push_tax_ids=push_tax_ids,
+            )
+        except Exception as exc:  # noqa: BLE001
+            if not _is_rate_limit_error(exc) or attempt >= BULK_SYNC_MAX_RETRIES:
+                raise
+            time.sleep(backoff_seconds * (2 ** attempt))
+    return customer_id  # pragma: no cover
+
+
+def bulk_sync_stripe_customers(
+    queryset=None,
+    *,
+    force: bool = False,
+    max_workers: int = 4,
+    chunk_size: int = 50,
+    backoff_seconds: float = 1.0,
+) -> dict[str, int]:
+    """Resynchronise les clients vers Stripe en ne poussant que les différences.
+
+    - Chaque client est comparé à son `StripeCustomerSyncState` : empreinte
+      identique → aucun appel Stripe ; seul le profil ou seuls les tax_ids
+      sont poussés selon ce qui a changé.
+    - Les appels Stripe sont parallélisés (`max_workers`) avec backoff
+      exponentiel sur 429 ; toutes les écritures DB restent dans le thread
+      appelant.
+    - L'état est enregistré après chaque lot de `chunk_size` clients : un run
+      interrompu reprend là où il s'est arrêté (les clients déjà poussés ont
+      une empreinte à jour).
+
+    Renvoie des compteurs : total / skipped / synced / failed.
+    """
+    from apps.clients.models import ClientProfile
+
+    from .models import StripeCustomerSyncState
+
+    stats = {"total": 0, "skipped": 0, "synced": 0, "failed": 0}
+    sk = _stripe_or_none()
+    if sk is None:
+        logger.info("Stripe non configuré : sync en masse ignoré.")
+        return stats
+
+    clients = list((queryset if queryset is not None else ClientProfile.objects.all()).order_by("pk"))
+    stats["total"] = len(clients)
+    states = {
+        st.client_id: st
+        for st in StripeCustomerSyncState.objects.filter(client_id__in=[c.pk for c in clients])
+    }
+
+    work = []
+    for client in clients:
+        profile_fp, tax_fp = client_fingerprints(client)
+        state = states.get(client.pk)
+        synced = state is not None and state.status == StripeCustomerSyncState.Status.OK
+        push_profile = force or not synced or state.profile_fingerprint != profile_fp
+        push_tax_ids = force or not synced or state.tax_fingerprint != tax_fp
+        if client.stripe_customer_id and not (push_profile or push_tax_ids):
+            stats["skipped"] += 1
+            continue
+        work.append((client, profile_fp, tax_fp, push_profile, push_tax_ids))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for start in range(0, len(work), max(1, chunk_size)):
+            chunk = work[start:start + chunk_size]
+            futures = [
+                (item, pool.submit(
+                    _push_with_backoff, sk, item[0],
+                    customer_id=item[0].stripe_customer_id or "",
+                    push_profile=item[3],
+                    push_tax_ids=item[4],
+                    backoff_seconds=backoff_seconds,
+                ))
+                for item in chunk
+            ]
+            now = timezone.now()
+            new_states, new_customers = [], []
+            for (client, profile_fp, tax_fp, _, _), future in futures:
+                state = StripeCustomerSyncState(client_id=client.pk, attempted_at=now)
+                try:
+                    customer_id = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Échec sync Stripe pour client #%s : %s", client.pk, str(exc)[:200])
+                    previous = states.get(client.pk)
+                    state.status = StripeCustomerSyncState.Status.FAILED
+                    state.last_error = str(exc)[:1000]
+                    # Conserver les empreintes du dernier succès pour le prochain diff.
+                    state.profile_fingerprint = previous.profile_fingerprint if previous else ""
+                    state.tax_fingerprint = previous.tax_fingerprint if previous else ""
+                    state.synced_at = previous.synced_at if previous else None
+                    stats["failed"] += 1
+                else:
+                    state.status = StripeCustomerSyncState.Status.OK
+                    state.profile_fingerprint = profile_fp
+                    state.tax_fingerprint = tax_fp
+                    state.synced_at = now
+                    if customer_id != client.stripe_customer_id:
+                        client.stripe_customer_id = customer_id
+                        new_customers.append(client)
+                    stats["synced"] += 1
+                new_states.append(state)
+            with transaction.atomic():
+                if new_customers:
+                    ClientProfile.objects.bulk_update(new_customers, ["stripe_customer_id"])
+                StripeCustomerSyncState.objects.bulk_create(
+                    new_states,
+                    update_conflicts=True,
+                    unique_fields=["client"],
+                    update_fields=[
+                        "status", "profile_fingerprint", "tax_fingerprint",
+                        "last_error", "synced_at", "attempted_at",
+                    ],
+                )
+
+    logger.info(
+        "Sync Stripe en masse : %s clients, %s inchangés, %s poussés, %s en échec.",
+        stats["total"], stats["skipped"], stats["synced"], stats["failed"],
+    )
+    return stats
+
+
 def ingest_stripe_customer_tax_ids(stripe_customer_id: str) -> Optional["ClientProfile"]:
     """Récupère les tax_ids d'un `Customer` Stripe et les pousse dans le ClientProfile.
 
@@ -204,5 +404,7 @@ def ingest_stripe_customer_tax_ids(stripe_customer_id: str) -> Optional["ClientP
 __all__ = [
     "StripeSyncError",
     "sync_client_to_stripe_customer",
+    "bulk_sync_stripe_customers",
+    "client_fingerprints",
     "ingest_stripe_customer_tax_ids",
 ]
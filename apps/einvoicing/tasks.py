@@ -1,4 +1,4 @@
-"""Jobs asynchrones django-q2 pour l'envoi PDP."""
+"""Jobs asynchrones django-q2 pour l'envoi PDP et l'ingestion des webhooks."""
 
 from __future__ import annotations
 
@@ -39,4 +39,20 @@ def queue_submit_invoice(invoice_id: int):
     return _async_q("apps.einvoicing.tasks.submit_invoice_async", invoice_id)
 
 
-__all__ = ["submit_invoice_async", "queue_submit_invoice"]
+def drain_webhook_inbox_async() -> dict:
+    """Draine l'inbox des webhooks PDP (voir `services.drain_webhook_inbox`)."""
+    from .services import drain_webhook_inbox
+
+    return drain_webhook_inbox()
+
+
+def queue_drain_webhook_inbox():
+    return _async_q("apps.einvoicing.tasks.drain_webhook_inbox_async")
+
+
+__all__ = [
+    "submit_invoice_async",
+    "queue_submit_invoice",
+    "drain_webhook_inbox_async",
+    "queue_drain_webhook_inbox",
+]
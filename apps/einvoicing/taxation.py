@@ -33,7 +33,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from decimal import ROUND_HALF_UP, Decimal
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Iterable, List, Optional
 
 from .codelists import VATEX_REASON_CODES
 
@@ -106,16 +106,21 @@ def _line_reason_code(item) -> str:
     return getattr(item, "vat_exemption_reason_code", "") or get_default_vatex_code()
 
 
-def compute_vat_breakdown(invoice: "Invoice") -> InvoiceTotals:
+def compute_vat_breakdown(invoice: "Invoice", items: Optional[Iterable] = None) -> InvoiceTotals:
     """Construit l'agrégat TVA EN 16931 pour la facture.
 
     Les lignes sont groupées par couple `(category, rate, exemption_reason)`.
     Le résultat est déterministe (tri lexicographique par catégorie puis taux).
+
+    `items` permet de fournir des lignes déjà chargées (``prefetch_related``
+    lors des exports en masse) et d'éviter une requête par facture.
     """
-    items = list(invoice.invoice_items.all().only(
-        "quantity", "unit_price", "tax_rate", "line_discount",
-        "vat_category_code", "vat_exemption_reason_code",
-    ))
+    if items is None:
+        items = invoice.invoice_items.all().only(
+            "quantity", "unit_price", "tax_rate", "line_discount",
+            "vat_category_code", "vat_exemption_reason_code",
+        )
+    items = list(items)
 
     # Agrégation par (category, rate, reason)
     buckets: dict[tuple[str, Decimal, str], dict[str, Decimal]] = {}
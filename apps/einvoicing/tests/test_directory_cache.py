@@ -0,0 +1,105 @@
+"""Tests du cache annuaire PDP (`apps.einvoicing.directory`) — pas de réseau."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.einvoicing.directory import (
+    lookup_directory_cached,
+    normalize_identifier,
+    prefetch_directory,
+)
+from apps.einvoicing.models import PeppolDirectoryEntry
+from apps.einvoicing.pdp.base import PDPClient
+from apps.einvoicing.pdp.exceptions import PDPRateLimitError, PDPTransportError
+
+
+pytestmark = pytest.mark.django_db
+
+
+KNOWN = "21800003700017"
+UNKNOWN = "00000000000000"
+
+
+class _DirectoryPDP(PDPClient):
+    provider = "fake"
+
+    def __init__(self, *, fail_with: Exception | None = None, rate_limited_once: bool = False) -> None:
+        self.calls: list[str] = []
+        self.fail_with = fail_with
+        self.rate_limited_once = rate_limited_once
+
+    def submit_invoice(self, invoice, *, facturx_pdf=None, cii_xml=None):  # pragma: no cover
+        raise NotImplementedError
+
+    def get_lifecycle(self, external_id: str):  # pragma: no cover
+        return []
+
+    def lookup_directory(self, siren_or_siret: str):
+        self.calls.append(siren_or_siret)
+        if self.fail_with is not None:
+            raise self.fail_with
+        if self.rate_limited_once:
+            self.rate_limited_once = False
+            raise PDPRateLimitError("429", provider=self.provider, retry_after=0)
+        if siren_or_siret == KNOWN:
+            return {"name": "Mairie", "siret": KNOWN, "peppol_id": f"0009:{KNOWN}", "country_code": "FR"}
+        return None
+
+
+def test_normalize_identifier() -> None:
+    assert normalize_identifier("218 000 037 00017") == KNOWN
+    assert normalize_identifier("908264112") == "908264112"
+    assert normalize_identifier("1234") == ""
+    assert normalize_identifier(None) == ""
+
+
+def test_hit_is_served_from_db_without_second_call() -> None:
+    pdp = _DirectoryPDP()
+    first = lookup_directory_cached("218 000 037 00017", client=pdp)
+    second = lookup_directory_cached(KNOWN, client=pdp)
+    assert first["peppol_id"] == second["peppol_id"] == f"0009:{KNOWN}"
+    assert pdp.calls == [KNOWN]
+
+
+def test_negative_result_is_cached() -> None:
+    pdp = _DirectoryPDP()
+    assert lookup_directory_cached(UNKNOWN, client=pdp) is None
+    assert lookup_directory_cached(UNKNOWN, client=pdp) is None
+    assert pdp.calls == [UNKNOWN]
+    assert PeppolDirectoryEntry.objects.get(identifier=UNKNOWN).found is False
+
+
+def test_expired_entry_is_refetched() -> None:
+    pdp = _DirectoryPDP()
+    lookup_directory_cached(KNOWN, client=pdp)
+    PeppolDirectoryEntry.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+    lookup_directory_cached(KNOWN, client=pdp)
+    assert pdp.calls == [KNOWN, KNOWN]
+    assert PeppolDirectoryEntry.objects.count() == 1
+
+
+def test_transport_error_is_not_cached() -> None:
+    pdp = _DirectoryPDP(fail_with=PDPTransportError("down", provider="fake"))
+    with pytest.raises(PDPTransportError):
+        lookup_directory_cached(KNOWN, client=pdp)
+    assert not PeppolDirectoryEntry.objects.exists()
+
+
+def test_prefetch_skips_fresh_entries_and_stores_in_bulk() -> None:
+    pdp = _DirectoryPDP()
+    lookup_directory_cached(KNOWN, client=pdp)
+    stats = prefetch_directory([KNOWN, UNKNOWN, "908264112", "bad"], client=pdp, rate_per_second=0)
+    assert stats == {"requested": 3, "cached": 1, "found": 0, "not_found": 2, "errors": 0}
+    assert sorted(pdp.calls) == sorted([KNOWN, UNKNOWN, "908264112"])
+    assert PeppolDirectoryEntry.objects.count() == 3
+
+
+def test_prefetch_retries_after_rate_limit() -> None:
+    pdp = _DirectoryPDP(rate_limited_once=True)
+    stats = prefetch_directory([KNOWN], client=pdp, max_workers=1, rate_per_second=0)
+    assert stats["found"] == 1
+    assert pdp.calls == [KNOWN, KNOWN]
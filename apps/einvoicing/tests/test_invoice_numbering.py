@@ -9,11 +9,15 @@ from __future__ import annotations
 
 from decimal import Decimal
 
+import importlib
+
 import pytest
+from django.apps import apps as django_apps
+from django.db import connection, transaction
 
 from apps.clients.models import ClientProfile
 from apps.einvoicing.codelists import InvoiceTypeCode
-from apps.factures.models import Invoice
+from apps.factures.models import Invoice, InvoiceNumberSequence
 
 
 pytestmark = pytest.mark.django_db
@@ -55,3 +59,54 @@ class TestInvoiceNumbering:
         n1 = int(inv1.number.rsplit("-", 1)[-1])
         n2 = int(inv2.number.rsplit("-", 1)[-1])
         assert n2 == n1 + 1
+
+
+class TestNumberSequenceTable:
+    def test_counter_row_tracks_last_number(self) -> None:
+        client = _make_client()
+        inv1 = Invoice.objects.create(client=client)
+        inv2 = Invoice.objects.create(client=client)
+        seq = InvoiceNumberSequence.objects.get(series="FAC", year=inv1.issue_date.year)
+        assert seq.last_value == 2
+        assert inv2.number == f"FAC-{inv1.issue_date.year}-002"
+
+    def test_rolled_back_creation_leaves_no_gap(self) -> None:
+        client = _make_client()
+        inv1 = Invoice.objects.create(client=client)
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Invoice.objects.create(client=client)
+                raise RuntimeError("rollback")
+        inv2 = Invoice.objects.create(client=client)
+        assert int(inv2.number.rsplit("-", 1)[-1]) == int(inv1.number.rsplit("-", 1)[-1]) + 1
+
+    def test_manual_number_advances_counter(self) -> None:
+        client = _make_client()
+        year = Invoice(client=client).issue_date.year
+        Invoice.objects.create(client=client, number=f"FAC-{year}-041")
+        nxt = Invoice.objects.create(client=client)
+        assert nxt.number == f"FAC-{year}-042"
+
+    def test_allocate_block_is_contiguous(self) -> None:
+        numbers = InvoiceNumberSequence.allocate("AVO", 2031, count=3)
+        assert numbers == ["AVO-2031-00001", "AVO-2031-00002", "AVO-2031-00003"]
+        assert InvoiceNumberSequence.allocate("AVO", 2031) == ["AVO-2031-00004"]
+
+    def test_migration_seeds_from_existing_numbers(self) -> None:
+        client = _make_client()
+        for number in ("FAC-2024-007", "FAC-2024-012", "AVO-2024-00003", "LEGACY-1"):
+            Invoice.objects.create(client=client, number=number)
+        InvoiceNumberSequence.objects.all().delete()
+
+        migration = importlib.import_module("apps.factures.migrations.0024_invoice_number_sequence")
+
+        class _Editor:
+            pass
+
+        editor = _Editor()
+        editor.connection = connection
+        migration.seed_sequences(django_apps, editor)
+        seeded = dict(
+            ((s.series, s.year), s.last_value) for s in InvoiceNumberSequence.objects.all()
+        )
+        assert seeded == {("FAC", 2024): 12, ("AVO", 2024): 3}
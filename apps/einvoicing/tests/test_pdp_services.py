@@ -29,6 +29,7 @@ class _FakePDP(PDPClient):
     def __init__(self, *, raise_validation: bool = False) -> None:
         self.raise_validation = raise_validation
         self.last_submitted: Optional[Invoice] = None
+        self.lookups: list[str] = []
 
     def submit_invoice(self, invoice, *, facturx_pdf=None, cii_xml=None) -> PDPSubmission:
         if self.raise_validation:
@@ -44,11 +45,12 @@ class _FakePDP(PDPClient):
         return []
 
     def lookup_directory(self, sirenorsiret: str):
+        self.lookups.append(sirenorsiret)
         return None
 
 
-def _make_invoice() -> Invoice:
-    client = ClientProfile.objects.create(full_name="X", email="x@y.fr")
+def _make_invoice(**client_fields) -> Invoice:
+    client = ClientProfile.objects.create(full_name="X", email="x@y.fr", **client_fields)
     inv = Invoice.objects.create(client=client)
     InvoiceItem.objects.create(
         invoice=inv,
@@ -71,6 +73,24 @@ class TestSubmitToPDP:
         assert ev.state == LifecycleState.SUBMITTED
         assert ev.source == "pdp.fake.submit"
 
+    def test_routing_is_read_from_cache_without_live_lookup(self) -> None:
+        from django.utils import timezone as dj_timezone
+
+        from apps.einvoicing.models import PeppolDirectoryEntry
+
+        siret = "21800003700017"
+        pdp = _FakePDP()
+        # Entrée périmée : tracée telle quelle, pas de rafraîchissement live à l'envoi.
+        PeppolDirectoryEntry.objects.create(
+            provider=pdp.provider, identifier=siret, found=True, peppol_id=f"0009:{siret}",
+            fetched_at=dj_timezone.now(), expires_at=dj_timezone.now(),
+        )
+        ev = submit_invoice_to_pdp(_make_invoice(siret=siret), client=pdp)
+        assert ev.payload["recipient_peppol_id"] == f"0009:{siret}"
+
+        submit_invoice_to_pdp(_make_invoice(siret="90826411200018"), client=pdp)
+        assert pdp.lookups == []
+
     def test_validation_error_logs_rejected_event_and_reraises(self) -> None:
         inv = _make_invoice()
         with pytest.raises(PDPValidationError):
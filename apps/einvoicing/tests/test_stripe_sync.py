@@ -7,8 +7,10 @@ from unittest.mock import MagicMock, patch
 import pytest
 
 from apps.clients.models import ClientProfile
+from apps.einvoicing.models import StripeCustomerSyncState
 from apps.einvoicing.stripe_sync import (
     _detect_tax_id_type,
+    bulk_sync_stripe_customers,
     ingest_stripe_customer_tax_ids,
     sync_client_to_stripe_customer,
 )
@@ -74,6 +76,26 @@ class TestSyncWithMockedStripe:
         # 2 tax_ids potentiels : tva_number puis siren → ici les deux passent
         assert sk.Customer.create_tax_id.call_count >= 1
 
+    @patch("apps.einvoicing.stripe_sync._stripe_or_none")
+    def test_idempotency_key_follows_customer_payload(self, mock_stripe_factory) -> None:
+        sk = MagicMock()
+        sk.Customer.create.return_value = {"id": "cus_key"}
+        sk.Customer.list_tax_ids.return_value = {"data": []}
+        mock_stripe_factory.return_value = sk
+        client = ClientProfile.objects.create(full_name="Acme", email="acme@example.com")
+
+        def key_for(profile):
+            sk.Customer.create.reset_mock()
+            profile.stripe_customer_id = ""
+            sync_client_to_stripe_customer(profile)
+            return sk.Customer.create.call_args.kwargs["idempotency_key"]
+
+        first = key_for(client)
+        assert first.startswith(f"tus-client-{client.pk}-customer-")
+        assert key_for(client) == first
+        client.email = "factures@acme.example"
+        assert key_for(client) != first
+
     @patch("apps.einvoicing.stripe_sync._stripe_or_none")
     def test_modifies_existing_customer(self, mock_stripe_factory) -> None:
         sk = MagicMock()
@@ -118,3 +140,84 @@ class TestIngestTaxIds:
         assert client.siren == "908264112"
         assert client.tva_number == "FR91908264112"
         assert client.is_business is True
+
+
+# ---------------------------------------------------------------------------
+# bulk_sync_stripe_customers — diff par empreinte + reprise
+# ---------------------------------------------------------------------------
+class _RateLimitError(Exception):
+    http_status = 429
+
+
+class TestBulkSync:
+    def _stripe(self) -> MagicMock:
+        sk = MagicMock()
+        counter = iter(range(1, 1000))
+        sk.Customer.create.side_effect = lambda **kw: {"id": f"cus_{next(counter)}"}
+        sk.Customer.list_tax_ids.return_value = {"data": []}
+        return sk
+
+    @patch("apps.einvoicing.stripe_sync._stripe_or_none")
+    def test_second_run_skips_unchanged_clients(self, mock_stripe_factory) -> None:
+        sk = self._stripe()
+        mock_stripe_factory.return_value = sk
+        for i in range(3):
+            ClientProfile.objects.create(full_name=f"C{i}", email=f"c{i}@example.com")
+
+        first = bulk_sync_stripe_customers(max_workers=2, chunk_size=2)
+        assert first == {"total": 3, "skipped": 0, "synced": 3, "failed": 0}
+        assert StripeCustomerSyncState.objects.count() == 3
+        assert not ClientProfile.objects.filter(stripe_customer_id="").exists()
+
+        sk.reset_mock()
+        second = bulk_sync_stripe_customers()
+        assert second == {"total": 3, "skipped": 3, "synced": 0, "failed": 0}
+        sk.Customer.modify.assert_not_called()
+        sk.Customer.list_tax_ids.assert_not_called()
+
+    @patch("apps.einvoicing.stripe_sync._stripe_or_none")
+    def test_profile_change_pushes_profile_only(self, mock_stripe_factory) -> None:
+        sk = self._stripe()
+        mock_stripe_factory.return_value = sk
+        client = ClientProfile.objects.create(full_name="Acme", email="acme@example.com", siren="908264112")
+        bulk_sync_stripe_customers()
+
+        sk.reset_mock()
+        client.full_name = "Acme SAS"
+        client.save(update_fields=["full_name"])
+        stats = bulk_sync_stripe_customers()
+        assert stats["synced"] == 1
+        sk.Customer.modify.assert_called_once()
+        assert sk.Customer.modify.call_args.kwargs["name"] == "Acme SAS"
+        sk.Customer.list_tax_ids.assert_not_called()
+
+    @patch("apps.einvoicing.stripe_sync._stripe_or_none")
+    def test_failure_is_recorded_and_retried_next_run(self, mock_stripe_factory) -> None:
+        sk = self._stripe()
+        sk.Customer.create.side_effect = RuntimeError("boom")
+        mock_stripe_factory.return_value = sk
+        client = ClientProfile.objects.create(full_name="X", email="x@y.fr")
+
+        stats = bulk_sync_stripe_customers()
+        assert stats["failed"] == 1
+        state = StripeCustomerSyncState.objects.get(client=client)
+        assert state.status == StripeCustomerSyncState.Status.FAILED
+        assert "boom" in state.last_error
+
+        sk.Customer.create.side_effect = None
+        sk.Customer.create.return_value = {"id": "cus_ok"}
+        stats = bulk_sync_stripe_customers()
+        assert stats["synced"] == 1
+        client.refresh_from_db()
+        assert client.stripe_customer_id == "cus_ok"
+
+    @patch("apps.einvoicing.stripe_sync._stripe_or_none")
+    def test_rate_limit_is_retried_with_backoff(self, mock_stripe_factory) -> None:
+        sk = self._stripe()
+        sk.Customer.create.side_effect = [_RateLimitError("429"), {"id": "cus_after_429"}]
+        mock_stripe_factory.return_value = sk
+        ClientProfile.objects.create(full_name="X", email="x@y.fr")
+
+        stats = bulk_sync_stripe_customers(backoff_seconds=0)
+        assert stats["synced"] == 1
+        assert sk.Customer.create.call_count == 2
@@ -1,4 +1,7 @@
-"""Tests bout-en-bout du endpoint webhook B2Brouter (pas de réseau)."""
+"""Tests bout-en-bout du endpoint webhook B2Brouter (pas de réseau).
+
+La vue accuse réception (inbox) ; l'ingestion est faite par `drain_webhook_inbox`.
+"""
 
 from __future__ import annotations
 
@@ -13,6 +16,8 @@ from django.test import Client
 
 from apps.clients.models import ClientProfile
 from apps.einvoicing.codelists import LifecycleState
+from apps.einvoicing.models import InvoiceLifecycleEvent, PDPWebhookDelivery
+from apps.einvoicing.services import drain_webhook_inbox
 from apps.factures.models import Invoice, InvoiceItem
 
 
@@ -68,20 +73,66 @@ def test_invalid_signature_returns_403() -> None:
     assert resp.status_code == 403
 
 
-def test_valid_signature_updates_invoice_state() -> None:
+def test_valid_signature_acks_then_drain_updates_invoice_state() -> None:
     inv = _make_invoice("inv_xyz")
     body = {"event": "invoice.delivered", "data": {"id": "inv_xyz", "state": "DELIVERED"}}
     raw, header = _signed_post(body)
     c = Client()
     resp = c.post(URL, raw, content_type="application/json", HTTP_X_B2BROUTER_SIGNATURE=header)
-    assert resp.status_code == 204
+    assert resp.status_code == 200
+    inv.refresh_from_db()
+    assert inv.lifecycle_state != LifecycleState.DELIVERED  # pas d'ingestion synchrone
+    assert PDPWebhookDelivery.objects.get().status == PDPWebhookDelivery.Status.PENDING
+
+    stats = drain_webhook_inbox()
+    assert stats["processed"] == 1
     inv.refresh_from_db()
     assert inv.lifecycle_state == LifecycleState.DELIVERED
+    assert PDPWebhookDelivery.objects.get().status == PDPWebhookDelivery.Status.PROCESSED
 
 
-def test_unknown_invoice_returns_204() -> None:
+def test_unknown_invoice_is_acked_and_ignored() -> None:
     body = {"event": "invoice.delivered", "data": {"id": "inv_unknown", "state": "DELIVERED"}}
     raw, header = _signed_post(body)
     c = Client()
     resp = c.post(URL, raw, content_type="application/json", HTTP_X_B2BROUTER_SIGNATURE=header)
-    assert resp.status_code == 204
+    assert resp.status_code == 200
+    stats = drain_webhook_inbox()
+    assert stats["ignored"] == 1
+    assert PDPWebhookDelivery.objects.get().status == PDPWebhookDelivery.Status.IGNORED
+
+
+def test_duplicate_delivery_is_noop() -> None:
+    inv = _make_invoice("inv_xyz")
+    body = {"event": "invoice.delivered", "data": {"id": "inv_xyz", "state": "DELIVERED"}}
+    raw, header = _signed_post(body)
+    c = Client()
+    for _ in range(3):
+        resp = c.post(URL, raw, content_type="application/json", HTTP_X_B2BROUTER_SIGNATURE=header)
+        assert resp.status_code == 200
+    assert PDPWebhookDelivery.objects.count() == 1
+
+    before = InvoiceLifecycleEvent.objects.filter(invoice=inv).count()
+    drain_webhook_inbox()
+    drain_webhook_inbox()
+    assert InvoiceLifecycleEvent.objects.filter(invoice=inv).count() == before + 1
+
+
+def test_drain_applies_events_in_reception_order() -> None:
+    inv = _make_invoice("inv_xyz")
+    c = Client()
+    for event_id, state in (("evt_1", "DELIVERED"), ("evt_2", "APPROVED"), ("evt_3", "PAID")):
+        body = {"event": "invoice.state", "id": event_id, "data": {"id": "inv_xyz", "state": state}}
+        raw, header = _signed_post(body)
+        c.post(URL, raw, content_type="application/json", HTTP_X_B2BROUTER_SIGNATURE=header)
+
+    stats = drain_webhook_inbox()
+    assert stats["processed"] == 3
+    assert stats["elapsed_ms"] >= 0
+    states = list(
+        InvoiceLifecycleEvent.objects.filter(invoice=inv, source="pdp.b2brouter.webhook")
+        .order_by("occurred_at", "id").values_list("state", flat=True)
+    )
+    assert states == [LifecycleState.DELIVERED, LifecycleState.APPROVED, LifecycleState.PAID]
+    inv.refresh_from_db()
+    assert inv.lifecycle_state == LifecycleState.PAID
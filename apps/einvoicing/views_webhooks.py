@@ -5,6 +5,8 @@ Sécurité (commune à toutes les Plateformes Agréées supportées) :
 - Vérification HMAC-SHA256 obligatoire (header dépendant du provider)
 - Anti-replay (timestamp signé, tolérance 5 min)
 - Logs structurés sans PII de la facture (numéro + état uniquement)
+- Fast-ACK : la livraison vérifiée est stockée dans `PDPWebhookDelivery`
+  (dédoublonnée par ID de livraison) puis ingérée hors requête par le worker
 
 Endpoints :
 - ``/webhooks/b2brouter/`` (provider=b2brouter, header X-B2Brouter-Signature)
@@ -16,22 +18,31 @@ from __future__ import annotations
 import json
 import logging
 
+from django.db import transaction
 from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
-from .codelists import LifecycleState
 from .pdp import get_pdp_client
-from .services import ingest_lifecycle_event
+from .services import record_webhook_delivery
+from .tasks import queue_drain_webhook_inbox
 
 logger = logging.getLogger(__name__)
 
+# Header optionnel portant l'identifiant de livraison (sinon déduit du payload).
+DELIVERY_ID_HEADER = "X-Webhook-Delivery-Id"
+
 
 # ---------------------------------------------------------------------------
 # Cœur générique
 # ---------------------------------------------------------------------------
 def _process_webhook(request, *, provider: str, signature_header: str):
-    """Pipeline commun : vérification de signature + ingestion."""
+    """Pipeline commun : vérification de signature + mise en inbox.
+
+    Fast-ACK : aucune lecture de facture ni écriture de cycle de vie ici —
+    la livraison est stockée puis ingérée par le worker (`drain_webhook_inbox`).
+    Les doublons (retry PDP) répondent 200 sans effet.
+    """
     body = request.body or b""
     signature = request.headers.get(signature_header, "")
 
@@ -44,31 +55,18 @@ def _process_webhook(request, *, provider: str, signature_header: str):
         payload = json.loads(body.decode("utf-8") or "{}")
     except (UnicodeDecodeError, json.JSONDecodeError):
         return HttpResponseBadRequest("invalid json")
+    if not isinstance(payload, dict):
+        return HttpResponseBadRequest("invalid json")
 
-    event_type = (payload.get("event") or payload.get("type") or "").lower()
-    data = payload.get("data") or payload
-
-    invoice = _resolve_invoice(data)
-    if invoice is None:
-        logger.info("Webhook %s : facture introuvable (event=%s).", provider, event_type)
-        # On répond 204 quand-même pour éviter que le PDP retry indéfiniment.
-        return HttpResponse(status=204)
-
-    state = _normalize_state(data.get("state") or data.get("status") or "")
-    if not state:
-        return HttpResponse(status=204)
-
-    ingest_lifecycle_event(
-        invoice,
-        state=state,
-        source=f"pdp.{provider}.webhook",
-        payload={
-            "event": event_type,
-            "external_id": invoice.external_pdp_id,
-            "reason": data.get("reason") or data.get("rejection_reason") or "",
-        },
+    _, created = record_webhook_delivery(
+        provider=provider,
+        payload=payload,
+        body=body,
+        delivery_header=request.headers.get(DELIVERY_ID_HEADER, ""),
     )
-    return HttpResponse(status=204)
+    if created:
+        transaction.on_commit(queue_drain_webhook_inbox)
+    return HttpResponse("ok", status=200)
 
 
 # ---------------------------------------------------------------------------
@@ -92,46 +90,4 @@ def iopole_webhook(request):
     )
 
 
-# ---------------------------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------------------------
-def _resolve_invoice(data: dict):
-    """Retrouve la facture liée au webhook (par external_pdp_id puis par numéro)."""
-    from apps.factures.models import Invoice
-
-    external_id = str(data.get("invoice_id") or data.get("id") or "")
-    if external_id:
-        inv = Invoice.objects.filter(external_pdp_id=external_id).first()
-        if inv is not None:
-            return inv
-    number = str(data.get("external_reference") or data.get("number") or "")
-    if number:
-        return Invoice.objects.filter(number=number).first()
-    return None
-
-
-def _normalize_state(state: str) -> str:
-    """Mappe un état PDP / DGFiP CDAR vers `LifecycleState`."""
-    if not state:
-        return ""
-    mapping = {
-        "DEPOSEE": LifecycleState.SUBMITTED,
-        "DEPOSITED": LifecycleState.SUBMITTED,
-        "RECUE": LifecycleState.DELIVERED,
-        "RECEIVED": LifecycleState.DELIVERED,
-        "DELIVERED": LifecycleState.DELIVERED,
-        "APPROUVEE": LifecycleState.APPROVED,
-        "APPROVED": LifecycleState.APPROVED,
-        "REFUSEE": LifecycleState.REJECTED,
-        "REJECTED": LifecycleState.REJECTED,
-        "DISPUTED": LifecycleState.DISPUTED,
-        "ENCAISSEE": LifecycleState.PAID,
-        "PAID": LifecycleState.PAID,
-        "SENT": LifecycleState.SENT,
-        "SUBMITTED": LifecycleState.SUBMITTED,
-        "CANCELLED": LifecycleState.CANCELLED,
-    }
-    return mapping.get(state.upper(), "")
-
-
 __all__ = ["b2brouter_webhook", "iopole_webhook"]
@@ -11,9 +11,10 @@ from django.utils.html import format_html
 from django.core.files.base import ContentFile
 from django import forms
 import os
+from django.http import HttpResponseRedirect
 from django.urls import reverse
 
-from .models import Invoice, InvoiceItem
+from .models import BankStatementImport, BankTransaction, Invoice, InvoiceItem, RecurringInvoiceSchedule
 from .services import PremiumEmailService
 from apps.clients.models import ClientDocument, ClientNotification
 
@@ -221,6 +222,136 @@ class InvoiceAdmin(admin.ModelAdmin):
         self.message_user(request, f"Factures envoyées. {published} publié(s) sur le portail.", level=messages.SUCCESS)
 
 
+class BankStatementImportForm(forms.ModelForm):
+    class Meta:
+        model = BankStatementImport
+        fields = ("file",)
+
+    def clean_file(self):
+        from .services.bank_import import _sha256
+
+        upload = self.cleaned_data.get("file")
+        if not upload:
+            raise forms.ValidationError("Déposez un relevé CAMT.053 (.xml) ou CSV.")
+        if BankStatementImport.objects.filter(sha256=_sha256(upload)).exists():
+            raise forms.ValidationError("Ce relevé a déjà été importé.")
+        return upload
+
+
+@admin.register(BankStatementImport)
+class BankStatementImportAdmin(admin.ModelAdmin):
+    """Import d'un relevé : le fichier déposé est rapproché à l'enregistrement."""
+
+    form = BankStatementImportForm
+    list_display = ("__str__", "source", "created_at", "imported_by", "stats_summary")
+    readonly_fields = ("source", "filename", "sha256", "imported_by", "stats", "created_at")
+    fields = ("file",) + readonly_fields
+
+    @admin.display(description="Résultat")
+    def stats_summary(self, obj):
+        s = obj.stats or {}
+        return (
+            f"{s.get('matched', 0)} rapprochée(s), {s.get('review', 0)} à vérifier, "
+            f"{s.get('unmatched', 0)} sans correspondance"
+        )
+
+    def has_change_permission(self, request, obj=None):
+        return obj is None and super().has_change_permission(request, obj)
+
+    def save_model(self, request, obj, form, change):
+        from .services.bank_import import StatementAlreadyImported, import_statement
+
+        upload = form.cleaned_data.get("file")
+        if change or not upload:
+            return super().save_model(request, obj, form, change)
+        obj.filename = upload.name[:255]
+        obj.imported_by = request.user
+        try:
+            import_statement(upload, filename=upload.name, user=request.user, statement=obj)
+        except (StatementAlreadyImported, ValueError) as exc:
+            # Import annulé (transaction) : rien n'est enregistré
+            obj.pk = None
+            if isinstance(exc, StatementAlreadyImported):
+                self.message_user(request, f"Relevé déjà importé : {exc}", level=messages.ERROR)
+            else:
+                self.message_user(request, f"Relevé illisible : {exc}", level=messages.ERROR)
+            return
+        self.message_user(request, f"Relevé importé — {self.stats_summary(obj)}.")
+
+    def log_addition(self, request, obj, message):
+        if obj.pk is not None:
+            return super().log_addition(request, obj, message)
+
+    def response_add(self, request, obj, post_url_continue=None):
+        if obj.pk is None:
+            # Import refusé : retour au formulaire, le message d'erreur suit
+            return HttpResponseRedirect(request.path)
+        return super().response_add(request, obj, post_url_continue)
+
+
+@admin.register(BankTransaction)
+class BankTransactionAdmin(admin.ModelAdmin):
+    """File de revue : choisir la facture puis appliquer le rapprochement."""
+
+    list_display = ("booking_date", "amount", "debtor_name", "remittance_short", "status", "invoice", "match_reason")
+    list_filter = ("status", "booking_date")
+    search_fields = ("debtor_name", "remittance", "bank_reference", "debtor_iban")
+    raw_id_fields = ("invoice",)
+    list_select_related = ("invoice",)
+    # Le statut ne change que par les actions (paiement appliqué à la facture)
+    readonly_fields = (
+        "statement", "fingerprint", "booking_date", "amount", "currency", "debtor_name",
+        "debtor_iban", "remittance", "bank_reference", "candidates", "match_reason", "applied_at",
+        "status",
+    )
+    actions = ["apply_matches", "mark_ignored"]
+
+    def get_readonly_fields(self, request, obj=None):
+        fields = super().get_readonly_fields(request, obj)
+        if obj is not None and obj.applied_at:
+            fields += ("invoice",)
+        return fields
+
+    @admin.display(description="Libellé")
+    def remittance_short(self, obj):
+        return (obj.remittance or "")[:60]
+
+    @admin.action(description="Appliquer le paiement à la facture choisie")
+    def apply_matches(self, request, queryset):
+        from .services.bank_import import apply_reviewed_transactions
+
+        count = apply_reviewed_transactions(queryset.select_related("invoice"), request.user)
+        self.message_user(request, f"{count} paiement(s) appliqué(s).")
+
+    @admin.action(description="Ignorer (hors factures)")
+    def mark_ignored(self, request, queryset):
+        count = queryset.filter(applied_at__isnull=True).update(status=BankTransaction.Status.IGNORED)
+        self.message_user(request, f"{count} ligne(s) ignorée(s).")
+
+
+@admin.register(RecurringInvoiceSchedule)
+class RecurringInvoiceScheduleAdmin(admin.ModelAdmin):
+    """Échéanciers : la génération passe par ``generate_recurring_invoices``."""
+
+    list_display = ("label", "client", "frequency", "next_run_date", "end_date", "active", "last_generated_at")
+    list_filter = ("active", "frequency")
+    search_fields = ("label", "client__full_name", "client__company_name")
+    autocomplete_fields = ("client",)
+    raw_id_fields = ("quote",)
+    readonly_fields = ("last_generated_at", "created_at")
+    actions = ["generate_due"]
+
+    @admin.action(description="Générer les factures échues maintenant")
+    def generate_due(self, request, queryset):
+        from .services.recurring import run_recurring
+
+        report = run_recurring(schedule_ids=list(queryset.values_list("pk", flat=True)))
+        self.message_user(
+            request,
+            f"{report.created} facture(s) créée(s), {report.skipped_existing} période(s) déjà facturée(s).",
+        )
+
+
 def publish_invoice_to_portal(invoice: Invoice, request=None) -> bool:
     """Publie le PDF de facture dans le portail client (ClientDocument + notification)."""
     try:
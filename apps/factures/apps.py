@@ -19,5 +19,6 @@ class FacturesConfig(AppConfig):
     verbose_name = "Factures"
 
     def ready(self) -> None:
-        # Signaux de notification gérés dans apps/clients/signals.py
-        pass
+        # Signaux de notification gérés dans apps/clients/signals.py ;
+        # ici uniquement l'invalidation du cache de la balance âgée.
+        from . import signals  # noqa: F401
@@ -0,0 +1,58 @@
+"""Formulaires de l'application factures."""
+
+from django import forms
+
+from apps.clients.models import ClientProfile
+from apps.einvoicing.codelists import LifecycleState
+from .models import Invoice
+
+
+_SELECT_CLASS = "bg-tus-black border border-tus-white/10 rounded-lg px-3 py-2 text-sm text-tus-white"
+
+
+class ArchiveFilterForm(forms.Form):
+    """Filtres de l'archive des factures (tous optionnels, soumis en GET)."""
+
+    status = forms.ChoiceField(
+        label="Statut",
+        required=False,
+        choices=[("", "Tous les statuts")] + list(Invoice.InvoiceStatus.choices),
+        widget=forms.Select(attrs={"class": _SELECT_CLASS}),
+    )
+    client = forms.ModelChoiceField(
+        label="Client",
+        required=False,
+        # __str__ lit company_name, email et user.email : tout chargé en une requête
+        queryset=ClientProfile.objects.select_related("user").order_by("full_name"),
+        empty_label="Tous les clients",
+        widget=forms.Select(attrs={"class": _SELECT_CLASS}),
+    )
+    lifecycle_state = forms.ChoiceField(
+        label="Cycle de vie PDP",
+        required=False,
+        choices=[("", "Tous les états PDP")] + list(LifecycleState.choices),
+        widget=forms.Select(attrs={"class": _SELECT_CLASS}),
+    )
+    date_from = forms.DateField(
+        label="Du",
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": _SELECT_CLASS}),
+    )
+    date_to = forms.DateField(
+        label="Au",
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": _SELECT_CLASS}),
+    )
+
+    def filter_kwargs(self) -> dict:
+        """Arguments pour `services.archive.filter_invoices` (filtres valides uniquement)."""
+        if not self.is_valid():
+            return {}
+        data = self.cleaned_data
+        return {
+            "status": data.get("status") or "",
+            "client_id": data["client"].pk if data.get("client") else None,
+            "lifecycle_state": data.get("lifecycle_state") or "",
+            "date_from": data.get("date_from"),
+            "date_to": data.get("date_to"),
+        }
@@ -0,0 +1,63 @@
+"""Exporte le FEC ou le grand livre CSV d'un exercice, en flux.
+
+Usage :
+    python manage.py export_ledger --year 2025                       # FEC dans le dossier courant
+    python manage.py export_ledger --year 2025 --format csv --gzip
+    python manage.py export_ledger --year 2025 --output /tmp/fec.txt
+
+Le fichier est écrit sous un nom temporaire puis renommé : un exercice
+déséquilibré ne laisse jamais de FEC partiel.
+"""
+
+from __future__ import annotations
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Exporte le FEC / grand livre CSV d'un exercice sans le charger en mémoire."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--year", type=int, default=timezone.localdate().year - 1,
+            help="Exercice (année civile, défaut : année précédente).",
+        )
+        parser.add_argument("--format", choices=("fec", "csv"), default="fec")
+        parser.add_argument("--gzip", action="store_true", help="Compresse la sortie (gzip).")
+        parser.add_argument("--output", default="", help="Chemin du fichier (défaut : nom réglementaire).")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        from apps.factures.services.ledger import (
+            LedgerExport,
+            LedgerImbalanceError,
+            export_filename,
+            export_stream,
+        )
+
+        year, fmt, gzip = options["year"], options["format"], options["gzip"]
+        output = options["output"] or export_filename(year, fmt, gzip=gzip)
+        export = LedgerExport(year, chunk_size=options["chunk_size"])
+
+        partial = f"{output}.part"
+        try:
+            with open(partial, "wb") as fh:
+                for block in export_stream(export, fmt, gzip=gzip):
+                    fh.write(block)
+        except LedgerImbalanceError as exc:
+            os.remove(partial)
+            raise CommandError(str(exc)) from exc
+        os.replace(partial, output)
+
+        stats = export.stats
+        if stats["mismatched"]:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['mismatched']} facture(s) dont le TTC stocké diffère du recalcul TVA (voir logs)."
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"{output} : {stats['entries']} écriture(s), {stats['lines']} ligne(s), "
+            f"débit = crédit = {stats['debit']} €."
+        ))
@@ -0,0 +1,48 @@
+"""Génère les factures récurrentes échues (maintenance, hébergement…).
+
+Usage :
+    python manage.py generate_recurring_invoices --dry-run   # périodes à facturer
+    python manage.py generate_recurring_invoices             # crée les factures
+    python manage.py generate_recurring_invoices --batch-size 200
+
+Idempotent : relancer la commande ne refacture pas une période déjà facturée.
+Planification recommandée : cron quotidien ou django-q2 schedule.
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Crée les factures des échéanciers de facturation récurrente arrivés à terme."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Liste les périodes à facturer sans rien créer.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="Échéanciers par transaction (défaut : INVOICE_RECURRING['BATCH_SIZE'] ou 100).",
+        )
+
+    def handle(self, *args, **options):
+        from apps.factures.services.recurring import run_recurring
+
+        report = run_recurring(dry_run=options["dry_run"], batch_size=options["batch_size"])
+        if report.dry_run:
+            for schedule, start in report.planned:
+                self.stdout.write(f"  {schedule.client} — {schedule.label} : période du {start:%d/%m/%Y}")
+            self.stdout.write(self.style.SUCCESS(
+                f"DRY-RUN : {len(report.planned)} facture(s) à créer ({report.schedules} échéancier(s))."
+            ))
+            return
+        if report.skipped_existing:
+            self.stdout.write(self.style.WARNING(
+                f"{report.skipped_existing} période(s) déjà facturée(s) — ignorée(s)."
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.created} facture(s) créée(s) pour {report.schedules} échéancier(s) "
+            f"({report.batches} lot(s))."
+        ))
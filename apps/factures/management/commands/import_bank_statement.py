@@ -0,0 +1,51 @@
+"""Importe un relevé bancaire et rapproche ses virements des factures ouvertes.
+
+Usage :
+    python manage.py import_bank_statement releve.xml            # CAMT.053
+    python manage.py import_bank_statement export.csv --dry-run  # simulation
+
+Les rapprochements sûrs sont appliqués ; les autres lignes attendent une
+validation dans l'admin (Transactions bancaires → « À vérifier »).
+"""
+
+from __future__ import annotations
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Importe un relevé CAMT.053 / CSV et rapproche les paiements reçus."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier relevé (.xml CAMT.053 ou .csv).")
+        parser.add_argument("--format", choices=("camt053", "csv"), default=None,
+                            help="Forcer le format (sinon détecté).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Rapproche sans rien enregistrer.")
+
+    def handle(self, *args, **options):
+        from apps.factures.services.bank_import import StatementAlreadyImported, import_statement
+
+        path = options["path"]
+        try:
+            with open(path, "rb") as fh:
+                statement = import_statement(
+                    fh, filename=os.path.basename(path), source=options["format"],
+                    dry_run=options["dry_run"],
+                )
+        except FileNotFoundError as exc:
+            raise CommandError(f"Fichier introuvable : {path}") from exc
+        except StatementAlreadyImported as exc:
+            raise CommandError(f"Relevé déjà importé : {exc}") from exc
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        s = statement.stats
+        prefix = "DRY-RUN — " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{s['lines']} crédit(s) : {s['matched']} rapproché(s) ({s['amount_matched']} €), "
+            f"{s['review']} à vérifier, {s['unmatched']} sans correspondance, "
+            f"{s['duplicates']} doublon(s) — {s['elapsed_ms']} ms."
+        ))
@@ -0,0 +1,60 @@
+"""Relance les factures impayées arrivées au niveau de relance suivant.
+
+Usage :
+    python manage.py run_dunning --dry-run     # volumes par niveau, aucun envoi
+    python manage.py run_dunning               # envoie les relances dues
+    python manage.py run_dunning --batch-size 100 --workers 8
+
+Planification recommandée : cron quotidien ou django-q2 schedule.
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Envoie les relances de factures impayées (niveaux 1 à 4)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Affiche les volumes par niveau sans rien envoyer.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="Nombre de relances par lot (défaut : INVOICE_DUNNING['BATCH_SIZE'] ou 50).",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Envois simultanés dans un lot (défaut : 4).",
+        )
+
+    def handle(self, *args, **options):
+        from apps.factures.services.dunning import run_dunning
+
+        report = run_dunning(
+            dry_run=options["dry_run"],
+            batch_size=options["batch_size"],
+            max_workers=options["workers"],
+        )
+        for level in sorted(report.due_by_level):
+            self.stdout.write(
+                f"  Niveau {level} : {report.due_by_level[level]} due(s), "
+                f"{report.sent_by_level.get(level, 0)} envoyée(s)"
+            )
+        if report.skipped_no_email:
+            self.stdout.write(self.style.WARNING(
+                f"{report.skipped_no_email} facture(s) sans email client — ignorée(s)."
+            ))
+        if report.skipped_claimed:
+            self.stdout.write(self.style.WARNING(
+                f"{report.skipped_claimed} facture(s) déjà prise(s) par un passage concurrent."
+            ))
+        if report.dry_run:
+            self.stdout.write(self.style.SUCCESS(f"DRY-RUN : {report.due} relance(s) à envoyer."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.sent} relance(s) envoyée(s), {report.failed} en échec "
+            f"({report.batches} lot(s))."
+        ))
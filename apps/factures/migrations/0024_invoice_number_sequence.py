@@ -0,0 +1,56 @@
+"""Compteurs de numérotation par (série, année), initialisés depuis l'existant.
+
+Pour chaque série (FAC, AVO) et année, `last_value` reprend le plus grand
+compteur déjà attribué : la prochaine facture reçoit exactement le numéro
+que l'ancien scan `number__startswith` aurait produit.
+"""
+import re
+
+from django.db import migrations, models
+
+NUMBER_RE = re.compile(r"^(FAC|AVO)-(\d{4})-(\d+)$")
+
+
+def seed_sequences(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Invoice = apps.get_model('factures', 'Invoice')
+    InvoiceNumberSequence = apps.get_model('factures', 'InvoiceNumberSequence')
+
+    last_values = {}
+    numbers = Invoice.objects.using(db).exclude(number='').values_list('number', flat=True)
+    for number in numbers.iterator():
+        match = NUMBER_RE.match(number or '')
+        if not match:
+            continue
+        key = (match.group(1), int(match.group(2)))
+        last_values[key] = max(last_values.get(key, 0), int(match.group(3)))
+
+    InvoiceNumberSequence.objects.using(db).bulk_create([
+        InvoiceNumberSequence(series=series, year=year, last_value=value)
+        for (series, year), value in sorted(last_values.items())
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factures', '0023_einvoicing_phase3'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('series', models.CharField(choices=[('FAC', 'Facture'), ('AVO', 'Avoir')], max_length=3, verbose_name='Série')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Année')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Dernier numéro attribué')),
+            ],
+            options={
+                'verbose_name': 'séquence de numérotation',
+                'verbose_name_plural': 'séquences de numérotation',
+                'constraints': [models.UniqueConstraint(fields=('series', 'year'), name='uniq_invoice_sequence_series_year')],
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0016_einvoicing_phase1_stripe'),
+        ('devis', '0021_alter_quote_pdf_alter_quote_signature_image'),
+        ('factures', '0024_invoice_number_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['-issue_date', '-number'], name='idx_invoice_archive_keyset'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0016_einvoicing_phase1_stripe'),
+        ('devis', '0021_alter_quote_pdf_alter_quote_signature_image'),
+        ('factures', '0025_invoice_archive_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'dunning_completed', 'last_reminder_level', 'due_date', 'last_reminder_date'], name='idx_invoice_dunning'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:20
+
+import core.utils
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factures', '0026_invoice_dunning_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankStatementImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('camt053', 'CAMT.053 (XML)'), ('csv', 'CSV')], max_length=10)),
+                ('filename', models.CharField(blank=True, max_length=255)),
+                ('file', models.FileField(blank=True, null=True, storage=core.utils.raw_media_storage, upload_to='factures/releves/', verbose_name='Fichier')),
+                ('sha256', models.CharField(blank=True, help_text="Empreinte du fichier — un relevé n'est importé qu'une fois.", max_length=64, null=True, unique=True)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('imported_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bank_statement_imports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'relevé bancaire',
+                'verbose_name_plural': 'relevés bancaires',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BankTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(help_text='Empreinte (date, montant, référence, libellé, IBAN) — anti-doublon entre relevés.', max_length=64, unique=True)),
+                ('booking_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('currency', models.CharField(default='EUR', max_length=3)),
+                ('debtor_name', models.CharField(blank=True, max_length=140)),
+                ('debtor_iban', models.CharField(blank=True, max_length=34)),
+                ('remittance', models.TextField(blank=True)),
+                ('bank_reference', models.CharField(blank=True, max_length=140)),
+                ('status', models.CharField(choices=[('matched', 'Rapprochée'), ('review', 'À vérifier'), ('unmatched', 'Non rapprochée'), ('ignored', 'Ignorée')], default='unmatched', max_length=10)),
+                ('candidates', models.JSONField(blank=True, default=list, help_text='Factures candidates (ids).')),
+                ('match_reason', models.CharField(blank=True, max_length=60)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('invoice', models.ForeignKey(blank=True, help_text='Facture rapprochée (ou suggérée, pour une ligne à vérifier).', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bank_transactions', to='factures.invoice')),
+                ('statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='factures.bankstatementimport')),
+            ],
+            options={
+                'verbose_name': 'transaction bancaire',
+                'verbose_name_plural': 'transactions bancaires',
+                'ordering': ['booking_date', 'pk'],
+                'indexes': [models.Index(fields=['status', 'booking_date'], name='idx_banktx_status_date')],
+            },
+        ),
+    ]
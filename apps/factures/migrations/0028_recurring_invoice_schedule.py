@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0017_client_iban'),
+        ('devis', '0021_alter_quote_pdf_alter_quote_signature_image'),
+        ('factures', '0027_bank_statement_import'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringInvoiceSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=120, verbose_name='Libellé')),
+                ('frequency', models.CharField(choices=[('monthly', 'Mensuelle'), ('quarterly', 'Trimestrielle'), ('yearly', 'Annuelle')], default='monthly', max_length=10, verbose_name='Fréquence')),
+                ('start_date', models.DateField(verbose_name='Première période')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Dernière période')),
+                ('next_run_date', models.DateField(help_text='Début de la prochaine période à facturer (avancé à chaque génération).', verbose_name='Prochaine période')),
+                ('lines', models.JSONField(blank=True, default=list, verbose_name='Lignes')),
+                ('payment_terms_days', models.PositiveSmallIntegerField(default=30, verbose_name='Délai de paiement (jours)')),
+                ('payment_terms', models.TextField(blank=True, default='', verbose_name='Conditions de paiement')),
+                ('notes', models.TextField(blank=True, default='', verbose_name='Notes')),
+                ('active', models.BooleanField(default=True, verbose_name='Actif')),
+                ('last_generated_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernière génération')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_schedules', to='clients.clientprofile', verbose_name='Client')),
+                ('quote', models.ForeignKey(blank=True, help_text="Lignes reprises du devis si aucune ligne n'est saisie.", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recurring_schedules', to='devis.quote', verbose_name='Devis source')),
+            ],
+            options={
+                'verbose_name': 'échéancier de facturation',
+                'verbose_name_plural': 'échéanciers de facturation',
+                'ordering': ['next_run_date', 'pk'],
+            },
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='recurring_schedule',
+            field=models.ForeignKey(blank=True, help_text='Échéancier ayant généré la facture (période = delivery_period_start).', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoices', to='factures.recurringinvoiceschedule', verbose_name='Échéancier'),
+        ),
+        migrations.AddConstraint(
+            model_name='invoice',
+            constraint=models.UniqueConstraint(condition=models.Q(('recurring_schedule__isnull', False)), fields=('recurring_schedule', 'delivery_period_start'), name='uniq_invoice_recurring_period'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringinvoiceschedule',
+            index=models.Index(fields=['active', 'next_run_date'], name='idx_recurring_due'),
+        ),
+    ]
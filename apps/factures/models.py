@@ -13,12 +13,19 @@ E-INVOICING UPGRADE (FR 2026/2027) :
   via `apps.einvoicing.InvoiceLifecycleEvent`.
 ✔ Catégorie TVA / motif d'exemption / code unité par ligne (EN 16931).
 ✔ Numérotation séparée pour les avoirs (`AVO-AAAA-XXXXX`).
+✔ Compteurs sans trou par (série, année) dans `InvoiceNumberSequence` —
+  incrémentés dans la transaction de création de la facture.
+✔ Relevés bancaires importés (`BankStatementImport`) et leurs lignes de
+  crédit (`BankTransaction`) rapprochées des factures ouvertes.
+✔ Échéanciers de facturation récurrente (`RecurringInvoiceSchedule`) —
+  une facture au plus par (échéancier, période).
 """
+import calendar
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import date
 from typing import List
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.utils.translation import gettext_lazy as _
 from core.utils import raw_media_storage
 
@@ -49,6 +56,84 @@ def _num2words_fr(v: Decimal) -> str:
 # Modèles
 # =========================
 
+class InvoiceNumberSequence(models.Model):
+    """Compteur de numérotation par (série, année).
+
+    Remplace le scan `number__startswith` : une seule ligne verrouillée
+    (`select_for_update`) par allocation, dans la transaction qui insère la
+    facture — un rollback rend le numéro, la séquence reste continue
+    (art. 289 CGI).
+    """
+
+    class Series(models.TextChoices):
+        INVOICE = "FAC", _("Facture")
+        CREDIT_NOTE = "AVO", _("Avoir")
+
+    # Largeur du compteur par série (format historique inchangé).
+    WIDTHS = {Series.INVOICE: 3, Series.CREDIT_NOTE: 5}
+
+    series = models.CharField(_("Série"), max_length=3, choices=Series.choices)
+    year = models.PositiveSmallIntegerField(_("Année"))
+    last_value = models.PositiveIntegerField(_("Dernier numéro attribué"), default=0)
+
+    class Meta:
+        verbose_name = _("séquence de numérotation")
+        verbose_name_plural = _("séquences de numérotation")
+        constraints = [
+            models.UniqueConstraint(fields=["series", "year"], name="uniq_invoice_sequence_series_year"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.series}-{self.year} → {self.last_value}"
+
+    @classmethod
+    def format_number(cls, series: str, year: int, value: int) -> str:
+        return f"{series}-{year}-{value:0{cls.WIDTHS[series]}d}"
+
+    @classmethod
+    def _locked(cls, series: str, year: int) -> "InvoiceNumberSequence":
+        """Ligne compteur verrouillée (créée au premier besoin). Appeler dans un atomic."""
+        try:
+            return cls.objects.select_for_update().get(series=series, year=year)
+        except cls.DoesNotExist:
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(series=series, year=year)
+            except IntegrityError:
+                # Création concurrente : l'autre transaction a gagné, on se met en file.
+                return cls.objects.select_for_update().get(series=series, year=year)
+
+    @classmethod
+    def allocate(cls, series: str, year: int, count: int = 1) -> list[str]:
+        """Réserve `count` numéros consécutifs et les renvoie formatés.
+
+        Doit être appelée dans la transaction qui enregistre les factures
+        pour rester sans trou.
+        """
+        with transaction.atomic():
+            seq = cls._locked(series, year)
+            first = seq.last_value + 1
+            seq.last_value += count
+            seq.save(update_fields=["last_value"])
+        return [cls.format_number(series, year, n) for n in range(first, first + count)]
+
+    @classmethod
+    def observe(cls, number: str) -> None:
+        """Avance le compteur si un numéro saisi manuellement le dépasse."""
+        try:
+            series, year, value = number.split("-", 2)
+            year, value = int(year), int(value)
+        except (AttributeError, ValueError):
+            return
+        if series not in cls.WIDTHS:
+            return
+        with transaction.atomic():
+            seq = cls._locked(series, year)
+            if value > seq.last_value:
+                seq.last_value = value
+                seq.save(update_fields=["last_value"])
+
+
 class Invoice(models.Model):
 
     class InvoiceStatus(models.TextChoices):
@@ -249,6 +334,19 @@ class Invoice(models.Model):
         help_text="Processus de relance terminé (4 relances envoyées)"
     )
 
+    # ===========================================
+    # FACTURATION RÉCURRENTE
+    # ===========================================
+    recurring_schedule = models.ForeignKey(
+        "factures.RecurringInvoiceSchedule",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="invoices",
+        verbose_name=_("Échéancier"),
+        help_text=_("Échéancier ayant généré la facture (période = delivery_period_start)."),
+    )
+
     class Meta:
         ordering = ["-issue_date", "-number"]
         indexes = [
@@ -256,6 +354,21 @@ class Invoice(models.Model):
             models.Index(fields=['status'], name='idx_invoice_status'),
             models.Index(fields=['client', 'status'], name='idx_invoice_client_status'),
             models.Index(fields=['quote'], name='idx_invoice_quote'),
+            # Pagination keyset de l'archive (ORDER BY issue_date DESC, number DESC)
+            models.Index(fields=['-issue_date', '-number'], name='idx_invoice_archive_keyset'),
+            # Sélection ensembliste des relances (services/dunning.py)
+            models.Index(
+                fields=['status', 'dunning_completed', 'last_reminder_level', 'due_date', 'last_reminder_date'],
+                name='idx_invoice_dunning',
+            ),
+        ]
+        constraints = [
+            # Idempotence de la facturation récurrente : une facture par période.
+            models.UniqueConstraint(
+                fields=['recurring_schedule', 'delivery_period_start'],
+                condition=models.Q(recurring_schedule__isnull=False),
+                name='uniq_invoice_recurring_period',
+            ),
         ]
         verbose_name = _("facture")
         verbose_name_plural = _("factures")
@@ -300,31 +413,28 @@ class Invoice(models.Model):
             else:
                 raise RuntimeError("Impossible de générer un token public unique après 10 tentatives")
 
-        if not self.pk and not self.number:
-            year = self.issue_date.year if self.issue_date else date.today().year
-            # Numérotation séparée pour les avoirs (intangibilité fiscale art. 289 CGI)
-            prefix = f"AVO-{year}-" if self.is_credit_note else f"FAC-{year}-"
-            counter_width = 5 if self.is_credit_note else 3
-            from django.db import transaction
-            with transaction.atomic():
-                last = (
-                    Invoice.objects
-                    .select_for_update()
-                    .filter(number__startswith=prefix)
-                    .order_by("number")
-                    .last()
-                )
-                counter = 0
-                if last and last.number:
-                    try:
-                        counter = int(last.number.rsplit("-", 1)[-1])
-                    except (ValueError, IndexError):
-                        counter = Invoice.objects.filter(number__startswith=prefix).count()
-                self.number = f"{prefix}{counter + 1:0{counter_width}d}"
         # Forcer le code type de facture cohérent avec is_credit_note
         if self.is_credit_note and self.invoice_type_code != InvoiceTypeCode.CREDIT_NOTE:
             self.invoice_type_code = InvoiceTypeCode.CREDIT_NOTE
-        super().save(*args, **kwargs)
+
+        if self.pk:
+            super().save(*args, **kwargs)
+            return
+
+        # Création : numéro alloué et facture insérée dans la même transaction
+        # (un échec d'INSERT annule l'incrément → pas de trou dans la séquence).
+        with transaction.atomic():
+            if not self.number:
+                year = self.issue_date.year if self.issue_date else date.today().year
+                # Numérotation séparée pour les avoirs (intangibilité fiscale art. 289 CGI)
+                series = (
+                    InvoiceNumberSequence.Series.CREDIT_NOTE if self.is_credit_note
+                    else InvoiceNumberSequence.Series.INVOICE
+                )
+                self.number = InvoiceNumberSequence.allocate(series, year)[0]
+            else:
+                InvoiceNumberSequence.observe(self.number)
+            super().save(*args, **kwargs)
 
     def compute_totals(self):
         """
@@ -454,3 +564,146 @@ class InvoiceItem(models.Model):
     @property
     def total_ttc(self) -> Decimal:
         return (self.total_ht + self.total_tva).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+class RecurringInvoiceSchedule(models.Model):
+    """Échéancier de facturation récurrente (maintenance, hébergement…).
+
+    Les lignes viennent de ``lines`` (liste de dicts ``description``,
+    ``quantity``, ``unit_price``, ``tax_rate``, ``line_discount``…) ou, à
+    défaut, du devis source. Génération : `services.recurring.run_recurring`.
+    """
+
+    class Frequency(models.TextChoices):
+        MONTHLY = "monthly", _("Mensuelle")
+        QUARTERLY = "quarterly", _("Trimestrielle")
+        YEARLY = "yearly", _("Annuelle")
+
+    # Nombre de mois par période.
+    MONTHS = {Frequency.MONTHLY: 1, Frequency.QUARTERLY: 3, Frequency.YEARLY: 12}
+
+    client = models.ForeignKey(
+        "clients.ClientProfile",
+        on_delete=models.CASCADE,
+        related_name="recurring_schedules",
+        verbose_name=_("Client"),
+    )
+    quote = models.ForeignKey(
+        "devis.Quote",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="recurring_schedules",
+        verbose_name=_("Devis source"),
+        help_text=_("Lignes reprises du devis si aucune ligne n'est saisie."),
+    )
+    label = models.CharField(_("Libellé"), max_length=120)
+    frequency = models.CharField(_("Fréquence"), max_length=10, choices=Frequency.choices, default=Frequency.MONTHLY)
+    start_date = models.DateField(_("Première période"))
+    end_date = models.DateField(_("Dernière période"), null=True, blank=True)
+    next_run_date = models.DateField(
+        _("Prochaine période"),
+        help_text=_("Début de la prochaine période à facturer (avancé à chaque génération)."),
+    )
+    lines = models.JSONField(_("Lignes"), default=list, blank=True)
+    payment_terms_days = models.PositiveSmallIntegerField(_("Délai de paiement (jours)"), default=30)
+    payment_terms = models.TextField(_("Conditions de paiement"), blank=True, default="")
+    notes = models.TextField(_("Notes"), blank=True, default="")
+    active = models.BooleanField(_("Actif"), default=True)
+    last_generated_at = models.DateTimeField(_("Dernière génération"), null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["next_run_date", "pk"]
+        indexes = [models.Index(fields=["active", "next_run_date"], name="idx_recurring_due")]
+        verbose_name = _("échéancier de facturation")
+        verbose_name_plural = _("échéanciers de facturation")
+
+    def __str__(self) -> str:
+        return f"{self.label} ({self.get_frequency_display()})"
+
+    def save(self, *args, **kwargs) -> None:
+        if not self.next_run_date:
+            self.next_run_date = self.start_date
+        super().save(*args, **kwargs)
+
+    def period_after(self, period_start: date) -> date:
+        """Début de la période suivant `period_start` (jour borné au mois court)."""
+        months = self.MONTHS[self.frequency]
+        index = period_start.year * 12 + period_start.month - 1 + months
+        year, month = divmod(index, 12)
+        day = min(self.start_date.day, calendar.monthrange(year, month + 1)[1])
+        return date(year, month + 1, day)
+
+
+class BankStatementImport(models.Model):
+    """Relevé bancaire importé (CAMT.053 ou CSV)."""
+
+    class Source(models.TextChoices):
+        CAMT053 = "camt053", "CAMT.053 (XML)"
+        CSV = "csv", "CSV"
+
+    source = models.CharField(max_length=10, choices=Source.choices)
+    filename = models.CharField(max_length=255, blank=True)
+    file = models.FileField(
+        "Fichier", upload_to="factures/releves/", blank=True, null=True, storage=raw_media_storage,
+    )
+    sha256 = models.CharField(
+        max_length=64, unique=True, blank=True, null=True,
+        help_text="Empreinte du fichier — un relevé n'est importé qu'une fois.",
+    )
+    imported_by = models.ForeignKey(
+        "auth.User", on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="bank_statement_imports",
+    )
+    stats = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "relevé bancaire"
+        verbose_name_plural = "relevés bancaires"
+
+    def __str__(self) -> str:
+        return self.filename or f"Relevé #{self.pk}"
+
+
+class BankTransaction(models.Model):
+    """Ligne de crédit d'un relevé et son rapprochement éventuel."""
+
+    class Status(models.TextChoices):
+        MATCHED = "matched", "Rapprochée"
+        REVIEW = "review", "À vérifier"
+        UNMATCHED = "unmatched", "Non rapprochée"
+        IGNORED = "ignored", "Ignorée"
+
+    statement = models.ForeignKey(BankStatementImport, on_delete=models.CASCADE, related_name="transactions")
+    fingerprint = models.CharField(
+        max_length=64, unique=True,
+        help_text="Empreinte (date, montant, référence, libellé, IBAN) — anti-doublon entre relevés.",
+    )
+    booking_date = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    currency = models.CharField(max_length=3, default="EUR")
+    debtor_name = models.CharField(max_length=140, blank=True)
+    debtor_iban = models.CharField(max_length=34, blank=True)
+    remittance = models.TextField(blank=True)
+    bank_reference = models.CharField(max_length=140, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.UNMATCHED)
+    invoice = models.ForeignKey(
+        Invoice, on_delete=models.SET_NULL, null=True, blank=True, related_name="bank_transactions",
+        help_text="Facture rapprochée (ou suggérée, pour une ligne à vérifier).",
+    )
+    candidates = models.JSONField(default=list, blank=True, help_text="Factures candidates (ids).")
+    match_reason = models.CharField(max_length=60, blank=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["booking_date", "pk"]
+        indexes = [models.Index(fields=["status", "booking_date"], name="idx_banktx_status_date")]
+        verbose_name = "transaction bancaire"
+        verbose_name_plural = "transactions bancaires"
+
+    def __str__(self) -> str:
+        return f"{self.booking_date} {self.amount} € {self.debtor_name}".strip()
@@ -0,0 +1,119 @@
+"""Archive des factures : filtres serveur, pagination keyset et totaux.
+
+La liste est triée par ``(-issue_date, -number)`` (le numéro est unique, donc
+l'ordre est total). Une page suivante est demandée avec un curseur opaque
+encodant le couple de la dernière ligne affichée : la requête reste un
+``WHERE (issue_date, number) < (…) LIMIT n`` servi par l'index
+``idx_invoice_archive_keyset``, quel que soit le volume d'historique.
+
+Les totaux HT / TVA / TTC du filtre courant sont calculés par un seul
+``aggregate`` (indépendant de la pagination).
+"""
+
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from django.db.models import Count, Q, QuerySet, Sum
+
+from apps.factures.models import Invoice
+
+DEFAULT_PAGE_SIZE = 50
+
+
+@dataclass(frozen=True)
+class ArchivePage:
+    invoices: list
+    next_cursor: str = ""
+
+    @property
+    def has_next(self) -> bool:
+        return bool(self.next_cursor)
+
+
+def encode_cursor(invoice: Invoice) -> str:
+    raw = f"{invoice.issue_date.isoformat()}|{invoice.number}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[tuple[date, str]]:
+    """Renvoie ``(issue_date, number)`` ou None si le curseur est illisible."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        issue_date, number = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return date.fromisoformat(issue_date), number
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def filter_invoices(
+    *,
+    status: str = "",
+    client_id: Optional[int] = None,
+    lifecycle_state: str = "",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> QuerySet:
+    """Queryset filtré (index status, client+status, lifecycle_state, issue_date)."""
+    qs = Invoice.objects.all()
+    if client_id:
+        qs = qs.filter(client_id=client_id)
+    if status:
+        qs = qs.filter(status=status)
+    if lifecycle_state:
+        qs = qs.filter(lifecycle_state=lifecycle_state)
+    if date_from:
+        qs = qs.filter(issue_date__gte=date_from)
+    if date_to:
+        qs = qs.filter(issue_date__lte=date_to)
+    return qs
+
+
+def archive_totals(qs: QuerySet) -> dict:
+    """Nombre de factures et totaux HT / TVA / TTC du filtre, en une requête."""
+    agg = qs.order_by().aggregate(
+        count=Count("id"),
+        total_ht=Sum("total_ht"),
+        tva=Sum("tva"),
+        total_ttc=Sum("total_ttc"),
+    )
+    zero = Decimal("0.00")
+    return {
+        "count": agg["count"] or 0,
+        "total_ht": agg["total_ht"] or zero,
+        "tva": agg["tva"] or zero,
+        "total_ttc": agg["total_ttc"] or zero,
+    }
+
+
+def archive_page(qs: QuerySet, *, cursor: str = "", page_size: int = DEFAULT_PAGE_SIZE) -> ArchivePage:
+    """Page suivant `cursor` (première page si vide ou illisible)."""
+    position = decode_cursor(cursor)
+    if position is not None:
+        issue_date, number = position
+        qs = qs.filter(Q(issue_date__lt=issue_date) | Q(issue_date=issue_date, number__lt=number))
+    rows = list(
+        qs.select_related("client", "quote__client")
+        .order_by("-issue_date", "-number")[: page_size + 1]
+    )
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return ArchivePage(invoices=rows, next_cursor=encode_cursor(rows[-1]))
+    return ArchivePage(invoices=rows)
+
+
+__all__ = [
+    "ArchivePage",
+    "DEFAULT_PAGE_SIZE",
+    "archive_page",
+    "archive_totals",
+    "decode_cursor",
+    "encode_cursor",
+    "filter_invoices",
+]
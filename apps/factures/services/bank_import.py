@@ -0,0 +1,711 @@
+"""Import de relevés bancaires et rapprochement automatique des virements.
+
+Formats acceptés :
+
+- **CAMT.053** (XML ISO 20022) — lu en flux avec ``lxml.etree.iterparse``
+  (chaque ``<Ntry>`` est libéré après lecture, entités et réseau désactivés) ;
+- **CSV** — export banque (séparateur détecté, virgule décimale acceptée,
+  colonnes reconnues par leur intitulé).
+
+Seuls les crédits sont retenus. Chaque ligne est rapprochée via un index en
+mémoire des factures ouvertes, construit en deux requêtes :
+
+1. numéros de facture trouvés dans le libellé (``FAC-2025-012``,
+   ``fac 2025 12``…) → rapprochement sûr si le montant couvre exactement le
+   reste dû (une ou plusieurs factures) ou le règle partiellement ;
+2. IBAN du client émetteur (``ClientProfile.iban``) + montant égal au reste
+   dû d'une seule de ses factures → rapprochement sûr ;
+3. montant seul, ou plusieurs candidates → ligne **à vérifier** (suggestion
+   conservée dans ``BankTransaction.invoice`` / ``candidates``).
+
+Les rapprochements sûrs sont appliqués après relecture verrouillée des
+factures : un ``save()`` par facture dont le statut change (signaux du
+cycle de vie e-invoicing et notification « Paiement reçu »), un
+``bulk_update`` pour les simples acomptes (montant payé, date,
+``payment_audit_trail``). Les lignes déjà importées (empreinte) sont
+ignorées ; deux virements identiques d'un même relevé restent distincts
+(rang d'occurrence dans l'empreinte).
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import hashlib
+import io
+import logging
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from typing import IO, Iterable, Iterator, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.factures.models import BankStatementImport, BankTransaction, Invoice
+
+logger = logging.getLogger(__name__)
+
+
+OPEN_STATUSES = (
+    Invoice.InvoiceStatus.SENT,
+    Invoice.InvoiceStatus.PARTIAL,
+    Invoice.InvoiceStatus.OVERDUE,
+)
+BATCH_SIZE = 500
+ZERO = Decimal("0.00")
+
+NUMBER_TOKEN_RE = re.compile(r"\b(FAC|AVO)[\s\-_/.]*(\d{4})[\s\-_/.]*(\d{1,6})\b", re.IGNORECASE)
+
+
+class StatementAlreadyImported(Exception):
+    """Le même fichier a déjà été importé."""
+
+
+def normalize_iban(value: Optional[str]) -> str:
+    return re.sub(r"[^0-9A-Za-z]", "", value or "").upper()
+
+
+def number_key(number: str) -> Optional[tuple[str, int, int]]:
+    """``FAC-2025-012`` → ``("FAC", 2025, 12)`` (insensible au zéro-padding)."""
+    match = NUMBER_TOKEN_RE.search(number or "")
+    if not match:
+        return None
+    return match.group(1).upper(), int(match.group(2)), int(match.group(3))
+
+
+# ---------------------------------------------------------------------------
+# Lignes de relevé
+# ---------------------------------------------------------------------------
+@dataclass(frozen=True)
+class StatementLine:
+    booking_date: date
+    amount: Decimal
+    currency: str = "EUR"
+    debtor_name: str = ""
+    debtor_iban: str = ""
+    remittance: str = ""
+    bank_reference: str = ""
+    # Rang parmi les lignes identiques du même relevé (cf. `with_occurrences`)
+    occurrence: int = 0
+
+    @property
+    def fingerprint(self) -> str:
+        parts = [
+            self.booking_date.isoformat(), f"{self.amount:.2f}", self.currency,
+            self.bank_reference, self.remittance, self.debtor_iban,
+        ]
+        if self.occurrence:
+            # Rang 0 omis : empreintes des lignes déjà importées inchangées
+            parts.append(str(self.occurrence))
+        raw = "|".join(parts)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def with_occurrences(lines: Iterable[StatementLine]) -> Iterator[StatementLine]:
+    """Numérote les lignes identiques d'un relevé (sans référence bancaire,
+    deux virements réels de même date, montant et libellé sont sinon confondus).
+
+    Un relevé qui chevauche un import précédent renumérote ses doublons dans
+    le même ordre : ils retrouvent la même empreinte et restent écartés.
+    """
+    counts: Counter = Counter()
+    for line in lines:
+        base = line.fingerprint
+        rank = counts[base]
+        counts[base] += 1
+        yield replace(line, occurrence=rank) if rank else line
+
+
+def _local(tag) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _find(elem, *path: str):
+    """Descente par noms locaux (indépendante de la version camt.053.001.xx)."""
+    nodes = [elem]
+    for name in path:
+        nodes = [child for node in nodes for child in node if _local(child.tag) == name]
+        if not nodes:
+            return None
+    return nodes[0]
+
+
+def _findall_text(elem, name: str) -> list[str]:
+    return [(node.text or "").strip() for node in elem.iter() if _local(node.tag) == name and node.text]
+
+
+def _text(elem, *path: str) -> str:
+    node = _find(elem, *path)
+    return (node.text or "").strip() if node is not None else ""
+
+
+def _parse_date(value: str) -> Optional[date]:
+    value = (value or "").strip()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%d.%m.%Y", "%Y%m%d"):
+        try:
+            return datetime.strptime(value[:10] if fmt == "%Y-%m-%d" else value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amount(value: str) -> Optional[Decimal]:
+    raw = (value or "").strip().replace(" ", "").replace(" ", "").replace("€", "")
+    if not raw:
+        return None
+    if "," in raw and "." in raw:
+        raw = raw.replace(".", "").replace(",", ".") if raw.rfind(",") > raw.rfind(".") else raw.replace(",", "")
+    else:
+        raw = raw.replace(",", ".")
+    try:
+        return Decimal(raw).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None
+
+
+def parse_camt053(fileobj: IO[bytes]) -> Iterator[StatementLine]:
+    """Crédits d'un relevé CAMT.053, entrée par entrée (mémoire constante).
+
+    Un XML mal formé (fichier tronqué…) lève ``ValueError``.
+    """
+    from lxml import etree
+
+    context = etree.iterparse(
+        fileobj, events=("end",), resolve_entities=False, no_network=True, huge_tree=False,
+    )
+    try:
+        yield from _camt_entries(context)
+    except etree.XMLSyntaxError as exc:
+        raise ValueError(f"CAMT.053 : XML invalide ({exc}).") from exc
+
+
+def _camt_entries(context) -> Iterator[StatementLine]:
+    for _event, entry in context:
+        if _local(entry.tag) != "Ntry":
+            continue
+        try:
+            if _text(entry, "CdtDbtInd") != "CRDT" or _text(entry, "RvslInd").lower() == "true":
+                continue
+            booking = _parse_date(_text(entry, "BookgDt", "Dt") or _text(entry, "BookgDt", "DtTm"))
+            amount_node = _find(entry, "Amt")
+            amount = _parse_amount(amount_node.text if amount_node is not None else "")
+            if booking is None or amount is None:
+                continue
+            tx = _find(entry, "NtryDtls", "TxDtls")
+            scope = tx if tx is not None else entry
+            debtor = _find(scope, "RltdPties", "Dbtr")
+            debtor_name = ""
+            if debtor is not None:
+                debtor_name = _text(debtor, "Nm") or _text(debtor, "Pty", "Nm")
+            remittance_node = _find(scope, "RmtInf")
+            remittance = ""
+            if remittance_node is not None:
+                remittance = " ".join(
+                    _findall_text(remittance_node, "Ustrd") + _findall_text(remittance_node, "Ref")
+                )
+            remittance = remittance or _text(entry, "AddtlNtryInf")
+            yield StatementLine(
+                booking_date=booking,
+                amount=amount,
+                currency=(amount_node.get("Ccy") or "EUR")[:3],
+                debtor_name=debtor_name[:140],
+                debtor_iban=normalize_iban(_text(scope, "RltdPties", "DbtrAcct", "Id", "IBAN")),
+                remittance=remittance[:2000],
+                bank_reference=(_text(entry, "AcctSvcrRef")
+                                or _text(scope, "Refs", "EndToEndId")
+                                or _text(scope, "Refs", "AcctSvcrRef"))[:140],
+            )
+        finally:
+            entry.clear()
+            while entry.getprevious() is not None:
+                del entry.getparent()[0]
+
+
+CSV_COLUMNS = {
+    "date": ("date", "date operation", "date opération", "date comptable", "booking date", "date valeur"),
+    "amount": ("montant", "amount", "montant (eur)"),
+    "credit": ("credit", "crédit"),
+    "label": ("libelle", "libellé", "description", "motif", "communication", "remittance"),
+    "reference": ("reference", "référence", "ref"),
+    "name": ("nom", "emetteur", "émetteur", "tiers", "debtor", "donneur d'ordre"),
+    "iban": ("iban", "iban emetteur", "iban émetteur", "compte"),
+}
+
+
+def _csv_mapping(header: list[str]) -> dict[str, int]:
+    normalized = [h.strip().lower() for h in header]
+    mapping = {}
+    for key, aliases in CSV_COLUMNS.items():
+        for idx, name in enumerate(normalized):
+            if name in aliases:
+                mapping[key] = idx
+                break
+    return mapping
+
+
+class _SemicolonDialect(csv.excel):
+    delimiter = ";"
+
+
+def parse_csv(fileobj: IO[bytes], encoding: str = "utf-8-sig") -> Iterator[StatementLine]:
+    """Crédits d'un export CSV bancaire, ligne par ligne."""
+    text = io.TextIOWrapper(fileobj, encoding=encoding, errors="replace", newline="")
+    try:
+        yield from _parse_csv_rows(text)
+    finally:
+        text.detach()  # ne pas fermer le fichier de l'appelant
+
+
+def _parse_csv_rows(text: io.TextIOWrapper) -> Iterator[StatementLine]:
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+    except csv.Error:
+        dialect = _SemicolonDialect
+    reader = csv.reader(text, dialect)
+    header = next(reader, None)
+    if not header:
+        return
+    cols = _csv_mapping(header)
+    if "date" not in cols or not ({"amount", "credit"} & cols.keys()):
+        raise ValueError("CSV : colonnes date et montant/crédit introuvables.")
+
+    def cell(row, key):
+        idx = cols.get(key)
+        return row[idx] if idx is not None and idx < len(row) else ""
+
+    for row in reader:
+        booking = _parse_date(cell(row, "date"))
+        amount = _parse_amount(cell(row, "credit") if "credit" in cols else cell(row, "amount"))
+        if booking is None or amount is None or amount <= 0:
+            continue
+        yield StatementLine(
+            booking_date=booking,
+            amount=amount,
+            debtor_name=cell(row, "name").strip()[:140],
+            debtor_iban=normalize_iban(cell(row, "iban")),
+            remittance=cell(row, "label").strip()[:2000],
+            bank_reference=cell(row, "reference").strip()[:140],
+        )
+
+
+PARSERS = {
+    BankStatementImport.Source.CAMT053: parse_camt053,
+    BankStatementImport.Source.CSV: parse_csv,
+}
+
+
+# ---------------------------------------------------------------------------
+# Index de rapprochement (en mémoire)
+# ---------------------------------------------------------------------------
+@dataclass
+class OpenInvoice:
+    pk: int
+    number: str
+    client_id: Optional[int]
+    remaining: Decimal
+
+
+@dataclass
+class MatchResult:
+    status: str
+    allocations: list[tuple[OpenInvoice, Decimal]] = field(default_factory=list)
+    candidates: list[OpenInvoice] = field(default_factory=list)
+    reason: str = ""
+
+
+class MatchIndex:
+    """Factures ouvertes indexées par numéro, reste dû et client.
+
+    Un rapprochement sûr consomme le reste dû en mémoire : deux virements
+    d'un même relevé ne soldent pas deux fois la même facture.
+    """
+
+    def __init__(self, invoices: Iterable[OpenInvoice], client_ibans: dict[str, int]):
+        self.by_number: dict[tuple[str, int, int], OpenInvoice] = {}
+        self.by_amount: dict[Decimal, list[OpenInvoice]] = defaultdict(list)
+        self.by_client: dict[int, list[OpenInvoice]] = defaultdict(list)
+        self.client_ibans = client_ibans
+        for inv in invoices:
+            key = number_key(inv.number)
+            if key:
+                self.by_number[key] = inv
+            self.by_amount[inv.remaining].append(inv)
+            if inv.client_id:
+                self.by_client[inv.client_id].append(inv)
+
+    @classmethod
+    def from_db(cls) -> "MatchIndex":
+        rows = (
+            Invoice.objects
+            .filter(status__in=OPEN_STATUSES, is_credit_note=False)
+            .values_list("pk", "number", "client_id", "total_ttc", "amount_paid")
+        )
+        invoices = [
+            OpenInvoice(pk, number, client_id, (ttc or ZERO) - (paid or ZERO))
+            for pk, number, client_id, ttc, paid in rows.iterator(chunk_size=2000)
+            if (ttc or ZERO) - (paid or ZERO) > 0
+        ]
+        from apps.clients.models import ClientProfile
+
+        ibans = {
+            normalize_iban(iban): pk
+            for pk, iban in ClientProfile.objects.exclude(iban="").values_list("pk", "iban")
+        }
+        return cls(invoices, ibans)
+
+    @staticmethod
+    def _open(invoices: Iterable[OpenInvoice]) -> list[OpenInvoice]:
+        return [inv for inv in invoices if inv.remaining > 0]
+
+    def _consume(self, allocations: list[tuple[OpenInvoice, Decimal]]) -> None:
+        for inv, amount in allocations:
+            self.by_amount[inv.remaining].remove(inv)
+            inv.remaining -= amount
+            if inv.remaining > 0:
+                self.by_amount[inv.remaining].append(inv)
+
+    def _sure(self, allocations, reason) -> MatchResult:
+        self._consume(allocations)
+        return MatchResult(BankTransaction.Status.MATCHED, allocations,
+                           [inv for inv, _ in allocations], reason)
+
+    def match(self, line: StatementLine) -> MatchResult:
+        amount = line.amount
+        # 1. Numéros cités dans le libellé
+        referenced = []
+        for m in NUMBER_TOKEN_RE.finditer(line.remittance):
+            inv = self.by_number.get((m.group(1).upper(), int(m.group(2)), int(m.group(3))))
+            if inv is not None and inv not in referenced:
+                referenced.append(inv)
+        referenced = self._open(referenced)
+        if len(referenced) == 1:
+            inv = referenced[0]
+            if amount == inv.remaining:
+                return self._sure([(inv, amount)], "numéro + montant")
+            if amount < inv.remaining:
+                return self._sure([(inv, amount)], "numéro (paiement partiel)")
+            return MatchResult(BankTransaction.Status.REVIEW, candidates=referenced,
+                               reason="numéro, montant supérieur au reste dû")
+        if len(referenced) > 1:
+            if amount == sum((inv.remaining for inv in referenced), ZERO):
+                return self._sure([(inv, inv.remaining) for inv in referenced], "numéros + montant")
+            return MatchResult(BankTransaction.Status.REVIEW, candidates=referenced,
+                               reason="plusieurs numéros, montant différent")
+
+        # 2. IBAN du client + montant exact
+        client_id = self.client_ibans.get(line.debtor_iban) if line.debtor_iban else None
+        if client_id:
+            exact = [inv for inv in self._open(self.by_client[client_id]) if inv.remaining == amount]
+            if len(exact) == 1:
+                return self._sure([(exact[0], amount)], "IBAN + montant")
+            if exact:
+                return MatchResult(BankTransaction.Status.REVIEW, candidates=exact,
+                                   reason="IBAN, plusieurs factures du même montant")
+            client_open = self._open(self.by_client[client_id])
+            if client_open:
+                return MatchResult(BankTransaction.Status.REVIEW, candidates=client_open,
+                                   reason="IBAN, montant sans correspondance")
+
+        # 3. Montant seul : jamais appliqué automatiquement
+        same_amount = self._open(self.by_amount.get(amount, []))
+        if same_amount:
+            return MatchResult(BankTransaction.Status.REVIEW, candidates=same_amount[:20],
+                               reason="montant seul")
+        return MatchResult(BankTransaction.Status.UNMATCHED, reason="aucune facture ouverte")
+
+
+# ---------------------------------------------------------------------------
+# Application des paiements
+# ---------------------------------------------------------------------------
+def _paid_at(booking: date) -> datetime:
+    return timezone.make_aware(datetime.combine(booking, time(12, 0)))
+
+
+def apply_payments(
+    payments: list[tuple[BankTransaction, list[tuple[int, Decimal]]]],
+    *,
+    user=None,
+) -> set[int]:
+    """Applique des paiements ``(transaction, [(invoice_id, montant)])``.
+
+    Relit les factures verrouillées et met à jour montant payé / statut /
+    date / audit trail. Renvoie l'identité Python (``id()``) des transactions
+    appliquées — elles ne sont pas encore en base. Une transaction est
+    écartée si l'une de ses factures n'existe plus, n'est plus ouverte ou si
+    le montant dépasse son reste dû (facture réglée depuis la construction de
+    l'index, ou validation manuelle d'un trop-perçu).
+
+    Les factures dont le statut change sont enregistrées par ``save()`` :
+    les signaux tracent la transition dans la chaîne d'audit e-invoicing et
+    notifient le client du paiement. Les autres (acompte sur facture déjà
+    partielle) passent en un ``bulk_update``.
+    """
+    if not payments:
+        return set()
+    invoice_ids = {inv_id for _tx, allocs in payments for inv_id, _ in allocs}
+    applied: set[int] = set()
+    with transaction.atomic():
+        invoices = {
+            inv.pk: inv
+            for inv in Invoice.objects.select_for_update().filter(pk__in=invoice_ids)
+        }
+        touched, status_changed = {}, set()
+        for tx, allocations in payments:
+            rows = [(invoices.get(inv_id), amount) for inv_id, amount in allocations]
+            if any(inv is None for inv, _ in rows):
+                continue
+            stale = any(
+                inv.status not in OPEN_STATUSES
+                or amount > (inv.total_ttc or ZERO) - (inv.amount_paid or ZERO)
+                for inv, amount in rows
+            )
+            if stale:
+                continue
+            for inv, amount in rows:
+                inv.amount_paid = (inv.amount_paid or ZERO) + amount
+                status = (
+                    Invoice.InvoiceStatus.PAID
+                    if inv.amount_paid >= (inv.total_ttc or ZERO)
+                    else Invoice.InvoiceStatus.PARTIAL
+                )
+                if status != inv.status:
+                    inv.status = status
+                    status_changed.add(inv.pk)
+                inv.paid_at = _paid_at(tx.booking_date)
+                if user is not None:
+                    inv.paid_by = user
+                trail = inv.payment_audit_trail or {}
+                trail[f"bank_{tx.booking_date.isoformat()}_{tx.fingerprint[:12]}"] = {
+                    "payment_method": "bank_transfer",
+                    "amount": f"{amount:.2f}",
+                    "transaction_amount": f"{tx.amount:.2f}",
+                    "bank_reference": tx.bank_reference,
+                    "debtor_name": tx.debtor_name,
+                    "debtor_iban": tx.debtor_iban,
+                    "statement_id": tx.statement_id,
+                    "matched_by": tx.match_reason or "manuel",
+                    "validated_by": getattr(user, "username", "") if user is not None else "auto",
+                    "timestamp": timezone.now().isoformat(),
+                }
+                inv.payment_audit_trail = trail
+                touched[inv.pk] = inv
+            applied.add(id(tx))
+        fields = ["amount_paid", "status", "paid_at", "paid_by", "payment_audit_trail"]
+        for pk in status_changed:
+            touched[pk].save(update_fields=fields)
+        unchanged = [inv for pk, inv in touched.items() if pk not in status_changed]
+        if unchanged:
+            Invoice.objects.bulk_update(unchanged, fields)
+            # bulk_update n'émet pas post_save : invalidation explicite de la balance âgée
+            from .receivables import invalidate_invoices
+
+            invalidate_invoices(unchanged)
+    return applied
+
+
+def _learn_ibans(matches: list[tuple[BankTransaction, int]]) -> None:
+    """Mémorise l'IBAN émetteur des clients rapprochés par numéro de facture."""
+    from apps.clients.models import ClientProfile
+
+    by_client = {client_id: tx.debtor_iban for tx, client_id in matches if client_id and tx.debtor_iban}
+    if not by_client:
+        return
+    profiles = list(ClientProfile.objects.filter(pk__in=by_client, iban=""))
+    for profile in profiles:
+        profile.iban = by_client[profile.pk]
+    if profiles:
+        ClientProfile.objects.bulk_update(profiles, ["iban"])
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+def _sha256(fileobj: IO[bytes]) -> str:
+    digest = hashlib.sha256()
+    for block in iter(lambda: fileobj.read(64 * 1024), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def detect_source(filename: str, head: bytes) -> str:
+    if filename.lower().endswith(".xml") or head.lstrip(codecs.BOM_UTF8).lstrip().startswith(b"<"):
+        return BankStatementImport.Source.CAMT053
+    return BankStatementImport.Source.CSV
+
+
+def _batches(lines: Iterable[StatementLine], size: int) -> Iterator[list[StatementLine]]:
+    batch: list[StatementLine] = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_statement(
+    fileobj: IO[bytes],
+    *,
+    filename: str = "",
+    source: Optional[str] = None,
+    user=None,
+    dry_run: bool = False,
+    statement: Optional[BankStatementImport] = None,
+) -> BankStatementImport:
+    """Importe un relevé, rapproche ses crédits et applique les paiements sûrs.
+
+    ``dry_run`` : rapproche sans rien écrire (statistiques seules).
+    Lève `StatementAlreadyImported` si le fichier a déjà été traité et
+    ``ValueError`` s'il est illisible. L'import est atomique : un fichier
+    illisible en cours de lecture (XML tronqué…) n'enregistre ni le relevé
+    — son empreinte reste libre pour un nouvel envoi — ni ses lignes.
+    """
+    if dry_run:
+        return _import_statement(fileobj, filename=filename, source=source, user=user,
+                                 dry_run=True, statement=statement)
+    with transaction.atomic():
+        return _import_statement(fileobj, filename=filename, source=source, user=user,
+                                 dry_run=False, statement=statement)
+
+
+def _import_statement(fileobj, *, filename, source, user, dry_run, statement) -> BankStatementImport:
+    sha = _sha256(fileobj)
+    if source is None:
+        source = detect_source(filename, fileobj.read(64))
+        fileobj.seek(0)
+    if BankStatementImport.objects.filter(sha256=sha).exclude(pk=getattr(statement, "pk", None)).exists():
+        raise StatementAlreadyImported(filename or sha)
+
+    started = timezone.now()
+    if statement is None:
+        statement = BankStatementImport(source=source, filename=filename[:255], imported_by=user)
+    statement.source, statement.sha256 = source, sha
+    if not dry_run:
+        statement.save()
+        fileobj.seek(0)  # l'enregistrement du FileField a pu consommer le flux
+
+    index = MatchIndex.from_db()
+    stats = {"lines": 0, "duplicates": 0, "matched": 0, "review": 0, "unmatched": 0, "amount_matched": "0.00"}
+    amount_matched = ZERO
+
+    for batch in _batches(with_occurrences(PARSERS[source](fileobj)), BATCH_SIZE):
+        fingerprints = {line.fingerprint for line in batch}
+        seen = set(
+            BankTransaction.objects.filter(fingerprint__in=fingerprints).values_list("fingerprint", flat=True)
+        )
+        to_create, payments, learned = [], [], []
+        for line in batch:
+            fp = line.fingerprint
+            if fp in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(fp)
+            stats["lines"] += 1
+            result = index.match(line)
+            tx = BankTransaction(
+                statement=statement if not dry_run else None,
+                fingerprint=fp,
+                booking_date=line.booking_date,
+                amount=line.amount,
+                currency=line.currency,
+                debtor_name=line.debtor_name,
+                debtor_iban=line.debtor_iban,
+                remittance=line.remittance,
+                bank_reference=line.bank_reference,
+                status=result.status,
+                invoice_id=result.candidates[0].pk if len(result.candidates) == 1 or result.allocations else None,
+                candidates=[inv.pk for inv in result.candidates],
+                match_reason=result.reason,
+            )
+            to_create.append(tx)
+            if result.allocations:
+                payments.append((tx, [(inv.pk, amount) for inv, amount in result.allocations]))
+                if result.reason.startswith("numéro"):
+                    learned.append((tx, result.allocations[0][0].client_id))
+
+        if dry_run:
+            for tx in to_create:
+                stats[tx.status] += 1
+            amount_matched += sum((tx.amount for tx, _ in payments), ZERO)
+            continue
+
+        with transaction.atomic():
+            applied = apply_payments(payments)
+            now = timezone.now()
+            for tx, _allocs in payments:
+                if id(tx) in applied:
+                    tx.applied_at = now
+                    amount_matched += tx.amount
+                else:
+                    tx.status = BankTransaction.Status.REVIEW
+                    tx.match_reason = "facture modifiée pendant l'import"
+            for tx in to_create:
+                stats[tx.status] += 1
+            BankTransaction.objects.bulk_create(to_create)
+            _learn_ibans([(tx, cid) for tx, cid in learned if id(tx) in applied])
+
+    stats["amount_matched"] = f"{amount_matched:.2f}"
+    stats["elapsed_ms"] = int((timezone.now() - started).total_seconds() * 1000)
+    statement.stats = stats
+    if not dry_run:
+        statement.save(update_fields=["source", "sha256", "stats"])
+    logger.info(
+        "Relevé %s : %s ligne(s), %s rapprochée(s), %s à vérifier, %s sans correspondance (%s ms).",
+        filename or sha[:12], stats["lines"], stats["matched"], stats["review"],
+        stats["unmatched"], stats["elapsed_ms"],
+    )
+    return statement
+
+
+def apply_reviewed_transactions(transactions: Iterable[BankTransaction], user) -> int:
+    """Applique les lignes « à vérifier » dont la facture a été confirmée.
+
+    Seules les lignes effectivement appliquées passent en rapprochées ; une
+    facture déjà soldée ou un montant supérieur au reste dû laisse la ligne
+    à vérifier (motif mis à jour). Renvoie le nombre de lignes appliquées.
+    """
+    pending = [
+        tx for tx in transactions
+        if tx.invoice_id and tx.applied_at is None
+        and tx.status in (BankTransaction.Status.REVIEW, BankTransaction.Status.UNMATCHED)
+    ]
+    if not pending:
+        return 0
+    with transaction.atomic():
+        for tx in pending:
+            tx.match_reason = tx.match_reason or "manuel"
+        applied = apply_payments([(tx, [(tx.invoice_id, tx.amount)]) for tx in pending], user=user)
+        now = timezone.now()
+        for tx in pending:
+            if id(tx) in applied:
+                tx.status = BankTransaction.Status.MATCHED
+                tx.applied_at = now
+            else:
+                tx.status = BankTransaction.Status.REVIEW
+                tx.match_reason = "refusé : facture non ouverte ou montant > reste dû"
+        BankTransaction.objects.bulk_update(pending, ["status", "applied_at", "match_reason"])
+    return len(applied)
+
+
+__all__ = [
+    "MatchIndex",
+    "MatchResult",
+    "OpenInvoice",
+    "StatementAlreadyImported",
+    "StatementLine",
+    "apply_payments",
+    "apply_reviewed_transactions",
+    "detect_source",
+    "import_statement",
+    "normalize_iban",
+    "parse_camt053",
+    "parse_csv",
+    "with_occurrences",
+]
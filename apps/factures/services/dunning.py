@@ -0,0 +1,362 @@
+"""Moteur de relances (dunning) des factures impayées.
+
+Pilote les champs existants de `Invoice` : ``last_reminder_level``,
+``last_reminder_date``, ``reminder_count`` et ``dunning_completed``.
+
+Déroulé d'un passage (`run_dunning`) :
+
+1. **Sélection ensembliste** — une seule requête (index
+   ``idx_invoice_dunning``) renvoie toutes les factures dues pour leur
+   niveau suivant : statut envoyée / partielle / en retard, échéance dépassée
+   du délai du niveau, intervalle minimal depuis la dernière relance.
+2. **Rendu par niveau** — le gabarit email d'un niveau est rendu une seule
+   fois avec des jetons (`__DUNNING_NUMBER__`…), puis chaque facture ne fait
+   qu'une substitution de chaînes (valeurs échappées HTML).
+3. **Réservation puis envoi par lots** — chaque lot est d'abord *réservé* :
+   ``select_for_update(skip_locked=True)`` sur les factures encore au niveau
+   lu, puis un seul ``UPDATE`` avance leurs compteurs (expressions `F`, pas
+   de `save()`) avant tout envoi. Un passage concurrent ne voit plus ces
+   factures au même niveau et ne les relance pas une seconde fois ; un
+   crash après la réservation fait au pire sauter une relance, jamais en
+   doubler une. Les envois partent ensuite en parallèle (`max_workers`) ;
+   une pause entre lots borne le débit vers Brevo.
+4. **Restitution des échecs** — une relance non partie rend son niveau à la
+   facture (elle sera retentée au passage suivant).
+
+Le mode ``dry_run`` ne fait que l'étape 1 et renvoie les volumes par niveau.
+
+Réglages optionnels (``settings.INVOICE_DUNNING``) : ``LEVEL_DELAYS_DAYS``,
+``MIN_INTERVAL_DAYS``, ``BATCH_SIZE``, ``MAX_WORKERS``, ``BATCH_PAUSE_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import html
+import logging
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, QuerySet, Value, When
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from apps.factures.models import Invoice
+
+logger = logging.getLogger(__name__)
+
+
+# Niveau → jours de retard minimum après l'échéance.
+DEFAULT_LEVEL_DELAYS_DAYS = {1: 3, 2: 10, 3: 20, 4: 30}
+DEFAULT_MIN_INTERVAL_DAYS = 5
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_BATCH_PAUSE_SECONDS = 1.0
+
+DUNNABLE_STATUSES = (
+    Invoice.InvoiceStatus.SENT,
+    Invoice.InvoiceStatus.PARTIAL,
+    Invoice.InvoiceStatus.OVERDUE,
+)
+
+LEVEL_CONTENT = {
+    1: {
+        "subject": "Rappel : facture {number} arrivée à échéance",
+        "headline": "Petit rappel de paiement",
+        "message": (
+            "Bonjour __DUNNING_CLIENT__,<br><br>"
+            "Sauf erreur de notre part, la facture <strong>__DUNNING_NUMBER__</strong> "
+            "arrivée à échéance le __DUNNING_DUE_DATE__ n'a pas encore été réglée. "
+            "Si le paiement est en cours, merci de ne pas tenir compte de ce message."
+        ),
+    },
+    2: {
+        "subject": "Relance : facture {number} en attente de règlement",
+        "headline": "Facture en attente de règlement",
+        "message": (
+            "Bonjour __DUNNING_CLIENT__,<br><br>"
+            "Nous n'avons toujours pas reçu le règlement de la facture "
+            "<strong>__DUNNING_NUMBER__</strong>, échue depuis le __DUNNING_DUE_DATE__. "
+            "Merci de procéder au paiement dans les meilleurs délais."
+        ),
+    },
+    3: {
+        "subject": "Urgent : facture {number} impayée",
+        "headline": "Règlement urgent demandé",
+        "message": (
+            "Bonjour __DUNNING_CLIENT__,<br><br>"
+            "Malgré nos précédents rappels, la facture <strong>__DUNNING_NUMBER__</strong> "
+            "reste impayée. Sans règlement sous 8 jours, des pénalités de retard et "
+            "l'indemnité forfaitaire de 40 € (art. L441-10 C. com.) pourront être appliquées."
+        ),
+    },
+    4: {
+        "subject": "Mise en demeure avant recouvrement : facture {number}",
+        "headline": "Dernier rappel avant recouvrement",
+        "message": (
+            "Bonjour __DUNNING_CLIENT__,<br><br>"
+            "Ceci est notre dernier rappel amiable concernant la facture "
+            "<strong>__DUNNING_NUMBER__</strong>. À défaut de règlement, le dossier sera "
+            "transmis au recouvrement."
+        ),
+    },
+}
+MAX_LEVEL = max(LEVEL_CONTENT)
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, "INVOICE_DUNNING", {}) or {}).get(key, default)
+
+
+@dataclass
+class DunningReport:
+    dry_run: bool
+    due_by_level: Counter = field(default_factory=Counter)
+    sent_by_level: Counter = field(default_factory=Counter)
+    failed: int = 0
+    skipped_no_email: int = 0
+    # Déjà réservées / relancées par un passage concurrent
+    skipped_claimed: int = 0
+    batches: int = 0
+
+    @property
+    def due(self) -> int:
+        return sum(self.due_by_level.values())
+
+    @property
+    def sent(self) -> int:
+        return sum(self.sent_by_level.values())
+
+
+# ---------------------------------------------------------------------------
+# Sélection
+# ---------------------------------------------------------------------------
+def due_invoices(today: Optional[date] = None) -> QuerySet:
+    """Toutes les factures dues pour leur prochain niveau de relance (une requête)."""
+    today = today or date.today()
+    delays = _cfg("LEVEL_DELAYS_DAYS", DEFAULT_LEVEL_DELAYS_DAYS)
+    min_interval = int(_cfg("MIN_INTERVAL_DAYS", DEFAULT_MIN_INTERVAL_DAYS))
+
+    level_due = Q()
+    for level in sorted(LEVEL_CONTENT):
+        level_due |= Q(
+            last_reminder_level=level - 1,
+            due_date__lte=today - timedelta(days=int(delays[level])),
+        )
+    return (
+        Invoice.objects
+        .filter(
+            status__in=DUNNABLE_STATUSES,
+            dunning_completed=False,
+            due_date__isnull=False,
+            last_reminder_level__lt=MAX_LEVEL,
+        )
+        .filter(level_due)
+        .filter(
+            Q(last_reminder_date__isnull=True)
+            | Q(last_reminder_date__lte=today - timedelta(days=min_interval))
+        )
+        .select_related("client", "quote__client")
+        .order_by("due_date", "pk")
+    )
+
+
+# ---------------------------------------------------------------------------
+# Rendu (une fois par niveau)
+# ---------------------------------------------------------------------------
+def _site_url() -> str:
+    site_url = str(getattr(settings, "SITE_URL", "https://traitdunion.it")).rstrip("/")
+    # Sécurité : ne jamais envoyer un lien localhost par email
+    if any(h in site_url for h in ("localhost", "127.0.0.1", "0.0.0.0")):
+        site_url = "https://traitdunion.it"
+    return site_url
+
+
+def render_level_template(level: int) -> str:
+    """HTML du niveau avec jetons `__DUNNING_*__` à substituer par facture."""
+    content = LEVEL_CONTENT[level]
+    return render_to_string(
+        "emails/notification_generic.html",
+        {
+            "headline": content["headline"],
+            "message": content["message"],
+            "details": [
+                {"label": "Facture", "value": "__DUNNING_NUMBER__"},
+                {"label": "Échéance", "value": "__DUNNING_DUE_DATE__"},
+                {"label": "Reste à payer", "value": "__DUNNING_AMOUNT__"},
+            ],
+            "cta_url": "__DUNNING_PAY_URL__",
+            "cta_text": "Régler la facture",
+        },
+    )
+
+
+def _recipient(invoice: Invoice) -> tuple[str, str]:
+    client = invoice.client or (invoice.quote.client if invoice.quote_id and invoice.quote else None)
+    if client is None:
+        return "", ""
+    return (client.email or ""), (client.full_name or "")
+
+
+def _personalize(template_html: str, invoice: Invoice, client_name: str) -> str:
+    remaining = (invoice.total_ttc or 0) - (invoice.amount_paid or 0)
+    pay_url = ""
+    if invoice.public_token:
+        pay_url = _site_url() + reverse("factures:pay", kwargs={"token": invoice.public_token})
+    values = {
+        "__DUNNING_CLIENT__": client_name or "Madame, Monsieur",
+        "__DUNNING_NUMBER__": invoice.number,
+        "__DUNNING_DUE_DATE__": invoice.due_date.strftime("%d/%m/%Y") if invoice.due_date else "",
+        "__DUNNING_AMOUNT__": f"{remaining:.2f} €",
+        "__DUNNING_PAY_URL__": pay_url,
+    }
+    out = template_html
+    for token, value in values.items():
+        out = out.replace(token, html.escape(str(value)))
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Envoi + avancement
+# ---------------------------------------------------------------------------
+def _send_one(invoice: Invoice, level: int, template_html: str) -> bool:
+    from core.services.email_backends import send_transactional_email
+
+    email, name = _recipient(invoice)
+    result = send_transactional_email(
+        to_email=email,
+        subject=LEVEL_CONTENT[level]["subject"].format(number=invoice.number),
+        html_content=_personalize(template_html, invoice, name),
+        to_name=name or None,
+        tags=["dunning", f"dunning-level-{level}"],
+    )
+    return bool(result.get("success"))
+
+
+def _advance(invoice_ids: list[int], today: date) -> int:
+    """Un seul UPDATE pour tout le lot réservé."""
+    if not invoice_ids:
+        return 0
+    return Invoice.objects.filter(pk__in=invoice_ids).update(
+        last_reminder_level=F("last_reminder_level") + 1,
+        last_reminder_date=today,
+        reminder_count=F("reminder_count") + 1,
+        dunning_completed=Case(
+            When(last_reminder_level__gte=MAX_LEVEL - 1, then=Value(True)),
+            default=F("dunning_completed"),
+        ),
+    )
+
+
+def _claim(batch: list[tuple[Invoice, int]], today: date) -> set[int]:
+    """Réserve le lot : verrouille les factures encore au niveau lu et les avance.
+
+    Les lignes verrouillées par un autre passage sont ignorées (`skip_locked`) ;
+    celles qu'il a déjà avancées ne correspondent plus au niveau attendu.
+    """
+    by_level = defaultdict(list)
+    for invoice, level in batch:
+        by_level[level].append(invoice.pk)
+    with transaction.atomic():
+        claimed: set[int] = set()
+        for level, ids in by_level.items():
+            claimed.update(
+                Invoice.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    pk__in=ids,
+                    last_reminder_level=level - 1,
+                    status__in=DUNNABLE_STATUSES,
+                    dunning_completed=False,
+                )
+                .values_list("pk", flat=True)
+            )
+        _advance(list(claimed), today)
+    return claimed
+
+
+def _release(invoice: Invoice, level: int) -> None:
+    """Annule la réservation d'une relance non partie (valeurs lues avant `_claim`)."""
+    Invoice.objects.filter(pk=invoice.pk, last_reminder_level=level).update(
+        last_reminder_level=level - 1,
+        last_reminder_date=invoice.last_reminder_date,
+        reminder_count=F("reminder_count") - 1,
+        dunning_completed=invoice.dunning_completed,
+    )
+
+
+def run_dunning(
+    *,
+    dry_run: bool = False,
+    today: Optional[date] = None,
+    batch_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    batch_pause_seconds: Optional[float] = None,
+) -> DunningReport:
+    """Exécute un passage de relances ; voir la docstring du module."""
+    today = today or date.today()
+    batch_size = batch_size or int(_cfg("BATCH_SIZE", DEFAULT_BATCH_SIZE))
+    max_workers = max_workers or int(_cfg("MAX_WORKERS", DEFAULT_MAX_WORKERS))
+    if batch_pause_seconds is None:
+        batch_pause_seconds = float(_cfg("BATCH_PAUSE_SECONDS", DEFAULT_BATCH_PAUSE_SECONDS))
+
+    report = DunningReport(dry_run=dry_run)
+    candidates = list(due_invoices(today))
+    work = []
+    for invoice in candidates:
+        level = invoice.last_reminder_level + 1
+        report.due_by_level[level] += 1
+        if not _recipient(invoice)[0]:
+            report.skipped_no_email += 1
+            continue
+        work.append((invoice, level))
+    if dry_run or not work:
+        return report
+
+    templates = {level: render_level_template(level) for level in {lvl for _, lvl in work}}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for start in range(0, len(work), batch_size):
+            if start and batch_pause_seconds:
+                time.sleep(batch_pause_seconds)
+            batch = work[start:start + batch_size]
+            claimed = _claim(batch, today)
+            report.skipped_claimed += len(batch) - len(claimed)
+            batch = [(invoice, level) for invoice, level in batch if invoice.pk in claimed]
+            futures = [
+                (invoice, level, pool.submit(_send_one, invoice, level, templates[level]))
+                for invoice, level in batch
+            ]
+            for invoice, level, future in futures:
+                try:
+                    ok = future.result()
+                except Exception:  # noqa: BLE001 — une relance en échec ne bloque pas le lot
+                    logger.exception("Relance niveau %s : échec envoi facture %s", level, invoice.number)
+                    ok = False
+                if ok:
+                    report.sent_by_level[level] += 1
+                else:
+                    _release(invoice, level)
+                    report.failed += 1
+            report.batches += 1
+
+    logger.info(
+        "Relances : %s dues, %s envoyées, %s en échec, %s sans email (%s lots).",
+        report.due, report.sent, report.failed, report.skipped_no_email, report.batches,
+    )
+    return report
+
+
+__all__ = [
+    "DunningReport",
+    "LEVEL_CONTENT",
+    "MAX_LEVEL",
+    "due_invoices",
+    "render_level_template",
+    "run_dunning",
+]
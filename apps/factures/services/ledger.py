@@ -0,0 +1,376 @@
+"""Export comptable en flux : FEC (art. A47 A-1 LPF) et grand livre CSV.
+
+Un exercice (année civile) est parcouru sans jamais charger l'historique en
+mémoire :
+
+- factures et avoirs émis sur l'exercice → journal des ventes ``VE``
+  (411 au débit, 706 / 44571 au crédit ; sens inversé pour un avoir) ;
+- encaissements datés de l'exercice → journal de banque ``BQ``
+  (512 au débit, 411 au crédit).
+
+Les factures sont lues par un itérateur serveur par paquets
+(``.iterator(chunk_size=…)`` + ``prefetch_related`` des lignes) et les lignes
+HT / TVA proviennent de `compute_vat_breakdown`, comme le XML Factur-X.
+
+Chaque écriture est contrôlée avant d'être émise (débit = crédit) et les
+cumuls du fichier sont vérifiés en fin de flux : un déséquilibre lève
+`LedgerImbalanceError` au lieu de produire un FEC faux.
+
+Les encaissements sont tirés de ``amount_paid`` / ``paid_at`` (cumul et date
+du dernier règlement), seules données de paiement fiables du modèle.
+
+Comptes et journaux surchargeables via ``settings.INVOICING['LEDGER']``
+(clés ``ACCOUNTS`` et ``JOURNALS``).
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import zlib
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, Iterator, NamedTuple
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.einvoicing.taxation import ZERO, compute_vat_breakdown, q2
+from apps.factures.models import Invoice
+
+logger = logging.getLogger(__name__)
+
+
+FEC_COLUMNS = (
+    "JournalCode", "JournalLib", "EcritureNum", "EcritureDate", "CompteNum",
+    "CompteLib", "CompAuxNum", "CompAuxLib", "PieceRef", "PieceDate",
+    "EcritureLib", "Debit", "Credit", "EcritureLet", "DateLet", "ValidDate",
+    "Montantdevise", "Idevise",
+)
+
+DEFAULT_ACCOUNTS = {
+    "CLIENT": ("411000", "Clients"),
+    "SALES": ("706000", "Prestations de services"),
+    "VAT": ("445710", "TVA collectée"),
+    "BANK": ("512000", "Banque"),
+}
+DEFAULT_JOURNALS = {
+    "SALES": ("VE", "Journal des ventes"),
+    "BANK": ("BQ", "Journal de banque"),
+}
+DEFAULT_CHUNK_SIZE = 500
+EXCLUDED_STATUSES = (Invoice.InvoiceStatus.DRAFT, Invoice.InvoiceStatus.DEMO)
+
+# Taille cible d'un bloc envoyé au client HTTP / écrit sur disque.
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class LedgerImbalanceError(Exception):
+    """Une écriture (ou le fichier) n'est pas équilibrée débit / crédit."""
+
+
+class LedgerLine(NamedTuple):
+    journal_code: str
+    journal_label: str
+    entry_number: str
+    entry_date: date
+    account: str
+    account_label: str
+    aux_account: str
+    aux_label: str
+    piece_ref: str
+    piece_date: date
+    label: str
+    debit: Decimal
+    credit: Decimal
+
+
+def _ledger_cfg() -> dict:
+    return (getattr(settings, "INVOICING", {}) or {}).get("LEDGER") or {}
+
+
+def _emitter_siren() -> str:
+    emitter = (getattr(settings, "INVOICING", {}) or {}).get("EMITTER") or {}
+    return str(emitter.get("siren") or "").replace(" ", "")
+
+
+def fec_filename(year: int) -> str:
+    """Nom réglementaire : ``<SIREN>FEC<AAAAMMJJ de clôture>.txt``."""
+    return f"{_emitter_siren()}FEC{year}1231.txt"
+
+
+# ---------------------------------------------------------------------------
+# Production des écritures
+# ---------------------------------------------------------------------------
+class LedgerExport:
+    """Générateur d'écritures d'un exercice, avec cumuls de contrôle."""
+
+    def __init__(self, year: int, *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.year = year
+        self.chunk_size = chunk_size
+        self.accounts = {**DEFAULT_ACCOUNTS, **(_ledger_cfg().get("ACCOUNTS") or {})}
+        self.journals = {**DEFAULT_JOURNALS, **(_ledger_cfg().get("JOURNALS") or {})}
+        self.stats = {
+            "entries": 0,
+            "lines": 0,
+            "debit": ZERO,
+            "credit": ZERO,
+            "mismatched": 0,
+        }
+
+    # -- requêtes (itérateurs serveur) -----------------------------------
+    def _sales_queryset(self) -> QuerySet:
+        return (
+            Invoice.objects
+            .filter(issue_date__year=self.year)
+            .exclude(status__in=EXCLUDED_STATUSES)
+            .select_related("client", "quote__client")
+            .prefetch_related("invoice_items")
+            .order_by("issue_date", "number")
+        )
+
+    def _payments_queryset(self) -> QuerySet:
+        return (
+            Invoice.objects
+            .filter(amount_paid__gt=0, paid_at__year=self.year)
+            .exclude(status__in=EXCLUDED_STATUSES)
+            .select_related("client", "quote__client")
+            .order_by("paid_at", "number")
+        )
+
+    # -- écritures -------------------------------------------------------
+    def _client(self, invoice: Invoice) -> tuple[str, str]:
+        client = invoice.client or (invoice.quote.client if invoice.quote_id and invoice.quote else None)
+        if client is None:
+            return "", ""
+        return f"C{client.pk:06d}", (client.company_name or client.full_name or "")
+
+    def _line(self, journal, number, when, account, label, invoice, aux=("", ""),
+              debit=ZERO, credit=ZERO) -> LedgerLine:
+        code, journal_label = self.journals[journal]
+        account_num, account_label = self.accounts[account]
+        return LedgerLine(
+            journal_code=code,
+            journal_label=journal_label,
+            entry_number=f"{code}{number:06d}",
+            entry_date=when,
+            account=account_num,
+            account_label=account_label,
+            aux_account=aux[0],
+            aux_label=aux[1],
+            piece_ref=invoice.number,
+            piece_date=invoice.issue_date,
+            label=label,
+            debit=q2(debit),
+            credit=q2(credit),
+        )
+
+    def _sales_entry(self, invoice: Invoice, number: int) -> list[LedgerLine]:
+        totals = compute_vat_breakdown(invoice, items=invoice.invoice_items.all())
+        if abs(totals.grand_total) != q2(abs(invoice.total_ttc or ZERO)):
+            self.stats["mismatched"] += 1
+            logger.warning(
+                "Export comptable : %s — TTC stocké %s ≠ TTC recalculé %s.",
+                invoice.number, invoice.total_ttc, totals.grand_total,
+            )
+        if not totals.grand_total:
+            return []
+
+        credit_note = invoice.is_credit_note or invoice.status == Invoice.InvoiceStatus.AVOIR
+        kind = "Avoir" if credit_note else "Facture"
+        aux = self._client(invoice)
+        label = f"{kind} {invoice.number} {aux[1]}".strip()[:200]
+        # Avoir saisi en montants positifs ou négatifs : le sens se déduit des deux.
+        sign = -1 if totals.grand_total < 0 else 1
+        reverse = credit_note != (sign < 0)
+
+        def side(amount: Decimal) -> dict:
+            """Montant au sens « vente » ; inversé pour un avoir."""
+            return {"debit" if reverse else "credit": amount * sign}
+
+        def counter_side(amount: Decimal) -> dict:
+            return {"credit" if reverse else "debit": amount * sign}
+
+        when = invoice.issue_date
+        lines = [self._line("SALES", number, when, "CLIENT", label, invoice, aux,
+                            **counter_side(totals.grand_total))]
+        # La remise globale est répartie au prorata : le reliquat d'arrondi
+        # des bases va sur la dernière ligne pour retomber sur BT-109.
+        remaining_basis = totals.tax_basis_total
+        for idx, vat in enumerate(totals.breakdown):
+            basis = remaining_basis if idx == len(totals.breakdown) - 1 else vat.taxable_amount
+            remaining_basis -= basis
+            if basis:
+                lines.append(self._line(
+                    "SALES", number, when, "SALES", f"{label} — HT {vat.rate_percent}%", invoice,
+                    **side(basis),
+                ))
+            if vat.tax_amount:
+                lines.append(self._line(
+                    "SALES", number, when, "VAT", f"{label} — TVA {vat.rate_percent}%", invoice,
+                    **side(vat.tax_amount),
+                ))
+        return lines
+
+    def _payment_entry(self, invoice: Invoice, number: int) -> list[LedgerLine]:
+        amount = abs(invoice.amount_paid or ZERO)
+        credit_note = invoice.is_credit_note or invoice.status == Invoice.InvoiceStatus.AVOIR
+        aux = self._client(invoice)
+        label = f"{'Remboursement' if credit_note else 'Règlement'} {invoice.number} {aux[1]}".strip()[:200]
+        when = timezone.localtime(invoice.paid_at).date()
+        bank, client = ({"debit": amount}, {"credit": amount})
+        if credit_note:
+            bank, client = client, bank
+        return [
+            self._line("BANK", number, when, "BANK", label, invoice, **bank),
+            self._line("BANK", number, when, "CLIENT", label, invoice, aux, **client),
+        ]
+
+    def _emit(self, lines: list[LedgerLine]) -> Iterator[LedgerLine]:
+        debit = sum((line.debit for line in lines), ZERO)
+        credit = sum((line.credit for line in lines), ZERO)
+        if debit != credit:
+            raise LedgerImbalanceError(
+                f"Écriture {lines[0].entry_number} ({lines[0].piece_ref}) déséquilibrée : "
+                f"débit {debit} ≠ crédit {credit}."
+            )
+        self.stats["entries"] += 1
+        self.stats["lines"] += len(lines)
+        self.stats["debit"] += debit
+        self.stats["credit"] += credit
+        yield from lines
+
+    def lines(self) -> Iterator[LedgerLine]:
+        """Toutes les lignes de l'exercice, écriture par écriture."""
+        number = 0
+        for invoice in self._sales_queryset().iterator(chunk_size=self.chunk_size):
+            lines = self._sales_entry(invoice, number + 1)
+            if lines:
+                number += 1
+                yield from self._emit(lines)
+        number = 0
+        for invoice in self._payments_queryset().iterator(chunk_size=self.chunk_size):
+            number += 1
+            yield from self._emit(self._payment_entry(invoice, number))
+
+        if self.stats["debit"] != self.stats["credit"]:  # pragma: no cover — garde-fou
+            raise LedgerImbalanceError(
+                f"Exercice {self.year} déséquilibré : débit {self.stats['debit']} "
+                f"≠ crédit {self.stats['credit']}."
+            )
+        logger.info(
+            "Export comptable %s : %s écritures, %s lignes, %s € au débit / crédit.",
+            self.year, self.stats["entries"], self.stats["lines"], self.stats["debit"],
+        )
+
+
+# ---------------------------------------------------------------------------
+# Formats de sortie
+# ---------------------------------------------------------------------------
+def _amount(value: Decimal) -> str:
+    return f"{value:.2f}".replace(".", ",")
+
+
+def _text(value: str) -> str:
+    return " ".join(str(value or "").split())
+
+
+def _fields(line: LedgerLine, date_format: str) -> list[str]:
+    return [
+        line.journal_code,
+        line.journal_label,
+        line.entry_number,
+        line.entry_date.strftime(date_format),
+        line.account,
+        _text(line.account_label),
+        line.aux_account,
+        _text(line.aux_label),
+        _text(line.piece_ref),
+        line.piece_date.strftime(date_format),
+        _text(line.label),
+        _amount(line.debit),
+        _amount(line.credit),
+        "",
+        "",
+        line.entry_date.strftime(date_format),
+        "",
+        "",
+    ]
+
+
+def fec_lines(export: LedgerExport) -> Iterator[str]:
+    """FEC : tabulations, dates AAAAMMJJ, virgule décimale."""
+    yield "\t".join(FEC_COLUMNS) + "\r\n"
+    for line in export.lines():
+        yield "\t".join(_fields(line, "%Y%m%d")) + "\r\n"
+
+
+class _Echo:
+    """Pseudo-fichier : `csv.writer` renvoie la ligne au lieu de la stocker."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def csv_lines(export: LedgerExport) -> Iterator[str]:
+    """Grand livre CSV (séparateur « ; », dates ISO) lisible dans un tableur."""
+    writer = csv.writer(_Echo(), delimiter=";")
+    yield writer.writerow(FEC_COLUMNS)
+    for line in export.lines():
+        yield writer.writerow(_fields(line, "%Y-%m-%d"))
+
+
+def encode_stream(chunks: Iterable[str], *, encoding: str = "utf-8", gzip: bool = False) -> Iterator[bytes]:
+    """Encode (et compresse) un flux de lignes par blocs de taille bornée."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if gzip else None
+    buffer: list[bytes] = []
+    size = 0
+    for chunk in chunks:
+        data = chunk.encode(encoding, errors="replace")
+        buffer.append(data)
+        size += len(data)
+        if size >= STREAM_BLOCK_SIZE:
+            block = b"".join(buffer)
+            buffer, size = [], 0
+            block = compressor.compress(block) if compressor else block
+            if block:
+                yield block
+    block = b"".join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+
+FORMATS = {
+    # format → (générateur de lignes, encodage, extension, content-type)
+    "fec": (fec_lines, "iso-8859-15", "txt", "text/plain; charset=iso-8859-15"),
+    "csv": (csv_lines, "utf-8", "csv", "text/csv; charset=utf-8"),
+}
+
+
+def export_stream(export: LedgerExport, fmt: str = "fec", *, gzip: bool = False) -> Iterator[bytes]:
+    """Flux d'octets prêt à écrire (fichier ou `StreamingHttpResponse`)."""
+    producer, encoding, _ext, _ctype = FORMATS[fmt]
+    return encode_stream(producer(export), encoding=encoding, gzip=gzip)
+
+
+def export_filename(year: int, fmt: str = "fec", *, gzip: bool = False) -> str:
+    name = fec_filename(year) if fmt == "fec" else f"grand-livre-{year}.csv"
+    return f"{name}.gz" if gzip else name
+
+
+__all__ = [
+    "FEC_COLUMNS",
+    "FORMATS",
+    "LedgerExport",
+    "LedgerImbalanceError",
+    "LedgerLine",
+    "csv_lines",
+    "encode_stream",
+    "export_filename",
+    "export_stream",
+    "fec_filename",
+    "fec_lines",
+]
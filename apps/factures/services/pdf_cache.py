@@ -0,0 +1,118 @@
+"""Cache chaud des PDF de factures (PDF classique et Factur-X).
+
+Le système de fichiers de Render est éphémère : les vues de téléchargement
+régénéraient le PDF (WeasyPrint, plusieurs centaines de ms) à chaque clic.
+Les rendus sont désormais conservés dans le cache Django (Redis en
+production) et pré-calculés en arrière-plan après une génération en masse
+(`core.tasks.async_prerender_invoice_pdfs`).
+
+La clé porte une empreinte de tout ce qui est imprimé : champs de la
+facture (hors suivi interne : relances, piste d'audit…), lignes et fiche
+client (nom, adresses, identifiants). Une facture, une ligne ou un client
+modifié ne sert jamais un rendu périmé, l'ancienne entrée expire d'elle-même.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from typing import Iterable, Optional
+
+from django.core.cache import cache
+
+from apps.factures.models import Invoice
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("pdf", "facturx")
+CACHE_TTL = 60 * 60 * 24 * 7
+
+# Champs absents du document : les exclure évite d'invalider le rendu à
+# chaque relance ou paiement Stripe. Tout autre champ entre dans l'empreinte.
+_INVOICE_EXCLUDED = {
+    "pdf", "created_at", "payment_audit_trail", "payment_proof", "stripe_checkout_session_id",
+    "last_reminder_level", "last_reminder_date", "reminder_count", "dunning_completed",
+}
+_CLIENT_EXCLUDED = {
+    "avatar", "user_id", "stripe_customer_id", "email_notifications", "must_change_password",
+    "created_at", "updated_at",
+}
+
+
+def _values(obj, excluded: set[str]) -> list[str]:
+    return [
+        str(getattr(obj, f.attname))
+        for f in obj._meta.concrete_fields
+        if f.attname not in excluded
+    ]
+
+
+def _fingerprint(invoice: Invoice) -> str:
+    parts = _values(invoice, _INVOICE_EXCLUDED)
+    # .all() : profite du prefetch_related de `prerender`, une requête sinon
+    for item in sorted(invoice.invoice_items.all(), key=lambda i: i.pk):
+        parts += _values(item, set())
+    client = invoice.client or (invoice.quote.client if invoice.quote_id and invoice.quote else None)
+    if client is not None:
+        parts += _values(client, _CLIENT_EXCLUDED)
+    raw = "|".join(parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(invoice: Invoice, format: str = "pdf") -> str:
+    return f"invoice_pdf:{invoice.pk}:{format}:{_fingerprint(invoice)}"
+
+
+def get_cached(invoice: Invoice, format: str = "pdf") -> Optional[bytes]:
+    return cache.get(cache_key(invoice, format))
+
+
+def render(invoice: Invoice, format: str = "pdf") -> bytes:
+    """Rend le document et le met en cache."""
+    pdf_bytes = invoice.generate_pdf(attach=False, format=format)
+    # generate_pdf recalcule les totaux : la clé est calculée après le rendu.
+    cache.set(cache_key(invoice, format), pdf_bytes, CACHE_TTL)
+    return pdf_bytes
+
+
+def get_or_render(invoice: Invoice, format: str = "pdf") -> bytes:
+    cached = get_cached(invoice, format)
+    if cached is not None:
+        return cached
+    return render(invoice, format)
+
+
+def prerender(invoice_ids: Iterable[int], formats: Iterable[str] = FORMATS) -> int:
+    """Réchauffe le cache pour `invoice_ids` ; renvoie le nombre de rendus faits.
+
+    Un échec de rendu est journalisé et n'interrompt pas le lot : le
+    téléchargement retombera sur un rendu à la demande.
+    """
+    formats = tuple(formats)
+    rendered = 0
+    invoices = (
+        Invoice.objects.filter(pk__in=list(invoice_ids))
+        .select_related("client", "quote__client")
+        .prefetch_related("invoice_items")
+    )
+    for invoice in invoices:
+        for fmt in formats:
+            if get_cached(invoice, fmt) is not None:
+                continue
+            try:
+                render(invoice, fmt)
+                rendered += 1
+            except Exception:  # noqa: BLE001 — pré-rendu best effort
+                logger.exception("Pré-rendu %s impossible pour la facture %s", fmt, invoice.number)
+    return rendered
+
+
+__all__ = [
+    "CACHE_TTL",
+    "FORMATS",
+    "cache_key",
+    "get_cached",
+    "get_or_render",
+    "prerender",
+    "render",
+]
@@ -0,0 +1,341 @@
+"""Balance âgée des créances clients (non échu, 0–30, 31–60, 61–90, 90+ jours).
+
+Le reste dû (``total_ttc - amount_paid``) de chaque facture ouverte est
+ventilé par ``CASE WHEN`` sur le nombre de jours de retard et agrégé par
+client en **une seule requête** (`aging_queryset`). Le client est celui de la
+facture, ou à défaut celui du devis d'origine.
+
+Cache par client : chaque ligne est mise en cache séparément, avec l'index
+des clients de la balance. Un paiement ou un changement de statut d'une
+facture (`invalidate_client`, branché sur ``post_save`` / ``post_delete``)
+ne fait recalculer que la ligne de ce client. Les clés portent la date du
+jour : les tranches glissent naturellement à minuit.
+
+Invalidation sans lecture-modification-écriture : chaque client a un numéro
+de version (``cache.incr``, atomique) porté par la clé de sa ligne. Le
+lecteur relève les versions *avant* sa requête : une ligne calculée pendant
+une invalidation concurrente est rangée sous l'ancienne version, donc
+jamais resservie. Un client absent de l'index (nouvelle créance) fait
+changer la version de l'index ; une reconstruction complète n'est mise en
+cache que si aucune invalidation n'est survenue pendant son calcul.
+
+L'export CSV est produit en flux à partir du même queryset.
+"""
+
+from __future__ import annotations
+
+import csv
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterable, Iterator, Optional
+
+from django.core.cache import cache
+from django.db.models import Case, Count, DecimalField, F, Min, Q, QuerySet, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.factures.models import Invoice
+
+OPEN_STATUSES = (
+    Invoice.InvoiceStatus.SENT,
+    Invoice.InvoiceStatus.PARTIAL,
+    Invoice.InvoiceStatus.OVERDUE,
+)
+
+# (clé, libellé, retard min, retard max) — bornes incluses, en jours.
+BUCKETS = (
+    ("not_due", "Non échu", None, 0),
+    ("d0_30", "0–30 j", 1, 30),
+    ("d31_60", "31–60 j", 31, 60),
+    ("d61_90", "61–90 j", 61, 90),
+    ("d90_plus", "90+ j", 91, None),
+)
+BUCKET_KEYS = tuple(key for key, *_ in BUCKETS)
+
+CACHE_TTL = 60 * 60 * 24
+ZERO = Decimal("0.00")
+_MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _today() -> date:
+    return timezone.localdate()
+
+
+def _version_key(day: date, name) -> str:
+    return f"receivables:{day.isoformat()}:version:{name}"
+
+
+def _index_key(day: date, version) -> str:
+    return f"receivables:{day.isoformat()}:index:{version}"
+
+
+def _row_key(day: date, client_id, version) -> str:
+    return f"receivables:{day.isoformat()}:client:{client_id or 0}:{version}"
+
+
+def _cid(client_id: Optional[int]) -> int:
+    """Identifiant de ligne : 0 pour les factures sans client."""
+    return client_id or 0
+
+
+def _new_version() -> int:
+    # Horodatage : une version évincée puis recréée ne retombe jamais sur
+    # une ancienne (pas de résurrection de lignes périmées).
+    return time.time_ns() // 1000
+
+
+def _versions(day: date, names: Iterable) -> dict:
+    """Versions courantes (créées si absentes) : ``{nom: version}``."""
+    keys = {name: _version_key(day, name) for name in names}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    for name, key in keys.items():
+        if key not in found:
+            cache.add(key, _new_version(), CACHE_TTL)
+            found[key] = cache.get(key)
+        versions[name] = found[key]
+    return versions
+
+
+def _bump(day: date, name) -> None:
+    try:
+        cache.incr(_version_key(day, name))
+    except ValueError:
+        cache.set(_version_key(day, name), _new_version(), CACHE_TTL)
+
+
+# ---------------------------------------------------------------------------
+# Requêtes
+# ---------------------------------------------------------------------------
+def open_invoices(today: Optional[date] = None) -> QuerySet:
+    """Factures ouvertes annotées ``debtor_id``, ``outstanding`` et ``reference_date``."""
+    today = today or _today()
+    return (
+        Invoice.objects
+        .filter(status__in=OPEN_STATUSES, is_credit_note=False)
+        .annotate(
+            debtor_id=Coalesce(F("client_id"), F("quote__client_id")),
+            outstanding=F("total_ttc") - F("amount_paid"),
+            reference_date=Coalesce(F("due_date"), F("issue_date")),
+        )
+        .filter(outstanding__gt=0)
+    )
+
+
+def _bucket_condition(today: date, low: Optional[int], high: Optional[int]) -> Q:
+    """Retard ∈ [low, high] ⇔ échéance ∈ [today - high, today - low]."""
+    cond = Q()
+    if low is not None:
+        cond &= Q(reference_date__lte=today - timedelta(days=low))
+    if high is not None:
+        cond &= Q(reference_date__gte=today - timedelta(days=high))
+    return cond
+
+
+def aging_queryset(today: Optional[date] = None, client_ids: Optional[Iterable[int]] = None) -> QuerySet:
+    """Une ligne par client : tranches, total, nombre de factures, plus vieille échéance."""
+    today = today or _today()
+    qs = open_invoices(today)
+    if client_ids is not None:
+        client_ids = set(client_ids)
+        cond = Q(debtor_id__in=[cid for cid in client_ids if cid])
+        if 0 in client_ids or None in client_ids:
+            cond |= Q(debtor_id__isnull=True)
+        qs = qs.filter(cond)
+    buckets = {
+        key: Coalesce(
+            Sum(Case(When(_bucket_condition(today, low, high), then=F("outstanding")),
+                     default=Value(ZERO), output_field=_MONEY)),
+            Value(ZERO), output_field=_MONEY,
+        )
+        for key, _label, low, high in BUCKETS
+    }
+    return (
+        qs.order_by()
+        .values("debtor_id")
+        .annotate(
+            **buckets,
+            total=Sum("outstanding", output_field=_MONEY),
+            invoice_count=Count("id"),
+            oldest_date=Min("reference_date"),
+        )
+        .order_by("-total")
+    )
+
+
+# ---------------------------------------------------------------------------
+# Lignes + cache par client
+# ---------------------------------------------------------------------------
+@dataclass
+class AgingRow:
+    client_id: Optional[int]
+    client_name: str
+    buckets: dict
+    total: Decimal
+    invoice_count: int
+    oldest_date: Optional[date]
+
+    def as_list(self) -> list:
+        return [self.buckets[key] for key in BUCKET_KEYS]
+
+
+def _client_names(ids: Iterable[int]) -> dict[int, str]:
+    from apps.clients.models import ClientProfile
+
+    ids = [i for i in ids if i]
+    if not ids:
+        return {}
+    return {
+        pk: (company or name or f"Client #{pk}")
+        for pk, company, name in ClientProfile.objects.filter(pk__in=ids).values_list(
+            "pk", "company_name", "full_name",
+        )
+    }
+
+
+def _build_rows(values: Iterable[dict]) -> list[AgingRow]:
+    values = list(values)
+    names = _client_names(v["debtor_id"] for v in values)
+    return [
+        AgingRow(
+            client_id=v["debtor_id"],
+            client_name=names.get(v["debtor_id"], "Sans client"),
+            buckets={key: v[key] or ZERO for key in BUCKET_KEYS},
+            total=v["total"] or ZERO,
+            invoice_count=v["invoice_count"],
+            oldest_date=v["oldest_date"],
+        )
+        for v in values
+    ]
+
+
+def aged_receivables(today: Optional[date] = None, *, refresh: bool = False) -> dict:
+    """Balance âgée complète : ``{"rows": [...], "totals": {...}, "today": date}``.
+
+    Sert les lignes depuis le cache ; seules les lignes invalidées (ou
+    absentes) sont recalculées, par la même requête filtrée sur ces clients.
+    """
+    today = today or _today()
+    meta = _versions(today, ("index", "generation"))
+    index = None if refresh else cache.get(_index_key(today, meta["index"]))
+    if index is None:
+        rows = _build_rows(aging_queryset(today))
+        versions = _versions(today, (_cid(r.client_id) for r in rows))
+        # Invalidation pendant le calcul : résultat servi mais pas mis en cache
+        if cache.get(_version_key(today, "generation")) == meta["generation"]:
+            cache.set_many(
+                {_row_key(today, r.client_id, versions[_cid(r.client_id)]): r for r in rows}, CACHE_TTL,
+            )
+            cache.set(_index_key(today, meta["index"]), list(versions), CACHE_TTL)
+    else:
+        versions = _versions(today, index)
+        keys = {cid: _row_key(today, cid, version) for cid, version in versions.items()}
+        cached = cache.get_many(list(keys.values()))
+        stale = {cid for cid, key in keys.items() if key not in cached}
+        rows = [cached[key] for key in keys.values() if key in cached]
+        if stale:
+            fresh = {_cid(r.client_id): r for r in _build_rows(aging_queryset(today, client_ids=stale))}
+            # Client soldé : marqueur False (il reste dans l'index jusqu'à minuit)
+            cache.set_many({keys[cid]: fresh.get(cid, False) for cid in stale}, CACHE_TTL)
+            rows.extend(fresh.values())
+        rows = [r for r in rows if r]
+
+    rows.sort(key=lambda r: r.total, reverse=True)
+    totals = {key: sum((r.buckets[key] for r in rows), ZERO) for key in BUCKET_KEYS}
+    totals["total"] = sum((r.total for r in rows), ZERO)
+    totals["invoice_count"] = sum(r.invoice_count for r in rows)
+    return {"rows": rows, "totals": totals, "today": today, "buckets": BUCKETS}
+
+
+def invalidate_client(client_id: Optional[int]) -> None:
+    """Marque la ligne d'un client à recalculer (paiement, statut, montant…)."""
+    today = _today()
+    cid = _cid(client_id)
+    _bump(today, "generation")
+    _bump(today, cid)
+    index_version = cache.get(_version_key(today, "index"))
+    index = cache.get(_index_key(today, index_version)) if index_version is not None else None
+    if index is not None and cid not in index:
+        _bump(today, "index")
+
+
+def invalidate_invoices(invoices: Iterable[Invoice], extra_client_ids: Iterable[Optional[int]] = ()) -> None:
+    """Invalide les clients des factures (et ``extra_client_ids`` : ancien client d'une facture déplacée)."""
+    client_ids = {inv.client_id or (inv.quote.client_id if inv.quote_id else None) for inv in invoices}
+    for client_id in client_ids | set(extra_client_ids):
+        invalidate_client(client_id)
+
+
+# ---------------------------------------------------------------------------
+# Drill-down + export CSV
+# ---------------------------------------------------------------------------
+def bucket_for(days_late: int) -> str:
+    for key, _label, low, high in BUCKETS:
+        if (low is None or days_late >= low) and (high is None or days_late <= high):
+            return key
+    return BUCKET_KEYS[-1]  # pragma: no cover
+
+
+def client_invoices(client_id: Optional[int], today: Optional[date] = None) -> list[dict]:
+    """Factures ouvertes d'un client, avec retard et tranche (drill-down)."""
+    today = today or _today()
+    qs = open_invoices(today)
+    qs = qs.filter(debtor_id=client_id) if client_id else qs.filter(debtor_id__isnull=True)
+    rows = []
+    for inv in qs.order_by("reference_date", "number"):
+        days_late = (today - inv.reference_date).days
+        rows.append({
+            "invoice": inv,
+            "outstanding": inv.outstanding,
+            "days_late": max(days_late, 0),
+            "bucket": bucket_for(days_late),
+        })
+    return rows
+
+
+class _Echo:
+    def write(self, value: str) -> str:
+        return value
+
+
+def csv_lines(today: Optional[date] = None) -> Iterator[str]:
+    """Balance âgée en CSV (« ; », virgule décimale), lue en flux."""
+    today = today or _today()
+    writer = csv.writer(_Echo(), delimiter=";")
+    yield writer.writerow(["Client", *[label for _k, label, *_ in BUCKETS], "Total", "Factures", "Plus ancienne échéance"])
+    values = aging_queryset(today).iterator(chunk_size=500)
+    batch: list[dict] = []
+
+    def flush(batch):
+        for row in _build_rows(batch):
+            yield writer.writerow([
+                row.client_name,
+                *[f"{amount:.2f}".replace(".", ",") for amount in row.as_list()],
+                f"{row.total:.2f}".replace(".", ","),
+                row.invoice_count,
+                row.oldest_date.isoformat() if row.oldest_date else "",
+            ])
+
+    for value in values:
+        batch.append(value)
+        if len(batch) >= 500:
+            yield from flush(batch)
+            batch = []
+    yield from flush(batch)
+
+
+__all__ = [
+    "AgingRow",
+    "BUCKETS",
+    "BUCKET_KEYS",
+    "aged_receivables",
+    "aging_queryset",
+    "bucket_for",
+    "client_invoices",
+    "csv_lines",
+    "invalidate_client",
+    "invalidate_invoices",
+    "open_invoices",
+]
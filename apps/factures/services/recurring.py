@@ -0,0 +1,276 @@
+"""Facturation récurrente (contrats de maintenance, hébergement…).
+
+Un échéancier (`RecurringInvoiceSchedule`) rattaché à un client — et
+éventuellement au devis d'origine — produit une facture par période.
+
+Déroulé d'un passage (`run_recurring`) :
+
+1. **Sélection** — les échéanciers actifs dont ``next_run_date`` est
+   atteinte (index ``idx_recurring_due``).
+2. **Un lot = une transaction** — les échéanciers du lot sont verrouillés ;
+   chaque période échue (rattrapage compris) donne une facture. Les numéros
+   sont réservés en bloc (`InvoiceNumberSequence.allocate`), les factures
+   puis toutes leurs lignes insérées par ``bulk_create``, l'événement DRAFT
+   initial de la chaîne d'audit inscrit en une requête, et ``next_run_date``
+   avancé. Un échec annule le lot entier, numéros compris (pas de trou).
+3. **Pré-rendu** — après commit, les PDF et Factur-X des factures créées
+   sont rendus en arrière-plan dans le cache chaud (`services.pdf_cache`).
+
+Les factures naissent en **brouillon** : rien n'est envoyé au client ici.
+Elles partent par le circuit habituel (action admin d'envoi / publication
+portail) ; tant qu'elles ne sont pas passées « envoyée », les relances
+(`services.dunning`) les ignorent.
+
+Idempotence : la période facturée est portée par ``delivery_period_start``
+et la contrainte ``uniq_invoice_recurring_period`` interdit une seconde
+facture pour le même (échéancier, période). Les périodes déjà facturées
+sont écartées avant l'allocation des numéros.
+
+Réglages optionnels (``settings.INVOICE_RECURRING``) : ``BATCH_SIZE``.
+"""
+
+from __future__ import annotations
+
+import logging
+import secrets
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.factures.models import Invoice, InvoiceItem, InvoiceNumberSequence, RecurringInvoiceSchedule
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+# Garde-fou de rattrapage : un échéancier oublié ne génère pas des années d'un coup.
+MAX_PERIODS_PER_RUN = 12
+
+_ITEM_FIELDS = (
+    "description", "quantity", "unit_price", "tax_rate", "line_discount",
+    "unit_code", "vat_category_code", "vat_exemption_reason_code", "item_identifier",
+)
+_DECIMAL_FIELDS = {"quantity", "unit_price", "tax_rate", "line_discount"}
+_CENT = Decimal("0.01")
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, "INVOICE_RECURRING", {}) or {}).get(key, default)
+
+
+@dataclass
+class RecurringReport:
+    dry_run: bool
+    schedules: int = 0
+    created: int = 0
+    skipped_existing: int = 0
+    batches: int = 0
+    invoice_ids: list = field(default_factory=list)
+    planned: list = field(default_factory=list)  # (échéancier, début de période)
+
+
+# ---------------------------------------------------------------------------
+# Sélection + périodes
+# ---------------------------------------------------------------------------
+def due_schedules(today: Optional[date] = None) -> QuerySet:
+    today = today or date.today()
+    return RecurringInvoiceSchedule.objects.filter(active=True, next_run_date__lte=today)
+
+
+def due_periods(schedule: RecurringInvoiceSchedule, today: date) -> list[tuple[date, date]]:
+    """Périodes échues ``(début, fin)`` depuis ``next_run_date``."""
+    periods = []
+    start = schedule.next_run_date
+    while start <= today and len(periods) < MAX_PERIODS_PER_RUN:
+        if schedule.end_date and start > schedule.end_date:
+            break
+        following = schedule.period_after(start)
+        periods.append((start, following - timedelta(days=1)))
+        start = following
+    return periods
+
+
+# ---------------------------------------------------------------------------
+# Lignes + totaux
+# ---------------------------------------------------------------------------
+def schedule_lines(schedule: RecurringInvoiceSchedule) -> list[dict]:
+    """Lignes de l'échéancier, ou celles du devis source (préchargées)."""
+    if schedule.lines:
+        return [
+            {
+                key: (Decimal(str(value)) if key in _DECIMAL_FIELDS else value)
+                for key, value in line.items() if key in _ITEM_FIELDS
+            }
+            for line in schedule.lines
+        ]
+    if schedule.quote_id:
+        return [
+            {
+                "description": item.description or (item.service.title if item.service else ""),
+                "quantity": item.quantity,
+                "unit_price": item.unit_price,
+                "tax_rate": item.tax_rate,
+                "line_discount": item.line_discount,
+            }
+            for item in schedule.quote.quote_items.all()
+        ]
+    return []
+
+
+def _totals(lines: list[dict]) -> tuple[Decimal, Decimal]:
+    """HT / TVA comme `Invoice.compute_totals` (somme brute puis arrondi)."""
+    ht = tva = Decimal("0")
+    for line in lines:
+        net = (
+            Decimal(line.get("quantity", 1)) * Decimal(line.get("unit_price", 0))
+            * (1 - Decimal(line.get("line_discount", 0)) / 100)
+        )
+        ht += net
+        tva += net * Decimal(line.get("tax_rate", 0)) / 100
+    return ht.quantize(_CENT, rounding=ROUND_HALF_UP), tva.quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def _build_invoice(schedule, period, lines, number: str, today: date) -> Invoice:
+    start, end = period
+    total_ht, tva = _totals(lines)
+    total_ttc = total_ht + tva
+    notes = schedule.notes
+    period_label = f"Période du {start:%d/%m/%Y} au {end:%d/%m/%Y}"
+    return Invoice(
+        client=schedule.client,
+        number=number,
+        issue_date=today,
+        due_date=today + timedelta(days=schedule.payment_terms_days),
+        status=Invoice.InvoiceStatus.DRAFT,
+        delivery_period_start=start,
+        delivery_period_end=end,
+        contract_ref=f"ABO-{schedule.pk}",
+        notes=f"{schedule.label} — {period_label}" + (f"\n\n{notes}" if notes else ""),
+        payment_terms=schedule.payment_terms,
+        total_ht=total_ht,
+        tva=tva,
+        total_ttc=total_ttc,
+        amount=total_ttc,
+        public_token=secrets.token_urlsafe(32),
+        recurring_schedule=schedule,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Génération
+# ---------------------------------------------------------------------------
+def _generate_batch(schedule_ids: list[int], today: date, report: RecurringReport) -> list[Invoice]:
+    with transaction.atomic():
+        schedules = list(
+            RecurringInvoiceSchedule.objects
+            .select_for_update(of=("self",))
+            .filter(pk__in=schedule_ids, active=True, next_run_date__lte=today)
+            .select_related("client", "quote")
+            .prefetch_related("quote__quote_items__service")
+            .order_by("pk")
+        )
+        plan = [(schedule, period) for schedule in schedules for period in due_periods(schedule, today)]
+        already = set(
+            Invoice.objects
+            .filter(recurring_schedule__in=schedules, delivery_period_start__in={p[0] for _, p in plan})
+            .values_list("recurring_schedule_id", "delivery_period_start")
+        )
+        todo = [(s, p) for s, p in plan if (s.pk, p[0]) not in already]
+        report.skipped_existing += len(plan) - len(todo)
+
+        invoices: list[Invoice] = []
+        items: list[InvoiceItem] = []
+        if todo:
+            numbers = InvoiceNumberSequence.allocate(InvoiceNumberSequence.Series.INVOICE, today.year, len(todo))
+            lines_by_schedule = {s.pk: schedule_lines(s) for s in schedules}
+            invoices = [
+                _build_invoice(schedule, period, lines_by_schedule[schedule.pk], number, today)
+                for (schedule, period), number in zip(todo, numbers)
+            ]
+            Invoice.objects.bulk_create(invoices)
+            for invoice in invoices:
+                for line in lines_by_schedule[invoice.recurring_schedule_id]:
+                    items.append(InvoiceItem(invoice=invoice, **line))
+            InvoiceItem.objects.bulk_create(items)
+
+            # bulk_create n'émet pas post_save : chaîne d'audit inscrite ici
+            # (cf. einvoicing/signals.py). Brouillons : pas de notification portail.
+            from apps.einvoicing.models import InvoiceLifecycleEvent
+            InvoiceLifecycleEvent.record_created_many(invoices, source="recurring.generated")
+
+        next_dates = {}
+        for schedule, (start, _end) in plan:
+            next_dates[schedule.pk] = schedule.period_after(start)
+        now = timezone.now()
+        for schedule in schedules:
+            if schedule.pk in next_dates:
+                schedule.next_run_date = next_dates[schedule.pk]
+                schedule.last_generated_at = now
+            if schedule.end_date and schedule.next_run_date > schedule.end_date:
+                schedule.active = False
+        RecurringInvoiceSchedule.objects.bulk_update(
+            schedules, ["next_run_date", "last_generated_at", "active"],
+        )
+
+        invoice_ids = [invoice.pk for invoice in invoices]
+        if invoice_ids:
+            from core.tasks import async_prerender_invoice_pdfs
+            transaction.on_commit(lambda: async_prerender_invoice_pdfs(invoice_ids))
+
+    report.schedules += len(schedules)
+    return invoices
+
+
+def run_recurring(
+    *,
+    dry_run: bool = False,
+    today: Optional[date] = None,
+    batch_size: Optional[int] = None,
+    schedule_ids: Optional[list[int]] = None,
+) -> RecurringReport:
+    """Génère les factures récurrentes échues (de `schedule_ids` si fourni)."""
+    today = today or date.today()
+    batch_size = batch_size or int(_cfg("BATCH_SIZE", DEFAULT_BATCH_SIZE))
+    report = RecurringReport(dry_run=dry_run)
+
+    schedules = due_schedules(today)
+    if schedule_ids is not None:
+        schedules = schedules.filter(pk__in=schedule_ids)
+
+    if dry_run:
+        for schedule in schedules.select_related("client"):
+            report.schedules += 1
+            report.planned.extend((schedule, start) for start, _end in due_periods(schedule, today))
+        return report
+
+    schedule_ids = list(schedules.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(schedule_ids), batch_size):
+        invoices = _generate_batch(schedule_ids[start:start + batch_size], today, report)
+        report.batches += 1
+        report.created += len(invoices)
+        report.invoice_ids.extend(invoice.pk for invoice in invoices)
+        if invoices:
+            # bulk_create n'émet pas post_save : invalidation explicite de la balance âgée
+            from apps.factures.services.receivables import invalidate_invoices
+            invalidate_invoices(invoices)
+
+    logger.info(
+        "Facturation récurrente : %s échéanciers, %s factures créées, %s périodes déjà facturées (%s lots).",
+        report.schedules, report.created, report.skipped_existing, report.batches,
+    )
+    return report
+
+
+__all__ = [
+    "MAX_PERIODS_PER_RUN",
+    "RecurringReport",
+    "due_periods",
+    "due_schedules",
+    "run_recurring",
+    "schedule_lines",
+]
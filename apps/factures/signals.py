@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import logging
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 from .models import Invoice
@@ -13,3 +13,42 @@ logger = logging.getLogger(__name__)
 
 # Notification de création de facture gérée dans apps/clients/signals.py
 # pour éviter les doublons.
+
+
+# Champs qui déplacent le reste dû d'une facture dans la balance âgée.
+RECEIVABLE_FIELDS = {"status", "amount_paid", "total_ttc", "due_date", "client", "is_credit_note"}
+
+
+@receiver(pre_save, sender=Invoice)
+def remember_receivables_client(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Retient le client d'avant : une facture déplacée invalide aussi son ancienne ligne."""
+    instance._receivables_previous_client = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and "client" not in update_fields:
+        return
+    previous = (
+        Invoice.objects.filter(pk=instance.pk)
+        .values_list("client_id", "quote__client_id")
+        .first()
+    )
+    if previous is not None:
+        instance._receivables_previous_client = previous[0] or previous[1]
+
+
+@receiver(post_save, sender=Invoice)
+def invalidate_receivables_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """Paiement / statut / montant modifié → ligne client de la balance âgée à recalculer."""
+    if update_fields is not None and not RECEIVABLE_FIELDS.intersection(update_fields):
+        return
+    from .services.receivables import invalidate_invoices
+
+    previous = getattr(instance, "_receivables_previous_client", None)
+    invalidate_invoices([instance], extra_client_ids=[previous] if previous else ())
+
+
+@receiver(post_delete, sender=Invoice)
+def invalidate_receivables_on_delete(sender, instance, **kwargs):
+    from .services.receivables import invalidate_invoices
+
+    invalidate_invoices([instance])
@@ -5,6 +5,8 @@ Deux routes sont exposées aux membres du staff :
 
 * ``create/<int:quote_id>/`` pour créer une facture à partir d'un devis.
 * ``download/<int:pk>/`` pour télécharger le PDF d'une facture existante.
+* ``export/comptable/`` pour télécharger le FEC / grand livre d'un exercice.
+* ``creances/`` pour la balance âgée des créances clients.
 
 Routes publiques (Phase 3 - Paiement en ligne):
 * ``payer/<token>/`` pour accéder à la page de paiement d'une facture.
@@ -21,6 +23,10 @@ urlpatterns = [
     path("download/<int:pk>/", views.download_invoice, name="download"),
     # Liste des factures avec leurs fichiers PDF (archive)
     path("archive/", views.archive, name="archive"),
+    # Export comptable en flux (FEC / grand livre CSV)
+    path("export/comptable/", views.ledger_export, name="ledger_export"),
+    # Balance âgée des créances (cache par client, export CSV)
+    path("creances/", views.receivables_report, name="receivables"),
     
     # ===========================================
     # PHASE 3 : Paiement en ligne
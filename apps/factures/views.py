@@ -7,13 +7,14 @@ import logging
 
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import Http404, HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods, require_POST
 
 from apps.devis.models import Quote
+from core.query_budget import query_budget
 from .models import Invoice
 
 logger = logging.getLogger(__name__)
@@ -24,18 +25,20 @@ logger = logging.getLogger(__name__)
 def create_invoice(request, quote_id: int):
     """
     Crée une facture à partir d'un devis existant.
-    Utilise le service de conversion Quote → Invoice.
+    Utilise le service de conversion Quote → Invoice ; le PDF est rendu en
+    tâche de fond (cache chaud) au lieu de bloquer la requête.
     """
     quote = get_object_or_404(Quote, pk=quote_id)
     
     try:
-        # Création de la facture via le service dédi é
+        # Création de la facture via le service dédié
         from apps.devis.services import create_invoice_from_quote
+        from core.tasks import async_prerender_invoice_pdfs
         result = create_invoice_from_quote(quote)
         invoice = result.invoice
         
-        # Génération du PDF
-        invoice.generate_pdf(attach=True)
+        # Génération du PDF en arrière-plan
+        async_prerender_invoice_pdfs([invoice.pk])
         
         messages.success(request, f"La facture {invoice.number} a été créée avec succès.")
         
@@ -55,13 +58,15 @@ def download_invoice(request, pk: int):
     """
     Téléchargement du PDF de la facture.
     
-    Note: On Render, filesystem is ephemeral, so we always generate fresh.
+    Note: On Render, filesystem is ephemeral — servi depuis le cache chaud
+    (services/pdf_cache.py), rendu à la demande si absent.
     """
+    from .services.pdf_cache import get_or_render
+
     invoice = get_object_or_404(Invoice, pk=pk)
     
     try:
-        # Always generate fresh PDF (ephemeral filesystem on Render)
-        pdf_bytes = invoice.generate_pdf(attach=False)
+        pdf_bytes = get_or_render(invoice)
         
         response = HttpResponse(pdf_bytes, content_type="application/pdf")
         response['Content-Disposition'] = f'attachment; filename="facture_{invoice.number}.pdf"'
@@ -74,10 +79,106 @@ def download_invoice(request, pk: int):
 @staff_member_required
 def archive(request):
     """
-    Archive des factures.
+    Archive des factures — filtres serveur, pagination keyset, totaux du filtre.
+
+    Requêtes HTMX :
+    - avec ``cursor`` : lignes de la page suivante seules (ajoutées au tableau) ;
+    - ciblant ``#archive-results`` : bloc totaux + première page (filtres).
+    """
+    from .forms import ArchiveFilterForm
+    from .services.archive import archive_page, archive_totals, filter_invoices
+
+    form = ArchiveFilterForm(request.GET or None)
+    invoices = filter_invoices(**form.filter_kwargs())
+    cursor = request.GET.get("cursor", "")
+    page = archive_page(invoices, cursor=cursor)
+
+    params = request.GET.copy()
+    params.pop("cursor", None)
+    context = {
+        "form": form,
+        "page": page,
+        "invoices": page.invoices,
+        "filter_query": params.urlencode(),
+    }
+    if request.headers.get("HX-Request"):
+        if cursor:
+            return render(request, "factures/partials/archive_rows.html", context)
+        if request.headers.get("HX-Target") == "archive-results":
+            context["totals"] = archive_totals(invoices)
+            return render(request, "factures/partials/archive_results.html", context)
+    context["totals"] = archive_totals(invoices)
+    return render(request, "factures/archive.html", context)
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def ledger_export(request):
+    """
+    Téléchargement en flux du FEC (``format=fec``) ou du grand livre CSV
+    (``format=csv``) d'un exercice ; ``gzip=1`` compresse à la volée.
     """
-    invoices = Invoice.objects.select_related('client', 'quote__client').order_by("-issue_date", "-number")
-    return render(request, "factures/archive.html", {"invoices": invoices})
+    from django.utils import timezone
+
+    from .services.ledger import FORMATS, LedgerExport, export_filename, export_stream
+
+    fmt = request.GET.get("format", "fec")
+    if fmt not in FORMATS:
+        fmt = "fec"
+    try:
+        year = int(request.GET.get("year") or timezone.localdate().year - 1)
+    except ValueError:
+        raise Http404("Exercice invalide")
+    gzip = request.GET.get("gzip") == "1"
+
+    content_type = "application/gzip" if gzip else FORMATS[fmt][3]
+    response = StreamingHttpResponse(
+        export_stream(LedgerExport(year), fmt, gzip=gzip),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{export_filename(year, fmt, gzip=gzip)}"'
+    return response
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def receivables_report(request):
+    """
+    Balance âgée par client (cache par client), détail d'un client avec
+    ``?client=<id>`` (0 = factures sans client), export ``?format=csv`` en flux.
+    """
+    from .services import receivables
+    from .services.ledger import encode_stream
+
+    if request.GET.get("format") == "csv":
+        from django.utils import timezone
+
+        today = timezone.localdate()
+        response = StreamingHttpResponse(
+            encode_stream(receivables.csv_lines(today)),
+            content_type="text/csv; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="balance-agee-{today.isoformat()}.csv"'
+        return response
+
+    report = receivables.aged_receivables(refresh=bool(request.GET.get("refresh")))
+    context = {
+        "rows": report["rows"],
+        "totals": report["totals"],
+        "today": report["today"],
+        "bucket_labels": [label for _key, label, *_ in receivables.BUCKETS],
+        "totals_list": [report["totals"][key] for key in receivables.BUCKET_KEYS],
+        "drilldown": None,
+    }
+    client_param = request.GET.get("client")
+    if client_param is not None and client_param.isdigit():
+        client_id = int(client_param) or None
+        context["selected_client"] = client_id
+        context["drilldown"] = receivables.client_invoices(client_id, report["today"])
+        context["drilldown_name"] = next(
+            (row.client_name for row in report["rows"] if row.client_id == client_id), "Sans client",
+        )
+    return render(request, "factures/receivables.html", context)
 
 
 # ===========================================
@@ -121,23 +222,13 @@ def invoice_create_checkout(request, token: str):
     Crée une session Stripe Checkout pour le paiement d'une facture.
     """
     # 🛡️ SECURITY: Rate-limit checkout session creation per IP (anti-abuse)
-    from django.core.cache import cache as _cache
-    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
-    client_ip = forwarded.split(',')[0].strip() if forwarded else request.META.get('REMOTE_ADDR', '')
-    checkout_key = f"ratelimit:inv_checkout:{client_ip}"
-    try:
-        checkout_count = _cache.get(checkout_key, 0)
-        if checkout_count >= 10:  # max 10 checkout sessions per hour per IP
-            return JsonResponse({
-                "success": False,
-                "error": "Trop de tentatives. Réessayez plus tard."
-            }, status=429)
-        try:
-            _cache.incr(checkout_key)
-        except ValueError:
-            _cache.set(checkout_key, 1, 3600)
-    except Exception:
-        pass  # Cache down — fail-open, Stripe handles abuse on their end
+    from core.ratelimit import hit
+    from core.utils import get_client_ip
+    if not hit('inv_checkout', get_client_ip(request), limit=10, period=3600).allowed:
+        return JsonResponse({
+            "success": False,
+            "error": "Trop de tentatives. Réessayez plus tard."
+        }, status=429)
 
     invoice = get_object_or_404(Invoice, public_token=token)
     
@@ -252,14 +343,17 @@ def invoice_payment_error(request):
 
 
 @require_http_methods(["GET"])
+@query_budget(11)
 def invoice_public_pdf(request, token: str):
     """
     Téléchargement public du PDF de facture via jeton.
     """
+    from .services.pdf_cache import get_or_render
+
     invoice = get_object_or_404(Invoice, public_token=token)
     
     try:
-        pdf_bytes = invoice.generate_pdf(attach=False)
+        pdf_bytes = get_or_render(invoice)
         response = HttpResponse(pdf_bytes, content_type="application/pdf")
         # 🛡️ SECURITY: Force download (attachment) on public endpoints to prevent
         # browser-rendered PDF XSS vectors and accidental data exposure.
@@ -3,8 +3,8 @@ from django.contrib import admin, messages
 from django.urls import reverse
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import Lead, LeadStatus, EmailSubscriber, NewsletterCampaign
-from .email_models import EmailTemplate, EmailComposition
+from .models import Lead, LeadStatus, EmailSubscriber, NewsletterCampaign, NewsletterDelivery
+from .email_models import BulkEmailResult, BulkEmailRun, EmailTemplate, EmailComposition
 
 
 @admin.register(Lead)
@@ -297,7 +297,7 @@ class NewsletterCampaignAdmin(admin.ModelAdmin):
     search_fields = ('subject',)
     readonly_fields = ('status', 'recipients_count', 'sent_count', 'failed_count', 'sent_at', 'created_at')
     ordering = ('-created_at',)
-    actions = ['action_send_campaign']
+    actions = ['action_send_campaign', 'action_resume_campaign']
 
     fieldsets = (
         ('Contenu', {
@@ -376,3 +376,67 @@ class NewsletterCampaignAdmin(admin.ModelAdmin):
                 f"⏭️ {skipped} campagne(s) ignorée(s) (déjà envoyée ou en cours).",
                 level=messages.WARNING,
             )
+
+    @admin.action(description="🔁 Reprendre l'envoi / relancer les échecs")
+    def action_resume_campaign(self, request, queryset):
+        """Reprend les destinataires en attente et renvoie ceux en échec.
+
+        Les échecs ne sont jamais renvoyés automatiquement (un envoi
+        interrompu a pu aboutir côté Brevo) : cette action est la décision
+        explicite de les relancer. L'envoi part en tâche de fond.
+        """
+        from core.tasks import async_send_newsletter_campaign
+        from .newsletter import retry_failed
+
+        for campaign in queryset.exclude(status=NewsletterCampaign.Status.DRAFT):
+            retried = retry_failed(campaign)
+            campaign.status = NewsletterCampaign.Status.SENDING
+            campaign.save(update_fields=['status'])
+            async_send_newsletter_campaign(campaign.pk)
+            self.message_user(
+                request,
+                f"🔁 « {campaign.subject} » : {retried} échec(s) relancé(s), reprise de l'envoi en file.",
+                level=messages.SUCCESS,
+            )
+
+
+@admin.register(NewsletterDelivery)
+class NewsletterDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('email', 'campaign', 'status', 'attempts', 'sent_at', 'message_id')
+    list_filter = ('status', 'campaign')
+    search_fields = ('email', 'message_id')
+    list_select_related = ('campaign',)
+    readonly_fields = ('campaign', 'email', 'status', 'message_id', 'attempts', 'last_error', 'claimed_at', 'sent_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BulkEmailRun)
+class BulkEmailRunAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'total', 'sent_count', 'failed_count', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject',)
+    list_select_related = ('created_by',)
+    readonly_fields = (
+        'subject', 'composition', 'created_by', 'status', 'total', 'sent_count', 'failed_count',
+        'concurrency', 'created_at', 'started_at', 'finished_at',
+    )
+    exclude = ('html_body', 'recipients')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BulkEmailResult)
+class BulkEmailResultAdmin(admin.ModelAdmin):
+    list_display = ('email', 'run', 'status', 'status_code', 'attempts', 'created_at', 'message_id')
+    list_filter = ('status', 'run')
+    search_fields = ('email', 'message_id')
+    list_select_related = ('run',)
+    readonly_fields = (
+        'run', 'email', 'status', 'message_id', 'status_code', 'error', 'attempts', 'claimed_at', 'created_at',
+    )
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,435 @@
+"""Envoi en masse (prospection) concurrent à débit adaptatif.
+
+Chaque destinataire reçoit un email individuel (``brevo_service.send_email``,
+voie ``bulk`` du limiteur partagé). Au lieu d'un envoi séquentiel entrecoupé
+d'un ``sleep`` fixe, un petit pool de threads envoie en parallèle sous le
+contrôle d'une fenêtre **AIMD** (comme TCP) :
+
+- chaque succès augmente la fenêtre d'environ 1 par tour complet
+  (``+INCREASE / fenêtre``) jusqu'à ``MAX_CONCURRENCY`` ;
+- une réponse 429 ou 5xx la divise (``× DECREASE``, au plus une fois par
+  ``COOLDOWN`` secondes) et le destinataire est retenté après un délai
+  exponentiel, jusqu'à ``MAX_ATTEMPTS`` tentatives.
+
+Comme pour la newsletter (``newsletter.claim``), chaque destinataire a une
+ligne ``BulkEmailResult`` PENDING dès la création du run. Le thread
+principal la réserve (SELECT … FOR UPDATE SKIP LOCKED, passage en SENDING)
+*avant* de la confier à un thread d'envoi : une tâche tuée au ``timeout``
+de django-q puis relancée, ou deux tâches sur le même run, ne renvoient
+jamais à un destinataire réservé. Les threads ne touchent pas à la base ;
+le thread principal écrit les résultats tous les ``FLUSH_EVERY``
+destinataires et recalcule les compteurs de ``BulkEmailRun`` (suivi en
+direct côté staff). Une ligne SENDING plus vieille que ``LEASE_SECONDS``
+passe en FAILED (l'appel a pu aboutir) et n'est jamais renvoyée d'office.
+
+L'attente d'un jeton du limiteur Brevo est bornée par le budget de temps
+restant : à l'échéance, un destinataire qui n'a pas obtenu de jeton (rien
+n'est parti) redevient PENDING pour la tâche suivante.
+
+Réglages optionnels (``settings.BULK_EMAIL_SENDING``) : ``INITIAL_CONCURRENCY``,
+``MIN_CONCURRENCY``, ``MAX_CONCURRENCY``, ``INCREASE``, ``DECREASE``,
+``COOLDOWN``, ``MAX_ATTEMPTS``, ``BACKOFF``, ``FLUSH_EVERY``, ``LEASE_SECONDS``,
+``TIME_BUDGET``.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INITIAL_CONCURRENCY = 2
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_INCREASE = 1.0
+DEFAULT_DECREASE = 0.5
+DEFAULT_COOLDOWN = 1.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF = 1.0
+DEFAULT_FLUSH_EVERY = 10
+# Au-delà, une ligne SENDING est considérée comme orpheline (worker tué).
+DEFAULT_LEASE_SECONDS = 600
+# Sous le ``timeout`` de Q_CLUSTER (120 s) : la suite part dans une nouvelle tâche.
+DEFAULT_TIME_BUDGET = 90
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, 'BULK_EMAIL_SENDING', {}) or {}).get(key, default)
+
+
+def is_congestion(status_code: Optional[int]) -> bool:
+    """429 (débit) et 5xx (Brevo surchargé) : ralentir et retenter."""
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+class AimdWindow:
+    """Fenêtre de concurrence AIMD partagée par les threads d'envoi."""
+
+    def __init__(
+        self,
+        initial: float,
+        minimum: float,
+        maximum: float,
+        *,
+        increase: float = DEFAULT_INCREASE,
+        decrease: float = DEFAULT_DECREASE,
+        cooldown: float = DEFAULT_COOLDOWN,
+    ):
+        self.minimum = max(1.0, float(minimum))
+        self.maximum = max(self.minimum, float(maximum))
+        self.limit = min(self.maximum, max(self.minimum, float(initial)))
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._in_flight = 0
+        self._last_decrease = float('-inf')
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, *, congested: bool) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            if congested:
+                now = time.monotonic()
+                # Une seule réduction par rafale de 429 (fenêtre déjà en vol)
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+
+@dataclass
+class RecipientResult:
+    email: str
+    sent: bool
+    attempts: int
+    message_id: str = ''
+    status_code: Optional[int] = None
+    error: str = ''
+    # Rien n'est parti (jeton refusé ou 429 à l'échéance) : à remettre en PENDING
+    deferred: bool = False
+
+
+def send_one(
+    email: str,
+    *,
+    subject: str,
+    html_body: str,
+    window: AimdWindow,
+    deadline: Optional[float] = None,
+) -> RecipientResult:
+    """Envoie à un destinataire, avec retentatives sur 429/5xx.
+
+    ``deadline`` (``time.monotonic()``) borne l'attente du limiteur et des
+    retentatives ; passé ce délai, un destinataire refusé est ``deferred``.
+    """
+    from core.services.email_backends import brevo_service
+
+    max_attempts = max(1, int(_cfg('MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)))
+    backoff = float(_cfg('BACKOFF', DEFAULT_BACKOFF))
+    attempt = 0
+    while True:
+        attempt += 1
+        window.acquire()
+        try:
+            result = brevo_service.send_email(
+                to_email=email,
+                subject=subject,
+                html_content=html_body,
+                tags=['bulk-email', 'prospection'],
+                lane='bulk',
+                limiter_timeout=None if deadline is None else max(0.0, deadline - time.monotonic()),
+            )
+        except Exception as e:  # noqa: BLE001 — un destinataire en échec n'arrête pas l'envoi
+            result = {'success': False, 'error': str(e)}
+        status_code = result.get('status_code')
+        congested = is_congestion(status_code)
+        window.release(congested=congested)
+
+        if result.get('success'):
+            return RecipientResult(email, True, attempt, message_id=str(result.get('message_id') or ''))
+        expired = deadline is not None and time.monotonic() >= deadline
+        if status_code == 429 and expired:
+            return RecipientResult(email, False, attempt, status_code=429, deferred=True)
+        if not congested or attempt >= max_attempts or expired:
+            return RecipientResult(
+                email, False, attempt, status_code=status_code, error=str(result.get('error') or ''),
+            )
+        delay = backoff * 2 ** (attempt - 1)
+        if deadline is not None:
+            delay = min(delay, max(0.0, deadline - time.monotonic()))
+        time.sleep(delay)
+
+
+def create_run(
+    emails: list[str],
+    *,
+    subject: str,
+    html_body: str,
+    body_html_raw: str = '',
+    template_id: Optional[str] = None,
+    user=None,
+):
+    """Crée le run, ses lignes PENDING et son entrée d'historique ``EmailComposition``."""
+    from .email_models import BulkEmailRun, EmailComposition
+
+    # Une ligne par adresse (contrainte unique run/email)
+    emails = list(dict.fromkeys(emails))
+    composition = None
+    if user is not None:
+        composition = EmailComposition.objects.create(
+            to_emails=', '.join(emails[:10]) + (f'... (+{len(emails) - 10})' if len(emails) > 10 else ''),
+            subject=f"[BULK x{len(emails)}] {subject}",
+            body_html=body_html_raw,
+            template_used_id=template_id or None,
+            is_draft=False,
+            sent_at=timezone.now(),
+            created_by=user,
+        )
+    run = BulkEmailRun.objects.create(
+        subject=subject,
+        html_body=html_body,
+        recipients=emails,
+        total=len(emails),
+        composition=composition,
+        created_by=user,
+    )
+    materialise(run)
+    return run
+
+
+def materialise(run) -> int:
+    """Crée les lignes PENDING manquantes (idempotent : runs antérieurs aux lignes)."""
+    from .email_models import BulkEmailResult
+
+    known = set(run.results.values_list('email', flat=True))
+    rows = [
+        BulkEmailResult(run=run, email=email)
+        for email in dict.fromkeys(run.recipients)
+        if email not in known
+    ]
+    BulkEmailResult.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def remaining_recipients(run) -> list[str]:
+    from .email_models import BulkEmailResult
+
+    return list(
+        run.results.filter(status=BulkEmailResult.Status.PENDING).order_by('pk').values_list('email', flat=True)
+    )
+
+
+def claim(run, limit: int) -> list:
+    """Réserve jusqu'à ``limit`` destinataires PENDING (SKIP LOCKED) et les passe en SENDING."""
+    from .email_models import BulkEmailResult
+
+    with transaction.atomic():
+        ids = list(
+            BulkEmailResult.objects
+            .select_for_update(skip_locked=True)
+            .filter(run=run, status=BulkEmailResult.Status.PENDING)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        if ids:
+            BulkEmailResult.objects.filter(pk__in=ids).update(
+                status=BulkEmailResult.Status.SENDING,
+                claimed_at=timezone.now(),
+            )
+    return list(BulkEmailResult.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def record(rows: list, results: list[RecipientResult]) -> None:
+    """Inscrit les résultats sur les lignes réservées ; les ``deferred`` redeviennent PENDING."""
+    from .email_models import BulkEmailResult
+
+    for row, item in zip(rows, results):
+        if item.deferred:
+            row.status = BulkEmailResult.Status.PENDING
+            row.claimed_at = None
+            continue
+        row.status = BulkEmailResult.Status.SENT if item.sent else BulkEmailResult.Status.FAILED
+        row.message_id = item.message_id[:255]
+        row.status_code = item.status_code
+        row.error = item.error[:2000]
+        row.attempts = item.attempts
+    BulkEmailResult.objects.bulk_update(
+        rows, ['status', 'message_id', 'status_code', 'error', 'attempts', 'claimed_at'], batch_size=1000,
+    )
+
+
+def release(rows: list) -> None:
+    """Rend à PENDING des lignes réservées mais jamais confiées à un thread d'envoi."""
+    from .email_models import BulkEmailResult
+
+    if rows:
+        BulkEmailResult.objects.filter(
+            pk__in=[row.pk for row in rows], status=BulkEmailResult.Status.SENDING,
+        ).update(status=BulkEmailResult.Status.PENDING, claimed_at=None)
+
+
+def release_stale(run) -> int:
+    """Passe en FAILED les lignes SENDING orphelines (jamais renvoyées d'office)."""
+    from .email_models import BulkEmailResult
+
+    lease = int(_cfg('LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+    return run.results.filter(
+        status=BulkEmailResult.Status.SENDING,
+        claimed_at__lt=timezone.now() - timedelta(seconds=lease),
+    ).update(
+        status=BulkEmailResult.Status.FAILED,
+        error="Envoi interrompu (worker arrêté) — non renvoyé pour éviter un doublon.",
+    )
+
+
+def lease_expiry(run):
+    """Fin du bail le plus proche parmi les lignes SENDING (maintenant si aucune)."""
+    from .email_models import BulkEmailResult
+
+    oldest = (
+        run.results
+        .filter(status=BulkEmailResult.Status.SENDING)
+        .order_by('claimed_at')
+        .values_list('claimed_at', flat=True)
+        .first()
+    )
+    if oldest is None:
+        return timezone.now()
+    return oldest + timedelta(seconds=int(_cfg('LEASE_SECONDS', DEFAULT_LEASE_SECONDS)))
+
+
+def refresh_counts(run) -> bool:
+    """Met à jour les compteurs ; clôt le run s'il ne reste rien à envoyer."""
+    from .email_models import BulkEmailResult, BulkEmailRun
+
+    Status = BulkEmailResult.Status
+    counts = run.results.aggregate(
+        sent=Count('pk', filter=Q(status=Status.SENT)),
+        failed=Count('pk', filter=Q(status=Status.FAILED)),
+        open=Count('pk', filter=Q(status__in=[Status.PENDING, Status.SENDING])),
+    )
+    run.sent_count = counts['sent']
+    run.failed_count = counts['failed']
+    fields = ['sent_count', 'failed_count', 'concurrency']
+    done = counts['open'] == 0
+    if done and run.status != BulkEmailRun.Status.DONE:
+        run.status = BulkEmailRun.Status.DONE
+        run.finished_at = timezone.now()
+        fields += ['status', 'finished_at']
+    run.save(update_fields=fields)
+    return done
+
+
+def deliver_run(run, *, time_budget: Optional[float] = None) -> bool:
+    """Envoie les destinataires PENDING du run ; True si tout est traité.
+
+    Les destinataires sont réservés par petits lots (``claim``) juste avant
+    d'être confiés au pool. Arrête de soumettre de nouveaux envois quand
+    ``time_budget`` (secondes) est écoulé : les envois en vol sont terminés
+    et enregistrés, les réservations non soumises rendues.
+    """
+    from .email_models import BulkEmailRun
+
+    if time_budget is None:
+        time_budget = float(_cfg('TIME_BUDGET', DEFAULT_TIME_BUDGET))
+    deadline = time.monotonic() + time_budget
+
+    if run.status != BulkEmailRun.Status.RUNNING:
+        run.status = BulkEmailRun.Status.RUNNING
+        run.started_at = run.started_at or timezone.now()
+        run.save(update_fields=['status', 'started_at'])
+    materialise(run)
+    release_stale(run)
+
+    window = AimdWindow(
+        _cfg('INITIAL_CONCURRENCY', DEFAULT_INITIAL_CONCURRENCY),
+        _cfg('MIN_CONCURRENCY', DEFAULT_MIN_CONCURRENCY),
+        _cfg('MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY),
+        increase=float(_cfg('INCREASE', DEFAULT_INCREASE)),
+        decrease=float(_cfg('DECREASE', DEFAULT_DECREASE)),
+        cooldown=float(_cfg('COOLDOWN', DEFAULT_COOLDOWN)),
+    )
+    flush_every = max(1, int(_cfg('FLUSH_EVERY', DEFAULT_FLUSH_EVERY)))
+    claim_size = int(window.maximum)
+    claimed = deque()
+    rows: list = []
+    results: list[RecipientResult] = []
+
+    def flush() -> None:
+        if rows:
+            record(rows, results)
+            rows.clear()
+            results.clear()
+            run.concurrency = window.limit
+            refresh_counts(run)
+
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=int(window.maximum), thread_name_prefix='bulk-email') as pool:
+        def submit_next() -> bool:
+            if time.monotonic() >= deadline:
+                return False
+            if not claimed:
+                claimed.extend(claim(run, claim_size))
+                if not claimed:
+                    return False
+            row = claimed.popleft()
+            future = pool.submit(
+                send_one, row.email, subject=run.subject, html_body=run.html_body,
+                window=window, deadline=deadline,
+            )
+            in_flight[future] = row
+            return True
+
+        # Autant de tâches en file que la fenêtre maximale : la fenêtre AIMD
+        # décide combien sont réellement en vol.
+        while len(in_flight) < window.maximum and submit_next():
+            pass
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                rows.append(in_flight.pop(future))
+                results.append(future.result())
+                submit_next()
+            if len(rows) >= flush_every:
+                flush()
+    release(list(claimed))
+    flush()
+    run.concurrency = window.limit
+    return refresh_counts(run)
+
+
+__all__ = [
+    'AimdWindow',
+    'RecipientResult',
+    'claim',
+    'create_run',
+    'deliver_run',
+    'is_congestion',
+    'lease_expiry',
+    'materialise',
+    'record',
+    'refresh_counts',
+    'release',
+    'release_stale',
+    'remaining_recipients',
+    'send_one',
+]
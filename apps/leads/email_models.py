@@ -95,3 +95,105 @@ class EmailComposition(models.Model):
         if not self.bcc_emails:
             return []
         return [email.strip() for email in self.bcc_emails.split(',') if email.strip()]
+
+
+class BulkEmailRun(models.Model):
+    """Envoi en masse (prospection) : un enregistrement par lancement.
+
+    Le résultat de chaque destinataire est conservé dans ``BulkEmailResult``
+    (écrit par lots) ; les compteurs servent au suivi en direct.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'En file'
+        RUNNING = 'running', 'En cours'
+        DONE = 'done', 'Terminé'
+
+    subject = models.CharField("Sujet", max_length=500)
+    html_body = models.TextField("Corps HTML rendu")
+    recipients = models.JSONField("Destinataires", default=list)
+    composition = models.ForeignKey(
+        EmailComposition,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bulk_runs',
+        verbose_name="Historique",
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Lancé par",
+    )
+    status = models.CharField(
+        "Statut", max_length=10, choices=Status.choices, default=Status.QUEUED,
+    )
+    total = models.PositiveIntegerField("Destinataires", default=0)
+    sent_count = models.PositiveIntegerField("Envoyés", default=0)
+    failed_count = models.PositiveIntegerField("Échecs", default=0)
+    concurrency = models.FloatField("Concurrence courante", default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField("Démarré le", null=True, blank=True)
+    finished_at = models.DateTimeField("Terminé le", null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Envoi en masse"
+        verbose_name_plural = "Envois en masse"
+
+    def __str__(self) -> str:
+        return f"{self.subject[:50]} ({self.sent_count}/{self.total})"
+
+    @property
+    def processed(self) -> int:
+        return self.sent_count + self.failed_count
+
+    def progress(self) -> dict:
+        """État sérialisable pour le suivi en direct (endpoint JSON)."""
+        return {
+            'id': self.pk,
+            'status': self.status,
+            'total': self.total,
+            'sent': self.sent_count,
+            'failed': self.failed_count,
+            'processed': self.processed,
+            'percent': round(100 * self.processed / self.total) if self.total else 100,
+            'concurrency': round(self.concurrency, 1),
+            'done': self.status == self.Status.DONE,
+        }
+
+
+class BulkEmailResult(models.Model):
+    """Résultat d'un destinataire d'un envoi en masse.
+
+    Une ligne PENDING par destinataire dès la création du run ; un worker la
+    réserve (SENDING) avant l'appel Brevo, cf. ``bulk_sender.claim``.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'En attente'
+        SENDING = 'sending', "En cours d'envoi"
+        SENT = 'sent', 'Envoyé'
+        FAILED = 'failed', 'Échec'
+
+    run = models.ForeignKey(BulkEmailRun, on_delete=models.CASCADE, related_name='results')
+    email = models.EmailField("Email")
+    status = models.CharField("Statut", max_length=10, choices=Status.choices, default=Status.PENDING)
+    message_id = models.CharField("ID message Brevo", max_length=255, blank=True, default='')
+    status_code = models.PositiveSmallIntegerField("Code HTTP", null=True, blank=True)
+    error = models.TextField("Erreur", blank=True, default='')
+    attempts = models.PositiveSmallIntegerField("Tentatives", default=0)
+    claimed_at = models.DateTimeField("Réservé le", null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Résultat d'envoi en masse"
+        verbose_name_plural = "Résultats d'envoi en masse"
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'email'], name='uniq_bulk_email_result'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.email} ({self.get_status_display()})"
@@ -13,6 +13,7 @@ from .email_views import (
     EmailTemplateAPIView,
     SendEmailView,
     BulkEmailView,
+    BulkEmailProgressView,
 )
 
 
@@ -27,6 +28,7 @@ urlpatterns = [
     path('', _staff(EmailListView), name='email_list'),
     path('compose/', _staff(EmailComposeView), name='email_compose'),
     path('bulk/', _staff(BulkEmailView), name='bulk_email'),
+    path('bulk/<int:pk>/progress/', _staff(BulkEmailProgressView), name='bulk_email_progress'),
     path('<int:pk>/', _staff(EmailDetailView), name='email_detail'),
     path('<int:pk>/send/', _staff(SendEmailView), name='email_send'),
     path('api/templates/<int:pk>/', _staff(EmailTemplateAPIView), name='template_api'),
@@ -5,6 +5,7 @@ import logging
 from typing import Any
 
 from django.conf import settings
+from django.db import transaction
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -17,7 +18,7 @@ from django.utils.decorators import method_decorator
 from django.views.generic import CreateView, ListView, DetailView
 from django.views import View
 
-from .email_models import EmailComposition, EmailTemplate
+from .email_models import BulkEmailRun, EmailComposition, EmailTemplate
 from .email_forms import EmailCompositionForm
 
 logger = logging.getLogger(__name__)
@@ -256,19 +257,22 @@ class BulkEmailView(View):
     
     def get(self, request: HttpRequest) -> HttpResponse:
         templates = EmailTemplate.objects.filter(is_active=True)
+        run_id = request.GET.get('run', '')
+        run = BulkEmailRun.objects.filter(pk=run_id).first() if run_id.isdigit() else None
         return render(request, 'leads/email_bulk.html', {
             'templates': templates,
+            'run': run,
         })
     
     def post(self, request: HttpRequest) -> HttpResponse:
-        from django_q.tasks import async_task
-        
+        from core.tasks import async_send_bulk_email_run
+        from .bulk_sender import create_run
+
         # Récupérer les données du formulaire
         emails_raw = request.POST.get('emails', '')
         subject = request.POST.get('subject', '')
         body_html = request.POST.get('body_html', '')
         template_id = request.POST.get('template')
-        delay_seconds = float(request.POST.get('delay', 1))  # Délai entre chaque envoi
         
         # Nettoyer et parser les emails
         from django.core.validators import validate_email
@@ -306,26 +310,28 @@ class BulkEmailView(View):
             'site_url': site_url,
         })
         
-        # Dispatcher l'envoi en arrière-plan via Django-Q2
-        async_task(
-            'apps.leads.tasks.send_bulk_emails_task',
-            emails=emails,
+        # Run suivi par destinataire, envoyé en arrière-plan via Django-Q2
+        run = create_run(
+            emails,
             subject=subject,
             html_body=html_body,
-            delay_seconds=delay_seconds,
             body_html_raw=body_html,
             template_id=template_id,
-            user_id=request.user.pk,
-            task_name=f'bulk_email_{len(emails)}_{timezone.now():%Y%m%d_%H%M}',
+            user=request.user,
         )
-        
+        transaction.on_commit(lambda: async_send_bulk_email_run(run.pk))
+
         messages.success(
             request,
-            f"✅ Envoi de {len(emails)} emails lancé en arrière-plan. "
-            f"Suivez la progression dans l'admin Django-Q."
+            f"✅ Envoi de {run.total} emails lancé en arrière-plan."
         )
-        
-        try:
-            return redirect('admin_emails:email_list')
-        except Exception:
-            return redirect('leads:email_list')
+        return redirect(f"{reverse('admin_emails:bulk_email')}?run={run.pk}")
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class BulkEmailProgressView(View):
+    """Progression en direct d'un envoi en masse (JSON, interrogé par la page)."""
+
+    def get(self, request: HttpRequest, pk: int) -> JsonResponse:
+        run = get_object_or_404(BulkEmailRun, pk=pk)
+        return JsonResponse(run.progress())
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0013_add_newsletter_campaign'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newslettercampaign',
+            name='rendered_html',
+            field=models.TextField(blank=True, default='', verbose_name='HTML rendu'),
+        ),
+        migrations.AddField(
+            model_name='newslettercampaign',
+            name='tags',
+            field=models.JSONField(blank=True, default=list, verbose_name='Tags Brevo'),
+        ),
+        migrations.CreateModel(
+            name='NewsletterDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('sending', 'En cours'), ('sent', 'Envoyé'), ('failed', 'Échec')], default='pending', max_length=10, verbose_name='Statut')),
+                ('message_id', models.CharField(blank=True, default='', max_length=255, verbose_name='ID message Brevo')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Dernière erreur')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Réservé le')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Envoyé le')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='leads.newslettercampaign')),
+            ],
+            options={
+                'verbose_name': 'Envoi newsletter',
+                'verbose_name_plural': 'Envois newsletter',
+                'indexes': [models.Index(fields=['campaign', 'status'], name='idx_newsletter_delivery_status')],
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'email'), name='uniq_newsletter_delivery')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0014_newsletter_delivery'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkEmailRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=500, verbose_name='Sujet')),
+                ('html_body', models.TextField(verbose_name='Corps HTML rendu')),
+                ('recipients', models.JSONField(default=list, verbose_name='Destinataires')),
+                ('status', models.CharField(choices=[('queued', 'En file'), ('running', 'En cours'), ('done', 'Terminé')], default='queued', max_length=10, verbose_name='Statut')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Destinataires')),
+                ('sent_count', models.PositiveIntegerField(default=0, verbose_name='Envoyés')),
+                ('failed_count', models.PositiveIntegerField(default=0, verbose_name='Échecs')),
+                ('concurrency', models.FloatField(default=0, verbose_name='Concurrence courante')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Démarré le')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminé le')),
+                ('composition', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bulk_runs', to='leads.emailcomposition', verbose_name='Historique')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Lancé par')),
+            ],
+            options={
+                'verbose_name': 'Envoi en masse',
+                'verbose_name_plural': 'Envois en masse',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BulkEmailResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('status', models.CharField(choices=[('sent', 'Envoyé'), ('failed', 'Échec')], max_length=10, verbose_name='Statut')),
+                ('message_id', models.CharField(blank=True, default='', max_length=255, verbose_name='ID message Brevo')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Code HTTP')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Erreur')),
+                ('attempts', models.PositiveSmallIntegerField(default=1, verbose_name='Tentatives')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='leads.bulkemailrun')),
+            ],
+            options={
+                'verbose_name': "Résultat d'envoi en masse",
+                'verbose_name_plural': "Résultats d'envoi en masse",
+                'constraints': [models.UniqueConstraint(fields=('run', 'email'), name='uniq_bulk_email_result')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0015_bulk_email_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkemailresult',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Réservé le'),
+        ),
+        migrations.AlterField(
+            model_name='bulkemailresult',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives'),
+        ),
+        migrations.AlterField(
+            model_name='bulkemailresult',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('sending', "En cours d'envoi"), ('sent', 'Envoyé'), ('failed', 'Échec')], default='pending', max_length=10, verbose_name='Statut'),
+        ),
+    ]
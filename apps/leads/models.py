@@ -209,6 +209,10 @@ class NewsletterCampaign(models.Model):
     failed_count = models.PositiveIntegerField("Échecs", default=0)
     sent_at = models.DateTimeField("Envoyée le", null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Figés au démarrage de l'envoi : un worker qui reprend la campagne
+    # envoie exactement le même message (cf. NewsletterDelivery).
+    rendered_html = models.TextField("HTML rendu", blank=True, default='')
+    tags = models.JSONField("Tags Brevo", default=list, blank=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -219,6 +223,48 @@ class NewsletterCampaign(models.Model):
         return f"[{self.get_status_display()}] {self.subject}"
 
 
+class NewsletterDelivery(models.Model):
+    """Suivi d'envoi d'une campagne, un enregistrement par destinataire.
+
+    Matérialisé en bloc au démarrage de la campagne ; les workers réservent
+    les destinataires PENDING par lots (``SELECT … FOR UPDATE SKIP LOCKED``),
+    les passent en SENDING avant l'appel Brevo puis en SENT/FAILED. Une
+    ligne n'est jamais remise en PENDING automatiquement : pas de double envoi.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'En attente'
+        SENDING = 'sending', 'En cours'
+        SENT = 'sent', 'Envoyé'
+        FAILED = 'failed', 'Échec'
+
+    campaign = models.ForeignKey(
+        NewsletterCampaign, on_delete=models.CASCADE, related_name='deliveries',
+    )
+    email = models.EmailField("Email")
+    status = models.CharField(
+        "Statut", max_length=10, choices=Status.choices, default=Status.PENDING,
+    )
+    message_id = models.CharField("ID message Brevo", max_length=255, blank=True, default='')
+    attempts = models.PositiveSmallIntegerField("Tentatives", default=0)
+    last_error = models.TextField("Dernière erreur", blank=True, default='')
+    claimed_at = models.DateTimeField("Réservé le", null=True, blank=True)
+    sent_at = models.DateTimeField("Envoyé le", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Envoi newsletter"
+        verbose_name_plural = "Envois newsletter"
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'email'], name='uniq_newsletter_delivery'),
+        ]
+        indexes = [
+            models.Index(fields=['campaign', 'status'], name='idx_newsletter_delivery_status'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.email} ({self.get_status_display()})"
+
+
 def make_unsubscribe_url(email: str) -> str:
     """Génère l'URL de désinscription signée pour un email donné."""
     import hashlib
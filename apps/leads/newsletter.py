@@ -0,0 +1,303 @@
+"""Envoi groupé des newsletters via l'API batch Brevo (messageVersions).
+
+Le template est rendu **une seule fois** : les valeurs propres à chaque
+abonné (lien de désinscription signé, email) sont des placeholders
+``{{ params.… }}`` remplis par Brevo pour chaque version du message.
+Les abonnés sont découpés en lots de ``BATCH_SIZE`` (maximum de l'API) et
+les lots partent en parallèle sur ``CONCURRENCY`` threads : quelques appels
+HTTP au lieu d'un appel + ``sleep`` par abonné.
+
+Suivi par destinataire (`deliver_campaign`) : au démarrage, une ligne
+``NewsletterDelivery`` PENDING est créée en bloc par abonné. Chaque worker
+réserve ensuite ``BATCH_SIZE × CONCURRENCY`` destinataires avec
+``SELECT … FOR UPDATE SKIP LOCKED`` et les passe en SENDING (commit) avant
+l'appel Brevo, puis en SENT/FAILED avec le ``message_id``. Conséquences :
+
+- plusieurs workers se partagent la même campagne sans se marcher dessus ;
+- un worker recyclé (``Q_CLUSTER`` : ``recycle``/``timeout``) ne perd que
+  son lot en cours ; la reprise repart des PENDING restants ;
+- jamais de double envoi : une ligne restée SENDING au-delà de
+  ``LEASE_SECONDS`` passe en FAILED (l'appel a pu aboutir) et n'est
+  renvoyée que sur décision explicite (`retry_failed`).
+
+Réglages optionnels (``settings.NEWSLETTER_SENDING``) : ``BATCH_SIZE``,
+``CONCURRENCY``, ``LEASE_SECONDS``, ``TIME_BUDGET``.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+# Au-delà, une ligne SENDING est considérée comme orpheline (worker tué).
+DEFAULT_LEASE_SECONDS = 600
+# Sous le ``timeout`` de Q_CLUSTER (120 s) : la suite part dans une nouvelle tâche.
+DEFAULT_TIME_BUDGET = 90
+
+# Variables du template remplacées par un paramètre Brevo par destinataire.
+PER_RECIPIENT_PARAMS = ('unsubscribe_url', 'email')
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, 'NEWSLETTER_SENDING', {}) or {}).get(key, default)
+
+
+@dataclass
+class BatchOutcome:
+    """Résultat d'un lot : destinataires acceptés par Brevo ou en échec."""
+    sent: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    message_ids: dict[str, str] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+    def merge(self, other: 'BatchOutcome') -> None:
+        self.sent.extend(other.sent)
+        self.failed.extend(other.failed)
+        self.message_ids.update(other.message_ids)
+        self.errors.update(other.errors)
+
+
+def render_once(template_name: str, context: dict) -> str:
+    """Rend le template avec des placeholders Brevo pour les valeurs par abonné."""
+    placeholders = {name: f'{{{{ params.{name} }}}}' for name in PER_RECIPIENT_PARAMS}
+    return render_to_string(template_name, {**context, **placeholders})
+
+
+def recipient_params(email: str) -> dict:
+    from .models import make_unsubscribe_url
+
+    return {'unsubscribe_url': make_unsubscribe_url(email), 'email': email}
+
+
+def batch_size() -> int:
+    from core.services.email_backends import BrevoEmailService
+
+    return min(int(_cfg('BATCH_SIZE', BrevoEmailService.MAX_MESSAGE_VERSIONS)),
+               BrevoEmailService.MAX_MESSAGE_VERSIONS)
+
+
+def send_batch(emails: list[str], *, subject: str, html_content: str, tags: list[str]) -> BatchOutcome:
+    """Envoie un lot (≤ ``batch_size()``) en un appel Brevo."""
+    from core.services.email_backends import brevo_service
+
+    outcome = BatchOutcome()
+    try:
+        result = brevo_service.send_batch(
+            subject=subject,
+            html_content=html_content,
+            versions=[{'to': email, 'params': recipient_params(email)} for email in emails],
+            tags=tags,
+        )
+    except Exception as e:  # noqa: BLE001 — un lot en échec n'arrête pas la campagne
+        result = {'success': False, 'error': str(e)}
+    if result.get('success'):
+        outcome.sent.extend(emails)
+        message_ids = result.get('message_ids') or []
+        if len(message_ids) == len(emails):
+            outcome.message_ids.update(zip(emails, message_ids))
+    else:
+        outcome.failed.extend(emails)
+        outcome.errors.update({email: result.get('error', '') for email in emails})
+        logger.error("Newsletter: échec d'un lot de %d destinataires: %s", len(emails), result.get('error'))
+    return outcome
+
+
+def send_to_all(emails: Iterable[str], *, subject: str, html_content: str, tags: list[str]) -> BatchOutcome:
+    """Découpe ``emails`` en lots et les envoie avec une concurrence bornée."""
+    emails = list(emails)
+    size = batch_size()
+    batches = [emails[i:i + size] for i in range(0, len(emails), size)]
+    total = BatchOutcome()
+    if not batches:
+        return total
+
+    workers = max(1, min(int(_cfg('CONCURRENCY', DEFAULT_CONCURRENCY)), len(batches)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='newsletter') as pool:
+        futures = [
+            pool.submit(send_batch, batch, subject=subject, html_content=html_content, tags=tags)
+            for batch in batches
+        ]
+        for future in futures:
+            total.merge(future.result())
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Suivi par destinataire (reprise, plusieurs workers)
+# ---------------------------------------------------------------------------
+def materialise(campaign) -> int:
+    """Crée les lignes PENDING des abonnés actifs (une seule fois par campagne)."""
+    from .models import EmailSubscriber, NewsletterDelivery
+
+    if not campaign.deliveries.exists():
+        emails = EmailSubscriber.objects.filter(is_active=True).values_list('email', flat=True)
+        NewsletterDelivery.objects.bulk_create(
+            (NewsletterDelivery(campaign=campaign, email=email) for email in emails.iterator()),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+    return campaign.deliveries.count()
+
+
+def claim(campaign, limit: int) -> list:
+    """Réserve jusqu'à ``limit`` destinataires PENDING (SKIP LOCKED) et les passe en SENDING."""
+    from .models import NewsletterDelivery
+
+    with transaction.atomic():
+        ids = list(
+            NewsletterDelivery.objects
+            .select_for_update(skip_locked=True)
+            .filter(campaign=campaign, status=NewsletterDelivery.Status.PENDING)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        if ids:
+            NewsletterDelivery.objects.filter(pk__in=ids).update(
+                status=NewsletterDelivery.Status.SENDING,
+                claimed_at=timezone.now(),
+                attempts=F('attempts') + 1,
+            )
+    return list(NewsletterDelivery.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def record(deliveries: list, outcome: BatchOutcome) -> None:
+    """Inscrit le résultat de l'envoi sur les lignes réservées."""
+    from .models import NewsletterDelivery
+
+    now = timezone.now()
+    sent = set(outcome.sent)
+    for delivery in deliveries:
+        if delivery.email in sent:
+            delivery.status = NewsletterDelivery.Status.SENT
+            delivery.message_id = outcome.message_ids.get(delivery.email, '')[:255]
+            delivery.sent_at = now
+            delivery.last_error = ''
+        else:
+            delivery.status = NewsletterDelivery.Status.FAILED
+            delivery.last_error = outcome.errors.get(delivery.email, '')[:2000]
+    NewsletterDelivery.objects.bulk_update(
+        deliveries, ['status', 'message_id', 'sent_at', 'last_error'], batch_size=1000,
+    )
+
+
+def release_stale(campaign) -> int:
+    """Passe en FAILED les lignes SENDING orphelines (jamais renvoyées d'office)."""
+    from .models import NewsletterDelivery
+
+    lease = int(_cfg('LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+    return campaign.deliveries.filter(
+        status=NewsletterDelivery.Status.SENDING,
+        claimed_at__lt=timezone.now() - timedelta(seconds=lease),
+    ).update(
+        status=NewsletterDelivery.Status.FAILED,
+        last_error="Envoi interrompu (worker arrêté) — non renvoyé pour éviter un doublon.",
+    )
+
+
+def lease_expiry(campaign):
+    """Fin du bail le plus proche parmi les lignes SENDING (maintenant si aucune)."""
+    from .models import NewsletterDelivery
+
+    oldest = (
+        campaign.deliveries
+        .filter(status=NewsletterDelivery.Status.SENDING)
+        .order_by('claimed_at')
+        .values_list('claimed_at', flat=True)
+        .first()
+    )
+    if oldest is None:
+        return timezone.now()
+    return oldest + timedelta(seconds=int(_cfg('LEASE_SECONDS', DEFAULT_LEASE_SECONDS)))
+
+
+def retry_failed(campaign) -> int:
+    """Remet les échecs en PENDING (action explicite de l'admin)."""
+    from .models import NewsletterDelivery
+
+    return campaign.deliveries.filter(status=NewsletterDelivery.Status.FAILED).update(
+        status=NewsletterDelivery.Status.PENDING, claimed_at=None,
+    )
+
+
+def refresh_counts(campaign) -> bool:
+    """Met à jour les compteurs ; clôt la campagne s'il ne reste rien à envoyer."""
+    from .models import NewsletterCampaign, NewsletterDelivery
+
+    Status = NewsletterDelivery.Status
+    counts = campaign.deliveries.aggregate(
+        total=Count('pk'),
+        sent=Count('pk', filter=Q(status=Status.SENT)),
+        failed=Count('pk', filter=Q(status=Status.FAILED)),
+        open=Count('pk', filter=Q(status__in=[Status.PENDING, Status.SENDING])),
+    )
+    campaign.recipients_count = counts['total']
+    campaign.sent_count = counts['sent']
+    campaign.failed_count = counts['failed']
+    fields = ['recipients_count', 'sent_count', 'failed_count']
+    done = counts['open'] == 0
+    if done and campaign.status != NewsletterCampaign.Status.SENT:
+        campaign.status = NewsletterCampaign.Status.SENT
+        campaign.sent_at = timezone.now()
+        fields += ['status', 'sent_at']
+    campaign.save(update_fields=fields)
+    return done
+
+
+def deliver_campaign(campaign, *, time_budget: Optional[float] = None) -> bool:
+    """Envoie les destinataires PENDING de la campagne, lot après lot.
+
+    S'arrête quand il n'y a plus rien à réserver ou quand ``time_budget``
+    (secondes) est écoulé. Renvoie True si la campagne est terminée ; sinon
+    il reste des PENDING (budget écoulé) ou seulement des lignes SENDING
+    d'un autre worker, à reprendre après ``lease_expiry``.
+    """
+    if time_budget is None:
+        time_budget = float(_cfg('TIME_BUDGET', DEFAULT_TIME_BUDGET))
+    deadline = time.monotonic() + time_budget
+    chunk = batch_size() * max(1, int(_cfg('CONCURRENCY', DEFAULT_CONCURRENCY)))
+
+    release_stale(campaign)
+    while time.monotonic() < deadline:
+        deliveries = claim(campaign, chunk)
+        if not deliveries:
+            break
+        outcome = send_to_all(
+            [delivery.email for delivery in deliveries],
+            subject=campaign.subject,
+            html_content=campaign.rendered_html,
+            tags=campaign.tags or ['newsletter', f'campaign-{campaign.pk}'],
+        )
+        record(deliveries, outcome)
+        refresh_counts(campaign)
+    return refresh_counts(campaign)
+
+
+__all__ = [
+    'BatchOutcome',
+    'PER_RECIPIENT_PARAMS',
+    'batch_size',
+    'claim',
+    'deliver_campaign',
+    'lease_expiry',
+    'materialise',
+    'recipient_params',
+    'record',
+    'refresh_counts',
+    'release_stale',
+    'render_once',
+    'retry_failed',
+    'send_batch',
+    'send_to_all',
+]
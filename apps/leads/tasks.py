@@ -2,11 +2,8 @@
 from __future__ import annotations
 
 import logging
-import time
 
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -20,87 +17,134 @@ def send_bulk_emails_task(
     template_id: str | None,
     user_id: int,
 ) -> dict:
-    """Send bulk emails one by one with a delay between each.
+    """Ancienne signature (tâches déjà en file) : crée un run et l'envoie.
 
-    This function is designed to be called via ``django_q.tasks.async_task``
-    so that the HTTP request returns immediately while emails are sent in the
-    background by a Django-Q2 worker.
+    ``delay_seconds`` est ignoré : le débit est désormais adaptatif
+    (cf. ``apps.leads.bulk_sender``).
+    """
+    from django.contrib.auth import get_user_model
+    from .bulk_sender import create_run
+
+    user = get_user_model().objects.filter(pk=user_id).first()
+    run = create_run(
+        emails, subject=subject, html_body=html_body,
+        body_html_raw=body_html_raw, template_id=template_id, user=user,
+    )
+    return send_bulk_run_task(run.pk)
+
+
+def send_bulk_run_task(run_id: int) -> dict:
+    """Envoie (ou reprend) un envoi en masse de prospection.
+
+    Appelé via django-q2 (``core.tasks.async_send_bulk_email_run``). Envoi
+    concurrent à débit adaptatif, un ``BulkEmailResult`` réservé par
+    destinataire avant l'envoi ; si le budget de temps est épuisé, la suite
+    repart dans une nouvelle tâche. S'il ne reste que des lignes SENDING
+    (réservées par une autre tâche), une seule reprise est planifiée à
+    l'expiration du bail.
 
     Returns a summary dict with success/failure counts.
     """
-    from core.services.email_backends import brevo_service
-    from .email_models import EmailComposition
-    from django.contrib.auth import get_user_model
+    from .bulk_sender import deliver_run, lease_expiry
+    from .email_models import BulkEmailResult, BulkEmailRun
 
-    User = get_user_model()
-
-    success_count = 0
-    failed_emails: list[str] = []
-
-    for i, recipient in enumerate(emails):
-        try:
-            result = brevo_service.send_email(
-                to_email=recipient,
-                subject=subject,
-                html_content=html_body,
-                tags=['bulk-email', 'prospection'],
-            )
-
-            if result.get('success'):
-                success_count += 1
-                logger.info("[%d/%d] Email envoyé à %s", i + 1, len(emails), recipient)
-            else:
-                failed_emails.append(recipient)
-                logger.error(
-                    "[%d/%d] Échec envoi à %s: %s",
-                    i + 1, len(emails), recipient, result.get('error'),
-                )
-
-            # Delay between sends to avoid rate limits
-            if i < len(emails) - 1 and delay_seconds > 0:
-                time.sleep(delay_seconds)
-
-        except Exception as e:
-            failed_emails.append(recipient)
-            logger.error("Erreur envoi à %s: %s", recipient, e)
-
-    # Record campaign in EmailComposition for history
     try:
-        user = User.objects.get(pk=user_id)
-    except User.DoesNotExist:
-        user = None
-
-    EmailComposition.objects.create(
-        to_emails=', '.join(emails[:10]) + (f'... (+{len(emails) - 10})' if len(emails) > 10 else ''),
-        subject=f"[BULK x{len(emails)}] {subject}",
-        body_html=body_html_raw,
-        template_id=template_id if template_id else None,
-        is_draft=False,
-        sent_at=timezone.now(),
-        created_by=user,
-    )
+        run = BulkEmailRun.objects.get(pk=run_id)
+    except BulkEmailRun.DoesNotExist:
+        logger.error("Envoi en masse #%d introuvable", run_id)
+        return {'error': 'Run not found'}
+
+    done = run.status == BulkEmailRun.Status.DONE or deliver_run(run)
+    if not done and run.results.filter(status=BulkEmailResult.Status.PENDING).exists():
+        from core.tasks import async_send_bulk_email_run
+        logger.info("Envoi en masse #%d: budget de temps atteint, reprise en tâche de fond", run.pk)
+        async_send_bulk_email_run(run.pk)
+    elif not done:
+        from core.tasks import schedule_bulk_email_run_retry
+        run_at = lease_expiry(run)
+        logger.info("Envoi en masse #%d: envois réservés ailleurs, reprise planifiée à %s", run.pk, run_at)
+        schedule_bulk_email_run_retry(run.pk, run_at)
+    else:
+        logger.info(
+            "Bulk email terminé: %d/%d envoyés, %d échecs",
+            run.sent_count, run.total, run.failed_count,
+        )
+
+    failed = run.results.filter(status=BulkEmailResult.Status.FAILED)
+    return {
+        'total': run.total,
+        'success': run.sent_count,
+        'failed': list(failed.values_list('email', flat=True)),
+        'run_id': run.pk,
+    }
 
-    logger.info(
-        "Bulk email terminé: %d/%d envoyés, %d échecs",
-        success_count, len(emails), len(failed_emails),
-    )
 
+def _site_url() -> str:
+    site_url = str(getattr(settings, 'SITE_URL', 'https://www.traitdunion.it')).rstrip('/')
+    if 'localhost' in site_url or '127.0.0.1' in site_url:
+        site_url = 'https://www.traitdunion.it'
+    return site_url
+
+
+def _campaign_summary(campaign) -> dict:
+    from .models import NewsletterDelivery
+
+    failed = campaign.deliveries.filter(status=NewsletterDelivery.Status.FAILED)
     return {
-        'total': len(emails),
-        'success': success_count,
-        'failed': failed_emails,
+        'total': campaign.recipients_count,
+        'success': campaign.sent_count,
+        'failed': list(failed.values_list('email', flat=True)),
+        'campaign_id': campaign.pk,
     }
 
 
+def _run_campaign(campaign) -> dict:
+    """Matérialise les destinataires puis envoie (ou reprend) la campagne.
+
+    Si le budget de temps est épuisé avant la fin, la suite repart dans une
+    nouvelle tâche : la progression est dans ``NewsletterDelivery``. S'il ne
+    reste que des lignes SENDING (lot en vol chez un autre worker), une
+    seule reprise est planifiée à l'expiration du bail : se relancer aussitôt
+    bouclerait sans rien réserver (récursion avec le repli synchrone de
+    ``core.tasks._dispatch``).
+    """
+    from .models import NewsletterCampaign, NewsletterDelivery
+    from .newsletter import deliver_campaign, lease_expiry, materialise
+
+    if campaign.status != NewsletterCampaign.Status.SENDING:
+        campaign.status = NewsletterCampaign.Status.SENDING
+        campaign.save(update_fields=['status'])
+    materialise(campaign)
+
+    done = deliver_campaign(campaign)
+    if not done and campaign.deliveries.filter(status=NewsletterDelivery.Status.PENDING).exists():
+        from core.tasks import async_send_newsletter_campaign
+        logger.info("Newsletter #%d: budget de temps atteint, reprise en tâche de fond", campaign.pk)
+        async_send_newsletter_campaign(campaign.pk)
+    elif not done:
+        from core.tasks import schedule_newsletter_campaign_retry
+        run_at = lease_expiry(campaign)
+        logger.info("Newsletter #%d: lot en vol ailleurs, reprise planifiée à %s", campaign.pk, run_at)
+        schedule_newsletter_campaign_retry(campaign.pk, run_at)
+    else:
+        logger.info(
+            "Newsletter #%d envoyée: %d/%d OK, %d échecs",
+            campaign.pk, campaign.sent_count, campaign.recipients_count, campaign.failed_count,
+        )
+    return _campaign_summary(campaign)
+
+
 def send_newsletter_campaign_task(campaign_id: int) -> dict:
-    """Envoie une campagne newsletter à tous les abonnés actifs.
+    """Envoie (ou reprend) une campagne newsletter à tous les abonnés actifs.
 
     Appelé via django-q2 async_task depuis l'admin.
-    Chaque abonné reçoit un email individuel avec lien de désinscription.
-    Délai de 1s entre chaque envoi pour respecter les limites Brevo.
+    Chaque abonné reçoit un email individuel avec lien de désinscription,
+    envoyé par lots Brevo (un appel API pour jusqu'à 1000 abonnés).
+    Idempotent : un retry ou plusieurs workers simultanés reprennent les
+    destinataires encore PENDING, sans double envoi.
     """
-    from core.services.email_backends import brevo_service
-    from .models import EmailSubscriber, NewsletterCampaign
+    from .models import NewsletterCampaign
+    from .newsletter import render_once
 
     try:
         campaign = NewsletterCampaign.objects.get(pk=campaign_id)
@@ -108,91 +152,34 @@ def send_newsletter_campaign_task(campaign_id: int) -> dict:
         logger.error("Campagne newsletter #%d introuvable", campaign_id)
         return {'error': 'Campaign not found'}
 
-    campaign.status = NewsletterCampaign.Status.SENDING
-    campaign.save(update_fields=['status'])
-
-    subscribers = EmailSubscriber.objects.filter(is_active=True).values_list('email', flat=True)
-    emails = list(subscribers)
-    campaign.recipients_count = len(emails)
-    campaign.save(update_fields=['recipients_count'])
-
-    if not emails:
-        campaign.status = NewsletterCampaign.Status.SENT
-        campaign.sent_at = timezone.now()
-        campaign.save(update_fields=['status', 'sent_at'])
-        return {'total': 0, 'success': 0, 'failed': []}
-
-    # Build HTML with premium template + unsubscribe link
-    branding = getattr(settings, 'INVOICE_BRANDING', {})
-    site_url = str(getattr(settings, 'SITE_URL', 'https://www.traitdunion.it')).rstrip('/')
-    if 'localhost' in site_url or '127.0.0.1' in site_url:
-        site_url = 'https://www.traitdunion.it'
-
-    success_count = 0
-    failed_emails = []
-
-    for i, email in enumerate(emails):
-        # Personalized unsubscribe link per recipient (HMAC-signed)
-        from .models import make_unsubscribe_url
-        unsub_url = make_unsubscribe_url(email)
+    if campaign.status == NewsletterCampaign.Status.SENT:
+        return _campaign_summary(campaign)
 
-        html_body = render_to_string('emails/newsletter_campaign.html', {
+    if not campaign.rendered_html:
+        # Rendu unique (placeholders Brevo par abonné), figé pour les reprises
+        campaign.rendered_html = render_once('emails/newsletter_campaign.html', {
             'subject': campaign.subject,
             'body_content': campaign.body_html,
-            'branding': branding,
-            'site_url': site_url,
-            'unsubscribe_url': unsub_url,
-            'email': email,
+            'branding': getattr(settings, 'INVOICE_BRANDING', {}),
+            'site_url': _site_url(),
         })
+        campaign.tags = ['newsletter', f'campaign-{campaign.pk}']
+        campaign.save(update_fields=['rendered_html', 'tags'])
 
-        try:
-            result = brevo_service.send_email(
-                to_email=email,
-                subject=campaign.subject,
-                html_content=html_body,
-                tags=['newsletter', f'campaign-{campaign.pk}'],
-            )
-            if result.get('success'):
-                success_count += 1
-            else:
-                failed_emails.append(email)
-                logger.error("Newsletter #%d: échec envoi à %s: %s", campaign.pk, email, result.get('error'))
-        except Exception as e:
-            failed_emails.append(email)
-            logger.error("Newsletter #%d: erreur envoi à %s: %s", campaign.pk, email, e)
-
-        # Throttle
-        if i < len(emails) - 1:
-            time.sleep(0.2)
-
-    # Update campaign
-    campaign.sent_count = success_count
-    campaign.failed_count = len(failed_emails)
-    campaign.status = NewsletterCampaign.Status.SENT if not failed_emails else NewsletterCampaign.Status.SENT
-    campaign.sent_at = timezone.now()
-    campaign.save(update_fields=['sent_count', 'failed_count', 'status', 'sent_at'])
-
-    logger.info(
-        "Newsletter #%d envoyée: %d/%d OK, %d échecs",
-        campaign.pk, success_count, len(emails), len(failed_emails),
-    )
-
-    return {
-        'total': len(emails),
-        'success': success_count,
-        'failed': failed_emails,
-    }
+    return _run_campaign(campaign)
 
 
 def send_article_as_newsletter_task(article_id: int) -> dict:
     """Envoie un article des Chroniques TUS comme newsletter à tous les abonnés actifs.
 
-    Crée automatiquement une NewsletterCampaign pour le suivi.
-    Chaque abonné reçoit un email individuel avec lien de désinscription signé.
+    Crée automatiquement une NewsletterCampaign pour le suivi (et la reprise,
+    cf. ``send_newsletter_campaign_task``).
+    Chaque abonné reçoit un email individuel avec lien de désinscription signé,
+    envoyé par lots Brevo (cf. ``newsletter.py``).
     """
-    from core.services.email_backends import brevo_service
     from apps.chroniques.models import Article
-    from .models import EmailSubscriber, NewsletterCampaign, make_unsubscribe_url
+    from .models import NewsletterCampaign
+    from .newsletter import render_once
 
     try:
         article = Article.objects.get(pk=article_id)
@@ -200,27 +187,7 @@ def send_article_as_newsletter_task(article_id: int) -> dict:
         logger.error("Article #%d introuvable pour newsletter", article_id)
         return {'error': 'Article not found'}
 
-    # Create campaign for tracking
-    campaign = NewsletterCampaign.objects.create(
-        subject=f"📰 {article.title}",
-        body_html=article.excerpt or article.title,
-        status=NewsletterCampaign.Status.SENDING,
-    )
-
-    subscribers = list(EmailSubscriber.objects.filter(is_active=True).values_list('email', flat=True))
-    campaign.recipients_count = len(subscribers)
-    campaign.save(update_fields=['recipients_count'])
-
-    if not subscribers:
-        campaign.status = NewsletterCampaign.Status.SENT
-        campaign.sent_at = timezone.now()
-        campaign.save(update_fields=['status', 'sent_at'])
-        return {'total': 0, 'success': 0, 'failed': []}
-
-    site_url = str(getattr(settings, 'SITE_URL', 'https://www.traitdunion.it')).rstrip('/')
-    if 'localhost' in site_url or '127.0.0.1' in site_url:
-        site_url = 'https://www.traitdunion.it'
-
+    site_url = _site_url()
     article_url = f"{site_url}{article.get_absolute_url()}"
 
     # Cover image URL
@@ -232,55 +199,20 @@ def send_article_as_newsletter_task(article_id: int) -> dict:
         else:
             cover_image_url = f"{site_url}{cover_url}"
 
-    success_count = 0
-    failed_emails = []
-
-    for i, email in enumerate(subscribers):
-        unsub_url = make_unsubscribe_url(email)
-
-        html_body = render_to_string('emails/newsletter_article.html', {
+    # Create campaign for tracking
+    campaign = NewsletterCampaign.objects.create(
+        subject=f"📰 {article.title}",
+        body_html=article.excerpt or article.title,
+        status=NewsletterCampaign.Status.SENDING,
+        rendered_html=render_once('emails/newsletter_article.html', {
             'title': article.title,
             'subtitle': article.subtitle or '',
             'category': article.category.name if article.category else '',
             'excerpt': article.excerpt or article.meta_description or article.title,
             'cover_image_url': cover_image_url,
             'article_url': article_url,
-            'unsubscribe_url': unsub_url,
             'site_url': site_url,
-        })
-
-        try:
-            result = brevo_service.send_email(
-                to_email=email,
-                subject=f"📰 {article.title}",
-                html_content=html_body,
-                tags=['newsletter', 'article', f'article-{article.slug}'],
-            )
-            if result.get('success'):
-                success_count += 1
-            else:
-                failed_emails.append(email)
-        except Exception as e:
-            failed_emails.append(email)
-            logger.error("Newsletter article: erreur envoi à %s: %s", email, e)
-
-        if i < len(subscribers) - 1:
-            time.sleep(0.2)
-
-    campaign.sent_count = success_count
-    campaign.failed_count = len(failed_emails)
-    campaign.status = NewsletterCampaign.Status.SENT
-    campaign.sent_at = timezone.now()
-    campaign.save(update_fields=['sent_count', 'failed_count', 'status', 'sent_at'])
-
-    logger.info(
-        "Newsletter article '%s': %d/%d OK, %d échecs",
-        article.title, success_count, len(subscribers), len(failed_emails),
+        }),
+        tags=['newsletter', 'article', f'article-{article.slug}'],
     )
-
-    return {
-        'total': len(subscribers),
-        'success': success_count,
-        'failed': failed_emails,
-        'campaign_id': campaign.pk,
-    }
+    return _run_campaign(campaign)
@@ -0,0 +1,214 @@
+"""Tests for bulk prospecting emails (leads app).
+
+Covers:
+- AIMD concurrency window (additive increase, multiplicative decrease)
+- Per-recipient results persisted, counters and run status
+- 429 responses retried, non-retryable failures recorded once
+- Re-running a task resumes without re-sending
+- Recipients claimed before sending (killed / concurrent tasks never re-send)
+- Limiter wait bounded by the time budget
+- Staff-only live progress endpoint
+"""
+import time
+
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.leads.email_models import BulkEmailResult, BulkEmailRun
+
+FAST = {'BACKOFF': 0, 'COOLDOWN': 0, 'FLUSH_EVERY': 3, 'MAX_CONCURRENCY': 4}
+
+
+@pytest.fixture
+def staff_user(db):
+    return get_user_model().objects.create_user(
+        username='staff', email='staff@example.com', password='x', is_staff=True,
+    )
+
+
+def _run(user, count=7):
+    from apps.leads.bulk_sender import create_run
+
+    emails = [f'prospect{i}@example.com' for i in range(count)]
+    return create_run(emails, subject='Bonjour', html_body='<p>x</p>', body_html_raw='<p>x</p>', user=user)
+
+
+class TestAimdWindow:
+    def test_increase_and_decrease(self):
+        from apps.leads.bulk_sender import AimdWindow
+
+        window = AimdWindow(2, 1, 8, cooldown=0)
+        for _ in range(4):
+            window.acquire()
+            window.release(congested=False)
+        assert window.limit > 3
+        before = window.limit
+        window.acquire()
+        window.release(congested=True)
+        assert window.limit == pytest.approx(before / 2)
+
+    def test_single_decrease_per_cooldown(self):
+        from apps.leads.bulk_sender import AimdWindow
+
+        window = AimdWindow(8, 1, 8, cooldown=60)
+        for _ in range(3):
+            window.acquire()
+            window.release(congested=True)
+        assert window.limit == 4
+
+
+@pytest.mark.django_db
+class TestBulkEmailRun:
+    @override_settings(BULK_EMAIL_SENDING=FAST)
+    def test_results_persisted_per_recipient(self, staff_user):
+        from apps.leads.tasks import send_bulk_run_task
+
+        run = _run(staff_user)
+
+        def fake_send(**kwargs):
+            if kwargs['to_email'] == 'prospect3@example.com':
+                return {'success': False, 'error': 'Adresse invalide', 'status_code': 400}
+            return {'success': True, 'message_id': f"<{kwargs['to_email']}>"}
+
+        with patch('core.services.email_backends.brevo_service.send_email', side_effect=fake_send) as send:
+            summary = send_bulk_run_task(run.pk)
+
+        assert send.call_count == 7
+        assert all(call.kwargs['lane'] == 'bulk' for call in send.call_args_list)
+        assert summary['success'] == 6
+        assert summary['failed'] == ['prospect3@example.com']
+        run.refresh_from_db()
+        assert run.status == BulkEmailRun.Status.DONE
+        assert (run.sent_count, run.failed_count) == (6, 1)
+        assert run.composition.subject == '[BULK x7] Bonjour'
+        failed = run.results.get(status=BulkEmailResult.Status.FAILED)
+        assert (failed.status_code, failed.attempts, failed.error) == (400, 1, 'Adresse invalide')
+        assert run.results.get(email='prospect0@example.com').message_id == '<prospect0@example.com>'
+
+    @override_settings(BULK_EMAIL_SENDING=FAST)
+    def test_throttled_recipient_is_retried(self, staff_user):
+        from apps.leads.tasks import send_bulk_run_task
+
+        run = _run(staff_user, count=1)
+        responses = [
+            {'success': False, 'error': 'Too Many Requests', 'status_code': 429},
+            {'success': True, 'message_id': '<ok>'},
+        ]
+        with patch('core.services.email_backends.brevo_service.send_email', side_effect=responses):
+            send_bulk_run_task(run.pk)
+
+        result = run.results.get()
+        assert (result.status, result.attempts) == (BulkEmailResult.Status.SENT, 2)
+
+    @override_settings(BULK_EMAIL_SENDING=FAST)
+    def test_rerun_skips_recipients_with_a_result(self, staff_user):
+        from apps.leads.tasks import send_bulk_run_task
+
+        run = _run(staff_user, count=4)
+        run.results.filter(email='prospect0@example.com').update(status=BulkEmailResult.Status.SENT)
+        BulkEmailRun.objects.filter(pk=run.pk).update(sent_count=1, status=BulkEmailRun.Status.RUNNING)
+
+        with patch('core.services.email_backends.brevo_service.send_email',
+                   return_value={'success': True, 'message_id': '<x>'}) as send:
+            send_bulk_run_task(run.pk)
+
+        assert sorted(c.kwargs['to_email'] for c in send.call_args_list) == [
+            'prospect1@example.com', 'prospect2@example.com', 'prospect3@example.com',
+        ]
+        run.refresh_from_db()
+        assert (run.sent_count, run.status) == (4, BulkEmailRun.Status.DONE)
+
+    def test_run_creates_one_pending_row_per_recipient(self, staff_user):
+        run = _run(staff_user, count=3)
+        assert run.results.filter(status=BulkEmailResult.Status.PENDING).count() == 3
+
+    @override_settings(BULK_EMAIL_SENDING=FAST)
+    def test_recipients_claimed_by_another_task_are_not_sent(self, staff_user):
+        from apps.leads.bulk_sender import claim, deliver_run
+
+        run = _run(staff_user, count=5)
+        taken = {row.email for row in claim(run, 2)}
+
+        with patch('core.services.email_backends.brevo_service.send_email',
+                   return_value={'success': True, 'message_id': '<x>'}) as send:
+            assert deliver_run(run) is False
+
+        sent = {c.kwargs['to_email'] for c in send.call_args_list}
+        assert len(sent) == 3 and not sent & taken
+        assert run.results.filter(status=BulkEmailResult.Status.SENDING).count() == 2
+
+    @override_settings(BULK_EMAIL_SENDING={**FAST, 'LEASE_SECONDS': 600})
+    def test_killed_task_rows_fail_instead_of_being_resent(self, staff_user):
+        from apps.leads.bulk_sender import claim
+        from apps.leads.tasks import send_bulk_run_task
+
+        run = _run(staff_user, count=3)
+        # Worker tué après la réservation : l'email a pu partir.
+        claim(run, 1)
+        run.results.filter(status=BulkEmailResult.Status.SENDING).update(
+            claimed_at=timezone.now() - timedelta(hours=1),
+        )
+
+        with patch('core.services.email_backends.brevo_service.send_email',
+                   return_value={'success': True, 'message_id': '<x>'}) as send:
+            send_bulk_run_task(run.pk)
+
+        assert send.call_count == 2
+        run.refresh_from_db()
+        assert (run.sent_count, run.failed_count, run.status) == (2, 1, BulkEmailRun.Status.DONE)
+        assert 'non renvoyé' in run.results.get(status=BulkEmailResult.Status.FAILED).error
+
+    @override_settings(BULK_EMAIL_SENDING=FAST)
+    def test_rows_in_flight_elsewhere_schedule_a_single_retry(self, staff_user):
+        from apps.leads.bulk_sender import claim
+        from apps.leads.tasks import send_bulk_run_task
+
+        run = _run(staff_user, count=1)
+        claim(run, 1)
+        with patch('core.services.email_backends.brevo_service.send_email') as send, \
+                patch('core.tasks.schedule_bulk_email_run_retry') as retry, \
+                patch('core.tasks.async_send_bulk_email_run') as resume:
+            send_bulk_run_task(run.pk)
+
+        send.assert_not_called()
+        resume.assert_not_called()
+        assert retry.call_args.args[0] == run.pk
+
+    @override_settings(BULK_EMAIL_SENDING=FAST)
+    def test_limiter_wait_is_bounded_by_the_time_budget(self, staff_user):
+        from apps.leads.bulk_sender import deliver_run
+
+        run = _run(staff_user, count=2)
+        def saturated(**kwargs):
+            # Le limiteur attend jusqu'au délai accordé puis refuse le jeton.
+            time.sleep(kwargs['limiter_timeout'])
+            return {'success': False, 'error': 'Débit Brevo saturé', 'status_code': 429, 'throttled': True}
+
+        with patch('core.services.email_backends.brevo_service.send_email', side_effect=saturated) as send:
+            assert deliver_run(run, time_budget=0.05) is False
+
+        assert all(0 <= c.kwargs['limiter_timeout'] <= 0.05 for c in send.call_args_list)
+        # Rien n'est parti : les destinataires restent à envoyer.
+        assert run.results.filter(status=BulkEmailResult.Status.PENDING).count() == 2
+        assert (run.sent_count, run.failed_count) == (0, 0)
+
+    def test_progress_endpoint_is_staff_only(self, client, staff_user):
+        run = _run(staff_user, count=4)
+        BulkEmailRun.objects.filter(pk=run.pk).update(sent_count=1, failed_count=1)
+        url = reverse('admin_emails:bulk_email_progress', args=[run.pk])
+
+        assert client.get(url).status_code == 302
+        client.force_login(staff_user)
+        data = client.get(url).json()
+        assert (data['processed'], data['total'], data['percent'], data['done']) == (2, 4, 50, False)
+
+    def test_bulk_page_shows_run_progress(self, client, staff_user):
+        run = _run(staff_user, count=2)
+        client.force_login(staff_user)
+        response = client.get(f"{reverse('admin_emails:bulk_email')}?run={run.pk}")
+        assert reverse('admin_emails:bulk_email_progress', args=[run.pk]) in response.content.decode()
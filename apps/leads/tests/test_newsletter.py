@@ -0,0 +1,189 @@
+"""Tests for newsletter sending (leads app).
+
+Covers:
+- Campaign template rendered once, per-recipient values as Brevo params
+- Subscribers split into batches of at most BATCH_SIZE
+- A failed batch only fails its own recipients
+- BrevoEmailService.send_batch payload (messageVersions)
+- Per-recipient delivery rows: resume after a killed worker, no double send
+- Rows still in flight: one delayed retry, no immediate re-enqueue
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from django.test import override_settings
+
+from apps.leads.models import EmailSubscriber, NewsletterCampaign, make_unsubscribe_url
+
+
+@pytest.fixture
+def subscribers(db):
+    EmailSubscriber.objects.bulk_create(
+        EmailSubscriber(email=f'abonne{i}@example.com') for i in range(25)
+    )
+    return sorted(EmailSubscriber.objects.values_list('email', flat=True))
+
+
+@pytest.mark.django_db
+class TestNewsletterBatchSending:
+    @override_settings(NEWSLETTER_SENDING={'BATCH_SIZE': 10, 'CONCURRENCY': 2})
+    def test_campaign_sent_in_batches_with_params(self, subscribers):
+        from apps.leads.tasks import send_newsletter_campaign_task
+
+        campaign = NewsletterCampaign.objects.create(subject='Nouveautés', body_html='<p>Bonjour</p>')
+        with patch('core.services.email_backends.brevo_service.send_batch',
+                   return_value={'success': True, 'message_ids': []}) as send_batch:
+            result = send_newsletter_campaign_task(campaign.pk)
+
+        assert sorted(len(call.kwargs['versions']) for call in send_batch.call_args_list) == [5, 10, 10]
+        html_bodies = {call.kwargs['html_content'] for call in send_batch.call_args_list}
+        assert len(html_bodies) == 1
+        assert '{{ params.unsubscribe_url }}' in html_bodies.pop()
+        versions = [v for call in send_batch.call_args_list for v in call.kwargs['versions']]
+        assert sorted(v['to'] for v in versions) == subscribers
+        first = versions[0]
+        assert first['params']['unsubscribe_url'] == make_unsubscribe_url(first['to'])
+
+        assert result['success'] == 25
+        campaign.refresh_from_db()
+        assert (campaign.sent_count, campaign.failed_count) == (25, 0)
+        assert campaign.status == NewsletterCampaign.Status.SENT
+
+    @override_settings(NEWSLETTER_SENDING={'BATCH_SIZE': 10, 'CONCURRENCY': 1})
+    def test_failed_batch_only_fails_its_recipients(self, subscribers):
+        from apps.leads.tasks import send_newsletter_campaign_task
+
+        campaign = NewsletterCampaign.objects.create(subject='Nouveautés', body_html='<p>Bonjour</p>')
+        results = [
+            {'success': True, 'message_ids': []},
+            {'success': False, 'error': 'HTTP 500'},
+            {'success': True, 'message_ids': []},
+        ]
+        with patch('core.services.email_backends.brevo_service.send_batch', side_effect=results):
+            result = send_newsletter_campaign_task(campaign.pk)
+
+        assert result['success'] == 15
+        assert len(result['failed']) == 10
+        campaign.refresh_from_db()
+        assert campaign.failed_count == 10
+
+
+class TestBrevoSendBatch:
+    @override_settings(BREVO_API_KEY='test-key')
+    def test_message_versions_payload(self):
+        from core.services.email_backends import BrevoEmailService
+
+        service = BrevoEmailService()
+        service._api_instance = MagicMock()
+        service._api_instance.send_transac_email.return_value = MagicMock(message_ids=['<a>', '<b>'])
+
+        result = service.send_batch(
+            'Sujet', '<a href="{{ params.unsubscribe_url }}">x</a>',
+            [{'to': 'a@example.com', 'params': {'unsubscribe_url': 'u1'}},
+             {'to': 'b@example.com', 'params': {'unsubscribe_url': 'u2'}}],
+            tags=['newsletter'],
+        )
+
+        assert result == {'success': True, 'message_ids': ['<a>', '<b>']}
+        payload = service._api_instance.send_transac_email.call_args.args[0]
+        assert [v.to[0].email for v in payload.message_versions] == ['a@example.com', 'b@example.com']
+        assert payload.message_versions[1].params == {'unsubscribe_url': 'u2'}
+
+    def test_rejects_more_than_api_maximum(self):
+        from core.services.email_backends import BrevoEmailService
+
+        service = BrevoEmailService()
+        with pytest.raises(ValueError):
+            service.send_batch('Sujet', '<p></p>', [{'to': f'{i}@x.fr'} for i in range(1001)])
+
+
+@pytest.mark.django_db
+class TestNewsletterDeliveryResume:
+    @override_settings(NEWSLETTER_SENDING={'BATCH_SIZE': 10, 'CONCURRENCY': 1})
+    def test_interrupted_campaign_resumes_without_double_send(self, subscribers):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.leads.models import NewsletterDelivery
+        from apps.leads.newsletter import claim, materialise
+        from apps.leads.tasks import send_newsletter_campaign_task
+
+        campaign = NewsletterCampaign.objects.create(
+            subject='Reprise', body_html='<p>x</p>', status=NewsletterCampaign.Status.SENDING,
+            rendered_html='<p>{{ params.unsubscribe_url }}</p>',
+        )
+        assert materialise(campaign) == 25
+        # Worker tué après avoir réservé un lot : lignes SENDING orphelines.
+        orphans = claim(campaign, 10)
+        NewsletterDelivery.objects.filter(pk__in=[d.pk for d in orphans]).update(
+            claimed_at=timezone.now() - timedelta(hours=1),
+        )
+
+        with patch('core.services.email_backends.brevo_service.send_batch',
+                   return_value={'success': True, 'message_ids': []}) as send_batch:
+            result = send_newsletter_campaign_task(campaign.pk)
+            again = send_newsletter_campaign_task(campaign.pk)
+
+        sent_to = [v['to'] for call in send_batch.call_args_list for v in call.kwargs['versions']]
+        assert len(sent_to) == len(set(sent_to)) == 15
+        assert not set(sent_to) & {d.email for d in orphans}
+        assert result['success'] == again['success'] == 15
+        assert sorted(result['failed']) == sorted(d.email for d in orphans)
+        campaign.refresh_from_db()
+        assert campaign.status == NewsletterCampaign.Status.SENT
+        assert (campaign.recipients_count, campaign.sent_count, campaign.failed_count) == (25, 15, 10)
+
+    @override_settings(NEWSLETTER_SENDING={'BATCH_SIZE': 10, 'CONCURRENCY': 1})
+    def test_claimed_rows_are_not_claimed_twice(self, subscribers):
+        from apps.leads.newsletter import claim, materialise
+
+        campaign = NewsletterCampaign.objects.create(subject='x', body_html='x')
+        materialise(campaign)
+        first, second = claim(campaign, 20), claim(campaign, 20)
+        assert len(first) == 20 and len(second) == 5
+        assert not {d.pk for d in first} & {d.pk for d in second}
+        assert all(d.attempts == 1 for d in first + second)
+
+    @override_settings(NEWSLETTER_SENDING={'LEASE_SECONDS': 600})
+    def test_rows_in_flight_schedule_one_delayed_retry(self, db):
+        from datetime import timedelta
+        from django.utils import timezone
+        from django_q.models import Schedule
+        from apps.leads.models import NewsletterDelivery
+        from apps.leads.tasks import send_newsletter_campaign_task
+
+        EmailSubscriber.objects.create(email='seul@example.com')
+        campaign = NewsletterCampaign.objects.create(
+            subject='En vol', body_html='x', status=NewsletterCampaign.Status.SENDING, rendered_html='x',
+        )
+        claimed_at = timezone.now() - timedelta(seconds=60)
+        NewsletterDelivery.objects.create(
+            campaign=campaign, email='seul@example.com',
+            status=NewsletterDelivery.Status.SENDING, claimed_at=claimed_at,
+        )
+
+        # Sans qcluster, _dispatch est synchrone : une relance immédiate récursait.
+        with patch('core.tasks._is_qcluster_running', return_value=False), \
+                patch('core.tasks.async_send_newsletter_campaign') as requeue, \
+                patch('core.services.email_backends.brevo_service.send_batch') as send_batch:
+            send_newsletter_campaign_task(campaign.pk)
+            send_newsletter_campaign_task(campaign.pk)
+
+        requeue.assert_not_called()
+        send_batch.assert_not_called()
+        retry = Schedule.objects.get(name=f'newsletter_{campaign.pk}_retry')
+        assert retry.next_run == claimed_at + timedelta(seconds=600)
+        assert retry.schedule_type == Schedule.ONCE
+
+    def test_resume_action_queues_the_campaign(self, subscribers, rf):
+        from django.contrib.admin.sites import site
+        from apps.leads.admin import NewsletterCampaignAdmin
+
+        campaign = NewsletterCampaign.objects.create(
+            subject='Reprise', body_html='x', status=NewsletterCampaign.Status.SENDING,
+        )
+        model_admin = NewsletterCampaignAdmin(NewsletterCampaign, site)
+        with patch('core.tasks.async_send_newsletter_campaign') as queue, \
+                patch.object(model_admin, 'message_user'), \
+                patch('apps.leads.tasks.send_newsletter_campaign_task') as inline:
+            model_admin.action_resume_campaign(rf.post('/'), NewsletterCampaign.objects.filter(pk=campaign.pk))
+        queue.assert_called_once_with(campaign.pk)
+        inline.assert_not_called()
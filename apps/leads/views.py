@@ -130,25 +130,15 @@ def newsletter_subscribe(request: HttpRequest) -> HttpResponse:
     """
     from django.core.validators import validate_email
     from django.core.exceptions import ValidationError as DjangoValidationError
-    from django.core.cache import cache as _cache
+    from core.ratelimit import hit
     from .models import EmailSubscriber
 
-    # Rate limit
-    ip = get_client_ip(request)
-    cache_key = f"ratelimit:newsletter:{ip}"
-    try:
-        count = _cache.get(cache_key, 0)
-        if count >= 5:
-            return HttpResponse(
-                '<p class="text-amber-400 text-sm">Trop de tentatives. Réessayez plus tard.</p>',
-                status=429,
-            )
-        try:
-            _cache.incr(cache_key)
-        except ValueError:
-            _cache.set(cache_key, 1, 3600)
-    except Exception:
-        pass
+    # Rate limit (atomique ; reste appliqué si le cache tombe, cf. core.ratelimit)
+    if not hit('newsletter', get_client_ip(request), limit=5, period=3600).allowed:
+        return HttpResponse(
+            '<p class="text-amber-400 text-sm">Trop de tentatives. Réessayez plus tard.</p>',
+            status=429,
+        )
 
     email = request.POST.get('email', '').strip().lower()
     source = request.POST.get('source', 'footer')
@@ -1,5 +1,6 @@
 """Admin configuration for the messaging app."""
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
@@ -204,6 +205,18 @@ class EmailCampaignAdmin(admin.ModelAdmin):
     
     inlines = [CampaignRecipientInline]
     
+    STATUS_LABELS = {
+        'draft': 'Brouillon',
+        'scheduled': 'Planifiée',
+        'sending': 'En cours',
+        'sent': 'Envoyée',
+        'paused': 'En pause',
+    }
+    
+    def get_queryset(self, request):
+        # Un COUNT par campagne dans la changelist → une seule agrégation
+        return super().get_queryset(request).annotate(_recipient_count=Count('recipients'))
+    
     def status_badge(self, obj):
         """Display status as a colored badge."""
         colors = {
@@ -218,14 +231,16 @@ class EmailCampaignAdmin(admin.ModelAdmin):
             '<span style="background-color: {}; color: white; padding: 4px 8px; '
             'border-radius: 4px; font-size: 11px;">{}</span>',
             color,
-            obj.get_status_display()
+            self.STATUS_LABELS.get(obj.status, obj.status)
         )
     status_badge.short_description = 'Statut'
     
     def recipient_count(self, obj):
         """Display recipient count."""
-        return obj.recipients.count()
+        count = getattr(obj, '_recipient_count', None)
+        return obj.recipients.count() if count is None else count
     recipient_count.short_description = 'Destinataires'
+    recipient_count.admin_order_field = '_recipient_count'
     
     def stats_display(self, obj):
         """Display campaign stats."""
@@ -256,6 +271,7 @@ class ProspectMessageAdmin(admin.ModelAdmin):
     search_fields = ['subject', 'content', 'prospect__email', 'prospect__contact_name']
     date_hierarchy = 'created_at'
     raw_id_fields = ['prospect']
+    list_select_related = ['prospect']
     
     def direction_icon(self, obj):
         """Display direction as an icon."""
@@ -117,6 +117,13 @@ def dashboard_view(request):
     overdue_amount = overdue_invoices.aggregate(
         total=Sum('total_ttc')
     )['total'] or Decimal('0')
+
+    # Balance âgée (lignes client en cache, invalidées à chaque paiement)
+    from apps.factures.services.receivables import BUCKETS, aged_receivables
+    receivables = aged_receivables(today)
+    receivables_buckets = [
+        (label, receivables['totals'][key]) for key, label, *_ in BUCKETS
+    ]
     
     # ===================
     # Projets actifs
@@ -202,6 +209,8 @@ def dashboard_view(request):
         'overdue_count': overdue_count,
         'overdue_amount': overdue_amount,
         'active_projects': active_projects,
+        'receivables_total': receivables['totals']['total'],
+        'receivables_buckets': receivables_buckets,
         
         # Charts data (for Chart.js)
         'revenue_labels': months_labels,
@@ -0,0 +1,36 @@
+"""Prometheus metrics endpoint (per-route latency, SQL, cache, response sizes)."""
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from core.metrics import render
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _authorized(request) -> bool:
+    """Staff session, or ``Authorization: Bearer <REQUEST_METRICS['TOKEN']>`` for scrapers."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    token = (getattr(settings, 'REQUEST_METRICS', {}) or {}).get('TOKEN')
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and header.startswith('Bearer '):
+        return hmac.compare_digest(header[len('Bearer '):].strip(), token)
+    return False
+
+
+def metrics(request):
+    """Return this worker's metrics in Prometheus text format.
+
+    🛡️ SECURITY: staff only (route names and volumes are internal data).
+    Each Gunicorn worker aggregates its own data; series carry a ``worker``
+    label so successive scrapes of different workers do not overwrite
+    each other.
+    """
+    if not _authorized(request):
+        return HttpResponseForbidden('Forbidden', content_type='text/plain')
+    response = HttpResponse(render(), content_type=PROMETHEUS_CONTENT_TYPE)
+    response['Cache-Control'] = 'no-store'
+    return response
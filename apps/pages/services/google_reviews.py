@@ -273,6 +273,9 @@ def sync_google_reviews(
     try:
         from django.core.cache import cache
         cache.delete("homepage_testimonials")
+        # Les .update() ci-dessus n'émettent pas post_save : pages à périmer ici
+        from core.page_cache import invalidate_tags
+        invalidate_tags("testimonials")
     except Exception:  # pragma: no cover
         pass
 
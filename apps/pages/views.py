@@ -6,11 +6,16 @@ from typing import Any
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 from django.templatetags.static import static
+from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 
+from core.page_cache import anonymous_page_cache
+from core.query_budget import query_budget
 from services.models import Service
 
 
+@method_decorator(anonymous_page_cache('services', 'testimonials', 'portfolio'), name='dispatch')
+@method_decorator(query_budget(4), name='dispatch')
 class HomeView(TemplateView):
     """Landing page of the website.
 
@@ -84,6 +89,7 @@ class HomeView(TemplateView):
         return context
 
 
+@method_decorator(anonymous_page_cache('services'), name='dispatch')
 class ServicesView(TemplateView):
     """Services overview page."""
 
@@ -98,6 +104,7 @@ class ServicesView(TemplateView):
         return context
 
 
+@method_decorator(anonymous_page_cache(), name='dispatch')
 class MethodView(TemplateView):
     """Methodology page describing the five‑step process."""
 
@@ -112,6 +119,7 @@ class MethodView(TemplateView):
         return context
 
 
+@method_decorator(anonymous_page_cache(), name='dispatch')
 class FAQView(TemplateView):
     """FAQ page with breadcrumbs for SEO rich snippets."""
 
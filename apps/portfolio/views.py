@@ -5,11 +5,15 @@ from typing import Any
 
 from django.db.models import QuerySet
 from django.http import HttpRequest
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView
 
+from core.page_cache import anonymous_page_cache
+
 from .models import Project, ProjectType
 
 
+@method_decorator(anonymous_page_cache('portfolio'), name='dispatch')
 class ProjectListView(ListView):
     """List of projects with optional filtering by type."""
 
@@ -40,6 +44,7 @@ class ProjectListView(ListView):
         return context
 
 
+@method_decorator(anonymous_page_cache('portfolio'), name='dispatch')
 class ProjectDetailView(DetailView):
     """Detail page of a single project."""
 
@@ -1,5 +1,6 @@
 """Admin configuration for knowledge base."""
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
 from .models import (
     KnowledgeCategory, KnowledgeArticle, ArticleTag, FAQ,
@@ -19,10 +20,17 @@ class KnowledgeCategoryAdmin(admin.ModelAdmin):
         return f"{obj.icon} {obj.name}"
     icon_name.short_description = "Catégorie"
     
+    def get_queryset(self, request):
+        # Un COUNT par catégorie dans la changelist → une seule agrégation
+        return super().get_queryset(request).annotate(_article_count=Count('articles'))
+
     def article_count(self, obj):
-        count = obj.articles.count()
+        count = getattr(obj, '_article_count', None)
+        if count is None:
+            count = obj.articles.count()
         return format_html('<strong>{}</strong> article(s)', count)
     article_count.short_description = "Articles"
+    article_count.admin_order_field = '_article_count'
 
 
 @admin.register(KnowledgeArticle)
@@ -85,9 +93,17 @@ class ArticleTagAdmin(admin.ModelAdmin):
     search_fields = ['name']
     prepopulated_fields = {'slug': ('name',)}
     
+    def get_queryset(self, request):
+        # Un COUNT par tag dans la changelist → une seule agrégation
+        return super().get_queryset(request).annotate(_article_count=Count('articles'))
+
     def article_count(self, obj):
-        return obj.articles.count()
+        count = getattr(obj, '_article_count', None)
+        if count is None:
+            count = obj.articles.count()
+        return count
     article_count.short_description = "Articles"
+    article_count.admin_order_field = '_article_count'
 
 
 @admin.register(FAQ)
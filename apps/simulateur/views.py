@@ -311,13 +311,8 @@ class ConformiteCheckView(View):
     def _is_rate_limited(self, ip: str) -> bool:
         if not ip:
             return False
-        from django.core.cache import cache
-        key = f"conformite_facture_rl:{ip}"
-        count = cache.get(key, 0)
-        if count >= self.MAX_PER_IP_PER_HOUR:
-            return True
-        cache.set(key, count + 1, 3600)
-        return False
+        from core.ratelimit import hit
+        return not hit('conformite_facture', ip, limit=self.MAX_PER_IP_PER_HOUR, period=3600).allowed
 
 
 # ── Endpoint: capture email + envoi rapport PDF ─────────────
@@ -346,15 +341,7 @@ class ReportSubmitView(View):
                 {'ok': False, 'message': 'Format invalide.'}, status=400,
             )
 
-        # Rate-limit par IP (fenêtre 1h).
         ip = get_client_ip(request)
-        if self._is_rate_limited(ip):
-            logger.warning("Rate limit atteint pour %s (report simulateur)", ip)
-            return JsonResponse(
-                {'ok': False,
-                 'message': 'Trop de demandes. Merci de réessayer plus tard.'},
-                status=429,
-            )
 
         # Honeypot : si rempli, succès factice, rien n'est persisté ni envoyé.
         if payload.get('website'):
@@ -368,6 +355,16 @@ class ReportSubmitView(View):
                 status=400,
             )
 
+        # Rate-limit par IP (fenêtre glissante 1h) : seules les demandes
+        # valides consomment le quota, comme lorsque l'on comptait les rapports.
+        if self._is_rate_limited(ip):
+            logger.warning("Rate limit atteint pour %s (report simulateur)", ip)
+            return JsonResponse(
+                {'ok': False,
+                 'message': 'Trop de demandes. Merci de réessayer plus tard.'},
+                status=429,
+            )
+
         report = form.save(commit=False)
         report.ip_address = ip or None
         report.user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
@@ -489,12 +486,6 @@ class ReportSubmitView(View):
     def _is_rate_limited(self, ip: str) -> bool:
         if not ip:
             return False
-        from datetime import timedelta
-        from django.utils import timezone
-        from .models import SimulatorReport
-        since = timezone.now() - timedelta(hours=1)
-        count = SimulatorReport.objects.filter(
-            ip_address=ip, created_at__gte=since,
-        ).count()
-        return count >= self.MAX_PER_IP_PER_HOUR
+        from core.ratelimit import hit
+        return not hit('simulator_report', ip, limit=self.MAX_PER_IP_PER_HOUR, period=3600).allowed
 
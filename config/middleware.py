@@ -3,7 +3,6 @@ import logging
 import time
 from typing import Any, Callable
 
-from django.core.cache import cache
 from django.http import HttpRequest, HttpResponse
 from django.utils.deprecation import MiddlewareMixin
 from django.utils.http import http_date
@@ -14,54 +13,32 @@ logger = logging.getLogger(__name__)
 
 # 🛡️ SECURITY: Single source of truth for IP extraction (DRY)
 from core.utils import get_client_ip as _get_client_ip  # noqa: E402
+from core.ratelimit import hit as rate_limit_hit  # noqa: E402
+from config.routes import route_of, suspicious_pattern  # noqa: E402
 
 
 class RateLimitMiddleware(MiddlewareMixin):
     """Rate limiting via Django cache backend (multi-process safe).
 
-    Utilise le cache Django (Redis en prod, LocMem en dev) pour compter
-    les soumissions POST par IP dans une fenêtre glissante.
-    Compatible multi-workers gunicorn.
+    Utilise ``core.ratelimit`` (GCRA atomique : script Lua sur Redis en
+    prod, cache local en dev) pour limiter les soumissions POST par IP
+    sur une fenêtre glissante. Compatible multi-workers gunicorn.
 
     Routes protégées :
     - /contact/          → 5 req/heure (anti-spam formulaire)
     - /accounts/login/   → 10 req/heure (anti brute-force)
     - /accounts/signup/  → 5 req/heure (anti création de masse)
-    """
 
-    # (path_prefix, max_requests, window_seconds)
-    RATE_LIMITS: list[tuple[str, int, int]] = [
-        ('/contact/', 5, 3600),
-        ('/accounts/login/', 10, 3600),
-        ('/accounts/signup/', 5, 3600),
-        ('/devis/', 5, 3600),
-        ('/devis/pdf/', 20, 3600),  # 🛡️ Rate limit public PDF downloads (GET)
-        ('/factures/payer/', 10, 3600),  # 🛡️ Rate limit public invoice payment page
-        ('/factures/webhook/', 60, 60),  # 🛡️ Rate limit Stripe webhooks (60/min)
-        ('/tus-gestion-secure/login/', 5, 900),  # 🛡️ Admin login: 5 attempts / 15 min
-    ]
-
-    # Routes also rate-limited on GET (e.g. public PDF downloads)
-    GET_RATE_LIMITS: list[tuple[str, int, int]] = [
-        ('/devis/pdf/', 20, 3600),
-        ('/factures/pdf/', 20, 3600),  # 🛡️ Rate limit public invoice PDF downloads
-    ]
+    Les règles (POST et GET) sont dans ``config.routes.POST_RATE_LIMITS`` /
+    ``GET_RATE_LIMITS``, compilées une fois et classées par requête.
+    """
 
     def process_request(self, request: HttpRequest) -> None | HttpResponse:
-        # Rate-limit GET on specific routes
-        if request.method == 'GET':
-            for path_prefix, max_requests, window_seconds in self.GET_RATE_LIMITS:
-                if request.path.startswith(path_prefix):
-                    return self._check_rate(request, path_prefix, max_requests, window_seconds)
-
-        if request.method != 'POST':
+        rule = route_of(request).rate_rule(request.method)
+        if rule is None:
             return None
-
-        for path_prefix, max_requests, window_seconds in self.RATE_LIMITS:
-            if request.path.startswith(path_prefix):
-                return self._check_rate(request, path_prefix, max_requests, window_seconds)
-
-        return None
+        path_prefix, max_requests, window_seconds = rule
+        return self._check_rate(request, path_prefix, max_requests, window_seconds)
 
     def _check_rate(
         self,
@@ -72,45 +49,20 @@ class RateLimitMiddleware(MiddlewareMixin):
     ) -> None | HttpResponse:
         """Check and enforce rate limit for a given route.
 
-        🛡️ SECURITY: If the cache backend is unavailable (Redis down),
-        fail-open to avoid blocking legitimate traffic.  The Stripe
-        webhook signature and Django CSRF still protect against abuse.
-        Rate limiting is a *defense-in-depth* layer, not the sole gate.
+        Un seul aller-retour atomique (GCRA, cf. ``core.ratelimit``) ; si
+        Redis est indisponible, le limiteur applique des seaux en mémoire
+        par processus : la limite reste active, sans 503.
         """
         # 🛡️ SECURITY: Sanitized IP extraction (see _get_client_ip)
         ip = _get_client_ip(request)
         # Normalise le path prefix pour la clé cache (ex: "contact", "login")
         route_key = path_prefix.strip('/').replace('/', '_')
-        cache_key = f"ratelimit:{route_key}:{ip}"
-
-        try:
-            current = cache.get(cache_key, 0)
-            if current >= max_requests:
-                response = HttpResponse('Too Many Requests', status=429)
-                response['Retry-After'] = str(window_seconds)
-                return response
-
-            # incr() est atomique dans les backends Redis/memcached
-            try:
-                cache.incr(cache_key)
-            except ValueError:
-                # Clé n'existe pas encore → la créer avec TTL
-                cache.set(cache_key, 1, window_seconds)
-        except Exception:
-            # 🛡️ SECURITY: Cache backend unavailable (Redis down) — fail-closed
-            # for sensitive routes, fail-open for everything else.
-            import logging
-            _logger = logging.getLogger('config.middleware')
-            _logger.warning(
-                "Rate limit cache unavailable for %s — applying in-memory fallback", route_key
-            )
-            # Fail-closed on login / contact / signup (block if cache down)
-            _SENSITIVE_ROUTES = {'contact', 'accounts_login', 'accounts_signup', 'tus-gestion-secure_login'}
-            if route_key in _SENSITIVE_ROUTES:
-                response = HttpResponse('Service temporarily unavailable', status=503)
-                response['Retry-After'] = '30'
-                return response
 
+        result = rate_limit_hit(route_key, ip, limit=max_requests, period=window_seconds)
+        if not result.allowed:
+            response = HttpResponse('Too Many Requests', status=429)
+            response['Retry-After'] = str(result.retry_after)
+            return response
         return None
 
 
@@ -137,7 +89,7 @@ class CacheControlMiddleware(MiddlewareMixin):
 
         content_type = response.get('Content-Type', '')
 
-        if request.path.startswith(('/tus-gestion-secure/', '/ecosysteme-tus/', '/accounts/')):
+        if route_of(request).private:
             response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
             # 🛡️ SECURITY: Prevent search engines from indexing admin/portal pages
             response['X-Robots-Tag'] = 'noindex, nofollow, noarchive'
@@ -149,6 +101,8 @@ class CacheControlMiddleware(MiddlewareMixin):
             # otherwise the browser will reject every inline/external script
             # because the nonce in the cached HTML no longer matches the CSP
             # header (silent script-src blocking = empty charts, dead buttons).
+            # Le cache serveur des pages anonymes (core.page_cache) repose un
+            # nonce neuf à chaque rejeu : il ne change rien à cet en-tête.
             response['Cache-Control'] = 'private, no-cache, no-store, max-age=0, must-revalidate'
             if 'Last-Modified' not in response:
                 response['Last-Modified'] = http_date(time.time())
@@ -167,15 +121,10 @@ class SecurityAuditMiddleware(MiddlewareMixin):
     Captures:
     - Failed login attempts (401/403 on login endpoints)
     - Rate limit hits (429 responses)
-    - Suspicious patterns (path traversal, SQL injection probes)
+    - Suspicious patterns (path traversal, SQL injection probes), see
+      config.routes.SUSPICIOUS_PATTERNS
     """
 
-    _SUSPICIOUS_PATTERNS = (
-        '../', '..\\', '%2e%2e', 'union+select', 'union%20select',
-        '<script', '%3cscript', 'javascript:', 'onerror=', 'onload=',
-        '.php', 'wp-admin', 'wp-login', '.env', '.git/',
-    )
-
     def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
         # Log rate limit hits
         if response.status_code == 429:
@@ -187,35 +136,31 @@ class SecurityAuditMiddleware(MiddlewareMixin):
         # Log failed login attempts
         if (
             response.status_code in (401, 403)
-            and request.path.startswith(('/accounts/login/', '/tus-gestion-secure/login/'))
             and request.method == 'POST'
+            and route_of(request).login
         ):
             self._log_security_event(
                 request, 'login_failed',
                 f"Failed login attempt on {request.path}",
             )
 
-        # Log suspicious path patterns
-        path_lower = request.path.lower()
-        query_lower = request.META.get('QUERY_STRING', '').lower()
-        combined = path_lower + query_lower
-        for pattern in self._SUSPICIOUS_PATTERNS:
-            if pattern in combined:
-                self._log_security_event(
-                    request, 'suspicious_activity',
-                    f"Suspicious pattern '{pattern}' in {request.method} {request.path}",
-                )
-                break
+        # Log suspicious path patterns (regex compilée, cf. config.routes)
+        pattern = suspicious_pattern(request)
+        if pattern:
+            self._log_security_event(
+                request, 'suspicious_activity',
+                f"Suspicious pattern '{pattern}' in {request.method} {request.path}",
+            )
 
         return response
 
     def _log_security_event(self, request: HttpRequest, action_type: str, description: str):
-        """Best-effort async security event logging."""
+        """Best-effort security event logging (écriture différée, cf. apps.audit.sink)."""
         try:
             from apps.audit.models import AuditLog
             ip = _get_client_ip(request)
             user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
-            AuditLog.log_action(
+            AuditLog.enqueue(
                 action_type=action_type,
                 actor=request.user if hasattr(request, 'user') and request.user.is_authenticated else None,
                 content_type='security.event',
@@ -253,8 +198,7 @@ class CanonicalDomainMiddleware(MiddlewareMixin):
       de redirection une fois la configuration corrigée.
     """
 
-    # Paths excluded from canonical redirect (health checks, static, media)
-    EXEMPT_PREFIXES = ('/healthz/', '/static/', '/media/')
+    # Paths excluded from canonical redirect: config.routes.CANONICAL_EXEMPT_PREFIXES
 
     # Cookie used to detect redirect loops
     _LOOP_COOKIE = '_canonical_ok'
@@ -289,9 +233,8 @@ class CanonicalDomainMiddleware(MiddlewareMixin):
             return None
 
         # Skip health checks, static files and media (Render probes, WhiteNoise)
-        for prefix in self.EXEMPT_PREFIXES:
-            if request.path.startswith(prefix):
-                return None
+        if route_of(request).canonical_exempt:
+            return None
 
         host = request.get_host().split(':')[0].lower()  # Strip port, case-insensitive
         normalized_path = self._normalized_path_with_trailing_slash(request)
@@ -1,8 +1,36 @@
 """Middleware pour forcer le changement de mot de passe à la première connexion."""
+from functools import lru_cache
+from typing import Optional
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.utils.deprecation import MiddlewareMixin
 
+from config.routes import route_of
+
+
+@lru_cache(maxsize=None)
+def _password_urls(success_url_name: str) -> tuple[str, str, Optional[str]]:
+    """URLs (changement, logout, succès) résolues une fois par processus."""
+    try:
+        change_url = reverse('account_change_password')
+    except Exception:
+        change_url = '/accounts/password/change/'
+    logout_url = reverse('account_logout')
+    try:
+        success_url = reverse(success_url_name)
+    except Exception:
+        success_url = None
+    return change_url, logout_url, success_url
+
+
+@receiver(setting_changed)
+def _reset_password_urls(*, setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        _password_urls.cache_clear()
+
 
 class ForcePasswordChangeMiddleware(MiddlewareMixin):
     """Redirige OBLIGATOIREMENT vers /accounts/password/change/ si le client
@@ -17,22 +45,14 @@ class ForcePasswordChangeMiddleware(MiddlewareMixin):
     sur la page de changement de mot de passe.
     """
 
-    # URLs exemptées du blocage (préfixes)
-    EXEMPT_PREFIXES = [
-        '/tus-gestion-secure/',
-        '/static/',
-        '/media/',
-    ]
+    # URLs exemptées du blocage : config.routes.PASSWORD_EXEMPT_PREFIXES
 
     # URL de la page succès changement de mot de passe
     SUCCESS_URL_NAME = 'clients:password_change_done'
 
     def _get_change_password_url(self):
-        """URL résolue dynamiquement via reverse (allauth)."""
-        try:
-            return reverse('account_change_password')
-        except Exception:
-            return '/accounts/password/change/'
+        """URL résolue via reverse (allauth), mise en cache au premier appel."""
+        return _password_urls(self.SUCCESS_URL_NAME)[0]
 
     def process_request(self, request):
         # Utilisateur non authentifié → rien à faire
@@ -44,24 +64,12 @@ class ForcePasswordChangeMiddleware(MiddlewareMixin):
             return None
 
         # Vérifier les préfixes exemptés (admin, static, etc.)
-        for prefix in self.EXEMPT_PREFIXES:
-            if request.path.startswith(prefix):
-                return None
-
-        change_url = self._get_change_password_url()
-        logout_url = reverse('account_logout')
+        if route_of(request).password_exempt:
+            return None
 
         # Autoriser la page de changement de mot de passe, le logout, et la page succès
-        try:
-            success_url = reverse(self.SUCCESS_URL_NAME)
-        except Exception:
-            success_url = None
-
-        allowed = [change_url, logout_url]
-        if success_url:
-            allowed.append(success_url)
-
-        if request.path in allowed:
+        change_url, logout_url, success_url = _password_urls(self.SUCCESS_URL_NAME)
+        if request.path in (change_url, logout_url, success_url):
             return None
 
         # TOUT LE RESTE est bloqué → redirection forcée
@@ -117,11 +125,8 @@ class ForcePasswordChangeMiddleware(MiddlewareMixin):
                     pass
 
                 # Rediriger vers la page de succès
-                try:
-                    success_url = reverse(self.SUCCESS_URL_NAME)
-                    from django.shortcuts import redirect as _redirect
-                    return _redirect(success_url)
-                except Exception:
-                    pass
+                success_url = _password_urls(self.SUCCESS_URL_NAME)[2]
+                if success_url:
+                    return redirect(success_url)
 
         return response
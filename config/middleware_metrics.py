@@ -0,0 +1,82 @@
+"""Mesure par route : latence, requêtes SQL, cache, taille des réponses.
+
+Placé en tête de ``MIDDLEWARE`` pour mesurer toute la chaîne. Seule une
+fraction des requêtes est mesurée (``settings.REQUEST_METRICS['SAMPLE_RATE']``,
+0 par défaut) : hors échantillon, le coût se limite à un tirage aléatoire ;
+à 0, même pas.
+
+Pour une requête échantillonnée :
+- les requêtes SQL sont comptées et chronométrées via
+  ``connection.execute_wrapper`` ;
+- les lectures cache passent par les enveloppes posées par
+  ``core.metrics.instrument_cache_backends`` ;
+- le tout est agrégé par route résolue dans ``core.metrics.registry`` et
+  exposé par ``apps.pages.metrics`` (staff uniquement).
+"""
+import random
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from core import metrics
+
+UNRESOLVED = metrics.UNRESOLVED_ROUTE
+
+
+def _route_label(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED
+    return match.route or match.view_name or UNRESOLVED
+
+
+def _response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    """Échantillonne les requêtes et agrège leurs mesures par route."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.instrument_cache_backends()
+
+    def __call__(self, request):
+        rate = metrics.sample_rate()
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        sample = metrics.RequestSample()
+        token = metrics.current_sample.set(sample)
+
+        def count_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                sample.db_queries += 1
+                sample.db_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(count_query))
+                response = self.get_response(request)
+        finally:
+            metrics.current_sample.reset(token)
+        elapsed = time.perf_counter() - start
+
+        metrics.registry.record(
+            _route_label(request),
+            request.method,
+            response.status_code,
+            elapsed,
+            _response_size(response),
+            sample,
+        )
+        return response
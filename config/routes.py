@@ -0,0 +1,172 @@
+"""Classification des chemins pour les middlewares (compilée à l'import).
+
+Chaque middleware parcourait ses propres listes de préfixes avec
+``startswith`` (règles de rate-limit POST et GET, exemptions canonical /
+changement de mot de passe, zones privées du Cache-Control, endpoints de
+login pour l'audit), à chaque requête. Ici toutes les tables sont compilées
+une fois en expressions régulières combinées (une alternative par règle,
+première règle gagnante comme dans les listes d'origine) et le chemin est
+classé **une seule fois** par requête : ``route_of(request)`` pose un
+``RouteInfo`` sur la requête, les middlewares suivants le relisent.
+
+La classification d'un chemin ne dépend que du chemin : elle est mise en
+cache (LRU borné) pour les chemins fréquents.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Sequence
+
+# (path_prefix, max_requests, window_seconds) — première règle gagnante
+RateRule = tuple[str, int, int]
+
+POST_RATE_LIMITS: list[RateRule] = [
+    ('/contact/', 5, 3600),
+    ('/accounts/login/', 10, 3600),
+    ('/accounts/signup/', 5, 3600),
+    ('/devis/', 5, 3600),
+    ('/devis/pdf/', 20, 3600),  # 🛡️ Rate limit public PDF downloads (GET)
+    ('/factures/payer/', 10, 3600),  # 🛡️ Rate limit public invoice payment page
+    ('/factures/webhook/', 60, 60),  # 🛡️ Rate limit Stripe webhooks (60/min)
+    ('/tus-gestion-secure/login/', 5, 900),  # 🛡️ Admin login: 5 attempts / 15 min
+]
+
+# Routes also rate-limited on GET (e.g. public PDF downloads)
+GET_RATE_LIMITS: list[RateRule] = [
+    ('/devis/pdf/', 20, 3600),
+    ('/factures/pdf/', 20, 3600),  # 🛡️ Rate limit public invoice PDF downloads
+]
+
+# Health checks, métriques, statiques et médias : jamais de redirection canonique
+CANONICAL_EXEMPT_PREFIXES = ('/healthz/', '/metrics/', '/static/', '/media/')
+# Accessibles même si le client doit changer son mot de passe
+PASSWORD_EXEMPT_PREFIXES = ('/tus-gestion-secure/', '/static/', '/media/')
+# Admin / portail : no-store + noindex
+PRIVATE_PREFIXES = ('/tus-gestion-secure/', '/ecosysteme-tus/', '/accounts/')
+# Échecs de connexion journalisés par SecurityAuditMiddleware
+LOGIN_PREFIXES = ('/accounts/login/', '/tus-gestion-secure/login/')
+
+SUSPICIOUS_PATTERNS = (
+    '../', '..\\', '%2e%2e', 'union+select', 'union%20select',
+    '<script', '%3cscript', 'javascript:', 'onerror=', 'onload=',
+    '.php', 'wp-admin', 'wp-login', '.env', '.git/',
+)
+
+
+class PrefixTable:
+    """Préfixes compilés en une regex ; renvoie l'index de la première règle."""
+
+    def __init__(self, prefixes: Sequence[str]):
+        self.prefixes = tuple(prefixes)
+        if self.prefixes:
+            alternatives = '|'.join(f'(?P<r{i}>{re.escape(p)})' for i, p in enumerate(self.prefixes))
+            self._regex = re.compile(f'(?:{alternatives})')
+        else:
+            self._regex = None
+
+    def index(self, path: str) -> Optional[int]:
+        if self._regex is None:
+            return None
+        match = self._regex.match(path)
+        if match is None:
+            return None
+        return int(match.lastgroup[1:])
+
+    def matches(self, path: str) -> bool:
+        return self._regex is not None and self._regex.match(path) is not None
+
+
+class RateTable:
+    """Règles de rate-limit indexées par une ``PrefixTable``."""
+
+    def __init__(self, rules: Sequence[RateRule]):
+        self.rules = tuple(rules)
+        self._prefixes = PrefixTable([rule[0] for rule in self.rules])
+
+    def match(self, path: str) -> Optional[RateRule]:
+        index = self._prefixes.index(path)
+        return None if index is None else self.rules[index]
+
+
+_POST_RULES = RateTable(POST_RATE_LIMITS)
+_GET_RULES = RateTable(GET_RATE_LIMITS)
+_CANONICAL_EXEMPT = PrefixTable(CANONICAL_EXEMPT_PREFIXES)
+_PASSWORD_EXEMPT = PrefixTable(PASSWORD_EXEMPT_PREFIXES)
+_PRIVATE = PrefixTable(PRIVATE_PREFIXES)
+_LOGIN = PrefixTable(LOGIN_PREFIXES)
+_SUSPICIOUS = re.compile('|'.join(re.escape(p) for p in SUSPICIOUS_PATTERNS))
+
+
+@dataclass(frozen=True, slots=True)
+class RouteInfo:
+    """Étiquettes d'un chemin, calculées une fois par requête."""
+    post_rate_rule: Optional[RateRule]
+    get_rate_rule: Optional[RateRule]
+    canonical_exempt: bool
+    password_exempt: bool
+    private: bool
+    login: bool
+    suspicious_path: Optional[str]
+
+    def rate_rule(self, method: str) -> Optional[RateRule]:
+        if method == 'GET' and self.get_rate_rule is not None:
+            return self.get_rate_rule
+        if method == 'POST':
+            return self.post_rate_rule
+        return None
+
+
+@lru_cache(maxsize=4096)
+def classify(path: str) -> RouteInfo:
+    """Classe un chemin (résultat mis en cache)."""
+    suspicious = _SUSPICIOUS.search(path.lower())
+    return RouteInfo(
+        post_rate_rule=_POST_RULES.match(path),
+        get_rate_rule=_GET_RULES.match(path),
+        canonical_exempt=_CANONICAL_EXEMPT.matches(path),
+        password_exempt=_PASSWORD_EXEMPT.matches(path),
+        private=_PRIVATE.matches(path),
+        login=_LOGIN.matches(path),
+        suspicious_path=suspicious.group(0) if suspicious else None,
+    )
+
+
+def route_of(request) -> RouteInfo:
+    """``RouteInfo`` de la requête (classé au premier appel, puis relu)."""
+    info = getattr(request, '_route_info', None)
+    if info is None or info[0] != request.path:
+        info = (request.path, classify(request.path))
+        request._route_info = info
+    return info[1]
+
+
+def suspicious_pattern(request) -> Optional[str]:
+    """Motif suspect dans le chemin ou la query string (None sinon)."""
+    found = route_of(request).suspicious_path
+    if found:
+        return found
+    query = request.META.get('QUERY_STRING', '')
+    if not query:
+        return None
+    # Chemin + query concaténés, comme l'ancien balayage (motif à cheval)
+    match = _SUSPICIOUS.search(request.path.lower() + query.lower())
+    return match.group(0) if match else None
+
+
+__all__ = [
+    'CANONICAL_EXEMPT_PREFIXES',
+    'GET_RATE_LIMITS',
+    'LOGIN_PREFIXES',
+    'PASSWORD_EXEMPT_PREFIXES',
+    'POST_RATE_LIMITS',
+    'PRIVATE_PREFIXES',
+    'PrefixTable',
+    'RateTable',
+    'RouteInfo',
+    'SUSPICIOUS_PATTERNS',
+    'classify',
+    'route_of',
+    'suspicious_pattern',
+]
@@ -120,6 +120,8 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    # 📈 Métriques par route (échantillonnées, cf. REQUEST_METRICS) — en tête pour mesurer toute la chaîne
+    'config.middleware_metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     # 🔍 SEO: Canonical domain redirect (www → non-www, render → custom domain)
@@ -237,8 +239,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # ==============================================================================
 # 🛡️ SECURITY: File Upload Limits
 # ==============================================================================
-# Maximum size for uploaded files (10MB)
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10 MB
+# Au-delà de 2.5 Mo, un fichier envoyé est écrit sur disque (TemporaryUploadedFile)
+# au lieu d'être gardé en mémoire, puis copié par morceaux vers le stockage.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(2.5 * 1024 * 1024)  # 2.5 MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10 MB
 # Maximum number of fields in POST request (anti-DoS)
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
@@ -267,6 +270,27 @@ ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'contact@traitdunion.it')
 # Si non défini, utilise ADMIN_EMAIL comme fallback
 TASK_NOTIFICATION_EMAIL = os.environ.get('TASK_NOTIFICATION_EMAIL', os.environ.get('ADMIN_EMAIL', 'contact@traitdunion.it'))
 
+# ==============================================================================
+# 📈 MÉTRIQUES PAR ROUTE (endpoint Prometheus /metrics/, staff uniquement)
+# ==============================================================================
+# SAMPLE_RATE : fraction des requêtes mesurées (0 = désactivé, coût quasi nul).
+# TOKEN : jeton Bearer optionnel pour un scraper Prometheus sans session staff.
+REQUEST_METRICS = {
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', '0') or 0),
+    'TOKEN': os.environ.get('REQUEST_METRICS_TOKEN', ''),
+}
+
+# ==============================================================================
+# ⚡ CACHE DES PAGES PUBLIQUES (visiteurs anonymes, cf. core/page_cache.py)
+# ==============================================================================
+# HTML gardé côté serveur avec nonce CSP / jeton CSRF en marqueurs, reposés
+# à chaque requête. Invalidé à l'écriture de Service, Testimonial, Project
+# (portfolio) et Article ; repart à froid à chaque déploiement.
+PAGE_CACHE = {
+    'ENABLED': os.environ.get('PAGE_CACHE_ENABLED', '1') == '1',
+    'TIMEOUT': int(os.environ.get('PAGE_CACHE_TIMEOUT', '600') or 600),
+}
+
 # ==============================================================================
 # DJANGO-Q2 : Tâches asynchrones (emails, PDF, notifications)
 # ==============================================================================
@@ -432,6 +456,10 @@ INVOICING = {
         "TIMEOUT_SECONDS": int(os.environ.get("EINVOICING_PDP_TIMEOUT", "20")),
         "RETRY_MAX_ATTEMPTS": int(os.environ.get("EINVOICING_PDP_RETRIES", "5")),
         "SANDBOX": os.environ.get("EINVOICING_PDP_SANDBOX", "1") == "1",
+        # Cache annuaire (apps.einvoicing.directory) : TTL positif / négatif + débit max.
+        "DIRECTORY_TTL_HOURS": int(os.environ.get("EINVOICING_DIRECTORY_TTL_HOURS", "168")),
+        "DIRECTORY_NEGATIVE_TTL_HOURS": int(os.environ.get("EINVOICING_DIRECTORY_NEGATIVE_TTL_HOURS", "24")),
+        "DIRECTORY_RATE_PER_SECOND": float(os.environ.get("EINVOICING_DIRECTORY_RATE", "5")),
     },
     # E-reporting B2C / cross-border (Phase 3) — TUS facture des particuliers via Stripe.
     "E_REPORTING_ENABLED": os.environ.get("EINVOICING_E_REPORTING", "1") == "1",
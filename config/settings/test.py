@@ -59,6 +59,17 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # restent fiables). En production le défaut (True) garde l'envoi non bloquant.
 SIMULATEUR_REPORT_EMAIL_ASYNC = False
 
+# Journal d'audit écrit immédiatement (pas de thread de vidage : les tests
+# relisent AuditLog juste après l'action).
+AUDIT_SINK = {'MODE': 'sync'}
+
+# Budgets de requêtes des vues décorées (@query_budget) : dépassement = échec
+QUERY_BUDGETS = {'MODE': 'raise'}
+
+# Cache des pages anonymes coupé : une page rendue par un test ne doit pas
+# être resservie à un autre (tests dédiés : override_settings)
+PAGE_CACHE = {'ENABLED': False}
+
 # ==============================================================================
 # STATIC FILES
 # ==============================================================================
@@ -49,6 +49,7 @@ admin.site.__class__ = TUSOTPAdminSite
 
 from config.sitemaps import StaticViewSitemap, PortfolioSitemap, ChroniquesSitemap
 from apps.pages.healthz import healthz
+from apps.pages.metrics import metrics
 from core.views_totp import totp_qr_code
 from core.views_session import session_ping
 
@@ -147,6 +148,8 @@ urlpatterns = [
     path('robots.txt', TemplateView.as_view(template_name='robots.txt', content_type='text/plain'), name='robots'),
     # Health check (Docker + uptime monitoring)
     path('healthz/', healthz, name='healthz'),
+    # Métriques Prometheus par route (staff / jeton Bearer)
+    path('metrics/', metrics, name='metrics'),
 ]
 
 # Servir les fichiers statiques et média en développement
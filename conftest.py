@@ -1,4 +1,6 @@
 """Root conftest — shared pytest fixtures for TUS."""
+from contextlib import contextmanager
+
 import pytest
 from django.contrib.auth.models import User
 from django.test import Client
@@ -28,3 +30,52 @@ def admin_user(db):
         email="admin@traitdunion.it",
         password="Adm1nP@ssw0rd!",
     )
+
+
+# ==============================================================================
+# QUERY BUDGETS (cf. core.query_budget, baseline tests/query_budgets.json)
+# ==============================================================================
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--update-query-budgets', action='store_true', default=False,
+        help="Réécrit tests/query_budgets.json avec les nombres de requêtes mesurés.",
+    )
+
+
+@pytest.fixture
+def query_budget(request):
+    """Budget de requêtes SQL d'un bloc.
+
+    ``with query_budget('pages:home'):`` lit le budget dans le fichier de
+    référence ; ``with query_budget(max_queries=5):`` le fixe en ligne. Un
+    dépassement échoue en listant les requêtes répétées. Avec
+    ``--update-query-budgets``, les budgets nommés sont remesurés et réécrits
+    en fin de session au lieu d'être vérifiés.
+    """
+    from core.query_budget import QueryRecorder, check, load_baseline
+
+    update = request.config.getoption('--update-query-budgets')
+    baseline = load_baseline()
+
+    @contextmanager
+    def budget(name=None, *, max_queries=None):
+        if max_queries is None and not update:
+            if name not in baseline:
+                pytest.fail(f"Aucun budget pour {name!r} (lancer pytest --update-query-budgets)")
+            max_queries = baseline[name]
+        with QueryRecorder() as recorder:
+            yield recorder
+        if update and name:
+            request.config.__dict__.setdefault('_measured_query_budgets', {})[name] = recorder.count
+        else:
+            check(name or '', max_queries, recorder)
+
+    return budget
+
+
+def pytest_sessionfinish(session):
+    measured = session.config.__dict__.get('_measured_query_budgets')
+    if measured:
+        from core.query_budget import load_baseline, save_baseline
+        save_baseline({**load_baseline(), **measured})
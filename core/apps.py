@@ -5,3 +5,15 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
     verbose_name = "Core"
+
+    def ready(self) -> None:
+        """Invalidation du cache de pages anonymes sur écriture des contenus publics."""
+        from django.db.models.signals import post_delete, post_save
+
+        from core.page_cache import MODEL_TAGS, invalidate_on_model_change
+
+        for label in MODEL_TAGS:
+            for name, signal in (('save', post_save), ('delete', post_delete)):
+                signal.connect(
+                    invalidate_on_model_change, sender=label, dispatch_uid=f'page_cache:{name}:{label}',
+                )
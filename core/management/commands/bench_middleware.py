@@ -0,0 +1,106 @@
+"""
+Micro-benchmark du surcoût par requête des middlewares du projet.
+
+Mesure, sur un jeu de chemins représentatif :
+- l'ancien balayage des préfixes (``startswith`` en boucle, par middleware) ;
+- la classification compilée ``config.routes.classify`` ;
+- la chaîne complète des middlewares ``config.*`` (réponse factice, requêtes
+  GET anonymes : pas de rate-limit ni d'accès base).
+
+Usage:
+    python manage.py bench_middleware
+    python manage.py bench_middleware --iterations 50000
+"""
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+
+from config import routes
+
+SAMPLE_PATHS = (
+    '/',
+    '/services/',
+    '/contact/',
+    '/static/css/output.css',
+    '/chroniques/un-article-assez-long-pour-etre-realiste/',
+    '/tus-gestion-secure/leads/lead/',
+    '/ecosysteme-tus/factures/',
+    '/healthz/',
+)
+
+
+def _legacy_scan(path: str, method: str):
+    """Balayages d'avant la table compilée (référence)."""
+    rule = None
+    if method == 'GET':
+        for prefix, limit, window in routes.GET_RATE_LIMITS:
+            if path.startswith(prefix):
+                rule = (prefix, limit, window)
+                break
+    if rule is None and method == 'POST':
+        for prefix, limit, window in routes.POST_RATE_LIMITS:
+            if path.startswith(prefix):
+                rule = (prefix, limit, window)
+                break
+    canonical = any(path.startswith(p) for p in routes.CANONICAL_EXEMPT_PREFIXES)
+    password = any(path.startswith(p) for p in routes.PASSWORD_EXEMPT_PREFIXES)
+    private = path.startswith(routes.PRIVATE_PREFIXES)
+    login = path.startswith(routes.LOGIN_PREFIXES)
+    lower = path.lower()
+    suspicious = next((p for p in routes.SUSPICIOUS_PATTERNS if p in lower), None)
+    return rule, canonical, password, private, login, suspicious
+
+
+class Command(BaseCommand):
+    help = "Mesure le surcoût par requête des middlewares (classification des chemins, chaîne config.*)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+
+    def _time(self, label: str, func, iterations: int) -> None:
+        paths = SAMPLE_PATHS
+        count = len(paths)
+        start = time.perf_counter()
+        for i in range(iterations):
+            func(paths[i % count])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:<40} {elapsed / iterations * 1e6:8.2f} µs/requête")
+
+    def handle(self, *args, **options):
+        iterations = max(1, options['iterations'])
+
+        self._time('Balayage startswith (ancien)', lambda p: _legacy_scan(p, 'GET'), iterations)
+        routes.classify.cache_clear()
+        self._time('config.routes.classify (à froid + LRU)', routes.classify, iterations)
+
+        def terminal(request):
+            return HttpResponse('ok', content_type='text/html; charset=utf-8')
+
+        handler = terminal
+        for path in reversed(settings.MIDDLEWARE):
+            if path.startswith('config.'):
+                handler = import_string(path)(handler)
+
+        factory = RequestFactory()
+
+        def run_chain(path: str):
+            request = factory.get(path)
+            request.user = AnonymousUser()
+            request.session = {}
+            return handler(request)
+
+        def request_only(path: str):
+            request = factory.get(path)
+            request.user = AnonymousUser()
+            request.session = {}
+            return terminal(request)
+
+        self._time('RequestFactory seul (référence)', request_only, iterations)
+        self._time('Chaîne middlewares config.*', run_chain, iterations)
@@ -0,0 +1,308 @@
+"""
+Métriques par route, agrégées dans le processus, au format Prometheus.
+
+Alimentées par ``config.middleware_metrics.RequestMetricsMiddleware`` pour
+une fraction des requêtes (``settings.REQUEST_METRICS['SAMPLE_RATE']``) :
+
+- latence (histogramme) ;
+- requêtes SQL par requête HTTP (histogramme) et temps SQL cumulé ;
+- lectures cache réussies / manquées (``get`` et ``get_many``) ;
+- taille des réponses (histogramme).
+
+Les séries sont étiquetées par route *résolue* (motif d'URL Django, p. ex.
+``devis/<int:pk>/``, jamais le chemin brut : cardinalité bornée) et par
+méthode. L'état est propre à chaque worker (étiquette ``worker`` = pid) ;
+``render()`` produit le texte exposé par ``apps.pages.metrics``, avec en
+plus les compteurs du limiteur Brevo et du puits d'audit.
+"""
+from __future__ import annotations
+
+import bisect
+import copy
+import os
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+UNRESOLVED_ROUTE = '<unresolved>'
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, 'REQUEST_METRICS', {}) or {}).get(key, default)
+
+
+def sample_rate() -> float:
+    return float(_cfg('SAMPLE_RATE', 0.0))
+
+
+# ----------------------------------------------------------------------
+# Mesure d'une requête
+# ----------------------------------------------------------------------
+
+@dataclass
+class RequestSample:
+    """Compteurs d'une requête échantillonnée (remplis pendant la vue)."""
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+# Requête échantillonnée en cours (None : aucune mesure, coût nul)
+current_sample: ContextVar[Optional[RequestSample]] = ContextVar('current_sample', default=None)
+
+
+_MISSING = object()
+_instrumented: set[type] = set()
+_instrument_lock = threading.Lock()
+
+
+def instrument_cache_backends() -> None:
+    """Enveloppe ``get``/``get_many`` des backends de cache configurés.
+
+    Les enveloppes ne comptent que pendant une requête échantillonnée
+    (``current_sample``) ; sinon elles délèguent directement.
+    """
+    from django.core.cache import caches
+
+    with _instrument_lock:
+        for alias in settings.CACHES:
+            cls = type(caches[alias])
+            if cls in _instrumented:
+                continue
+            _wrap_backend(cls)
+            _instrumented.add(cls)
+
+
+def _wrap_backend(cls: type) -> None:
+    original_get = cls.get
+    original_get_many = cls.get_many
+
+    def get(self, key, default=None, version=None):
+        sample = current_sample.get()
+        if sample is None:
+            return original_get(self, key, default, version)
+        value = original_get(self, key, _MISSING, version)
+        if value is _MISSING:
+            sample.cache_misses += 1
+            return default
+        sample.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None):
+        sample = current_sample.get()
+        if sample is None:
+            return original_get_many(self, keys, version)
+        keys = list(keys)
+        # Certains backends (LocMem) implémentent get_many via get : pas de double compte
+        token = current_sample.set(None)
+        try:
+            found = original_get_many(self, keys, version)
+        finally:
+            current_sample.reset(token)
+        sample.cache_hits += len(found)
+        sample.cache_misses += len(keys) - len(found)
+        return found
+
+    cls.get = get
+    cls.get_many = get_many
+
+
+# ----------------------------------------------------------------------
+# Agrégation
+# ----------------------------------------------------------------------
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (sémantique Prometheus)."""
+
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # dernière case : +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(list(self.bounds) + ['+Inf'], self.counts):
+            running += count
+            yield bound, running
+
+
+@dataclass
+class RouteMetrics:
+    """Agrégats d'une (route, méthode)."""
+    latency: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS))
+    queries: Histogram = field(default_factory=lambda: Histogram(QUERY_BUCKETS))
+    size: Histogram = field(default_factory=lambda: Histogram(SIZE_BUCKETS))
+    statuses: dict = field(default_factory=dict)
+    db_seconds: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+class MetricsRegistry:
+    """Agrégats du processus, protégés par un verrou (workers multi-threads)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: dict[tuple[str, str], RouteMetrics] = {}
+
+    def record(
+        self,
+        route: str,
+        method: str,
+        status: int,
+        seconds: float,
+        size: Optional[int],
+        sample: RequestSample,
+    ) -> None:
+        status_class = f'{status // 100}xx'
+        with self._lock:
+            metrics = self._routes.get((route, method))
+            if metrics is None:
+                metrics = self._routes[(route, method)] = RouteMetrics()
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(sample.db_queries)
+            if size is not None:
+                metrics.size.observe(size)
+            metrics.statuses[status_class] = metrics.statuses.get(status_class, 0) + 1
+            metrics.db_seconds += sample.db_seconds
+            metrics.cache_hits += sample.cache_hits
+            metrics.cache_misses += sample.cache_misses
+
+    def snapshot(self) -> dict[tuple[str, str], RouteMetrics]:
+        # Copie profonde sous verrou : le rendu se fait hors verrou
+        with self._lock:
+            return copy.deepcopy(self._routes)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+registry = MetricsRegistry()
+
+
+# ----------------------------------------------------------------------
+# Export Prometheus (format texte 0.0.4)
+# ----------------------------------------------------------------------
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: dict) -> list[str]:
+    lines = [
+        f'{name}_bucket{_labels(**labels, le=bound)} {count}'
+        for bound, count in histogram.cumulative()
+    ]
+    lines.append(f'{name}_sum{_labels(**labels)} {histogram.total:.6f}')
+    lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+    return lines
+
+
+def _header(name: str, kind: str, help_text: str) -> list[str]:
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+
+
+def render() -> str:
+    """Texte Prometheus de toutes les métriques du processus."""
+    worker = str(os.getpid())
+    routes = sorted(registry.snapshot().items())
+    lines: list[str] = []
+
+    lines += _header('tus_metrics_sample_rate', 'gauge', 'Fraction des requêtes mesurées.')
+    lines.append(f'tus_metrics_sample_rate{_labels(worker=worker)} {sample_rate()}')
+
+    lines += _header('tus_http_requests_total', 'counter', 'Requêtes mesurées par route et classe de statut.')
+    for (route, method), m in routes:
+        for status, count in sorted(m.statuses.items()):
+            lines.append(
+                f'tus_http_requests_total{_labels(route=route, method=method, status=status, worker=worker)} {count}'
+            )
+
+    histograms = (
+        ('tus_http_request_duration_seconds', 'latency', 'Latence des requêtes (secondes).'),
+        ('tus_http_db_queries', 'queries', 'Requêtes SQL par requête HTTP.'),
+        ('tus_http_response_size_bytes', 'size', 'Taille des réponses (octets).'),
+    )
+    for name, attr, help_text in histograms:
+        lines += _header(name, 'histogram', help_text)
+        for (route, method), m in routes:
+            lines += _histogram_lines(name, getattr(m, attr), {'route': route, 'method': method, 'worker': worker})
+
+    counters = (
+        ('tus_http_db_seconds_total', 'db_seconds', 'Temps SQL cumulé (secondes).'),
+        ('tus_http_cache_hits_total', 'cache_hits', 'Lectures cache trouvées.'),
+        ('tus_http_cache_misses_total', 'cache_misses', 'Lectures cache manquées.'),
+    )
+    for name, attr, help_text in counters:
+        lines += _header(name, 'counter', help_text)
+        for (route, method), m in routes:
+            value = getattr(m, attr)
+            value = f'{value:.6f}' if isinstance(value, float) else value
+            lines.append(f'{name}{_labels(route=route, method=method, worker=worker)} {value}')
+
+    lines += _external_metrics(worker)
+    return '\n'.join(lines) + '\n'
+
+
+def _external_metrics(worker: str) -> list[str]:
+    """Compteurs des autres sous-systèmes (best-effort : jamais d'erreur d'export)."""
+    lines: list[str] = []
+    try:
+        from core.services.brevo_throttle import metrics as brevo_metrics
+
+        brevo = brevo_metrics()
+    except Exception:  # noqa: BLE001 — cache indisponible
+        brevo = {}
+    if brevo:
+        lines += _header('tus_brevo_throttle_total', 'counter', 'Limiteur Brevo partagé, par voie et événement.')
+        for lane, counts in sorted(brevo.items()):
+            for event, value in sorted(counts.items()):
+                lines.append(f'tus_brevo_throttle_total{_labels(lane=lane, event=event)} {value}')
+
+    try:
+        from apps.audit.sink import sink
+
+        audit = sink.stats()
+    except Exception:  # noqa: BLE001
+        audit = {}
+    if audit:
+        lines += _header('tus_audit_sink_pending', 'gauge', "Enregistrements d'audit en attente d'écriture.")
+        lines.append(f'tus_audit_sink_pending{_labels(worker=worker)} {audit["pending"]}')
+        for event in ('written', 'dropped', 'failed'):
+            name = f'tus_audit_sink_{event}_total'
+            lines += _header(name, 'counter', f"Enregistrements d'audit ({event}).")
+            lines.append(f'{name}{_labels(worker=worker)} {audit[event]}')
+    return lines
+
+
+__all__ = [
+    'Histogram',
+    'UNRESOLVED_ROUTE',
+    'MetricsRegistry',
+    'RequestSample',
+    'current_sample',
+    'instrument_cache_backends',
+    'registry',
+    'render',
+    'sample_rate',
+]
@@ -0,0 +1,242 @@
+"""
+Cache serveur des pages publiques pour les visiteurs anonymes.
+
+``CacheControlMiddleware`` marque tout le HTML ``no-store`` : les nonces CSP
+(django-csp) changent à chaque requête, une page mise en cache par un
+navigateur ou un CDN casserait ses scripts. Chaque visite anonyme de
+l'accueil, des services, de la méthode, de la FAQ, du portfolio ou des
+chroniques refaisait donc tout le rendu des gabarits.
+
+Ici le HTML rendu est gardé **côté serveur**, avec des marqueurs à la
+place des valeurs propres à une requête :
+
+- le nonce CSP de la requête qui a produit la page → ``__TUS_CSP_NONCE__`` ;
+- les jetons CSRF masqués (``{% csrf_token %}``, en-tête HTMX de
+  ``base.html``) → ``__TUS_CSRF_TOKEN__``.
+
+Au rejeu, un seul passage de substitution pose un nonce neuf (celui que
+``CSPMiddleware`` écrit ensuite dans l'en-tête) et un jeton CSRF valide
+pour le visiteur (le cookie suit via ``CsrfViewMiddleware``).
+
+Contournement : méthode autre que GET, query string, requête HTMX,
+utilisateur authentifié, cookie de session ou de messages (état propre au
+visiteur). Seules les réponses HTML 200 sans cookie posé par la vue sont
+stockées.
+
+Invalidation par étiquettes : chaque page déclare ses étiquettes, la clé
+d'une page embarque la version courante de chacune ; un ``post_save`` /
+``post_delete`` de ``Service``, ``Testimonial``, ``Project`` (portfolio)
+ou ``Article`` incrémente la version (cf. ``MODEL_TAGS``) et oublie les
+fragments du cache applicatif correspondants. La clé inclut aussi la
+version déployée (``RENDER_GIT_COMMIT``) : un déploiement repart à froid.
+
+Réglages optionnels (``settings.PAGE_CACHE``) : ``ENABLED``, ``TIMEOUT``
+(secondes), ``VERSION``.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import time
+from functools import wraps
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'pagecache'
+DEFAULT_TIMEOUT = 600
+NONCE_PLACEHOLDER = '__TUS_CSP_NONCE__'
+CSRF_PLACEHOLDER = '__TUS_CSRF_TOKEN__'
+
+_PLACEHOLDERS = re.compile('__TUS_(?:CSP_NONCE|CSRF_TOKEN)__')
+# Jeton CSRF masqué : 64 caractères alphanumériques
+_CSRF_CANDIDATE = re.compile(r'(?<![A-Za-z0-9])[A-Za-z0-9]{64}(?![A-Za-z0-9])')
+
+# Modèle → étiquettes de pages à invalider
+MODEL_TAGS = {
+    'services.Service': ('services',),
+    'pages.Testimonial': ('testimonials',),
+    'portfolio.Project': ('portfolio',),
+    'chroniques.Article': ('chroniques',),
+}
+# Étiquette → fragments du cache applicatif (HomeView) recalculés avec la page
+FRAGMENT_KEYS = {
+    'services': ('homepage_services',),
+    'testimonials': ('homepage_testimonials',),
+    'portfolio': ('homepage_portfolio_count',),
+}
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, 'PAGE_CACHE', {}) or {}).get(key, default)
+
+
+def _release() -> str:
+    return str(_cfg('VERSION', os.environ.get('RENDER_GIT_COMMIT', '')))
+
+
+# ----------------------------------------------------------------------
+# Étiquettes
+# ----------------------------------------------------------------------
+
+def _tag_key(tag: str) -> str:
+    return f'{KEY_PREFIX}:tag:{tag}'
+
+
+def _new_version() -> int:
+    # Horodatage : une étiquette évincée puis recréée ne retombe jamais sur
+    # une ancienne version (pas de résurrection de pages périmées).
+    return time.time_ns() // 1000
+
+
+def _tag_versions(tags: Iterable[str]) -> str:
+    keys = [_tag_key(tag) for tag in tags]
+    if not keys:
+        return '0'
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def invalidate_tags(*tags: str) -> None:
+    """Périme toutes les pages portant l'une de ces étiquettes."""
+    for tag in tags:
+        try:
+            try:
+                cache.incr(_tag_key(tag))
+            except ValueError:
+                cache.set(_tag_key(tag), _new_version(), None)
+            fragments = FRAGMENT_KEYS.get(tag)
+            if fragments:
+                cache.delete_many(fragments)
+        except Exception as e:  # noqa: BLE001 — l'écriture métier ne doit pas échouer
+            logger.warning("Cache de pages : invalidation de %r impossible (%s)", tag, e)
+
+
+def invalidate_on_model_change(sender, **kwargs) -> None:
+    """Receveur ``post_save`` / ``post_delete`` (branché dans ``core.apps``)."""
+    invalidate_tags(*MODEL_TAGS.get(sender._meta.label, ()))
+
+
+# ----------------------------------------------------------------------
+# Stockage / rejeu
+# ----------------------------------------------------------------------
+
+def _bypass(request) -> bool:
+    if request.method != 'GET' or request.META.get('QUERY_STRING') or request.headers.get('HX-Request'):
+        return True
+    cookies = request.COOKIES
+    if settings.SESSION_COOKIE_NAME in cookies or getattr(settings, 'MESSAGE_COOKIE_NAME', 'messages') in cookies:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated
+
+
+def _page_key(request, tags) -> str:
+    url = hashlib.sha1(f'{request.get_host()}{request.path}'.encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}:page:{_release()}:{url}:{_tag_versions(tags)}'
+
+
+def _csrf_matcher(request):
+    """Reconnaît les jetons masqués du secret CSRF de la requête."""
+    secret = request.META.get('CSRF_COOKIE')
+    if not secret:
+        return None
+    # API privée de Django : démasquer plutôt que deviner par motif
+    from django.middleware.csrf import _unmask_cipher_token
+
+    def replace(match):
+        token = match.group(0)
+        return CSRF_PLACEHOLDER if _unmask_cipher_token(token) == secret else token
+
+    return replace
+
+
+def _store(request, response, key: str, timeout: int) -> None:
+    session = getattr(request, 'session', None)
+    if (
+        response.status_code != 200
+        or response.streaming
+        or 'text/html' not in response.get('Content-Type', '')
+        or response.cookies
+        or (session is not None and session.modified)
+    ):
+        return
+    content = response.content.decode(response.charset)
+    nonce = getattr(request, '_csp_nonce', None)
+    if isinstance(nonce, str):
+        content = content.replace(nonce, NONCE_PLACEHOLDER)
+    replace = _csrf_matcher(request)
+    if replace is not None:
+        content = _CSRF_CANDIDATE.sub(replace, content)
+    try:
+        cache.set(key, {
+            'content': content,
+            'content_type': response['Content-Type'],
+            'nonce': NONCE_PLACEHOLDER in content,
+            'csrf': CSRF_PLACEHOLDER in content,
+        }, timeout)
+    except Exception as e:  # noqa: BLE001
+        logger.warning("Cache de pages : écriture impossible (%s)", e)
+
+
+def _replay(request, entry: dict) -> HttpResponse:
+    values = {
+        NONCE_PLACEHOLDER: str(request.csp_nonce) if entry['nonce'] else '',
+        CSRF_PLACEHOLDER: get_token(request) if entry['csrf'] else '',
+    }
+    content = _PLACEHOLDERS.sub(lambda m: values[m.group(0)], entry['content'])
+    response = HttpResponse(content, content_type=entry['content_type'])
+    response['X-Page-Cache'] = 'HIT'
+    return response
+
+
+def anonymous_page_cache(*tags: str, timeout: int | None = None):
+    """Met en cache la page pour les visiteurs anonymes (cf. module).
+
+    ``tags`` : étiquettes invalidées par ``MODEL_TAGS``. Sur une CBV :
+    ``@method_decorator(anonymous_page_cache('portfolio'), name='dispatch')``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _cfg('ENABLED', True) or _bypass(request):
+                return view(request, *args, **kwargs)
+            try:
+                key = _page_key(request, tags)
+                entry = cache.get(key)
+            except Exception as e:  # noqa: BLE001 — cache indisponible : rendu normal
+                logger.warning("Cache de pages : lecture impossible (%s)", e)
+                return view(request, *args, **kwargs)
+            if entry is not None:
+                return _replay(request, entry)
+
+            response = view(request, *args, **kwargs)
+            ttl = timeout if timeout is not None else int(_cfg('TIMEOUT', DEFAULT_TIMEOUT))
+            if getattr(response, 'is_rendered', True) is False:
+                response.add_post_render_callback(lambda r: _store(request, r, key, ttl))
+            else:
+                _store(request, response, key, ttl)
+            response['X-Page-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+    return decorator
+
+
+__all__ = [
+    'MODEL_TAGS',
+    'anonymous_page_cache',
+    'invalidate_on_model_change',
+    'invalidate_tags',
+]
@@ -0,0 +1,173 @@
+"""
+Budgets de requêtes SQL par vue : garde-fou contre les N+1.
+
+Les N+1 s'installent sans bruit (un ``obj.recipients.count()`` par ligne de
+changelist, un ``invoice.items`` dans une boucle de template…). Ce module
+compte les requêtes d'un bloc de code et échoue au-delà d'un maximum, en
+listant les requêtes répétées par *empreinte* (SQL normalisé : littéraux,
+paramètres et listes ``IN (...)`` remplacés) pour pointer la boucle fautive.
+
+- ``QueryRecorder`` : enregistre les requêtes (``connection.execute_wrapper``) ;
+- ``assert_query_budget(n)`` : context manager, lève ``QueryBudgetExceeded`` ;
+- ``@query_budget(n)`` : décorateur de vue ; selon
+  ``settings.QUERY_BUDGETS['MODE']`` : ``raise`` (tests), ``warn`` (log,
+  défaut en DEBUG) ou ``off`` (défaut en production, aucun surcoût) ;
+- ``load_baseline()`` / ``save_baseline()`` : fichier de référence
+  ``tests/query_budgets.json`` (nom d'URL → budget) utilisé par la fixture
+  pytest ``query_budget`` (cf. ``conftest.py``).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Nombre de requêtes répétées affichées dans le rapport
+REPORT_TOP = 5
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN \((?:\?, )*\?\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, 'QUERY_BUDGETS', {}) or {}).get(key, default)
+
+
+def _mode() -> str:
+    return _cfg('MODE', 'warn' if settings.DEBUG else 'off')
+
+
+def baseline_path() -> Path:
+    return Path(_cfg('BASELINE', Path(settings.BASE_DIR) / 'tests' / 'query_budgets.json'))
+
+
+def fingerprint(sql: str) -> str:
+    """SQL normalisé : deux requêtes de la même boucle ont la même empreinte."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PARAM.sub('?', sql)
+    sql = _SPACES.sub(' ', sql).strip()
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Plus de requêtes que le budget déclaré."""
+
+
+class QueryRecorder:
+    """Enregistre les requêtes SQL exécutées sur toutes les connexions."""
+
+    def __init__(self):
+        self.queries: list[str] = []
+        self._stack: Optional[ExitStack] = None
+
+    def _record(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self) -> "QueryRecorder":
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._record))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stack.close()
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def duplicates(self) -> list[tuple[str, int]]:
+        """Empreintes exécutées plus d'une fois, les plus fréquentes d'abord."""
+        counts = Counter(fingerprint(sql) for sql in self.queries)
+        return [(fp, n) for fp, n in counts.most_common() if n > 1]
+
+
+def report(label: str, budget: int, recorder: QueryRecorder) -> str:
+    lines = [f"{label or 'Bloc'} : {recorder.count} requêtes SQL pour un budget de {budget}."]
+    duplicates = recorder.duplicates()
+    if duplicates:
+        lines.append("Requêtes répétées (N+1 probable) :")
+        lines += [f"  {n}× {fp[:300]}" for fp, n in duplicates[:REPORT_TOP]]
+    return '\n'.join(lines)
+
+
+def check(label: str, budget: int, recorder: QueryRecorder) -> None:
+    if recorder.count > budget:
+        raise QueryBudgetExceeded(report(label, budget, recorder))
+
+
+@contextmanager
+def assert_query_budget(budget: int, label: str = ''):
+    """Échoue si le bloc exécute plus de ``budget`` requêtes."""
+    with QueryRecorder() as recorder:
+        yield recorder
+    check(label, budget, recorder)
+
+
+def query_budget(max_queries: int):
+    """Déclare le budget de requêtes d'une vue (fonction ou ``as_view()``).
+
+    Compte les requêtes de la vue elle-même (pas des middlewares, ni du
+    rendu différé d'une ``TemplateResponse`` : le budget complet d'une page
+    est vérifié par la fixture pytest). Usage sur une CBV :
+    ``method_decorator(query_budget(8), name='dispatch')``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            mode = _mode()
+            if mode == 'off':
+                return view(request, *args, **kwargs)
+            with QueryRecorder() as recorder:
+                response = view(request, *args, **kwargs)
+            if recorder.count > max_queries:
+                message = report(f"{request.method} {request.path}", max_queries, recorder)
+                if mode == 'raise':
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return response
+
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+def load_baseline(path: Optional[Path] = None) -> dict[str, int]:
+    path = path or baseline_path()
+    if not path.exists():
+        return {}
+    with path.open(encoding='utf-8') as fh:
+        return {str(k): int(v) for k, v in json.load(fh).items()}
+
+
+def save_baseline(budgets: dict[str, int], path: Optional[Path] = None) -> None:
+    path = path or baseline_path()
+    path.write_text(json.dumps(dict(sorted(budgets.items())), indent=2) + '\n', encoding='utf-8')
+
+
+__all__ = [
+    'QueryBudgetExceeded',
+    'QueryRecorder',
+    'assert_query_budget',
+    'check',
+    'fingerprint',
+    'load_baseline',
+    'query_budget',
+    'report',
+    'save_baseline',
+]
@@ -0,0 +1,189 @@
+"""
+Limiteur de débit partagé (GCRA) pour les vues et le middleware.
+
+Remplace les compteurs ``cache.get`` + ``cache.incr``/``cache.set`` recopiés
+de vue en vue : deux allers-retours Redis, non atomiques, et une fenêtre
+fixe qui se réinitialise d'un coup (rafale possible à cheval sur deux
+fenêtres). Ici un seul algorithme, **GCRA** (Generic Cell Rate Algorithm,
+équivalent exact d'un seau de jetons de capacité ``limit`` rechargé de
+``limit`` jetons par ``period``) :
+
+- on mémorise par clé le *TAT* (theoretical arrival time) ;
+- une requête est acceptée si ``TAT + intervalle - period <= maintenant`` ;
+- le quota se reconstitue en continu (fenêtre glissante), sans remise à zéro.
+
+Exécution :
+
+- **Redis** (cache ``default`` de production) : un script Lua, un seul
+  aller-retour, atomique, horloge ``TIME`` du serveur ;
+- **autres backends** (LocMem en dev/tests) : même calcul sur le cache sous
+  un verrou de processus (LocMem est déjà local au processus) ;
+- **Redis injoignable** : seaux en mémoire du processus pendant 60 s, puis
+  nouvel essai. Les limites restent appliquées (par worker) au lieu
+  d'échouer ouvert ou de renvoyer des 503.
+
+Usage ::
+
+    from core.ratelimit import hit
+
+    if not hit('inv_checkout', ip, limit=10, period=3600).allowed:
+        return JsonResponse({...}, status=429)
+"""
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ratelimit'
+# Au-delà, les seaux locaux expirés sont purgés (mémoire bornée).
+LOCAL_MAX_KEYS = 10_000
+REDIS_RETRY_SECONDS = 60
+
+# KEYS[1] = TAT ; ARGV = limite, période (s), coût.
+# Renvoie {autorisé (0/1), restant, attente en ms}.
+_LUA_GCRA = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local interval = period / limit
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval * cost
+local allow_at = new_tat - period
+if allow_at > now then
+  return {0, 0, math.ceil((allow_at - now) * 1000)}
+end
+redis.call('SET', KEYS[1], string.format('%.6f', new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, math.floor((period - (new_tat - now)) / interval), 0}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Décision du limiteur pour une requête."""
+    allowed: bool
+    remaining: int
+    retry_after: int  # secondes avant la prochaine requête acceptée (0 si acceptée)
+
+    def __bool__(self) -> bool:
+        return self.allowed
+
+
+def _gcra(tat: Optional[float], now: float, limit: int, period: float, cost: int):
+    """Calcul GCRA commun : renvoie (résultat, nouveau TAT ou None si refus)."""
+    interval = period / limit
+    tat = max(tat if tat is not None else now, now)
+    new_tat = tat + interval * cost
+    allow_at = new_tat - period
+    if allow_at > now:
+        return RateLimitResult(False, 0, max(1, math.ceil(allow_at - now))), None
+    remaining = int((period - (new_tat - now)) // interval)
+    return RateLimitResult(True, max(0, remaining), 0), new_tat
+
+
+class _LocalBuckets:
+    """Seaux en mémoire (repli par processus quand Redis est injoignable)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tats: dict[str, float] = {}
+
+    def hit(self, key: str, limit: int, period: float, cost: int) -> RateLimitResult:
+        with self._lock:
+            now = time.monotonic()
+            if len(self._tats) > LOCAL_MAX_KEYS:
+                self._tats = {k: v for k, v in self._tats.items() if v > now}
+            result, new_tat = _gcra(self._tats.get(key), now, limit, period, cost)
+            if new_tat is not None:
+                self._tats[key] = new_tat
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tats.clear()
+
+
+class RateLimiter:
+    """GCRA atomique : Lua sur Redis, verrou local ailleurs, repli mémoire."""
+
+    def __init__(self, alias: str = 'default'):
+        self.alias = alias
+        self._local = _LocalBuckets()
+        self._cache_lock = threading.Lock()
+        self._script = None
+        self._redis_disabled_until = 0.0
+
+    def _redis_script(self):
+        if self._script is None:
+            from django.core.cache.backends.redis import RedisCache
+
+            backend = caches[self.alias]
+            if not isinstance(backend, RedisCache):
+                return None
+            client = backend._cache.get_client(write=True)
+            self._script = (client.register_script(_LUA_GCRA), backend.make_key)
+        return self._script
+
+    def _hit_cache(self, key: str, limit: int, period: float, cost: int) -> RateLimitResult:
+        backend = caches[self.alias]
+        with self._cache_lock:
+            now = time.time()
+            result, new_tat = _gcra(backend.get(key), now, limit, period, cost)
+            if new_tat is not None:
+                backend.set(key, new_tat, max(1, math.ceil(new_tat - now)))
+            return result
+
+    def hit(self, key: str, *, limit: int, period: float, cost: int = 1) -> RateLimitResult:
+        """Consomme ``cost`` unités du quota ``limit`` / ``period`` secondes de ``key``."""
+        if limit <= 0:
+            return RateLimitResult(False, 0, max(1, math.ceil(period)))
+        if time.monotonic() >= self._redis_disabled_until:
+            try:
+                script = self._redis_script()
+                if script is None:
+                    return self._hit_cache(key, limit, period, cost)
+                run, make_key = script
+                allowed, remaining, wait_ms = run(keys=[make_key(key)], args=[limit, period, cost])
+                return RateLimitResult(
+                    bool(allowed), int(remaining), math.ceil(int(wait_ms) / 1000) if not allowed else 0,
+                )
+            except Exception as e:  # noqa: BLE001 — cache indisponible : repli local
+                logger.warning(
+                    "Limiteur de débit : cache indisponible (%s), repli mémoire %d s", e, REDIS_RETRY_SECONDS,
+                )
+                self._script = None
+                self._redis_disabled_until = time.monotonic() + REDIS_RETRY_SECONDS
+        return self._local.hit(key, limit, period, cost)
+
+    def reset(self) -> None:
+        """Oublie l'état local (tests)."""
+        self._local.reset()
+        self._script = None
+        self._redis_disabled_until = 0.0
+
+
+# Singleton processus (l'état lui-même est dans Redis)
+limiter = RateLimiter()
+
+
+def hit(scope: str, identifier: str, *, limit: int, period: float, cost: int = 1) -> RateLimitResult:
+    """Raccourci : clé ``ratelimit:<scope>:<identifier>``."""
+    return limiter.hit(f'{KEY_PREFIX}:{scope}:{identifier}', limit=limit, period=period, cost=cost)
+
+
+__all__ = [
+    'RateLimitResult',
+    'RateLimiter',
+    'hit',
+    'limiter',
+]
@@ -6,16 +6,24 @@ sont automatiquement envoyés via l'API transactionnelle Brevo.
 
 Usage dans settings :
     EMAIL_BACKEND = 'core.services.brevo_backend.BrevoEmailBackend'
+
+Le client HTTP est partagé par processus (``core.services.brevo_client``) :
+les connexions keep-alive survivent aux instances du backend, et
+``send_messages`` envoie ses messages en parallèle sur ce pool.
 """
 from __future__ import annotations
 
 import base64
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 from django.conf import settings
 from django.core.mail.backends.base import BaseEmailBackend
 
+from core.services.brevo_client import concurrency, get_transactional_api, request_timeout
+from core.services.brevo_throttle import TRANSACTIONAL, RateLimitExceeded, limiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,32 +37,37 @@ class BrevoEmailBackend(BaseEmailBackend):
 
     @property
     def api_instance(self):
-        if self._api_instance is None:
-            import sib_api_v3_sdk
-
-            configuration = sib_api_v3_sdk.Configuration()
-            configuration.api_key['api-key'] = self.api_key
-            self._api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-                sib_api_v3_sdk.ApiClient(configuration)
-            )
-        return self._api_instance
+        if self._api_instance is not None:
+            return self._api_instance
+        return get_transactional_api(self.api_key)
 
     def send_messages(self, email_messages) -> int:
-        """Envoie une liste d'EmailMessage via l'API Brevo."""
+        """Envoie une liste d'EmailMessage via l'API Brevo (en parallèle)."""
         if not self.api_key:
             logger.warning("BREVO_API_KEY non configuré — emails non envoyés")
             return 0
 
-        sent = 0
-        for message in email_messages:
-            try:
-                if self._send_one(message):
-                    sent += 1
-            except Exception as e:
-                logger.error("Erreur envoi Brevo pour '%s': %s", message.subject, e)
-                if not self.fail_silently:
-                    raise
-        return sent
+        email_messages = list(email_messages)
+        if not email_messages:
+            return 0
+        workers = min(concurrency(), len(email_messages))
+        if workers == 1:
+            outcomes = [self._send_safely(message) for message in email_messages]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='brevo') as pool:
+                outcomes = list(pool.map(self._send_safely, email_messages))
+
+        errors = [error for _, error in outcomes if error is not None]
+        if errors and not self.fail_silently:
+            raise errors[0]
+        return sum(1 for sent, _ in outcomes if sent)
+
+    def _send_safely(self, message) -> tuple[bool, Optional[Exception]]:
+        try:
+            return bool(self._send_one(message)), None
+        except Exception as e:
+            logger.error("Erreur envoi Brevo pour '%s': %s", message.subject, e)
+            return False, e
 
     def _send_one(self, message) -> bool:
         """Envoie un seul EmailMessage via Brevo."""
@@ -137,8 +150,17 @@ class BrevoEmailBackend(BaseEmailBackend):
             if brevo_attachments:
                 smtp_email.attachment = brevo_attachments
 
-        # Envoi
-        response = self.api_instance.send_transac_email(smtp_email)
+        # Envoi (jeton du limiteur partagé, cf. brevo_throttle)
+        if not limiter.acquire(TRANSACTIONAL):
+            raise RateLimitExceeded(f"Débit Brevo saturé, email '{message.subject}' non envoyé")
+        try:
+            response = self.api_instance.send_transac_email(
+                smtp_email, _request_timeout=request_timeout()
+            )
+        except Exception as e:
+            if getattr(e, 'status', None) == 429:
+                limiter.record_upstream_429(TRANSACTIONAL)
+            raise
         logger.info(
             "Email envoyé via Brevo API: '%s' → %s (ID: %s)",
             message.subject,
@@ -0,0 +1,106 @@
+"""
+Client API Brevo partagé par processus (pool de connexions keep-alive).
+
+Django instancie un ``BrevoEmailBackend`` par ``send_mail`` et chaque
+instance construisait son propre ``sib_api_v3_sdk.ApiClient`` : nouveau
+``urllib3.PoolManager``, donc nouvelle poignée de main TLS à presque chaque
+email. Ici un seul ``TransactionalEmailsApi`` est créé par processus (et par
+clé API) ; son pool urllib3 garde les connexions ouvertes (HTTP/1.1
+keep-alive) et accepte ``POOL_SIZE`` requêtes simultanées, ce qui permet à
+``BrevoEmailBackend.send_messages`` d'envoyer ses messages en parallèle.
+
+Le client est recréé après un ``fork`` (workers Gunicorn / django-q) : des
+sockets hérités du parent ne doivent jamais être partagés.
+
+Réglages optionnels (``settings.BREVO_HTTP``) : ``HOST`` (URL de l'API,
+utile en test), ``POOL_SIZE`` (connexions gardées ouvertes),
+``CONCURRENCY`` (envois simultanés de ``send_messages``), ``TIMEOUT``
+(secondes par requête).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 30
+
+_lock = threading.Lock()
+_clients: dict[tuple, object] = {}
+_owner_pid: Optional[int] = None
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, 'BREVO_HTTP', {}) or {}).get(key, default)
+
+
+def concurrency() -> int:
+    """Nombre d'envois simultanés (borné par la taille du pool)."""
+    return max(1, min(int(_cfg('CONCURRENCY', DEFAULT_CONCURRENCY)), pool_size()))
+
+
+def pool_size() -> int:
+    return max(1, int(_cfg('POOL_SIZE', DEFAULT_POOL_SIZE)))
+
+
+def request_timeout() -> int:
+    # Le SDK n'accepte qu'un entier (ou un tuple connexion/lecture)
+    return int(_cfg('TIMEOUT', DEFAULT_TIMEOUT))
+
+
+def _build(api_key: str, host: Optional[str], size: int):
+    import sib_api_v3_sdk
+
+    configuration = sib_api_v3_sdk.Configuration()
+    configuration.api_key['api-key'] = api_key
+    configuration.connection_pool_maxsize = size
+    if host:
+        configuration.host = host.rstrip('/')
+    return sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+
+
+def get_transactional_api(api_key: str):
+    """``TransactionalEmailsApi`` partagé pour ``api_key`` (un par processus)."""
+    global _owner_pid
+
+    host = _cfg('HOST', None)
+    size = pool_size()
+    key = (api_key, host, size)
+    pid = os.getpid()
+    with _lock:
+        if _owner_pid != pid:
+            # Processus fils : ne jamais réutiliser les sockets du parent
+            _clients.clear()
+            _owner_pid = pid
+        api = _clients.get(key)
+        if api is None:
+            api = _clients[key] = _build(api_key, host, size)
+            logger.debug("Client Brevo créé (pool %d, pid %d)", size, pid)
+        return api
+
+
+def reset_clients() -> None:
+    """Ferme les pools (tests, rotation de clé API)."""
+    with _lock:
+        for api in _clients.values():
+            try:
+                api.api_client.rest_client.pool_manager.clear()
+            except Exception:  # noqa: BLE001 — fermeture best-effort
+                pass
+        _clients.clear()
+
+
+__all__ = [
+    'concurrency',
+    'get_transactional_api',
+    'pool_size',
+    'request_timeout',
+    'reset_clients',
+]
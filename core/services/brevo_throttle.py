@@ -0,0 +1,230 @@
+"""
+Limiteur de débit partagé pour tout le trafic Brevo (token bucket).
+
+Emails transactionnels (devis, factures, bienvenue via ``core.tasks``),
+prospection en masse et newsletters appellent la même API Brevo : chacun
+se régulait avec son propre ``time.sleep`` et, ensemble, ils dépassaient
+le débit du compte (HTTP 429). Tous passent désormais par un seau de jetons
+unique :
+
+- **Redis** (cache ``default`` de production) : le seau est une clé Redis
+  mise à jour par un script Lua atomique (horloge ``TIME`` du serveur), donc
+  partagé entre workers Gunicorn et django-q.
+- **Repli local** (LocMem en dev/tests, Redis injoignable) : même algorithme
+  en mémoire, par processus.
+
+Voies prioritaires : ``transactional`` peut vider le seau, ``bulk`` doit y
+laisser ``BULK_RESERVE`` (fraction de la capacité). Sous contention, le
+transactionnel passe donc toujours avant la prospection et les newsletters.
+
+Métriques (`metrics()`) : jetons accordés, attentes (nombre, durée cumulée),
+rejets (délai dépassé) et 429 renvoyés malgré tout par Brevo, par voie.
+
+Réglages optionnels (``settings.BREVO_RATE_LIMIT``) : ``RATE`` (jetons/s),
+``BURST`` (capacité), ``BULK_RESERVE``, ``TRANSACTIONAL_TIMEOUT``,
+``BULK_TIMEOUT`` (secondes d'attente max avant rejet).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+logger = logging.getLogger(__name__)
+
+TRANSACTIONAL = 'transactional'
+BULK = 'bulk'
+LANES = (TRANSACTIONAL, BULK)
+
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 20
+DEFAULT_BULK_RESERVE = 0.25
+DEFAULT_TIMEOUTS = {TRANSACTIONAL: 30.0, BULK: 120.0}
+
+BUCKET_KEY = 'brevo:bucket'
+METRICS_KEY = 'brevo:metrics:{lane}:{name}'
+METRIC_NAMES = ('acquired', 'waits', 'wait_ms', 'rejected', 'upstream_429')
+
+# KEYS[1] = seau ; ARGV = débit (jetons/s), capacité, plancher de la voie.
+# Renvoie 0 si le jeton est accordé, sinon l'attente estimée en ms.
+_LUA_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local floor = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local granted = 0
+local wait_ms = 0
+if tokens >= floor + 1 then
+  tokens = tokens - 1
+  granted = 1
+else
+  wait_ms = math.ceil((floor + 1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+if granted == 1 then return 0 end
+return wait_ms
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Aucun jeton Brevo obtenu dans le délai imparti."""
+
+
+def _cfg(key: str, default):
+    return (getattr(settings, 'BREVO_RATE_LIMIT', {}) or {}).get(key, default)
+
+
+class _LocalBucket:
+    """Seau en mémoire (repli par processus)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: Optional[float] = None
+        self._ts = 0.0
+
+    def take(self, rate: float, capacity: float, floor: float) -> int:
+        with self._lock:
+            now = time.monotonic()
+            if self._tokens is None:
+                self._tokens, self._ts = capacity, now
+            self._tokens = min(capacity, self._tokens + max(0.0, now - self._ts) * rate)
+            self._ts = now
+            if self._tokens >= floor + 1:
+                self._tokens -= 1
+                return 0
+            return int((floor + 1 - self._tokens) / rate * 1000) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tokens = None
+
+
+class BrevoRateLimiter:
+    """Seau de jetons partagé (Redis + Lua) avec repli local et voies prioritaires."""
+
+    def __init__(self):
+        self._local = _LocalBucket()
+        self._script = None
+        self._redis_disabled_until = 0.0
+
+    # -- configuration -----------------------------------------------------
+    @property
+    def rate(self) -> float:
+        return float(_cfg('RATE', DEFAULT_RATE))
+
+    @property
+    def capacity(self) -> float:
+        return float(_cfg('BURST', DEFAULT_BURST))
+
+    def floor(self, lane: str) -> float:
+        if lane == BULK:
+            return self.capacity * float(_cfg('BULK_RESERVE', DEFAULT_BULK_RESERVE))
+        return 0.0
+
+    def timeout(self, lane: str) -> float:
+        return float(_cfg(f'{lane.upper()}_TIMEOUT', DEFAULT_TIMEOUTS.get(lane, 30.0)))
+
+    # -- seau ----------------------------------------------------------------
+    def _redis_script(self):
+        if time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._script is None:
+            from django.core.cache.backends.redis import RedisCache
+
+            backend = caches['default']
+            if not isinstance(backend, RedisCache):
+                return None
+            client = backend._cache.get_client(write=True)
+            self._script = (client.register_script(_LUA_TOKEN_BUCKET), backend.make_key(BUCKET_KEY))
+        return self._script
+
+    def _take(self, lane: str) -> int:
+        script = self._redis_script()
+        if script is not None:
+            run, key = script
+            try:
+                return int(run(keys=[key], args=[self.rate, self.capacity, self.floor(lane)]))
+            except Exception as e:  # noqa: BLE001 — Redis indisponible : repli local
+                logger.warning("Limiteur Brevo : Redis indisponible (%s), repli local 60 s", e)
+                self._script = None
+                self._redis_disabled_until = time.monotonic() + 60
+        return self._local.take(self.rate, self.capacity, self.floor(lane))
+
+    def acquire(self, lane: str = TRANSACTIONAL, *, timeout: Optional[float] = None) -> bool:
+        """Attend un jeton pour ``lane`` ; False si ``timeout`` est dépassé."""
+        if lane not in LANES:
+            raise ValueError(f"Voie inconnue : {lane!r}")
+        timeout = self.timeout(lane) if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        started = time.monotonic()
+        waited = False
+        while True:
+            wait_ms = self._take(lane)
+            if wait_ms <= 0:
+                _incr(lane, 'acquired')
+                if waited:
+                    _incr(lane, 'waits')
+                    _incr(lane, 'wait_ms', int((time.monotonic() - started) * 1000))
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _incr(lane, 'rejected')
+                logger.warning("Limiteur Brevo : jeton refusé (voie %s, attente > %.1f s)", lane, timeout)
+                return False
+            waited = True
+            time.sleep(min(wait_ms / 1000, remaining))
+
+    def record_upstream_429(self, lane: str = TRANSACTIONAL) -> None:
+        """Brevo a répondu 429 malgré le seau : à signaler (débit mal réglé)."""
+        _incr(lane, 'upstream_429')
+
+    def reset(self) -> None:
+        """Vide l'état local et les métriques (tests, changement de réglage)."""
+        self._local.reset()
+        self._script = None
+        self._redis_disabled_until = 0.0
+        cache.delete_many([METRICS_KEY.format(lane=lane, name=name) for lane in LANES for name in METRIC_NAMES])
+
+
+def _incr(lane: str, name: str, amount: int = 1) -> None:
+    key = METRICS_KEY.format(lane=lane, name=name)
+    try:
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+    except Exception:  # noqa: BLE001 — les métriques ne bloquent jamais un envoi
+        logger.debug("Métrique Brevo %s non enregistrée", key, exc_info=True)
+
+
+def metrics() -> dict:
+    """Compteurs par voie : ``{'transactional': {'acquired': n, ...}, 'bulk': {...}}``."""
+    keys = {(lane, name): METRICS_KEY.format(lane=lane, name=name) for lane in LANES for name in METRIC_NAMES}
+    values = cache.get_many(list(keys.values()))
+    return {
+        lane: {name: int(values.get(keys[(lane, name)], 0)) for name in METRIC_NAMES}
+        for lane in LANES
+    }
+
+
+# Singleton processus (le seau lui-même est partagé via Redis)
+limiter = BrevoRateLimiter()
+
+
+__all__ = [
+    'BULK',
+    'BrevoRateLimiter',
+    'LANES',
+    'RateLimitExceeded',
+    'TRANSACTIONAL',
+    'limiter',
+    'metrics',
+]
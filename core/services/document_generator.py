@@ -2,6 +2,7 @@
 Document Generator Service
 Génère les PDFs pour les devis et factures avec la charte graphique TUS.
 """
+import base64
 import logging
 from io import BytesIO
 from typing import TYPE_CHECKING, Optional
@@ -115,6 +116,24 @@ class DocumentGenerator:
         )
         return html_content
     
+    @classmethod
+    def _signature_data_uri(cls, quote: 'Quote') -> Optional[str]:
+        """Signature du client à incruster dans le PDF (data URI PNG).
+
+        La variante rognée et réduite (``signature_display``) est préférée ;
+        l'original n'est utilisé que si le traitement de fond n'a pas abouti.
+        """
+        image = quote.signature_display or quote.signature_image
+        if not image:
+            return None
+        try:
+            with image.open('rb') as fh:
+                data = fh.read()
+        except Exception:
+            logger.warning("Signature du devis %s illisible — PDF sans image.", quote.number, exc_info=True)
+            return None
+        return 'data:image/png;base64,' + base64.b64encode(data).decode('ascii')
+
     @classmethod
     def generate_quote_pdf(cls, quote: "Quote", attach: bool = True) -> bytes:
         """Génère le PDF d'un devis.
@@ -151,6 +170,7 @@ class DocumentGenerator:
                 'integrity_hash': audit.get('integrity_hash', 'N/A')[:16] + '...' if audit.get('integrity_hash') else 'N/A',
                 'legal_statement': audit.get('legal', {}).get('statement', ''),
                 'has_signature_image': bool(quote.signature_image),
+                'signature_image_uri': cls._signature_data_uri(quote),
             }
         
         # Préparer les informations de validation OTP si le devis a été validé
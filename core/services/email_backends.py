@@ -21,12 +21,18 @@ from typing import Optional
 from django.conf import settings
 from django.core.mail import EmailMessage
 
+from core.services.brevo_client import get_transactional_api, request_timeout
+from core.services.brevo_throttle import BULK, TRANSACTIONAL, limiter
+
 logger = logging.getLogger(__name__)
 
 
 class BrevoEmailService:
     """Service d'envoi d'emails via l'API Brevo."""
 
+    # Limite Brevo de messageVersions par appel /smtp/email
+    MAX_MESSAGE_VERSIONS = 1000
+
     def __init__(self):
         self.api_key = getattr(settings, 'BREVO_API_KEY', None)
         self.default_from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'contact@traitdunion.it')
@@ -35,21 +41,14 @@ class BrevoEmailService:
 
     @property
     def api_instance(self):
-        """Lazy loading de l'instance API Brevo."""
-        if self._api_instance is None:
-            try:
-                import sib_api_v3_sdk
-                from sib_api_v3_sdk.rest import ApiException  # noqa: F401
-
-                configuration = sib_api_v3_sdk.Configuration()
-                configuration.api_key['api-key'] = self.api_key
-                self._api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-                    sib_api_v3_sdk.ApiClient(configuration)
-                )
-            except ImportError:
-                logger.error("Le package sib-api-v3-sdk n'est pas installé")
-                raise
-        return self._api_instance
+        """Client API Brevo partagé par processus (cf. brevo_client)."""
+        if self._api_instance is not None:
+            return self._api_instance
+        try:
+            return get_transactional_api(self.api_key)
+        except ImportError:
+            logger.error("Le package sib-api-v3-sdk n'est pas installé")
+            raise
 
     def is_configured(self) -> bool:
         """Vérifie si Brevo est correctement configuré."""
@@ -67,6 +66,8 @@ class BrevoEmailService:
         reply_to: Optional[str] = None,
         attachments: Optional[list[dict]] = None,
         tags: Optional[list[str]] = None,
+        lane: str = TRANSACTIONAL,
+        limiter_timeout: Optional[float] = None,
     ) -> dict:
         """
         Envoie un email transactionnel via Brevo.
@@ -81,9 +82,14 @@ class BrevoEmailService:
             reply_to: Adresse de réponse (optionnel)
             attachments: Liste de pièces jointes [{'name': 'file.pdf', 'content': bytes}]
             tags: Tags pour le tracking (optionnel)
+            lane: Voie du limiteur de débit (``transactional`` ou ``bulk``)
+            limiter_timeout: Attente maximale d'un jeton du limiteur, en
+                secondes (défaut de la voie si None)
 
         Returns:
-            dict avec 'success': bool et 'message_id' ou 'error'
+            dict avec 'success': bool et 'message_id' ou 'error' ; un jeton
+            refusé renvoie ``status_code`` 429 et ``throttled`` (rien n'est
+            parti chez Brevo)
 
         Raises:
             Exception si l'envoi échoue et que fail_silently=False
@@ -141,8 +147,12 @@ class BrevoEmailService:
             if tags:
                 send_smtp_email.tags = tags
 
-            # Envoi
-            api_response = self.api_instance.send_transac_email(send_smtp_email)
+            # Envoi (jeton du limiteur partagé, cf. brevo_throttle)
+            if not limiter.acquire(lane, timeout=limiter_timeout):
+                return {'success': False, 'error': 'Débit Brevo saturé', 'status_code': 429, 'throttled': True}
+            api_response = self.api_instance.send_transac_email(
+                send_smtp_email, _request_timeout=request_timeout()
+            )
             logger.info(
                 "Email envoyé via Brevo: %s -> %s (ID: %s)",
                 subject, to_email, api_response.message_id
@@ -154,6 +164,8 @@ class BrevoEmailService:
 
         except Exception as e:
             error_msg = str(e)
+            if getattr(e, 'status', None) == 429:
+                limiter.record_upstream_429(lane)
             if 'ApiException' in type(e).__name__ or hasattr(e, 'status'):
                 logger.error("Erreur API Brevo: %s", e)
                 return {
@@ -167,6 +179,89 @@ class BrevoEmailService:
                 'error': error_msg
             }
 
+    def send_batch(
+        self,
+        subject: str,
+        html_content: str,
+        versions: list[dict],
+        *,
+        from_email: Optional[str] = None,
+        from_name: Optional[str] = None,
+        tags: Optional[list[str]] = None,
+        lane: str = BULK,
+    ) -> dict:
+        """
+        Envoie un même email à plusieurs destinataires en un appel (messageVersions).
+
+        Le HTML est commun ; chaque version apporte son destinataire et ses
+        paramètres, référencés dans le HTML par ``{{ params.<clé> }}``.
+
+        Args:
+            subject: Objet de l'email
+            html_content: Contenu HTML commun (avec placeholders ``params``)
+            versions: ``[{'to': email, 'params': {...}}]``, au plus
+                ``MAX_MESSAGE_VERSIONS`` éléments
+            from_email: Email expéditeur (optionnel)
+            from_name: Nom expéditeur (optionnel)
+            tags: Tags pour le tracking (optionnel)
+            lane: Voie du limiteur de débit (``bulk`` par défaut)
+
+        Returns:
+            dict avec 'success': bool et 'message_ids' ou 'error'
+        """
+        if len(versions) > self.MAX_MESSAGE_VERSIONS:
+            raise ValueError(f"Au plus {self.MAX_MESSAGE_VERSIONS} versions par appel Brevo")
+        if not versions:
+            return {'success': True, 'message_ids': []}
+
+        if not self.is_configured():
+            logger.warning("Brevo non configuré, lot non envoyé: %s (%d)", subject, len(versions))
+            if settings.DEBUG:
+                return {'success': True, 'message_ids': ['dev-mode'] * len(versions), 'fallback': True}
+            return {'success': False, 'error': 'Brevo non configuré'}
+
+        try:
+            import sib_api_v3_sdk
+
+            send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+                sender=sib_api_v3_sdk.SendSmtpEmailSender(
+                    email=from_email or self.default_from_email,
+                    name=from_name or self.default_from_name
+                ),
+                subject=subject,
+                html_content=html_content,
+                message_versions=[
+                    sib_api_v3_sdk.SendSmtpEmailMessageVersions(
+                        to=[sib_api_v3_sdk.SendSmtpEmailTo1(email=version['to'])],
+                        params=version.get('params') or None,
+                    )
+                    for version in versions
+                ],
+            )
+            if tags:
+                send_smtp_email.tags = tags
+
+            if not limiter.acquire(lane):
+                return {'success': False, 'error': 'Débit Brevo saturé', 'status_code': 429}
+            api_response = self.api_instance.send_transac_email(
+                send_smtp_email, _request_timeout=request_timeout()
+            )
+            message_ids = list(getattr(api_response, 'message_ids', None) or [])
+            if not message_ids and getattr(api_response, 'message_id', None):
+                message_ids = [api_response.message_id]
+            logger.info("Lot envoyé via Brevo: %s -> %d destinataires", subject, len(versions))
+            return {'success': True, 'message_ids': message_ids}
+
+        except Exception as e:
+            if getattr(e, 'status', None) == 429:
+                limiter.record_upstream_429(lane)
+            logger.error("Erreur lors de l'envoi d'un lot via Brevo (%d destinataires): %s", len(versions), e)
+            return {
+                'success': False,
+                'error': str(e),
+                'status_code': getattr(e, 'status', None),
+            }
+
     def send_email_with_template(
         self,
         to_email: str,
@@ -223,7 +318,11 @@ class BrevoEmailService:
                     )
                 send_smtp_email.attachment = brevo_attachments
 
-            api_response = self.api_instance.send_transac_email(send_smtp_email)
+            if not limiter.acquire(TRANSACTIONAL):
+                return {'success': False, 'error': 'Débit Brevo saturé', 'status_code': 429}
+            api_response = self.api_instance.send_transac_email(
+                send_smtp_email, _request_timeout=request_timeout()
+            )
             logger.info(
                 "Email template envoyé via Brevo: template=%d -> %s (ID: %s)",
                 template_id, to_email, api_response.message_id
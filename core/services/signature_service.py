@@ -25,10 +25,10 @@ logger = logging.getLogger(__name__)
 
 # Import conditionnel de PIL
 try:
-    from PIL import Image
+    from PIL import Image, ImageChops
     PIL_AVAILABLE = True
 except ImportError:
-    Image = None
+    Image = ImageChops = None
     PIL_AVAILABLE = False
     logger.warning("Pillow non installé. Validation des signatures désactivée.")
 
@@ -43,6 +43,10 @@ class SignatureService:
     # Taille maximale du fichier base64 (500KB)
     MAX_BASE64_SIZE = 500 * 1024
 
+    # Variante d'affichage : largeur max et marge autour du tracé
+    MAX_DISPLAY_WIDTH = 600
+    TRIM_PADDING = 8
+
     @classmethod
     def validate_signature_data(cls, base64_data: str) -> Tuple[bool, str]:
         """
@@ -54,25 +58,40 @@ class SignatureService:
         Returns:
             Tuple (is_valid, message)
         """
+        image_data, message = cls.decode_signature_data(base64_data)
+        return image_data is not None, message
+
+    @classmethod
+    def decode_signature_data(cls, base64_data: str) -> Tuple[Optional[bytes], str]:
+        """
+        Décode et valide la signature en un seul passage.
+
+        La requête de signature réutilise les octets renvoyés pour
+        l'enregistrement (``store_signature_image``) au lieu de décoder le
+        base64 une seconde fois.
+
+        Returns:
+            Tuple (octets de l'image ou None si invalide, message)
+        """
         if not base64_data:
-            return False, "Aucune signature fournie"
+            return None, "Aucune signature fournie"
 
         # Vérifier la taille
         if len(base64_data) > cls.MAX_BASE64_SIZE:
-            return False, "La signature est trop volumineuse"
+            return None, "La signature est trop volumineuse"
 
         # Nettoyer le préfixe data:image/png;base64,
         if base64_data.startswith('data:image'):
             try:
                 base64_data = base64_data.split(',')[1]
             except IndexError:
-                return False, "Format de signature invalide"
+                return None, "Format de signature invalide"
 
         # Décoder le base64
         try:
             image_data = base64.b64decode(base64_data)
         except Exception:
-            return False, "Données base64 invalides"
+            return None, "Données base64 invalides"
 
         # Valider avec PIL si disponible
         if PIL_AVAILABLE:
@@ -81,21 +100,21 @@ class SignatureService:
 
                 # Vérifier le format
                 if img.format not in ('PNG', 'JPEG'):
-                    return False, "Format d'image non supporté (PNG requis)"
+                    return None, "Format d'image non supporté (PNG requis)"
 
                 # Vérifier les dimensions minimales
                 if img.width < cls.MIN_WIDTH or img.height < cls.MIN_HEIGHT:
-                    return False, f"Signature trop petite (min {cls.MIN_WIDTH}x{cls.MIN_HEIGHT}px)"
+                    return None, f"Signature trop petite (min {cls.MIN_WIDTH}x{cls.MIN_HEIGHT}px)"
 
                 # Vérifier que l'image n'est pas vide (tout blanc/transparent)
                 if cls._is_blank_image(img):
-                    return False, "La signature semble vide"
+                    return None, "La signature semble vide"
 
             except Exception as e:
                 logger.error(f"Erreur validation image: {e}")
-                return False, "Image corrompue ou invalide"
+                return None, "Image corrompue ou invalide"
 
-        return True, "Signature valide"
+        return image_data, "Signature valide"
 
     @classmethod
     def _is_blank_image(cls, img: "Image.Image") -> bool:
@@ -113,22 +132,62 @@ class SignatureService:
             if img.mode != 'RGBA':
                 img = img.convert('RGBA')
 
-            # Compter les pixels non-blancs et non-transparents
-            pixels = list(img.getdata())
-            non_blank = 0
-            for r, g, b, a in pixels:
-                # Pixel visible (non transparent) et non blanc
-                if a > 10 and (r < 250 or g < 250 or b < 250):
-                    non_blank += 1
+            # Compter les pixels non-blancs et non-transparents (opérations
+            # Pillow en C : pas de boucle Python sur chaque pixel)
+            visible, dark = cls._ink_masks(img)
+            non_blank = ImageChops.multiply(visible, dark).histogram()[255]
 
             # Si moins de 1% des pixels sont "dessinés", considérer comme vide
-            threshold = len(pixels) * 0.01
+            threshold = img.width * img.height * 0.01
             return non_blank < threshold
 
         except Exception:
             # En cas d'erreur, ne pas bloquer
             return False
 
+    @staticmethod
+    def _ink_masks(img: "Image.Image"):
+        """Masques (0/255) des pixels visibles (alpha > 10) et non blancs (< 250)."""
+        r, g, b, a = img.split()
+        visible = a.point(lambda v: 255 if v > 10 else 0)
+        darkest = ImageChops.darker(ImageChops.darker(r, g), b)
+        dark = darkest.point(lambda v: 255 if v < 250 else 0)
+        return visible, dark
+
+    @classmethod
+    def normalize_signature_image(cls, image_data: bytes) -> bytes:
+        """
+        Rogne la signature au tracé, la réduit et l'optimise (PNG).
+
+        Utilisé en tâche de fond (cf. ``apps.devis.signature_pipeline``) :
+        l'original haché reste la pièce probante, cette variante sert à
+        l'affichage et au PDF.
+
+        Returns:
+            Image PNG optimisée
+        """
+        img = Image.open(BytesIO(image_data))
+        img.load()
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+
+        visible, dark = cls._ink_masks(img)
+        bbox = ImageChops.multiply(visible, dark).getbbox()
+        if bbox:
+            left, top, right, bottom = bbox
+            pad = cls.TRIM_PADDING
+            img = img.crop((
+                max(left - pad, 0), max(top - pad, 0),
+                min(right + pad, img.width), min(bottom + pad, img.height),
+            ))
+        if img.width > cls.MAX_DISPLAY_WIDTH:
+            height = max(round(img.height * cls.MAX_DISPLAY_WIDTH / img.width), 1)
+            img = img.resize((cls.MAX_DISPLAY_WIDTH, height), Image.Resampling.LANCZOS)
+
+        buffer = BytesIO()
+        img.save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue()
+
     @classmethod
     def generate_audit_trail(
         cls,
@@ -229,6 +288,21 @@ class SignatureService:
         except Exception:
             return None
 
+        return cls.store_signature_image(image_data, filename, subdir)
+
+    @classmethod
+    def store_signature_image(
+        cls,
+        image_data: bytes,
+        filename: str,
+        subdir: str = "signatures"
+    ) -> Optional[str]:
+        """
+        Écrit une image de signature déjà décodée sous MEDIA_ROOT.
+
+        Returns:
+            Chemin relatif du fichier sauvegardé ou None si erreur
+        """
         if not image_data:
             return None
 
@@ -122,6 +122,102 @@ def async_notify_quote_request(quote_request_id: int):
     )
 
 
+def async_process_quote_request_photos(photo_ids: list):
+    """Optimise les photos d'une demande de devis (WebP, EXIF, doublons)."""
+    photo_ids = list(photo_ids)
+    return _dispatch(
+        'core.tasks._task_process_quote_request_photos',
+        photo_ids,
+        task_name=f'quote_request_photos_{photo_ids[0] if photo_ids else 0}',
+    )
+
+
+def async_process_quote_signature(quote_id: int):
+    """Optimise la signature d'un devis et régénère le PDF signé."""
+    return _dispatch(
+        'core.tasks._task_process_quote_signature',
+        quote_id,
+        task_name=f'quote_signature_{quote_id}',
+    )
+
+
+def async_send_newsletter_campaign(campaign_id: int, workers: int = 1):
+    """Envoie / reprend une campagne newsletter sur ``workers`` tâches parallèles.
+
+    Les tâches se partagent les destinataires (SKIP LOCKED, cf.
+    ``apps.leads.newsletter``) : en lancer plusieurs ne double aucun envoi.
+    """
+    return [
+        _dispatch(
+            'apps.leads.tasks.send_newsletter_campaign_task',
+            campaign_id,
+            task_name=f'newsletter_{campaign_id}_{index}',
+        )
+        for index in range(max(1, workers))
+    ]
+
+
+def schedule_newsletter_campaign_retry(campaign_id: int, run_at):
+    """Planifie une seule reprise différée de la campagne à ``run_at``.
+
+    Pour des lignes encore SENDING (bail en cours) : la reprise attend
+    l'expiration du bail au lieu de se relancer aussitôt. Jamais exécutée
+    de manière synchrone — sans qcluster, le planning attend le prochain
+    démarrage du cluster. Une reprise déjà planifiée n'est pas dupliquée.
+    """
+    from django_q.models import Schedule
+    from django_q.tasks import schedule
+
+    name = f'newsletter_{campaign_id}_retry'
+    if Schedule.objects.filter(name=name).exists():
+        return None
+    # ONCE + repeats=-1 : supprimé par le scheduler après exécution
+    return schedule(
+        'apps.leads.tasks.send_newsletter_campaign_task',
+        campaign_id,
+        name=name,
+        schedule_type=Schedule.ONCE,
+        repeats=-1,
+        next_run=run_at,
+    )
+
+
+def async_send_bulk_email_run(run_id: int):
+    """Met en file un envoi en masse de prospection (cf. apps.leads.bulk_sender).
+
+    Toujours via la file django-q2, sans repli synchrone : un envoi de
+    plusieurs minutes ne doit jamais bloquer la requête de la page d'envoi.
+    Sans qcluster actif, la tâche attend le démarrage du cluster.
+    """
+    return async_task(
+        'apps.leads.tasks.send_bulk_run_task',
+        run_id,
+        task_name=f'bulk_email_run_{run_id}',
+    )
+
+
+def schedule_bulk_email_run_retry(run_id: int, run_at):
+    """Planifie une seule reprise différée de l'envoi en masse à ``run_at``.
+
+    Même principe que ``schedule_newsletter_campaign_retry`` : les lignes
+    encore SENDING sont attendues jusqu'à l'expiration de leur bail.
+    """
+    from django_q.models import Schedule
+    from django_q.tasks import schedule
+
+    name = f'bulk_email_run_{run_id}_retry'
+    if Schedule.objects.filter(name=name).exists():
+        return None
+    return schedule(
+        'apps.leads.tasks.send_bulk_run_task',
+        run_id,
+        name=name,
+        schedule_type=Schedule.ONCE,
+        repeats=-1,
+        next_run=run_at,
+    )
+
+
 def async_notify_invoice_created(invoice_id: int):
     """Notifie l'admin de la création d'une facture."""
     return _dispatch(
@@ -163,6 +259,16 @@ def async_send_password_changed_email(user_id: int):
     )
 
 
+def async_prerender_invoice_pdfs(invoice_ids: list):
+    """Pré-rend les PDF / Factur-X de factures dans le cache chaud."""
+    invoice_ids = list(invoice_ids)
+    return _dispatch(
+        'core.tasks._task_prerender_invoice_pdfs',
+        invoice_ids,
+        task_name=f'prerender_invoice_pdfs_{len(invoice_ids)}',
+    )
+
+
 def async_notify_admin_new_comment(comment_id: int):
     """Notifie l'admin qu'un client a posté un commentaire sur un projet."""
     return _dispatch(
@@ -304,6 +410,23 @@ def _task_notify_quote_request(quote_request_id: int):
     logger.info(f"[ASYNC] Notification demande de devis REQ-{qr.pk} envoyée")
 
 
+def _task_process_quote_request_photos(photo_ids: list):
+    """Worker : variantes WebP + dédoublonnage des photos de demande de devis."""
+    from apps.devis.photo_pipeline import process_photos
+
+    stats = process_photos(photo_ids)
+    logger.info(f"[ASYNC] Photos demande de devis traitées : {stats}")
+
+
+def _task_process_quote_signature(quote_id: int):
+    """Worker : variante d'affichage de la signature + PDF signé."""
+    from apps.devis.signature_pipeline import process_signature
+
+    quote = process_signature(quote_id)
+    status = quote.signature_status if quote else 'introuvable'
+    logger.info(f"[ASYNC] Signature devis {quote_id} traitée : {status}")
+
+
 def _task_notify_invoice_created(invoice_id: int):
     """Worker : notification création facture."""
     from apps.factures.models import Invoice
@@ -376,6 +499,14 @@ def _task_send_payment_confirmation(quote_id: int = None, invoice_id: int = None
         logger.info(f"[ASYNC] Confirmation paiement facture {invoice.number}")
 
 
+def _task_prerender_invoice_pdfs(invoice_ids: list):
+    """Worker : réchauffe le cache des PDF de factures."""
+    from apps.factures.services.pdf_cache import prerender
+
+    rendered = prerender(invoice_ids)
+    logger.info(f"[ASYNC] {rendered} PDF de facture pré-rendus ({len(invoice_ids)} factures)")
+
+
 def _task_send_generic_email(to_email: str, subject: str, html_content: str, from_email: str = None):
     """Worker : email générique."""
     from django.core.mail import EmailMessage
@@ -7,11 +7,11 @@ import io
 import logging
 
 from django.contrib.auth import authenticate
-from django.core.cache import cache
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_POST
 
+from core.ratelimit import hit
 from core.utils import get_client_ip
 
 logger = logging.getLogger(__name__)
@@ -31,16 +31,6 @@ def totp_qr_code(request):
     Returns: PNG image of QR code or 403/429 JSON error
     """
     ip = get_client_ip(request)
-    cache_key = f'totp_qr_rate:{ip}'
-
-    # Rate limiting
-    attempts = cache.get(cache_key, 0)
-    if attempts >= QR_RATE_LIMIT:
-        logger.warning('TOTP QR rate limit exceeded for IP %s', ip)
-        return JsonResponse(
-            {'error': 'Trop de tentatives. Réessayez dans 15 minutes.'},
-            status=429,
-        )
 
     username = request.POST.get('username', '').strip()
     password = request.POST.get('password', '')
@@ -48,8 +38,14 @@ def totp_qr_code(request):
     if not username or not password:
         return JsonResponse({'error': 'Identifiants requis.'}, status=400)
 
-    # Increment rate limit counter BEFORE auth check (prevents timing attacks)
-    cache.set(cache_key, attempts + 1, QR_RATE_WINDOW)
+    # Rate limiting: counted BEFORE auth check (prevents timing attacks),
+    # atomic and still enforced if the cache is down (core.ratelimit)
+    if not hit('totp_qr', ip, limit=QR_RATE_LIMIT, period=QR_RATE_WINDOW).allowed:
+        logger.warning('TOTP QR rate limit exceeded for IP %s', ip)
+        return JsonResponse(
+            {'error': 'Trop de tentatives. Réessayez dans 15 minutes.'},
+            status=429,
+        )
 
     # Authenticate
     user = authenticate(request, username=username, password=password)
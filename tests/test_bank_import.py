@@ -0,0 +1,306 @@
+"""Tests de l'import de relevés bancaires et du rapprochement automatique."""
+import io
+import time
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import User
+
+from apps.clients.models import ClientProfile
+from apps.factures.models import BankStatementImport, BankTransaction, Invoice
+from apps.factures.services.bank_import import (
+    MatchIndex,
+    OpenInvoice,
+    StatementAlreadyImported,
+    StatementLine,
+    apply_reviewed_transactions,
+    import_statement,
+    parse_camt053,
+    parse_csv,
+)
+
+IBAN = 'FR7630006000011234567890189'
+
+
+def camt(entries: str) -> bytes:
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">
+  <BkToCstmrStmt><Stmt><Id>1</Id>{entries}</Stmt></BkToCstmrStmt>
+</Document>'''.encode('utf-8')
+
+
+def entry(amount, remittance='', iban='', indicator='CRDT', ref='REF1', day='2025-03-10'):
+    return f'''
+    <Ntry>
+      <Amt Ccy="EUR">{amount}</Amt>
+      <CdtDbtInd>{indicator}</CdtDbtInd>
+      <BookgDt><Dt>{day}</Dt></BookgDt>
+      <AcctSvcrRef>{ref}</AcctSvcrRef>
+      <NtryDtls><TxDtls>
+        <RltdPties><Dbtr><Nm>Marie Martin</Nm></Dbtr>
+          <DbtrAcct><Id><IBAN>{iban}</IBAN></Id></DbtrAcct></RltdPties>
+        <RmtInf><Ustrd>{remittance}</Ustrd></RmtInf>
+      </TxDtls></NtryDtls>
+    </Ntry>'''
+
+
+@pytest.fixture
+def bank_client(db):
+    return ClientProfile.objects.create(full_name='Marie Martin', email='marie@test.com')
+
+
+def open_invoice(client_profile, ttc, **kwargs):
+    invoice = Invoice.objects.create(client=client_profile, status='sent', **kwargs)
+    Invoice.objects.filter(pk=invoice.pk).update(total_ttc=Decimal(ttc))
+    invoice.refresh_from_db()
+    return invoice
+
+
+class TestParsers:
+    def test_camt053_keeps_credits_only(self):
+        data = camt(entry('150.00', 'Facture FAC-2025-004', IBAN)
+                    + entry('20.00', 'frais', indicator='DBIT', ref='REF2'))
+        lines = list(parse_camt053(io.BytesIO(data)))
+        assert len(lines) == 1
+        line = lines[0]
+        assert line.amount == Decimal('150.00')
+        assert line.booking_date == date(2025, 3, 10)
+        assert line.debtor_iban == IBAN
+        assert line.debtor_name == 'Marie Martin'
+        assert 'FAC-2025-004' in line.remittance
+        assert line.bank_reference == 'REF1'
+
+    def test_csv_french_export(self):
+        data = (
+            'Date;Libellé;Montant;IBAN\n'
+            '10/03/2025;VIR MARIE fac 2025 4;1 250,50;FR76 3000 6000 0112 3456 7890 189\n'
+            '11/03/2025;PRLV EDF;-45,00;\n'
+        ).encode('utf-8')
+        lines = list(parse_csv(io.BytesIO(data)))
+        assert len(lines) == 1
+        assert lines[0].amount == Decimal('1250.50')
+        assert lines[0].debtor_iban == IBAN
+
+
+class TestMatchIndex:
+    def _index(self):
+        invoices = [
+            OpenInvoice(1, 'FAC-2025-001', 10, Decimal('100.00')),
+            OpenInvoice(2, 'FAC-2025-002', 10, Decimal('250.00')),
+            OpenInvoice(3, 'FAC-2025-003', 20, Decimal('100.00')),
+        ]
+        return MatchIndex(invoices, {IBAN: 10})
+
+    def line(self, amount, remittance='', iban=''):
+        return StatementLine(date(2025, 3, 1), Decimal(amount), remittance=remittance, debtor_iban=iban)
+
+    def test_number_and_amount_is_confident(self):
+        result = self._index().match(self.line('250.00', 'Paiement fac-2025-2'))
+        assert result.status == BankTransaction.Status.MATCHED
+        assert [inv.pk for inv, _ in result.allocations] == [2]
+
+    def test_multiple_numbers_summing_to_amount(self):
+        result = self._index().match(self.line('350.00', 'FAC-2025-001 FAC-2025-002'))
+        assert result.status == BankTransaction.Status.MATCHED
+        assert {inv.pk for inv, _ in result.allocations} == {1, 2}
+
+    def test_iban_and_amount_is_confident_and_consumes(self):
+        index = self._index()
+        first = index.match(self.line('100.00', 'virement', IBAN))
+        assert first.status == BankTransaction.Status.MATCHED
+        assert first.allocations[0][0].pk == 1
+        second = index.match(self.line('100.00', 'virement', IBAN))
+        assert second.status != BankTransaction.Status.MATCHED
+
+    def test_amount_only_goes_to_review(self):
+        result = self._index().match(self.line('100.00', 'virement'))
+        assert result.status == BankTransaction.Status.REVIEW
+        assert {inv.pk for inv in result.candidates} == {1, 3}
+
+    def test_thousands_of_lines_match_fast(self):
+        invoices = [OpenInvoice(i, f'FAC-2025-{i:03d}', i % 300, Decimal(100 + i)) for i in range(1, 5001)]
+        index = MatchIndex(invoices, {})
+        lines = [self.line(str(100 + i), f'Reglement FAC-2025-{i:03d}') for i in range(1, 5001)]
+        started = time.perf_counter()
+        results = [index.match(line) for line in lines]
+        assert time.perf_counter() - started < 1.0
+        assert all(r.status == BankTransaction.Status.MATCHED for r in results)
+
+
+@pytest.mark.django_db
+class TestImportStatement:
+    def test_confident_matches_applied_with_audit_trail(self, bank_client):
+        paid = open_invoice(bank_client, '150.00')
+        partial = open_invoice(bank_client, '300.00')
+        untouched = open_invoice(bank_client, '80.00')
+        data = camt(
+            entry('150.00', f'Facture {paid.number}', IBAN, ref='A')
+            + entry('100.00', f'Acompte {partial.number}', ref='B')
+            + entry('80.00', 'virement sans reference', ref='C')
+        )
+        statement = import_statement(io.BytesIO(data), filename='releve.xml')
+
+        assert statement.stats['matched'] == 2
+        assert statement.stats['review'] == 1
+        paid.refresh_from_db()
+        partial.refresh_from_db()
+        untouched.refresh_from_db()
+        assert paid.status == 'paid' and paid.amount_paid == Decimal('150.00')
+        assert partial.status == 'partial' and partial.amount_paid == Decimal('100.00')
+        assert untouched.status == 'sent'
+        trail = list(paid.payment_audit_trail.values())[0]
+        assert trail['payment_method'] == 'bank_transfer'
+        assert trail['debtor_iban'] == IBAN
+        review = BankTransaction.objects.get(status='review')
+        assert review.invoice_id == untouched.pk
+        bank_client.refresh_from_db()
+        assert bank_client.iban == IBAN
+
+    def test_reimport_rejected_and_duplicate_lines_skipped(self, bank_client):
+        invoice = open_invoice(bank_client, '60.00')
+        first = camt(entry('60.00', invoice.number, ref='X'))
+        import_statement(io.BytesIO(first), filename='a.xml')
+        with pytest.raises(StatementAlreadyImported):
+            import_statement(io.BytesIO(first), filename='a.xml')
+        overlapping = camt(entry('60.00', invoice.number, ref='X') + entry('5.00', 'autre', ref='Y'))
+        statement = import_statement(io.BytesIO(overlapping), filename='b.xml')
+        assert statement.stats['duplicates'] == 1
+        invoice.refresh_from_db()
+        assert invoice.amount_paid == Decimal('60.00')
+
+    def test_dry_run_writes_nothing(self, bank_client):
+        invoice = open_invoice(bank_client, '40.00')
+        statement = import_statement(io.BytesIO(camt(entry('40.00', invoice.number))), dry_run=True)
+        assert statement.stats['matched'] == 1
+        assert not BankStatementImport.objects.exists()
+        invoice.refresh_from_db()
+        assert invoice.amount_paid == Decimal('0.00')
+
+    def test_reviewed_transaction_applied_by_staff(self, bank_client):
+        invoice = open_invoice(bank_client, '90.00')
+        import_statement(io.BytesIO(camt(entry('90.00', 'sans ref'))), filename='c.xml')
+        tx = BankTransaction.objects.get()
+        assert tx.status == 'review' and tx.invoice_id == invoice.pk
+        staff = User.objects.create_user('compta', 'c@test.com', 'x', is_staff=True)
+        assert apply_reviewed_transactions(BankTransaction.objects.all(), staff) == 1
+        invoice.refresh_from_db()
+        assert invoice.status == 'paid'
+        assert invoice.paid_by == staff
+        tx.refresh_from_db()
+        assert tx.status == 'matched' and tx.applied_at is not None
+
+    def test_reviewed_overpayment_is_refused(self, bank_client):
+        invoice = open_invoice(bank_client, '90.00')
+        import_statement(io.BytesIO(camt(entry('90.00', 'sans ref', ref='P1'))), filename='d.xml')
+        import_statement(io.BytesIO(camt(entry('90.00', 'sans ref', ref='P2'))), filename='e.xml')
+        staff = User.objects.create_user('compta', 'c@test.com', 'x', is_staff=True)
+        first, second = BankTransaction.objects.order_by('pk')
+        assert apply_reviewed_transactions([first], staff) == 1
+
+        second.invoice = invoice  # suggestion maintenue à la main sur la facture soldée
+        assert apply_reviewed_transactions([second], staff) == 0
+        invoice.refresh_from_db()
+        assert invoice.amount_paid == Decimal('90.00')
+        second.refresh_from_db()
+        assert second.status == 'review' and second.applied_at is None
+
+    def test_identical_transfers_without_reference_are_kept(self, bank_client):
+        csv_data = (
+            'Date;Libellé;Montant\n'
+            '10/03/2025;Cotisation;25,00\n'
+            '10/03/2025;Cotisation;25,00\n'
+        ).encode('utf-8')
+        statement = import_statement(io.BytesIO(csv_data), filename='a.csv')
+        assert statement.stats['lines'] == 2 and statement.stats['duplicates'] == 0
+        # Relevé chevauchant : les deux mêmes lignes + une nouvelle
+        overlapping = csv_data + '11/03/2025;Cotisation;25,00\n'.encode('utf-8')
+        statement = import_statement(io.BytesIO(overlapping), filename='b.csv')
+        assert statement.stats['lines'] == 1 and statement.stats['duplicates'] == 2
+
+    def test_status_change_goes_through_invoice_signals(self, bank_client):
+        from apps.clients.models import ClientNotification
+        from apps.einvoicing.models import InvoiceLifecycleEvent
+
+        bank_client.user = User.objects.create_user('marie', 'marie@test.com', 'x')
+        bank_client.save(update_fields=['user'])
+        invoice = open_invoice(bank_client, '70.00')
+        import_statement(io.BytesIO(camt(entry('70.00', invoice.number))), filename='f.xml')
+
+        event = InvoiceLifecycleEvent.objects.filter(invoice=invoice).order_by('-occurred_at', '-id').first()
+        assert event.payload['to_status'] == 'paid'
+        assert InvoiceLifecycleEvent.verify_chain(invoice.pk) == (True, None)
+        assert ClientNotification.objects.filter(client=bank_client, title='Paiement reçu').exists()
+
+    def test_unreadable_files_leave_nothing_behind(self, bank_client):
+        invoice = open_invoice(bank_client, '60.00')
+        # Tronqué après une première entrée valide : rien ne doit rester
+        truncated = camt(entry('60.00', invoice.number, ref='T1') + entry('5.00', 'x', ref='T2'))[:-120]
+        with pytest.raises(ValueError):
+            import_statement(io.BytesIO(truncated), filename='t.xml')
+        with pytest.raises(ValueError):
+            import_statement(io.BytesIO(b'Foo;Bar\n1;2\n'), filename='x.csv')
+        assert not BankStatementImport.objects.exists()
+        assert not BankTransaction.objects.exists()
+        invoice.refresh_from_db()
+        assert invoice.amount_paid == Decimal('0.00')
+        # Le même fichier, corrigé, reste importable
+        import_statement(io.BytesIO(b'Date;Montant\n10/03/2025;5,00\n'), filename='x.csv')
+
+
+@pytest.mark.django_db
+class TestBankAdmin:
+    @pytest.fixture
+    def admin_client(self, client):
+        from django_otp import DEVICE_ID_SESSION_KEY
+        from django_otp.plugins.otp_static.models import StaticDevice
+
+        staff = User.objects.create_superuser('banque', 'banque@test.com', 'x')
+        device = StaticDevice.objects.create(user=staff, name='test')
+        client.force_login(staff)
+        session = client.session
+        session[DEVICE_ID_SESSION_KEY] = device.persistent_id
+        session.save()
+        return client
+
+    def _upload(self, admin_client, name, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.urls import reverse
+
+        return admin_client.post(
+            reverse('admin:factures_bankstatementimport_add'),
+            {'file': SimpleUploadedFile(name, content)}, follow=True,
+        )
+
+    def test_bad_or_repeated_upload_shows_a_message(self, admin_client, bank_client):
+        response = self._upload(admin_client, 'r.xml', camt(entry('5.00', 'x'))[:-40])
+        assert response.status_code == 200
+        assert 'Relevé illisible' in response.content.decode()
+        assert not BankStatementImport.objects.exists()
+
+        self._upload(admin_client, 'r.xml', camt(entry('5.00', 'x')))
+        assert BankStatementImport.objects.count() == 1
+        response = self._upload(admin_client, 'r.xml', camt(entry('5.00', 'x')))
+        assert 'Ce relevé a déjà été importé' in response.content.decode()
+        # Course entre deux envois du même fichier : refus au moment de l'import
+        with patch('apps.factures.admin.BankStatementImportForm.clean_file', lambda form: form.cleaned_data['file']):
+            response = self._upload(admin_client, 'r.xml', camt(entry('5.00', 'x')))
+        assert response.status_code == 200
+        assert 'Relevé déjà importé' in response.content.decode()
+        assert BankStatementImport.objects.count() == 1
+
+    def test_status_and_applied_invoice_are_read_only(self, bank_client):
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+        from apps.factures.admin import BankTransactionAdmin
+
+        invoice = open_invoice(bank_client, '30.00')
+        import_statement(io.BytesIO(camt(entry('30.00', invoice.number))), filename='g.xml')
+        tx = BankTransaction.objects.get()
+        model_admin = BankTransactionAdmin(BankTransaction, site)
+        request = RequestFactory().get('/')
+        assert 'status' in model_admin.get_readonly_fields(request)
+        assert 'invoice' in model_admin.get_readonly_fields(request, tx)
+        tx.applied_at = None
+        assert 'invoice' not in model_admin.get_readonly_fields(request, tx)
@@ -127,6 +127,89 @@ class TestBrevoEmailBackend:
             assert backend._send_one(msg) is True
 
 
+# ==============================================================================
+# BREVO POOLED CLIENT (brevo_client.py)
+# ==============================================================================
+
+@pytest.fixture
+def fake_brevo():
+    """Serveur HTTP local imitant POST /v3/smtp/email (keep-alive)."""
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from django.core.cache import cache
+    from core.services.brevo_client import reset_clients
+    from core.services.brevo_throttle import limiter
+
+    stats = {'connections': 0, 'requests': 0, 'in_flight': 0, 'max_in_flight': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            with lock:
+                stats['connections'] += 1
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with lock:
+                stats['requests'] += 1
+                stats['in_flight'] += 1
+                stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+            time.sleep(0.05)
+            with lock:
+                stats['in_flight'] -= 1
+            body = json.dumps({'messageId': f"<{stats['requests']}@fake>"}).encode()
+            self.send_response(201)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    cache.clear()
+    limiter.reset()
+    reset_clients()
+    yield f'http://127.0.0.1:{server.server_address[1]}/v3', stats
+    reset_clients()
+    server.shutdown()
+    server.server_close()
+
+
+class TestBrevoPooledClient:
+    def test_client_shared_across_backend_instances(self):
+        from core.services.brevo_backend import BrevoEmailBackend
+        from core.services.brevo_client import reset_clients
+        reset_clients()
+        with override_settings(BREVO_API_KEY='test-key'):
+            assert BrevoEmailBackend().api_instance is BrevoEmailBackend().api_instance
+
+    def test_messages_sent_concurrently_over_kept_alive_connections(self, fake_brevo):
+        from core.services.brevo_backend import BrevoEmailBackend
+        host, stats = fake_brevo
+        with override_settings(BREVO_API_KEY='test-key',
+                               BREVO_HTTP={'HOST': host, 'POOL_SIZE': 3, 'CONCURRENCY': 3}):
+            messages = [EmailMessage(subject=f'S{i}', body='x', to=[f'{i}@e.com'], from_email='f@e.com')
+                        for i in range(6)]
+            # Une instance de backend par appel, comme send_mail
+            assert BrevoEmailBackend().send_messages(messages[:3]) == 3
+            assert BrevoEmailBackend().send_messages(messages[3:]) == 3
+
+        assert stats['requests'] == 6
+        assert stats['max_in_flight'] > 1
+        # Les connexions du pool sont réutilisées d'un backend à l'autre
+        assert stats['connections'] <= 3
+
+
 # ==============================================================================
 # BREVO EMAIL SERVICE (email_backends.py)
 # ==============================================================================
@@ -162,6 +245,61 @@ class TestBrevoEmailService:
         assert result is True
 
 
+# ==============================================================================
+# BREVO RATE LIMITER (brevo_throttle.py)
+# ==============================================================================
+
+class TestBrevoRateLimiter:
+    @pytest.fixture(autouse=True)
+    def fresh_limiter(self):
+        from django.core.cache import cache
+        from core.services.brevo_throttle import limiter
+        cache.clear()
+        limiter.reset()
+        yield limiter
+        limiter.reset()
+
+    @override_settings(BREVO_RATE_LIMIT={'RATE': 0.001, 'BURST': 4, 'BULK_RESERVE': 0.5})
+    def test_bulk_leaves_reserve_for_transactional(self, fresh_limiter):
+        from core.services.brevo_throttle import BULK, TRANSACTIONAL
+        assert fresh_limiter.acquire(BULK, timeout=0)
+        assert fresh_limiter.acquire(BULK, timeout=0)
+        # Réserve atteinte : la prospection attend, le transactionnel passe
+        assert fresh_limiter.acquire(BULK, timeout=0) is False
+        assert fresh_limiter.acquire(TRANSACTIONAL, timeout=0)
+        assert fresh_limiter.acquire(TRANSACTIONAL, timeout=0)
+        assert fresh_limiter.acquire(TRANSACTIONAL, timeout=0) is False
+
+    @override_settings(BREVO_RATE_LIMIT={'RATE': 0.001, 'BURST': 1})
+    def test_rejections_and_waits_are_counted(self, fresh_limiter):
+        from core.services.brevo_throttle import TRANSACTIONAL, metrics
+        assert fresh_limiter.acquire(TRANSACTIONAL, timeout=0)
+        assert fresh_limiter.acquire(TRANSACTIONAL, timeout=0.01) is False
+        fresh_limiter.record_upstream_429(TRANSACTIONAL)
+        stats = metrics()[TRANSACTIONAL]
+        assert (stats['acquired'], stats['rejected'], stats['upstream_429']) == (1, 1, 1)
+
+    @override_settings(BREVO_RATE_LIMIT={'RATE': 50, 'BURST': 1})
+    def test_acquire_waits_for_refill(self, fresh_limiter):
+        from core.services.brevo_throttle import TRANSACTIONAL, metrics
+        assert fresh_limiter.acquire(TRANSACTIONAL, timeout=0)
+        assert fresh_limiter.acquire(TRANSACTIONAL, timeout=1)
+        assert metrics()[TRANSACTIONAL]['waits'] == 1
+
+    @override_settings(BREVO_API_KEY='test-key',
+                       BREVO_RATE_LIMIT={'RATE': 0.001, 'BURST': 1, 'TRANSACTIONAL_TIMEOUT': 0})
+    def test_send_email_rejected_without_api_call(self, fresh_limiter):
+        from core.services.email_backends import BrevoEmailService
+        service = BrevoEmailService()
+        service._api_instance = MagicMock()
+        service._api_instance.send_transac_email.return_value = MagicMock(message_id='<1>')
+        assert service.send_email('a@ex.com', 'Sujet', '<p>x</p>')['success'] is True
+        result = service.send_email('b@ex.com', 'Sujet', '<p>x</p>')
+        assert result['success'] is False
+        assert result['status_code'] == 429
+        assert service._api_instance.send_transac_email.call_count == 1
+
+
 # ==============================================================================
 # CRM SERVICE
 # ==============================================================================
@@ -397,6 +535,26 @@ class TestSignatureService:
         valid, msg = SignatureService.validate_signature_data(data)
         assert valid is True
 
+    def test_blank_signature_rejected(self):
+        from core.services.signature_service import SignatureService
+        from PIL import Image, ImageDraw
+        img = Image.new('RGBA', (200, 100), (255, 255, 255, 0))
+        assert SignatureService._is_blank_image(img) is True
+        ImageDraw.Draw(img).rectangle((20, 20, 80, 60), fill=(0, 0, 0, 255))
+        assert SignatureService._is_blank_image(img) is False
+
+    def test_normalize_signature_trims_and_downscales(self):
+        from core.services.signature_service import SignatureService
+        from PIL import Image, ImageDraw
+        img = Image.new('RGBA', (1400, 400), (255, 255, 255, 0))
+        ImageDraw.Draw(img).line((100, 150, 1300, 250), fill=(0, 0, 0, 255), width=6)
+        buf = io.BytesIO()
+        img.save(buf, format='PNG')
+        result = Image.open(io.BytesIO(SignatureService.normalize_signature_image(buf.getvalue())))
+        assert result.format == 'PNG'
+        assert result.width == SignatureService.MAX_DISPLAY_WIDTH
+        assert result.height < 100
+
     def test_compute_signature_hash(self):
         from core.services.signature_service import SignatureService
         data = base64.b64encode(b'test-image-data').decode()
@@ -57,6 +57,93 @@ class TestPublicDevisView:
         assert response.status_code == 200
 
 
+@pytest.mark.django_db
+class TestQuoteRequestPhotos:
+    def _jpeg(self, name='photo.jpg', size=(2400, 1200), orientation=None):
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        # Dégradé horizontal ; pivoté par l'EXIF il devient vertical (autre dHash).
+        ramp = Image.linear_gradient('L').rotate(-90).resize(size)
+        image = Image.merge('RGB', (ramp, ramp, ramp))
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', exif=exif.tobytes())
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def _request(self):
+        from apps.devis.models import QuoteRequest
+        return QuoteRequest.objects.create(
+            client_name='Marie', email='marie@test.com', phone='0600000000', address='Cayenne',
+        )
+
+    def test_public_form_stores_originals_pending(self, client):
+        from apps.devis.models import QuoteRequest
+
+        response = client.post('/devis/nouveau/', {
+            'client_name': 'Marie', 'email': 'marie@test.com', 'phone': '0600000000',
+            'address': 'Cayenne', 'photos': [self._jpeg('a.jpg'), self._jpeg('b.jpg')],
+        })
+        assert response.status_code == 302
+        photos = list(QuoteRequest.objects.get().photos.all())
+        assert len(photos) == 2
+        assert {p.status for p in photos} == {'pending'}
+        assert not photos[0].optimized
+
+    def test_processing_orients_resizes_and_dedupes(self):
+        from PIL import Image
+        from apps.devis.photo_pipeline import process_photos, store_uploads
+
+        qr = self._request()
+        photos = store_uploads(qr, [
+            self._jpeg('rotated.jpg', orientation=6),
+            self._jpeg('copy.jpg', orientation=6),
+            self._jpeg('other.jpg', size=(800, 600)),
+        ])
+        stats = process_photos([p.pk for p in photos])
+
+        assert stats == {'processed': 3, 'failed': 0, 'duplicates': 1}
+        kept = list(qr.photos.order_by('pk'))
+        assert [p.pk for p in kept] == [photos[0].pk, photos[2].pk]
+        first = kept[0]
+        assert first.status == 'ready'
+        # Orientation 6 (rotation 90°) : paysage 2400x1200 → portrait borné à 1600.
+        assert (first.width, first.height) == (800, 1600)
+        with first.optimized.open('rb') as fh:
+            optimized = Image.open(fh)
+            assert optimized.format == 'WEBP'
+            assert 0x0112 not in optimized.getexif()
+        assert first.display_image == first.optimized
+
+    def test_decompression_bomb_skips_only_that_photo(self):
+        from PIL import Image
+        from apps.devis.photo_pipeline import process_photos, store_uploads
+
+        qr = self._request()
+        photos = store_uploads(qr, [self._jpeg('bomb.jpg', size=(400, 200)), self._jpeg('ok.jpg', size=(40, 20))])
+        with patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            stats = process_photos([p.pk for p in photos])
+        assert stats == {'processed': 1, 'failed': 1, 'duplicates': 0}
+
+    def test_admin_gallery_links_optimized_variant(self):
+        from django.contrib import admin
+        from apps.devis.admin import QuoteRequestAdmin
+        from apps.devis.models import QuoteRequest
+        from apps.devis.photo_pipeline import process_photos, store_uploads
+
+        qr = self._request()
+        photos = store_uploads(qr, [self._jpeg('a.jpg', size=(800, 600))])
+        process_photos([p.pk for p in photos])
+        photo = qr.photos.get()
+        html_out = QuoteRequestAdmin(QuoteRequest, admin.site).photo_gallery(qr)
+        assert f'href="{photo.optimized.url}"' in html_out
+        assert f'src="{photo.thumbnail.url}"' in html_out
+        assert photo.image.url not in html_out
+
+
 @pytest.mark.django_db
 class TestAdminDevisViews:
     def test_download_pdf_requires_staff(self, client, quote_fixture):
@@ -82,6 +169,73 @@ class TestQuoteValidation:
         response = client.post('/devis/valider/nonexistent-token/code/')
         assert response.status_code == 404
 
+    def test_unknown_public_token_is_negatively_cached(self, client, django_assert_num_queries):
+        from django.core.cache import cache
+        from apps.devis.application.validation_cache import resolve_quote_id
+
+        cache.clear()
+        assert resolve_quote_id('nonexistent-token') is None
+        with django_assert_num_queries(0):
+            assert resolve_quote_id('nonexistent-token') is None
+
+    def test_every_wrong_code_is_persisted(self, quote_fixture, django_assert_num_queries):
+        from django.core.cache import cache
+        from apps.devis.application import validation_cache
+        from apps.devis.application.quote_validation import confirm_quote_validation_code
+        from apps.devis.models import QuoteValidation
+
+        cache.clear()
+        validation = QuoteValidation.create_for_quote(quote_fixture)
+        wrong = '000000' if validation.code != '000000' else '111111'
+
+        for _ in range(3):
+            assert confirm_quote_validation_code(token=validation.token, submitted_code=wrong) is False
+        validation.refresh_from_db()
+        assert validation.attempts == 3
+
+        # Cache vidé ou propre à un autre worker : aucun essai rendu.
+        cache.clear()
+        for _ in range(2):
+            assert confirm_quote_validation_code(token=validation.token, submitted_code=wrong) is False
+        validation.refresh_from_db()
+        assert validation.attempts == 5
+        assert confirm_quote_validation_code(token=validation.token, submitted_code=validation.code) is False
+        assert validation.verify(validation.code) is False
+
+        # Verrouillée et en cache : plus aucune requête SQL par essai.
+        validation_cache.get_snapshot(validation.token)
+        with django_assert_num_queries(0):
+            assert confirm_quote_validation_code(token=validation.token, submitted_code=wrong) is False
+
+    def test_correct_code_confirms_and_expiry_is_kept(self, quote_fixture):
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.utils import timezone
+        from apps.devis.application.quote_validation import (
+            QuoteValidationExpiredError, confirm_quote_validation_code,
+        )
+        from apps.devis.models import QuoteValidation
+
+        cache.clear()
+        quote_fixture.status = Quote.QuoteStatus.SENT
+        quote_fixture.save()
+        validation = QuoteValidation.create_for_quote(quote_fixture)
+        with patch('apps.devis.models.Quote.generate_pdf'), \
+                patch('apps.devis.application.quote_validation._notify_admin_quote_accepted'):
+            assert confirm_quote_validation_code(token=validation.token, submitted_code=validation.code)
+        validation.refresh_from_db()
+        quote_fixture.refresh_from_db()
+        assert validation.confirmed_at is not None and validation.attempts == 1
+        assert quote_fixture.status == Quote.QuoteStatus.ACCEPTED
+
+        expired = QuoteValidation.objects.create(
+            quote=quote_fixture, token='expired-token', code='123456',
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+        with pytest.raises(QuoteValidationExpiredError):
+            confirm_quote_validation_code(token=expired.token, submitted_code='123456')
+        assert expired.verify('123456') is False
+
 
 @pytest.mark.django_db
 class TestQuotePublicPdf:
@@ -96,6 +250,65 @@ class TestQuoteSignAndPay:
         response = client.get('/devis/valider/nonexistent-token/signer/')
         assert response.status_code == 404
 
+    def test_signature_persisted_then_processed_in_background(self, client, quote_fixture, settings, tmp_path):
+        import base64
+        import io
+        from django.core.cache import cache
+        from PIL import Image, ImageDraw
+        from apps.devis.signature_pipeline import process_signature
+
+        cache.clear()
+        settings.MEDIA_ROOT = str(tmp_path)
+        quote_fixture.status = Quote.QuoteStatus.SENT
+        quote_fixture.save()
+        img = Image.new('RGBA', (900, 300), (255, 255, 255, 0))
+        ImageDraw.Draw(img).line((50, 100, 850, 200), fill=(0, 0, 0, 255), width=8)
+        buf = io.BytesIO()
+        img.save(buf, format='PNG')
+        payload = {'signature_data': 'data:image/png;base64,' + base64.b64encode(buf.getvalue()).decode()}
+
+        with patch('core.services.stripe_service.is_stripe_configured', return_value=False):
+            response = client.post(
+                f'/devis/valider/{quote_fixture.public_token}/signature/',
+                data=json.dumps(payload), content_type='application/json',
+            )
+        data = response.json()
+        assert data['success'] is True
+        quote_fixture.refresh_from_db()
+        assert quote_fixture.signed_at and quote_fixture.signature_audit_trail['technical']['signature_hash']
+        assert quote_fixture.signature_status == Quote.SignatureStatus.PENDING
+        assert client.get(data['status_url']).json()['ready'] is False
+
+        with patch('apps.devis.models.Quote.generate_pdf') as generate_pdf:
+            process_signature(quote_fixture.pk)
+        generate_pdf.assert_called_once_with(attach=True)
+        quote_fixture.refresh_from_db()
+        assert quote_fixture.signature_status == Quote.SignatureStatus.READY
+        assert quote_fixture.signature_display
+        assert client.get(data['status_url']).json()['ready'] is True
+
+    def test_signed_pdf_embeds_display_variant(self, quote_fixture, settings, tmp_path):
+        import base64
+        from django.core.files.base import ContentFile
+        from django.utils import timezone
+        from core.services.document_generator import DocumentGenerator
+
+        settings.MEDIA_ROOT = str(tmp_path)
+        quote_fixture.signature_image.save('sig.png', ContentFile(b'original'), save=False)
+        quote_fixture.signed_at = timezone.now()
+        quote_fixture.signature_audit_trail = {'signer': {'name': 'Marie Martin'}}
+        quote_fixture.save()
+
+        with patch.object(DocumentGenerator, '_render_pdf', return_value=b'%PDF') as render:
+            DocumentGenerator.generate_quote_pdf(quote_fixture)
+            assert base64.b64encode(b'original').decode() in render.call_args[0][0]
+
+            quote_fixture.signature_display.save('sig_display.png', ContentFile(b'optimized'), save=False)
+            DocumentGenerator.generate_quote_pdf(quote_fixture)
+            html = render.call_args[0][0]
+        assert base64.b64encode(b'optimized').decode() in html
+        assert base64.b64encode(b'original').decode() not in html
+
 
 @pytest.mark.django_db
 class TestDevisPaymentSuccess:
@@ -134,6 +347,59 @@ class TestFacturesViews:
         response = client.get('/factures/archive/')
         assert response.status_code == 200
 
+    def test_archive_keyset_pagination_walks_all_invoices(self, client, staff_user, devis_client):
+        from datetime import date
+        from apps.factures.services.archive import archive_page, filter_invoices
+
+        for day in (1, 2, 2, 3, 5):
+            Invoice.objects.create(client=devis_client, issue_date=date(2025, 1, day))
+        seen, cursor = [], ''
+        while True:
+            page = archive_page(filter_invoices(), cursor=cursor, page_size=2)
+            seen.extend(inv.number for inv in page.invoices)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        expected = list(Invoice.objects.order_by('-issue_date', '-number').values_list('number', flat=True))
+        assert seen == expected
+
+    def test_archive_filters_and_totals(self, client, staff_user, devis_client):
+        Invoice.objects.create(client=devis_client, status='paid', total_ht=Decimal('100.00'),
+                               tva=Decimal('8.50'), total_ttc=Decimal('108.50'))
+        Invoice.objects.create(client=devis_client, status='sent', total_ht=Decimal('50.00'),
+                               tva=Decimal('0.00'), total_ttc=Decimal('50.00'))
+        client.force_login(staff_user)
+        response = client.get('/factures/archive/', {'status': 'paid'})
+        assert response.status_code == 200
+        totals = response.context['totals']
+        assert totals['count'] == 1
+        assert totals['total_ttc'] == Decimal('108.50')
+        assert len(response.context['invoices']) == 1
+
+    def test_archive_htmx_returns_partials(self, client, staff_user, devis_client):
+        from apps.factures.services.archive import encode_cursor
+
+        invoice = Invoice.objects.create(client=devis_client)
+        client.force_login(staff_user)
+        response = client.get('/factures/archive/', HTTP_HX_REQUEST='true', HTTP_HX_TARGET='archive-results')
+        assert [t.name for t in response.templates][0] == 'factures/partials/archive_results.html'
+        response = client.get('/factures/archive/', {'cursor': encode_cursor(invoice)}, HTTP_HX_REQUEST='true')
+        assert [t.name for t in response.templates][0] == 'factures/partials/archive_rows.html'
+        assert response.context['invoices'] == []
+
+    def test_archive_client_filter_renders_in_one_query(self, db):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.factures.forms import ArchiveFilterForm
+
+        for i in range(10):
+            user = User.objects.create_user(f'archive{i}', f'archive{i}@test.com', 'x') if i % 2 else None
+            ClientProfile.objects.create(full_name=f'Client {i}', email=f'c{i}@test.com', user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            html = str(ArchiveFilterForm()['client'])
+        assert len(ctx.captured_queries) == 1
+        assert 'archive1@test.com' in html
+
     def test_download_invoice_requires_staff(self, client, invoice_fixture):
         response = client.get(f'/factures/download/{invoice_fixture.pk}/')
         assert response.status_code == 302
@@ -201,6 +467,401 @@ class TestInvoiceModels:
         assert 'FAC' in invoice_fixture.number
 
 
+@pytest.mark.django_db
+class TestDunning:
+    def _invoice(self, client_profile, days_overdue, **kwargs):
+        from datetime import date, timedelta
+        return Invoice.objects.create(
+            client=client_profile, status='sent', total_ttc=Decimal('120.00'),
+            due_date=date(2026, 3, 31) - timedelta(days=days_overdue), **kwargs,
+        )
+
+    def test_selection_respects_levels_and_interval(self, devis_client):
+        from datetime import date
+        from apps.factures.services.dunning import due_invoices
+
+        fresh = self._invoice(devis_client, 1)                      # pas encore dû
+        level1 = self._invoice(devis_client, 5)                     # niveau 1 dû
+        level2 = self._invoice(devis_client, 15, last_reminder_level=1,
+                               last_reminder_date=date(2026, 3, 20))
+        too_soon = self._invoice(devis_client, 15, last_reminder_level=1,
+                                 last_reminder_date=date(2026, 3, 29))
+        done = self._invoice(devis_client, 60, dunning_completed=True)
+        paid = self._invoice(devis_client, 60)
+        Invoice.objects.filter(pk=paid.pk).update(status='paid')
+
+        ids = set(due_invoices(date(2026, 3, 31)).values_list('pk', flat=True))
+        assert ids == {level1.pk, level2.pk}
+        assert not ids & {fresh.pk, too_soon.pk, done.pk, paid.pk}
+
+    def test_dry_run_reports_volumes_without_sending(self, devis_client):
+        from datetime import date
+        from apps.factures.services.dunning import run_dunning
+
+        self._invoice(devis_client, 5)
+        self._invoice(devis_client, 40, last_reminder_level=3)
+        with patch('core.services.email_backends.send_transactional_email') as mock_send:
+            report = run_dunning(dry_run=True, today=date(2026, 3, 31))
+        mock_send.assert_not_called()
+        assert dict(report.due_by_level) == {1: 1, 4: 1}
+        assert Invoice.objects.filter(reminder_count__gt=0).count() == 0
+
+    def test_run_sends_and_advances_counters_in_batches(self, devis_client):
+        from datetime import date
+        from apps.factures.services.dunning import run_dunning
+
+        first = self._invoice(devis_client, 5)
+        last = self._invoice(devis_client, 40, last_reminder_level=3, reminder_count=3)
+        failing = self._invoice(devis_client, 6)
+
+        def fake_send(to_email, subject, html_content, **kwargs):
+            assert '__DUNNING_' not in html_content
+            return {'success': failing.number not in subject}
+
+        with patch('core.services.email_backends.send_transactional_email', side_effect=fake_send):
+            report = run_dunning(today=date(2026, 3, 31), batch_size=2, batch_pause_seconds=0)
+
+        assert report.sent == 2 and report.failed == 1 and report.batches == 2
+        first.refresh_from_db()
+        last.refresh_from_db()
+        failing.refresh_from_db()
+        assert (first.last_reminder_level, first.reminder_count) == (1, 1)
+        assert first.last_reminder_date == date(2026, 3, 31)
+        assert first.dunning_completed is False
+        assert (last.last_reminder_level, last.reminder_count) == (4, 4)
+        assert last.dunning_completed is True
+        assert failing.last_reminder_level == 0
+
+    def test_overlapping_runs_send_each_reminder_once(self, devis_client):
+        from datetime import date
+        from apps.factures.services import dunning
+
+        today = date(2026, 3, 31)
+        invoice = self._invoice(devis_client, 5)
+        stale = list(dunning.due_invoices(today))  # sélection d'un passage concurrent
+
+        with patch('core.services.email_backends.send_transactional_email',
+                   return_value={'success': True}) as mock_send:
+            first = dunning.run_dunning(today=today, batch_pause_seconds=0)
+            with patch.object(dunning, 'due_invoices', return_value=stale):
+                second = dunning.run_dunning(today=today, batch_pause_seconds=0)
+
+        assert mock_send.call_count == 1
+        assert (first.sent, second.sent, second.skipped_claimed) == (1, 0, 1)
+        invoice.refresh_from_db()
+        assert (invoice.last_reminder_level, invoice.reminder_count) == (1, 1)
+
+    def test_level_template_personalised_and_escaped(self, devis_client):
+        from apps.factures.services.dunning import _personalize, render_level_template
+
+        invoice = self._invoice(devis_client, 5)
+        html_out = _personalize(render_level_template(1), invoice, '<b>Marie</b>')
+        assert invoice.number in html_out
+        assert '&lt;b&gt;Marie&lt;/b&gt;' in html_out
+        assert f'/factures/payer/{invoice.public_token}/' in html_out
+
+
+@pytest.mark.django_db
+class TestLedgerExport:
+    def _invoice(self, client_profile, lines, **kwargs):
+        from datetime import date
+        from apps.factures.models import InvoiceItem
+
+        kwargs.setdefault('status', 'sent')
+        invoice = Invoice.objects.create(client=client_profile, issue_date=date(2025, 6, 1), **kwargs)
+        for qty, price, rate in lines:
+            InvoiceItem.objects.create(invoice=invoice, description='Prestation',
+                                       quantity=Decimal(qty), unit_price=Decimal(price),
+                                       tax_rate=Decimal(rate))
+        ttc = sum(Decimal(q) * Decimal(p) * (1 + Decimal(r) / 100) for q, p, r in lines)
+        Invoice.objects.filter(pk=invoice.pk).update(total_ttc=ttc.quantize(Decimal('0.01')))
+        return invoice
+
+    def test_entries_balance_and_follow_vat_breakdown(self, devis_client):
+        from datetime import datetime, timezone as dt_tz
+        from apps.factures.services.ledger import LedgerExport
+
+        invoice = self._invoice(devis_client, [('2', '100.00', '20'), ('1', '50.00', '0')])
+        Invoice.objects.filter(pk=invoice.pk).update(
+            amount_paid=Decimal('290.00'), paid_at=datetime(2025, 7, 1, 10, tzinfo=dt_tz.utc),
+        )
+        self._invoice(devis_client, [('1', '30.00', '0')], is_credit_note=True)
+        self._invoice(devis_client, [('1', '999.00', '0')], status='draft')
+
+        export = LedgerExport(2025, chunk_size=1)
+        lines = list(export.lines())
+
+        assert export.stats['entries'] == 3
+        assert export.stats['debit'] == export.stats['credit']
+        assert export.stats['mismatched'] == 0
+        sales = [l for l in lines if l.piece_ref == invoice.number and l.journal_code == 'VE']
+        by_account = {}
+        for l in sales:
+            by_account.setdefault(l.account, []).append(l)
+        assert by_account['411000'][0].debit == Decimal('290.00')
+        assert sorted(l.credit for l in by_account['706000']) == [Decimal('50.00'), Decimal('200.00')]
+        assert [l.credit for l in by_account['445710']] == [Decimal('40.00')]
+        credit_note = [l for l in lines if l.account == '411000' and l.label.startswith('Avoir')]
+        assert credit_note[0].credit == Decimal('30.00')
+        assert not any('999' in str(l.debit) for l in lines)
+
+    def test_fec_stream_gzip_roundtrip(self, devis_client):
+        import gzip
+        from apps.factures.services.ledger import FEC_COLUMNS, LedgerExport, export_stream
+
+        self._invoice(devis_client, [('1', '120.50', '0')])
+        blob = b''.join(export_stream(LedgerExport(2025), 'fec', gzip=True))
+        text = gzip.decompress(blob).decode('iso-8859-15')
+        rows = [r.split('\t') for r in text.split('\r\n')[:-1]]
+        assert rows[0] == list(FEC_COLUMNS)
+        assert all(len(r) == 18 for r in rows)
+        assert rows[1][3] == '20250601'
+        assert '120,50' in {rows[1][11], rows[2][12]}
+
+    def test_imbalanced_entry_raises(self, devis_client):
+        from apps.factures.services import ledger
+
+        self._invoice(devis_client, [('1', '10.00', '0')])
+        export = ledger.LedgerExport(2025)
+        with patch.object(ledger.LedgerExport, '_sales_entry',
+                          lambda self, inv, n: [self._line('SALES', n, inv.issue_date, 'CLIENT', 'x', inv,
+                                                           debit=Decimal('1'))]):
+            with pytest.raises(ledger.LedgerImbalanceError):
+                list(export.lines())
+
+    def test_download_requires_staff_and_streams(self, client, staff_user, devis_client):
+        self._invoice(devis_client, [('1', '80.00', '0')])
+        response = client.get('/factures/export/comptable/', {'year': 2025})
+        assert response.status_code == 302
+        client.force_login(staff_user)
+        response = client.get('/factures/export/comptable/', {'year': 2025, 'format': 'csv'})
+        assert response.status_code == 200
+        assert response.streaming
+        body = b''.join(response.streaming_content).decode('utf-8')
+        assert body.startswith('JournalCode;')
+        assert 'grand-livre-2025.csv' in response['Content-Disposition']
+
+
+@pytest.mark.django_db
+class TestReceivables:
+    @pytest.fixture(autouse=True)
+    def _clear_cache(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def _invoice(self, client_profile, ttc, days_late, paid='0.00'):
+        from datetime import timedelta
+        from django.utils import timezone
+        invoice = Invoice.objects.create(client=client_profile, status='sent')
+        Invoice.objects.filter(pk=invoice.pk).update(
+            total_ttc=Decimal(ttc), amount_paid=Decimal(paid),
+            due_date=timezone.localdate() - timedelta(days=days_late),
+        )
+        return invoice
+
+    def test_buckets_aggregated_per_client(self, devis_client):
+        from apps.factures.services.receivables import aged_receivables
+
+        other = ClientProfile.objects.create(full_name='Paul', email='paul@test.com')
+        self._invoice(devis_client, '100.00', -5)
+        self._invoice(devis_client, '200.00', 10, paid='50.00')
+        self._invoice(devis_client, '300.00', 45)
+        self._invoice(other, '400.00', 75)
+        self._invoice(other, '500.00', 120)
+
+        report = aged_receivables()
+        rows = {row.client_id: row for row in report['rows']}
+        marie = rows[devis_client.pk]
+        assert marie.buckets['not_due'] == Decimal('100.00')
+        assert marie.buckets['d0_30'] == Decimal('150.00')
+        assert marie.buckets['d31_60'] == Decimal('300.00')
+        assert marie.total == Decimal('550.00')
+        assert rows[other.pk].buckets['d61_90'] == Decimal('400.00')
+        assert rows[other.pk].buckets['d90_plus'] == Decimal('500.00')
+        assert report['totals']['total'] == Decimal('1450.00')
+
+    def test_payment_invalidates_only_that_client(self, devis_client, django_assert_max_num_queries):
+        from apps.factures.services.receivables import aged_receivables
+
+        other = ClientProfile.objects.create(full_name='Paul', email='paul@test.com')
+        invoice = self._invoice(devis_client, '100.00', 10)
+        self._invoice(other, '80.00', 10)
+        aged_receivables()
+        with django_assert_max_num_queries(0):
+            aged_receivables()
+
+        invoice.refresh_from_db()
+        invoice.amount_paid = Decimal('100.00')
+        invoice.status = 'paid'
+        invoice.save(update_fields=['amount_paid', 'status'])
+
+        report = aged_receivables()
+        assert [row.client_id for row in report['rows']] == [other.pk]
+        assert report['totals']['total'] == Decimal('80.00')
+
+    def test_moving_invoice_refreshes_both_clients(self, devis_client):
+        from apps.factures.services.receivables import aged_receivables
+
+        other = ClientProfile.objects.create(full_name='Paul', email='paul@test.com')
+        invoice = self._invoice(devis_client, '100.00', 10)
+        self._invoice(other, '80.00', 10)
+        aged_receivables()
+
+        invoice.refresh_from_db()
+        invoice.client = other
+        invoice.save(update_fields=['client'])
+
+        rows = {row.client_id: row.total for row in aged_receivables()['rows']}
+        assert rows == {other.pk: Decimal('180.00')}
+
+    def test_invalidation_during_a_report_is_not_lost(self, devis_client):
+        from apps.factures.services import receivables
+
+        invoice = self._invoice(devis_client, '100.00', 10)
+        receivables.aged_receivables()
+        real_queryset = receivables.aging_queryset
+
+        def racing_queryset(*args, **kwargs):
+            # Lignes lues, puis paiement validé avant la mise en cache
+            values = list(real_queryset(*args, **kwargs))
+            Invoice.objects.filter(pk=invoice.pk).update(amount_paid=Decimal('100.00'), status='paid')
+            receivables.invalidate_client(devis_client.pk)
+            return values
+
+        receivables.invalidate_client(devis_client.pk)
+        with patch.object(receivables, 'aging_queryset', racing_queryset):
+            receivables.aged_receivables()
+        assert receivables.aged_receivables()['rows'] == []
+
+        # Même course sur une reconstruction complète
+        invoice2 = self._invoice(devis_client, '50.00', 10)
+        invoice = invoice2
+        with patch.object(receivables, 'aging_queryset', racing_queryset):
+            receivables.aged_receivables(refresh=True)
+        assert receivables.aged_receivables()['rows'] == []
+
+    def test_report_view_drilldown_and_csv(self, client, staff_user, devis_client):
+        invoice = self._invoice(devis_client, '120.00', 40)
+        assert client.get('/factures/creances/').status_code == 302
+        client.force_login(staff_user)
+        response = client.get('/factures/creances/', {'client': devis_client.pk})
+        assert response.status_code == 200
+        assert response.context['drilldown'][0]['invoice'].pk == invoice.pk
+        assert response.context['drilldown'][0]['bucket'] == 'd31_60'
+        response = client.get('/factures/creances/', {'format': 'csv'})
+        body = b''.join(response.streaming_content).decode('utf-8')
+        assert 'Marie Martin;0,00;0,00;120,00;0,00;0,00;120,00;1' in body
+
+
+@pytest.mark.django_db
+class TestRecurringInvoices:
+    LINES = [
+        {'description': 'Maintenance mensuelle', 'quantity': '1', 'unit_price': '120.00', 'tax_rate': '8.50'},
+        {'description': 'Hébergement', 'quantity': '2', 'unit_price': '15.00', 'tax_rate': '8.50'},
+    ]
+
+    def _schedule(self, client_profile, start, **kwargs):
+        from apps.factures.models import RecurringInvoiceSchedule
+        kwargs.setdefault('lines', self.LINES)
+        return RecurringInvoiceSchedule.objects.create(
+            client=client_profile, label='Contrat maintenance', start_date=start, **kwargs,
+        )
+
+    def test_generates_due_periods_with_block_numbers(self, devis_client):
+        from datetime import date
+        from apps.einvoicing.models import InvoiceLifecycleEvent
+        from apps.factures.services.recurring import run_recurring
+
+        schedule = self._schedule(devis_client, date(2026, 1, 31))
+        report = run_recurring(today=date(2026, 3, 5))
+
+        assert report.created == 2
+        invoices = list(Invoice.objects.filter(recurring_schedule=schedule).order_by('number'))
+        assert [inv.number for inv in invoices] == ['FAC-2026-001', 'FAC-2026-002']
+        assert [inv.delivery_period_start for inv in invoices] == [date(2026, 1, 31), date(2026, 2, 28)]
+        assert invoices[0].delivery_period_end == date(2026, 2, 27)
+        assert invoices[0].total_ht == Decimal('150.00')
+        assert invoices[0].total_ttc == Decimal('162.75')
+        assert invoices[0].invoice_items.count() == 2
+        assert {inv.status for inv in invoices} == {'draft'}  # jamais relancée avant envoi
+        assert InvoiceLifecycleEvent.verify_chain(invoices[0].pk) == (True, None)
+        schedule.refresh_from_db()
+        assert schedule.next_run_date == date(2026, 3, 31)
+
+    def test_idempotent_per_period(self, devis_client):
+        from datetime import date
+        from apps.factures.models import RecurringInvoiceSchedule
+        from apps.factures.services.recurring import run_recurring
+
+        schedule = self._schedule(devis_client, date(2026, 1, 1), frequency='quarterly')
+        run_recurring(today=date(2026, 1, 10))
+        # Échéancier remis en arrière (restauration, saisie manuelle…) : pas de doublon.
+        RecurringInvoiceSchedule.objects.filter(pk=schedule.pk).update(next_run_date=date(2026, 1, 1))
+        report = run_recurring(today=date(2026, 1, 10))
+
+        assert report.created == 0
+        assert report.skipped_existing == 1
+        assert Invoice.objects.filter(recurring_schedule=schedule).count() == 1
+        schedule.refresh_from_db()
+        assert schedule.next_run_date == date(2026, 4, 1)
+
+    def test_quote_lines_end_date_and_dry_run(self, devis_client):
+        from datetime import date
+        from apps.devis.models import QuoteItem
+        from apps.factures.services.recurring import run_recurring
+
+        quote = Quote.objects.create(client=devis_client, status='accepted')
+        QuoteItem.objects.create(quote=quote, description='Hébergement', quantity=1, unit_price=Decimal('40.00'))
+        schedule = self._schedule(
+            devis_client, date(2026, 1, 1), quote=quote, lines=[], end_date=date(2026, 2, 1),
+        )
+
+        dry = run_recurring(dry_run=True, today=date(2026, 6, 1))
+        assert [start for _s, start in dry.planned] == [date(2026, 1, 1), date(2026, 2, 1)]
+        assert not Invoice.objects.exists()
+
+        run_recurring(today=date(2026, 6, 1))
+        assert Invoice.objects.filter(recurring_schedule=schedule).count() == 2
+        assert Invoice.objects.first().invoice_items.get().description == 'Hébergement'
+        schedule.refresh_from_db()
+        assert schedule.active is False
+
+    def test_download_served_from_warm_cache(self, client, staff_user, invoice_fixture):
+        from django.core.cache import cache
+        from apps.factures.services.pdf_cache import prerender
+
+        cache.clear()
+        with patch.object(Invoice, 'generate_pdf', return_value=b'%PDF-warm') as render:
+            assert prerender([invoice_fixture.pk]) == 2
+            client.force_login(staff_user)
+            response = client.get(f'/factures/download/{invoice_fixture.pk}/')
+        assert response.content == b'%PDF-warm'
+        assert render.call_count == 2  # pdf + facturx, aucun rendu au téléchargement
+
+    def test_cached_pdf_follows_items_and_client(self, client, staff_user, invoice_fixture):
+        from django.core.cache import cache
+        from apps.factures.models import InvoiceItem
+
+        cache.clear()
+        client.force_login(staff_user)
+        url = f'/factures/download/{invoice_fixture.pk}/'
+        with patch.object(Invoice, 'generate_pdf', return_value=b'%PDF') as render:
+            client.get(url)
+            client.get(url)
+            assert render.call_count == 1
+
+            InvoiceItem.objects.create(invoice=invoice_fixture, description='Ajout',
+                                       quantity=Decimal('1'), unit_price=Decimal('10.00'))
+            client.get(url)
+            assert render.call_count == 2
+
+            profile = invoice_fixture.client or invoice_fixture.quote.client
+            profile.address_line = '12 rue Neuve'
+            profile.save()
+            client.get(url)
+            assert render.call_count == 3
+
+
 # ==============================================================================
 # EMAIL BACKENDS
 # ==============================================================================
@@ -279,6 +940,50 @@ class TestDevisServices:
         q = Quote.objects.create(client=devis_client, status='draft')
         assert q.number.startswith('DEV-')
 
+    def _accepted_quote(self, client_profile, *prices):
+        from apps.devis.models import QuoteItem
+        q = Quote.objects.create(client=client_profile, status='accepted')
+        for price in prices:
+            QuoteItem.objects.create(
+                quote=q, description=f'Ligne {price}', quantity=2,
+                unit_price=Decimal(price), tax_rate=Decimal('8.50'),
+            )
+        return q
+
+    def test_bulk_conversion_batches_numbers_and_items(self, devis_client, django_assert_max_num_queries):
+        from datetime import date
+        from apps.devis.services import create_invoices_from_quotes
+        from apps.einvoicing.models import InvoiceLifecycleEvent
+
+        quotes = [self._accepted_quote(devis_client, '100.00', '25.00') for _ in range(5)]
+        draft = Quote.objects.create(client=devis_client, status='draft')
+        # Le nombre de requêtes ne dépend pas du nombre de devis (une transaction par lot).
+        with django_assert_max_num_queries(20):
+            result = create_invoices_from_quotes([q.pk for q in quotes] + [draft.pk], batch_size=50)
+
+        assert len(result.created) == 5
+        assert set(result.errors) == {draft.pk}
+        year = date.today().year
+        assert sorted(inv.number for inv in result.invoices) == [f'FAC-{year}-{n:03d}' for n in range(1, 6)]
+        invoice = Invoice.objects.get(quote=quotes[0])
+        assert invoice.invoice_items.count() == 2
+        assert invoice.total_ht == Decimal('250.00')
+        assert invoice.total_ttc == Decimal('271.25')
+        assert InvoiceLifecycleEvent.verify_chain(invoice.pk) == (True, None)
+        quotes[0].refresh_from_db()
+        assert quotes[0].status == 'invoiced'
+
+    def test_bulk_conversion_skips_already_invoiced(self, devis_client):
+        from apps.devis.services import create_invoice_from_quote, create_invoices_from_quotes
+
+        q = self._accepted_quote(devis_client, '10.00')
+        create_invoice_from_quote(q)
+        Quote.objects.filter(pk=q.pk).update(status='accepted')
+        result = create_invoices_from_quotes([q])
+        assert result.created == []
+        assert 'existe déjà' in result.errors[q.pk]
+        assert Invoice.objects.filter(quote=q).count() == 1
+
 
 # ==============================================================================
 # FACTURES UTILS/SERVICES
@@ -5,6 +5,9 @@ Covers:
 - Rate limiting uses X-Forwarded-For behind proxy
 - 429 response after hitting limit
 - CacheControlMiddleware sets correct headers
+- Security audit events go through the buffered audit sink
+- Per-route request metrics and the staff-only Prometheus endpoint
+- Anonymous page cache: fresh CSP nonce / CSRF token per hit, bypass, invalidation
 """
 import pytest
 from django.test import Client, override_settings
@@ -75,6 +78,135 @@ class TestRateLimiting:
         assert response2.status_code != 429
 
 
+class TestRateLimiter:
+    """Test core.ratelimit (GCRA) semantics and fallback."""
+
+    def setup_method(self):
+        from core.ratelimit import limiter
+        cache.clear()
+        limiter.reset()
+
+    def test_burst_then_sliding_refill(self):
+        """After a burst, the next slot opens after period/limit, not a full window."""
+        from core.ratelimit import hit
+        results = [hit('t', 'ip', limit=5, period=3600) for _ in range(6)]
+        assert [r.allowed for r in results] == [True] * 5 + [False]
+        assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+        assert 0 < results[5].retry_after <= 720
+
+    def test_keys_are_independent(self):
+        from core.ratelimit import hit
+        assert hit('t', 'a', limit=1, period=60)
+        assert not hit('t', 'a', limit=1, period=60)
+        assert hit('t', 'b', limit=1, period=60)
+
+    def test_in_process_fallback_when_cache_is_down(self):
+        """A failing cache backend must not disable the limit."""
+        from unittest.mock import patch
+        from core.ratelimit import RateLimiter
+        limiter = RateLimiter()
+        with patch.object(RateLimiter, '_hit_cache', side_effect=ConnectionError('down')):
+            decisions = [limiter.hit('k', limit=2, period=60).allowed for _ in range(3)]
+        assert decisions == [True, True, False]
+
+    def test_conformite_check_uses_shared_limiter(self):
+        from unittest.mock import patch
+        from apps.simulateur.views import ConformiteCheckView
+        view = ConformiteCheckView()
+        with patch.object(ConformiteCheckView, 'MAX_PER_IP_PER_HOUR', 2):
+            assert [view._is_rate_limited('9.9.9.9') for _ in range(3)] == [False, False, True]
+
+    @pytest.mark.django_db
+    def test_newsletter_subscribe_stays_limited_when_cache_is_down(self):
+        from unittest.mock import patch
+        from django.urls import reverse
+        from core.ratelimit import RateLimiter
+        client = Client()
+        url = reverse('leads:newsletter_subscribe')
+        with patch.object(RateLimiter, '_hit_cache', side_effect=ConnectionError('down')):
+            codes = [client.post(url, {'email': 'invalide'}).status_code for _ in range(6)]
+        assert 429 not in codes[:5]
+        assert codes[5] == 429
+
+    @pytest.mark.django_db
+    def test_totp_qr_uses_shared_limiter(self):
+        from django.urls import reverse
+        client = Client()
+        url = reverse('admin_totp_qr')
+        codes = [client.post(url, {'username': 'x', 'password': 'y'}).status_code for _ in range(6)]
+        assert codes == [403] * 5 + [429]
+
+
+@pytest.mark.django_db
+class TestAuditSink:
+    """Test apps.audit.sink buffering, backpressure and flush."""
+
+    BUFFERED = {'MODE': 'memory', 'MAX_BUFFER': 3, 'BATCH_SIZE': 2, 'FLUSH_INTERVAL_MS': 60000}
+
+    def setup_method(self):
+        from apps.audit.sink import sink
+        sink.reset()
+
+    def _no_flusher(self):
+        # Le vidage est déclenché à la main, dans la connexion du test
+        from unittest.mock import patch
+        from apps.audit.sink import AuditSink
+        return patch.object(AuditSink, '_ensure_flusher')
+
+    def test_sync_mode_writes_immediately(self):
+        from apps.audit.models import AuditLog
+        assert AuditLog.enqueue('admin_action', content_type='x', description='sync')
+        assert AuditLog.objects.filter(description='sync').count() == 1
+
+    def test_buffered_events_are_bulk_written_on_flush(self, django_assert_num_queries):
+        from apps.audit.models import AuditLog
+        from apps.audit.sink import sink
+        with override_settings(AUDIT_SINK=self.BUFFERED), self._no_flusher():
+            for i in range(3):
+                assert AuditLog.enqueue('suspicious_activity', content_type='security.event', description=f'e{i}')
+            assert not AuditLog.objects.exists()
+            with django_assert_num_queries(2):  # un bulk_create par lot de 2
+                assert sink.flush() == 3
+        assert sorted(AuditLog.objects.values_list('description', flat=True)) == ['e0', 'e1', 'e2']
+
+    def test_full_buffer_drops_and_counts(self):
+        from apps.audit.models import AuditLog
+        from apps.audit.sink import sink
+        with override_settings(AUDIT_SINK=self.BUFFERED), self._no_flusher():
+            accepted = [AuditLog.enqueue('rate_limit_hit', description=str(i)) for i in range(5)]
+            assert accepted == [True, True, True, False, False]
+            assert sink.stats()['dropped'] == 2
+            assert sink.stats()['pending'] == 3
+            sink.shutdown()
+        assert AuditLog.objects.count() == 3
+        assert sink.stats()['pending'] == 0
+
+    def test_timestamp_is_event_time(self):
+        from datetime import timedelta
+        from unittest.mock import patch
+        from django.utils import timezone
+        from apps.audit.models import AuditLog
+        from apps.audit.sink import sink
+        with override_settings(AUDIT_SINK=self.BUFFERED), self._no_flusher():
+            before = timezone.now()
+            AuditLog.enqueue('admin_action', description='late')
+            with patch('django.utils.timezone.now', return_value=before + timedelta(hours=1)):
+                sink.flush()
+        log = AuditLog.objects.get(description='late')
+        assert log.timestamp - before < timedelta(minutes=1)
+
+    def test_suspicious_request_is_not_written_inline(self, client):
+        from apps.audit.models import AuditLog
+        from apps.audit.sink import sink
+        with override_settings(AUDIT_SINK=self.BUFFERED), self._no_flusher():
+            client.get('/wp-login.php')
+            assert not AuditLog.objects.exists()
+            sink.flush()
+        log = AuditLog.objects.get()
+        assert log.action_type == 'suspicious_activity'
+        assert log.metadata['path'] == '/wp-login.php'
+
+
 @pytest.mark.django_db
 class TestCacheControlHeaders:
     """Test CacheControlMiddleware header behavior."""
@@ -183,3 +315,192 @@ class TestSitemap:
         response = client.get('/sitemap.xml')
         assert response.status_code == 200
         assert b'<?xml' in response.content or b'<urlset' in response.content
+
+
+class TestRouteClassifier:
+    """Test config.routes compiled path classification."""
+
+    def test_rate_rules_keep_first_match_order(self):
+        from config.routes import classify
+        # POST /devis/pdf/ matches the broader '/devis/' rule first (list order)
+        assert classify('/devis/pdf/abc/').rate_rule('POST') == ('/devis/', 5, 3600)
+        assert classify('/devis/pdf/abc/').rate_rule('GET') == ('/devis/pdf/', 20, 3600)
+        assert classify('/contact/').rate_rule('GET') is None
+        assert classify('/services/').rate_rule('POST') is None
+
+    def test_exemption_and_audit_tags(self):
+        from config.routes import classify
+        admin = classify('/tus-gestion-secure/login/')
+        assert admin.password_exempt and admin.private and admin.login
+        assert not admin.canonical_exempt
+        static = classify('/static/css/app.css')
+        assert static.canonical_exempt and static.password_exempt and not static.private
+        assert classify('/wp-login.php').suspicious_path == 'wp-login'
+
+    def test_request_is_classified_once(self):
+        from unittest.mock import patch
+        from django.test import RequestFactory
+        from config import routes
+        request = RequestFactory().get('/services/', QUERY_STRING='q=%3Cscript')
+        with patch.object(routes, 'classify', wraps=routes.classify) as spy:
+            routes.route_of(request)
+            routes.route_of(request)
+            assert routes.suspicious_pattern(request) == '%3cscript'
+        assert spy.call_count == 1
+
+    def test_benchmark_command_runs(self):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('bench_middleware', iterations=50, stdout=out)
+        assert 'µs/requête' in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+    """Test config.middleware_metrics and the /metrics/ endpoint."""
+
+    ON = {'SAMPLE_RATE': 1.0, 'TOKEN': 'scrape-secret'}
+
+    def setup_method(self):
+        from core.metrics import registry
+        registry.reset()
+        cache.clear()
+
+    def _middleware(self, view):
+        from config.middleware_metrics import RequestMetricsMiddleware
+        return RequestMetricsMiddleware(view)
+
+    def _request(self, route='devis/<int:pk>/'):
+        from django.test import RequestFactory
+        from django.urls import ResolverMatch
+        request = RequestFactory().get('/devis/1/')
+        request.resolver_match = ResolverMatch(lambda r: None, (), {}, route=route)
+        return request
+
+    def test_sampling_off_records_nothing(self):
+        from django.http import HttpResponse
+        from core.metrics import registry
+        with override_settings(REQUEST_METRICS={'SAMPLE_RATE': 0}):
+            self._middleware(lambda r: HttpResponse('ok'))(self._request())
+        assert registry.snapshot() == {}
+
+    def test_queries_cache_and_size_are_recorded_per_route(self):
+        from django.contrib.auth.models import User
+        from django.http import HttpResponse
+        from core.metrics import registry
+
+        def view(request):
+            User.objects.count()
+            User.objects.exists()
+            cache.set('m-hit', 1)
+            cache.get('m-hit')
+            cache.get('m-miss')
+            cache.get_many(['m-hit', 'm-other'])
+            return HttpResponse('x' * 1500)
+
+        with override_settings(REQUEST_METRICS=self.ON):
+            self._middleware(view)(self._request())
+            self._middleware(view)(self._request())
+
+        metrics = registry.snapshot()[('devis/<int:pk>/', 'GET')]
+        assert metrics.latency.count == 2
+        assert metrics.queries.total == 4
+        assert (metrics.cache_hits, metrics.cache_misses) == (4, 4)
+        assert metrics.size.total == 3000
+        assert metrics.statuses == {'2xx': 2}
+
+    def test_endpoint_is_staff_only_and_prometheus_formatted(self, client):
+        from django.contrib.auth.models import User
+        with override_settings(REQUEST_METRICS=self.ON):
+            client.get('/contact/')
+            assert client.get('/metrics/').status_code == 403
+            assert client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code == 403
+
+            staff = User.objects.create_user('ops', 'ops@example.com', 'x', is_staff=True)
+            client.force_login(staff)
+            response = client.get('/metrics/')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        body = response.content.decode()
+        assert 'tus_http_requests_total{route="contact/",method="GET",status="2xx"' in body
+        assert 'le="+Inf"' in body
+        assert '# TYPE tus_http_db_queries histogram' in body
+        assert 'tus_audit_sink_dropped_total' in body
+
+    def test_endpoint_accepts_bearer_token(self, client):
+        with override_settings(REQUEST_METRICS=self.ON):
+            response = client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        assert response.status_code == 200
+
+
+@pytest.mark.django_db
+class TestAnonymousPageCache:
+    """Test core.page_cache on the public pages."""
+
+    ON = {'ENABLED': True, 'TIMEOUT': 60}
+    def setup_method(self):
+        cache.clear()
+
+    def _get(self, client, url='/faq/'):
+        from csp.constants import NONCE
+        policy = {'DIRECTIVES': {'default-src': ["'self'"], 'script-src': ["'self'", NONCE]}}
+        with override_settings(PAGE_CACHE=self.ON, CONTENT_SECURITY_POLICY=policy):
+            return client.get(url)
+
+    @staticmethod
+    def _nonces(response):
+        import re
+        body = set(re.findall(r'nonce="([^"]+)"', response.content.decode()))
+        header = re.search(r"'nonce-([^']+)'", response['Content-Security-Policy']).group(1)
+        return body, header
+
+    def test_hit_gets_a_fresh_nonce_matching_the_csp_header(self):
+        first = self._get(Client())
+        second = self._get(Client())
+        assert (first['X-Page-Cache'], second['X-Page-Cache']) == ('MISS', 'HIT')
+
+        (body1, header1), (body2, header2) = self._nonces(first), self._nonces(second)
+        assert body1 == {header1} and body2 == {header2}
+        assert header1 != header2
+        assert '__TUS_' not in second.content.decode()
+
+    def test_hit_carries_a_csrf_token_valid_for_the_visitor(self):
+        import re
+        from django.conf import settings
+        from django.middleware.csrf import _unmask_cipher_token
+
+        self._get(Client())
+        visitor = Client()
+        response = self._get(visitor)
+        assert response['X-Page-Cache'] == 'HIT'
+        token = re.search(r'"X-CSRFToken": "([^"]+)"', response.content.decode()).group(1)
+        assert _unmask_cipher_token(token) == response.cookies[settings.CSRF_COOKIE_NAME].value
+
+    def test_authenticated_and_query_string_requests_bypass(self):
+        from django.contrib.auth.models import User
+        self._get(Client())
+
+        member = Client()
+        member.force_login(User.objects.create_user('member', 'm@example.com', 'x'))
+        assert 'X-Page-Cache' not in self._get(member)
+        assert 'X-Page-Cache' not in self._get(Client(), '/faq/?utm_source=x')
+
+    def test_model_save_invalidates_tagged_pages(self):
+        from django.urls import reverse
+        from apps.portfolio.models import Project
+        url = reverse('portfolio:list')
+        assert self._get(Client(), url)['X-Page-Cache'] == 'MISS'
+        assert self._get(Client(), url)['X-Page-Cache'] == 'HIT'
+
+        Project.objects.create(
+            title='Nouveau site', slug='nouveau-site', project_type='vitrine',
+            objective='o', solution='s', result='r', is_published=True,
+        )
+        response = self._get(Client(), url)
+        assert response['X-Page-Cache'] == 'MISS'
+        assert 'Nouveau site' in response.content.decode()
+        # Étiquette non concernée : la FAQ reste en cache
+        self._get(Client())
+        assert self._get(Client())['X-Page-Cache'] == 'HIT'
@@ -0,0 +1,211 @@
+"""Query-budget regression guard (core.query_budget, baseline tests/query_budgets.json).
+
+Covers:
+- SQL fingerprints collapse literals, parameters and IN lists
+- @query_budget raises with the duplicated fingerprints in test mode
+- Every page of the baseline stays within its budget:
+  public pages, client portal, quote/invoice PDFs, admin changelists
+
+Each scenario runs on data with several rows per relation, so a per-row
+query (N+1) shows up as a budget overrun. After an intended change, refresh
+the baseline with ``pytest tests/test_query_budgets.py --update-query-budgets``.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.query_budget import QueryBudgetExceeded, fingerprint, load_baseline, query_budget
+
+ROWS = 3
+
+
+class TestFingerprint:
+    def test_literals_params_and_in_lists_are_normalised(self):
+        a = fingerprint('SELECT * FROM "t" WHERE "id" = %s AND "k" = \'x\' LIMIT 21')
+        b = fingerprint('SELECT  *  FROM "t" WHERE "id" = %s AND "k" = \'y\' LIMIT 5')
+        assert a == b == 'SELECT * FROM "t" WHERE "id" = ? AND "k" = ? LIMIT ?'
+        assert fingerprint('SELECT 1 FROM "t1" WHERE "id" IN (%s, %s, %s)') == \
+            'SELECT ? FROM "t1" WHERE "id" IN (...)'
+
+
+@pytest.mark.django_db
+class TestQueryBudgetDecorator:
+    def test_overrun_reports_duplicated_queries(self):
+        for i in range(3):
+            User.objects.create_user(f'u{i}')
+
+        @query_budget(2)
+        def view(request):
+            for user in User.objects.all():
+                User.objects.filter(pk=user.pk).exists()
+            return HttpResponse('ok')
+
+        assert view.query_budget == 2
+        with pytest.raises(QueryBudgetExceeded) as exc:
+            view(RequestFactory().get('/n-plus-one/'))
+        message = str(exc.value)
+        assert 'GET /n-plus-one/ : 4 requêtes SQL pour un budget de 2' in message
+        assert '3× SELECT ? AS "a" FROM "auth_user"' in message
+
+    def test_off_mode_does_not_count(self):
+        @query_budget(0)
+        def view(request):
+            User.objects.exists()
+            return HttpResponse('ok')
+
+        with override_settings(QUERY_BUDGETS={'MODE': 'off'}):
+            assert view(RequestFactory().get('/')).status_code == 200
+
+
+# ==============================================================================
+# BASELINE SCENARIOS
+# ==============================================================================
+
+@pytest.fixture
+def budget_world(db):
+    """Plusieurs lignes par relation : un N+1 fait dépasser le budget."""
+    from django_otp.plugins.otp_static.models import StaticDevice
+
+    from apps.chroniques.models import Article
+    from apps.clients.models import ClientProfile, Project as ClientProject
+    from apps.devis.models import Quote, QuoteItem
+    from apps.factures.models import Invoice, InvoiceItem
+    from apps.leads.models import Lead
+    from apps.messaging.models import CampaignRecipient, EmailCampaign, Prospect, ProspectMessage
+    from apps.pages.models import Testimonial
+    from apps.portfolio.models import Project as PortfolioProject
+    from apps.resources.models import ArticleTag, KnowledgeArticle, KnowledgeCategory
+
+    staff = User.objects.create_superuser('ops', 'ops@test.com', 'pass123')
+    device = StaticDevice.objects.create(user=staff, name='budget')
+    customer = User.objects.create_user('budget_client', 'client@test.com', 'pass123')
+    profile = ClientProfile.objects.create(
+        user=customer, full_name='Jean Dupont', email='client@test.com', company_name='Dupont SARL',
+    )
+
+    quotes, invoices = [], []
+    for i in range(ROWS):
+        ClientProject.objects.create(client=profile, name=f'Projet {i}', status='briefing')
+        quote = Quote.objects.create(client=profile, status='sent')
+        invoice = Invoice.objects.create(client=profile, quote=quote, status='sent')
+        for j in range(ROWS):
+            QuoteItem.objects.create(quote=quote, description=f'Ligne {j}', quantity=1, unit_price=Decimal('100.00'))
+            InvoiceItem.objects.create(
+                invoice=invoice, description=f'Ligne {j}', quantity=Decimal('1'), unit_price=Decimal('100.00'),
+            )
+        quotes.append(quote)
+        invoices.append(invoice)
+
+        PortfolioProject.objects.create(
+            title=f'Réalisation {i}', slug=f'realisation-{i}', project_type='vitrine',
+            objective='Pourquoi', solution='Défi', result='Résultat',
+        )
+        Article.objects.create(
+            title=f'Chronique {i}', slug=f'chronique-{i}', body='Contenu',
+            is_published=True, publish_date=timezone.now(),
+        )
+        category = KnowledgeCategory.objects.create(name=f'Catégorie {i}', slug=f'categorie-{i}')
+        tag = ArticleTag.objects.create(name=f'Tag {i}', slug=f'tag-{i}')
+        for j in range(ROWS):
+            tag.articles.add(KnowledgeArticle.objects.create(
+                category=category, title=f'Article {i}.{j}', slug=f'article-{i}-{j}',
+                summary='Résumé', content='Contenu',
+            ))
+        Testimonial.objects.create(client_name=f'Client {i}', content='Très bien')
+        Lead.objects.create(name=f'Lead {i}', email=f'lead{i}@test.com', project_type='site', message='Bonjour')
+        campaign = EmailCampaign.objects.create(name=f'Campagne {i}', created_by=staff)
+        for j in range(ROWS):
+            prospect, _ = Prospect.objects.get_or_create(
+                email=f'prospect{j}@test.com', defaults={'contact_name': f'Prospect {j}', 'company_name': 'Co'},
+            )
+            CampaignRecipient.objects.create(campaign=campaign, prospect=prospect)
+            ProspectMessage.objects.create(prospect=prospect, subject=f'Relance {i}', content='Bonjour')
+
+    return {
+        'staff': staff, 'device': device, 'customer': customer,
+        'quote': quotes[0], 'invoice': invoices[0],
+    }
+
+
+def _admin(model):
+    return lambda world: (reverse(f'admin:{model}_changelist'), 'staff')
+
+
+SCENARIOS = {
+    # Pages publiques (anonyme)
+    'pages:home': lambda w: (reverse('pages:home'), None),
+    'pages:services': lambda w: (reverse('pages:services'), None),
+    'pages:method': lambda w: (reverse('pages:method'), None),
+    'pages:faq': lambda w: (reverse('pages:faq'), None),
+    'portfolio:list': lambda w: (reverse('portfolio:list'), None),
+    'chroniques:list': lambda w: (reverse('chroniques:list'), None),
+    'resources:list': lambda w: (reverse('resources:list'), None),
+    'leads:contact': lambda w: (reverse('leads:contact'), None),
+    'devis:request_quote': lambda w: (reverse('devis:request_quote'), None),
+    # Portail client
+    'clients:dashboard': lambda w: (reverse('clients:dashboard'), 'customer'),
+    'clients:projects': lambda w: (reverse('clients:projects'), 'customer'),
+    'clients:quotes': lambda w: (reverse('clients:quotes'), 'customer'),
+    'clients:quote_detail': lambda w: (reverse('clients:quote_detail', args=[w['quote'].pk]), 'customer'),
+    'clients:invoices': lambda w: (reverse('clients:invoices'), 'customer'),
+    'clients:invoice_detail': lambda w: (reverse('clients:invoice_detail', args=[w['invoice'].pk]), 'customer'),
+    # PDF devis / factures
+    'devis:quote_public_pdf': lambda w: (reverse('devis:quote_public_pdf', args=[w['quote'].public_token]), None),
+    'factures:public_pdf': lambda w: (reverse('factures:public_pdf', args=[w['invoice'].public_token]), None),
+    'clients:quote_pdf_download': lambda w: (
+        reverse('clients:quote_pdf_download', args=[w['quote'].pk]), 'customer',
+    ),
+    'clients:invoice_pdf_download': lambda w: (
+        reverse('clients:invoice_pdf_download', args=[w['invoice'].pk]), 'customer',
+    ),
+    # Changelists admin
+    'admin:devis_quote_changelist': _admin('devis_quote'),
+    'admin:factures_invoice_changelist': _admin('factures_invoice'),
+    'admin:clients_clientprofile_changelist': _admin('clients_clientprofile'),
+    'admin:leads_lead_changelist': _admin('leads_lead'),
+    'admin:messaging_emailcampaign_changelist': _admin('messaging_emailcampaign'),
+    'admin:messaging_prospect_changelist': _admin('messaging_prospect'),
+    'admin:messaging_prospectmessage_changelist': _admin('messaging_prospectmessage'),
+    'admin:resources_knowledgecategory_changelist': _admin('resources_knowledgecategory'),
+    'admin:resources_knowledgearticle_changelist': _admin('resources_knowledgearticle'),
+    'admin:resources_articletag_changelist': _admin('resources_articletag'),
+    'admin:chroniques_article_changelist': _admin('chroniques_article'),
+    'admin:portfolio_project_changelist': _admin('portfolio_project'),
+    'admin:pages_testimonial_changelist': _admin('pages_testimonial'),
+}
+
+
+def test_baseline_covers_every_scenario(request):
+    if request.config.getoption('--update-query-budgets'):
+        pytest.skip('baseline en cours de réécriture')
+    assert sorted(load_baseline()) == sorted(SCENARIOS)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', sorted(SCENARIOS))
+def test_page_stays_within_query_budget(name, budget_world, client, query_budget):
+    from django.core.cache import cache
+    from django_otp import DEVICE_ID_SESSION_KEY
+
+    url, who = SCENARIOS[name](budget_world)
+    if who == 'staff':
+        client.force_login(budget_world['staff'])
+        session = client.session
+        session[DEVICE_ID_SESSION_KEY] = budget_world['device'].persistent_id
+        session.save()
+    elif who == 'customer':
+        client.force_login(budget_world['customer'])
+    cache.clear()  # budgets mesurés à froid
+
+    # Le rendu WeasyPrint n'est pas mesuré ; les requêtes du gabarit PDF le sont
+    with patch('core.services.document_generator.DocumentGenerator._render_pdf', return_value=b'%PDF-budget'), \
+            query_budget(name):
+        response = client.get(url)
+
+    assert response.status_code == 200, f'{url} → {response.status_code}'